@@ -0,0 +1,225 @@
+"""Online backup van de catalogus via de SQLite backup API.
+
+De database is de enige index van de media collectie. Het .db bestand
+kopieren tijdens een index run kan een half geschreven kopie opleveren (en
+mist alles wat nog in de WAL staat). De backup job kopieert de database met
+Connection.backup in stappen van een aantal pages en slaapt tussen de
+stappen, zodat de writer en de schijf ruimte houden.
+
+De bron is een read-only connectie met een open read transactie: in WAL mode
+ziet de backup een vaste snapshot terwijl de writer doorschrijft. Zonder die
+transactie zou elke commit van de writer de backup vooraan laten beginnen.
+
+Elke backup wordt als <naam>_<YYYYmmdd_HHMMSS>.db geschreven (eerst als
+.partial, na een quick_check hernoemd). Alleen de laatste N generaties blijven
+bewaard.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote
+
+from integrity_scanner import lower_thread_priority
+
+_TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+
+class BackupCancelledError(Exception):
+    """Backup gestopt via stop()."""
+
+
+class CatalogBackup:
+    """Backup job met page-step batches en rotatie van generaties."""
+
+    def __init__(
+        self,
+        db_path: str | Path,
+        backup_dir: str | Path,
+        *,
+        keep: int = 7,
+        pages: int = 1024,
+        sleep: float = 0.01,
+        nice_value: int = 19,
+    ) -> None:
+        """Initialize de backup job.
+
+        Args:
+        ----
+            db_path: Pad naar de SQLite database
+            backup_dir: Directory voor de backup bestanden
+            keep: Aantal backup generaties dat bewaard blijft
+            pages: Aantal pages per backup stap
+            sleep: Seconden pauze tussen twee stappen
+            nice_value: Nice waarde voor de backup thread
+
+        """
+        self.db_path = Path(db_path)
+        self.backup_dir = Path(backup_dir)
+        self.keep = max(1, keep)
+        self.pages = max(1, pages)
+        self.sleep = sleep
+        self.nice_value = nice_value
+        self._pattern = re.compile(rf"^{re.escape(self.db_path.stem)}_(\d{{8}}_\d{{6}})(?:_\d+)?\.db$")
+
+        self.thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+
+        # Voortgang (ook beschikbaar voor UI)
+        self.pages_done = 0
+        self.pages_total = 0
+        self.last_backup: Path | None = None
+        self.last_error: str | None = None
+
+    @classmethod
+    def from_config(cls, db_path: str | Path | None = None) -> "CatalogBackup":
+        """Maak een backup job met parameters uit config.json (default van database_name)."""
+        from config import get_param
+
+        return cls(
+            db_path=db_path or get_param("database", "database_name"),
+            backup_dir=get_param("database", "database_backup_path"),
+            keep=get_param("database", "database_backup_keep"),
+            pages=get_param("database", "database_backup_pages"),
+            sleep=get_param("database", "database_backup_sleep"),
+            nice_value=get_param("integrity", "integrity_nice"),
+        )
+
+    @property
+    def is_running(self) -> bool:
+        """Check of de backup thread actief is."""
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self) -> None:
+        """Start een backup in een achtergrond thread."""
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop een lopende backup; de onvolledige kopie wordt verwijderd."""
+        self._stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=timeout)
+
+    def get_progress(self) -> dict[str, object]:
+        """Haal voortgang op voor UI updates."""
+        with self._lock:
+            return {
+                "is_running": self.is_running,
+                "pages_done": self.pages_done,
+                "pages_total": self.pages_total,
+                "last_backup": str(self.last_backup) if self.last_backup else None,
+                "last_error": self.last_error,
+            }
+
+    def generations(self) -> list[Path]:
+        """Bestaande backups, nieuwste eerst."""
+        if not self.backup_dir.is_dir():
+            return []
+        backups = [path for path in self.backup_dir.iterdir() if self._pattern.match(path.name)]
+        return sorted(backups, key=lambda path: path.name, reverse=True)
+
+    def prune(self) -> list[Path]:
+        """Verwijder backups buiten de laatste keep generaties; geeft de verwijderde paden."""
+        removed = self.generations()[self.keep:]
+        for path in removed:
+            path.unlink(missing_ok=True)
+        return removed
+
+    def backup_path(self, now: datetime | None = None) -> Path:
+        """Nieuw backup pad met tijdstempel (uniek binnen dezelfde seconde)."""
+        stamp = (now or datetime.now()).strftime(_TIMESTAMP_FORMAT)  # noqa: DTZ005
+        path = self.backup_dir / f"{self.db_path.stem}_{stamp}.db"
+        counter = 1
+        while path.exists():
+            path = self.backup_dir / f"{self.db_path.stem}_{stamp}_{counter}.db"
+            counter += 1
+        return path
+
+    def _run(self) -> None:
+        """Thread entry point."""
+        lower_thread_priority(self.nice_value)
+        try:
+            self.run_once()
+        except (OSError, sqlite3.Error) as e:
+            with self._lock:
+                self.last_error = str(e)
+
+    def _connect_source(self) -> sqlite3.Connection:
+        """Read-only bron connectie met een vaste snapshot (open read transactie)."""
+        uri = f"file:{quote(str(self.db_path.resolve()))}?mode=ro"
+        source = sqlite3.connect(uri, uri=True, timeout=30.0, isolation_level=None)
+        source.execute("BEGIN")
+        source.execute("SELECT count(*) FROM sqlite_master").fetchone()
+        return source
+
+    def run_once(
+        self, progress_callback: Callable[[int, int], None] | None = None,
+    ) -> Path | None:
+        """Maak een backup; geeft het pad of None als de backup gestopt is.
+
+        Args:
+        ----
+            progress_callback: Optioneel, aangeroepen met (pages klaar, pages totaal)
+
+        Raises
+        ------
+            sqlite3.Error: Als de backup of de quick_check mislukt
+
+        """
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        # Restanten van een backup die door een crash niet afgemaakt is
+        for stale in self.backup_dir.glob(f"{self.db_path.stem}_*.db.partial"):
+            stale.unlink(missing_ok=True)
+        target = self.backup_path()
+        partial = target.with_name(f"{target.name}.partial")
+        with self._lock:
+            self.pages_done = self.pages_total = 0
+            self.last_error = None
+
+        def progress(_status: int, remaining: int, total: int) -> None:
+            with self._lock:
+                self.pages_total = total
+                self.pages_done = total - remaining
+            if progress_callback is not None:
+                progress_callback(total - remaining, total)
+            if self._stop_event.is_set():
+                raise BackupCancelledError
+            if remaining and self.sleep > 0:
+                time.sleep(self.sleep)
+
+        source = self._connect_source()
+        try:
+            destination = sqlite3.connect(partial)
+            try:
+                source.backup(destination, pages=self.pages, progress=progress)
+                # Losse kopie zonder -wal bestand
+                destination.execute("PRAGMA journal_mode = DELETE")
+                result = destination.execute("PRAGMA quick_check").fetchone()[0]
+                if result != "ok":
+                    msg = f"Backup quick_check failed: {result}"
+                    raise sqlite3.DatabaseError(msg)
+            finally:
+                destination.close()
+            with partial.open("rb") as handle:
+                os.fsync(handle.fileno())
+            partial.replace(target)
+        except BackupCancelledError:
+            return None
+        finally:
+            source.close()
+            partial.unlink(missing_ok=True)
+
+        with self._lock:
+            self.last_backup = target
+        self.prune()
+        return target
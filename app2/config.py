@@ -213,6 +213,51 @@ def create_default_config() -> dict[str, Any]:
             "database_table_media": "Media",
             "database_table_media_new": "Media_New",
             "database_table_dirs": "Directories",
+            "database_table_segments": "Media_Segments",
+            "database_table_integrity_progress": "Integrity_Progress",
+            "database_table_integrity_mismatches": "Integrity_Mismatches",
+            "database_table_geo": "Media_Geo",
+            "database_table_stats": "Library_Stats",
+            "database_table_raw": "Media_Raw",
+            "database_raw_codec": "zlib",
+            "database_table_backfill": "Schema_Backfill",
+            "database_backfill_batch_size": 200,
+            "database_read_pool_size": 4,
+            "database_mmap_size": 268435456,
+            "database_statement_cache": 256,
+            "database_sql_page_size": 100,
+            "database_query_timeout": 30,
+            "database_query_cache_mb": 64,
+            "database_export_batch_size": 1000,
+            "database_backup_path": "../YAPMO_backup",
+            "database_backup_keep": 7,
+            "database_backup_pages": 1024,
+            "database_backup_sleep": 0.01,
+            "database_maintenance_interval": 300,
+            "database_maintenance_idle": 60,
+            "database_maintenance_step_budget": 0.5,
+            "database_wal_threshold_mb": 64,
+            "database_vacuum_pages": 256,
+            "database_migration_chunk_size": 5000,
+            "database_federation": False,
+            "database_catalog_path": "../YAPMO_db/volumes",
+            "database_federated_view": "AllMedia",
+            "database_diff_report_path": "../YAPMO_reports",
+            "database_geo_index": False,
+            "database_table_fts": "Media_FTS",
+            "database_fts_fields": [
+                "YAPMO_FILE_Name", "IPTC_Keywords", "XMP_Subject",
+                "XMP_HierarchicalSubject", "XMP_Title", "QuickTime_Keywords",
+                "QuickTime_Title", "QuickTime_Description",
+            ],
+            "database_table_tags": "Tags",
+            "database_table_media_tags": "MediaTags",
+            "database_tag_fields": ["IPTC_Keywords", "XMP_Subject", "QuickTime_Keywords"],
+            "database_hierarchical_tag_fields": ["XMP_HierarchicalSubject"],
+            "database_index_fields": [
+                "EXIF_DateTimeOriginal", "QuickTime_CreateDate",
+                "YAPMO_FILE_Size", "XMP_Rating",
+            ],
             "database_write_retry": 3,
             "database_max_retry_files": 10,
             "database_write_batch_size": 1000,
@@ -220,13 +265,13 @@ def create_default_config() -> dict[str, Any]:
         "metadata_fields_file": {
             "YAPMO:Modify": "YAPMO_Modify",
             "YAPMO:FileName": "YAPMO_FILE_Name",
-            "FILE:FileName": "FILE_Name",
+            "File:FileName": "FILE_Name",
             "YAPMO:Directory": "YAPMO_FILE_Path",
-            "FILE:Directory": "FILE_Path",
+            "File:Directory": "FILE_Path",
             "YAPMO:FileSize": "YAPMO_FILE_Size",
-            "FILE:FileSize": "FILE_Size",
+            "File:FileSize": "FILE_Size",
             "YAPMO:FileType": "YAPMO_FILE_Type",
-            "FILE:FileType": "FILE_Type",
+            "File:FileType": "FILE_Type",
             "YAPMO:Name_New": "YAPMO_FILE_Name_New",
             "YAPMO:Path_New": "YAPMO_FILE_Path_New",
             "YAPMO:Hash": "YAPMO_hash",
@@ -234,6 +279,8 @@ def create_default_config() -> dict[str, Any]:
             "YAPMO:Sidecars": "YAPMO_Sidecars",
             "File:FileModifyDate": "FILE_Modify_Date",
             "YAPMO:FQPN": "YAPMO_FQPN",
+            "YAPMO:PHash": "YAPMO_phash",
+            "YAPMO:Health": "YAPMO_health",
         },
         "metadata_fields_image": {
             "EXIF:DateTimeOriginal": "EXIF_DateTimeOriginal",
@@ -242,18 +289,21 @@ def create_default_config() -> dict[str, Any]:
             "EXIF:GPSTimeStamp": "EXIF_GPSTimeStamp",
             "IPTC:Keywords": "IPTC_Keywords",
             "IPTC:TimeCreated": "IPTC_TimeCreated",
-                    "XMP_CreateDate": "XMP_CreateDate",
-        "XMP_ModifyDate": "XMP_ModifyDate",
-        "XMP_Rating": "XMP_Rating",
-        "XMP_Subject": "XMP_Subject",
-        "XMP_HierarchicalSubject": "XMP_HierarchicalSubject",
-        "XMP_RegionAreaH": "XMP_RegionAreaH",
-        "XMP_RegionAreaW": "XMP_RegionAreaW",
-        "XMP_RegionAreaX": "XMP_RegionAreaX",
-        "XMP_RegionAreaY": "XMP_RegionAreaY",
-        "XMP_RegionType": "XMP_RegionType",
-        "XMP_RegionName": "XMP_RegionName",
-        "XMP_Title": "XMP_Title",
+                    "XMP:CreateDate": "XMP_CreateDate",
+        "XMP:ModifyDate": "XMP_ModifyDate",
+        "XMP:Rating": "XMP_Rating",
+        "XMP:Subject": "XMP_Subject",
+        "XMP:HierarchicalSubject": "XMP_HierarchicalSubject",
+        "XMP:RegionAreaH": "XMP_RegionAreaH",
+        "XMP:RegionAreaW": "XMP_RegionAreaW",
+        "XMP:RegionAreaX": "XMP_RegionAreaX",
+        "XMP:RegionAreaY": "XMP_RegionAreaY",
+        "XMP:RegionType": "XMP_RegionType",
+        "XMP:RegionName": "XMP_RegionName",
+        "XMP:Title": "XMP_Title",
+            "Composite:GPSLatitude": "GPS_Latitude",
+            "Composite:GPSLongitude": "GPS_Longitude",
+            "EXIF:Model": "EXIF_Model",
         },
         "metadata_fields_video": {
             "QuickTime:CreateDate": "QuickTime_CreateDate",
@@ -265,6 +315,25 @@ def create_default_config() -> dict[str, Any]:
             "Composite:ImageSize": "Composite_ImageSize",
             "Composite:Megapixels": "Composite_Megapixels",
             "Composite:Duration": "Composite_Duration",
+            "Composite:GPSLatitude": "GPS_Latitude",
+            "Composite:GPSLongitude": "GPS_Longitude",
+        },
+        "database_field_types": {
+            "YAPMO_FILE_Size": "INTEGER",
+            "FILE_Size": "INTEGER",
+            "YAPMO_FILE_Modify_Date": "EPOCH",
+            "FILE_Modify_Date": "EPOCH",
+            "EXIF_DateTimeOriginal": "EPOCH",
+            "IPTC_DateCreated": "ISODATE",
+            "XMP_CreateDate": "EPOCH",
+            "XMP_ModifyDate": "EPOCH",
+            "XMP_Rating": "INTEGER",
+            "QuickTime_CreateDate": "EPOCH",
+            "Composite_Rating": "INTEGER",
+            "Composite_Megapixels": "REAL",
+            "Composite_Duration": "DURATION",
+            "GPS_Latitude": "REAL",
+            "GPS_Longitude": "REAL",
         },
         "metadata_write_image": {
             "File:Name": False,
@@ -311,6 +380,26 @@ def create_default_config() -> dict[str, Any]:
             "exiftool_timeout": 30000,
             "nicegui_update_interval": 500,
             "ui_update": 500,
+            "tree_hash_enabled": False,
+            "tree_hash_threshold": 1073741824,
+            "tree_hash_segment_size": 67108864,
+            "tree_hash_threads": 4,
+            "single_read": False,
+            "single_read_max_size": 268435456,
+            "perceptual_hash": False,
+            "perceptual_hash_algorithm": "dhash",
+            "health_check": True,
+            "store_raw_metadata": False,
+            "run_spool": True,
+            "run_spool_path": "../YAPMO_spool",
+            "run_spool_fsync_every": 100,
+            "run_spool_fsync_interval": 1.0,
+        },
+        "integrity": {
+            "integrity_rate_limit_mb": 20,
+            "integrity_nice": 19,
+            "integrity_checkpoint_interval": 100,
+            "integrity_batch_size": 500,
         },
         "paths": {
             "source_path": "/workspaces",
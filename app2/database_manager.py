@@ -8,24 +8,65 @@ VERSIE 2: Database initialisatie routine
 """
 
 import sqlite3
+import subprocess
 from pathlib import Path
 from typing import Dict, Any
-from threading import Lock
+from threading import Event, Lock, Thread
 
 from config import get_param
 from globals import logging_service
 from nicegui import ui  # type: ignore[import]
+from directory_index import DirectoryIndex
+from fts_index import FullTextIndex, fts5_available
+from geo_index import GeoIndex, rtree_available
+from legacy_migration import LegacyMigration, MigrationReport
+from library_stats import LibraryStats
+from maintenance import enable_incremental_vacuum, maintenance_paused
+from metadata_blob import RawMetadataStore, zstd_available
+from query_cache import write_generation
+from read_pool import enable_wal, reset_shared_pool
+from schema_evolution import SchemaEvolution
+from tag_index import TagIndex
+from typed_ingest import TypedRecordMapper, index_statements
 
 
 class DatabaseManager:
     """Database manager voor YAPMO met initialisatie routine."""
     
-    def __init__(self) -> None:
-        """Initialize DatabaseManager met configuratie."""
+    def __init__(
+        self, db_name: str | Path | None = None, *, clean: bool | None = None, notify: bool = True,
+    ) -> None:
+        """Initialize DatabaseManager met configuratie.
+
+        Args:
+            db_name: Optioneel ander database bestand, bijv. de catalogus van een
+                volume bij federatie (default database_name uit config)
+            clean: Database eerst verwijderen (default database_clean uit config)
+            notify: Fouten ook als UI melding tonen (False buiten een NiceGUI client, bijv. CLI)
+        """
+        self.notify = notify
         # Load configuratie parameters
-        self.db_name = get_param("database", "database_name")
+        self.db_name = db_name or get_param("database", "database_name")
         self.db_table_media = get_param("database", "database_table_media")
-        self.database_clean = get_param("database", "database_clean")
+        self.db_table_segments = get_param("database", "database_table_segments")
+        self.database_clean = get_param("database", "database_clean") if clean is None else clean
+        self.db_write_retry = get_param("database", "database_write_retry")
+        self.db_index_fields = get_param("database", "database_index_fields")
+        self.db_table_dirs = get_param("database", "database_table_dirs")
+        self.db_table_geo = get_param("database", "database_table_geo")
+        self.db_table_stats = get_param("database", "database_table_stats")
+        self.db_table_raw = get_param("database", "database_table_raw")
+        self.db_table_backfill = get_param("database", "database_table_backfill")
+        self.backfill_batch_size = get_param("database", "database_backfill_batch_size")
+        self.migration_chunk_size = get_param("database", "database_migration_chunk_size")
+        self.raw_codec = get_param("database", "database_raw_codec")
+        self.geo_index_enabled = get_param("database", "database_geo_index")
+        self.db_table_fts = get_param("database", "database_table_fts")
+        self.fts_fields = get_param("database", "database_fts_fields")
+        self.db_table_tags = get_param("database", "database_table_tags")
+        self.db_table_media_tags = get_param("database", "database_table_media_tags")
+        self.tag_fields = get_param("database", "database_tag_fields")
+        self.hierarchical_tag_fields = get_param("database", "database_hierarchical_tag_fields")
         
         # Database paths
         self.db_path = Path(self.db_name)
@@ -33,9 +74,39 @@ class DatabaseManager:
         # Database state
         self.connection: sqlite3.Connection | None = None
         self.cursor: sqlite3.Cursor | None = None
+        # True als database_clean het bestand verwijderd heeft (run spool hervat dan niet)
+        self.cleaned = False
         
         # Thread safety
         self.db_lock = Lock()
+
+        # Typed ingest: worker resultaten -> getypeerde kolommen
+        self.record_mapper = TypedRecordMapper(
+            self._get_field_mappings(), get_param("database_field_types"),
+        )
+
+        # Directory boom met range keys voor subtree queries
+        self.directory_index: DirectoryIndex | None = None
+
+        # Incrementele statistieken (per type, maand, camera, directory)
+        self.library_stats: LibraryStats | None = None
+
+        # ALTER TABLE + backfill bij gewijzigde metadata mappings
+        self.schema_evolution: SchemaEvolution | None = None
+        self._backfill_thread: Thread | None = None
+        self._backfill_stop = Event()
+
+        # Volledige ExifTool JSON per bestand (gecomprimeerd)
+        self.raw_store: RawMetadataStore | None = None
+
+        # Ruimtelijke index (optioneel, vereist SQLite R*Tree)
+        self.geo_index: GeoIndex | None = None
+
+        # Full-text index over keywords/titels (optioneel, vereist FTS5)
+        self.fts_index: FullTextIndex | None = None
+
+        # Genormaliseerde tags voor facet tellingen
+        self.tag_index: TagIndex | None = None
         
         # Initialize database
         self._initialize_database()
@@ -49,14 +120,16 @@ class DatabaseManager:
             
             # Clean database indien gewenst
             if self.database_clean and self.db_path.exists():
-                self.db_path.unlink()
-                logging_service.log("INFO", f"Removed existing database: {self.db_path}")
+                self._remove_database()
             
             # Connect to database
             self._connect()
             
             # Initialize tables
             self._initialize_tables()
+
+            # Nieuwe kolommen vullen voor bestaande rijen (achtergrond)
+            self._start_schema_backfill()
             
             logging_service.log("INFO", "Database initialization completed successfully")
             
@@ -64,13 +137,29 @@ class DatabaseManager:
             error_msg = f"Database initialization failed: {e}"
             logging_service.log("ERROR", error_msg)
             # UI melding voor gebruiker
-            ui.notify(
-                "Database initialization failed - Check logs for details",
-                type="negative",
-                position="top-right"
-            )
+            self._notify_error("Database initialization failed - Check logs for details")
             raise
     
+    def _notify_error(self, message: str) -> None:
+        """Toon een foutmelding in de UI (alleen binnen een NiceGUI client)."""
+        if self.notify:
+            ui.notify(message, type="negative", position="top-right")
+
+    def _remove_database(self) -> None:
+        """Verwijder het database bestand met WAL en shared memory bestanden.
+
+        Open read pool en onderhoud connecties worden eerst gesloten: anders
+        lezen ze door op het verwijderde bestand, en een achtergebleven -wal
+        zou op de nieuwe database teruggespeeld kunnen worden.
+        """
+        if self.db_path == Path(get_param("database", "database_name")):
+            reset_shared_pool()
+        with maintenance_paused():
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{self.db_path}{suffix}").unlink(missing_ok=True)
+        self.cleaned = True
+        logging_service.log("INFO", f"Removed existing database: {self.db_path}")
+
     def _connect(self) -> None:
         """Connect to SQLite database met timeout."""
         try:
@@ -78,25 +167,35 @@ class DatabaseManager:
             self.db_path.parent.mkdir(parents=True, exist_ok=True)
             
             # Connect to database met 30 seconden timeout
-            self.connection = sqlite3.connect(str(self.db_path), timeout=30.0)
+            # check_same_thread=False: de batch writer draait in de processing
+            # thread; db_lock serialiseert alle toegang tot deze connectie
+            self.connection = sqlite3.connect(
+                str(self.db_path), timeout=30.0, check_same_thread=False,
+            )
             self.cursor = self.connection.cursor()
+
+            # Nieuwe databases: vrije pages later teruggeven via incremental_vacuum
+            enable_incremental_vacuum(self.connection)
+
+            # WAL: readers uit de read pool lezen door terwijl de writer schrijft
+            journal_mode = enable_wal(self.connection)
             
-            logging_service.log("INFO", f"Connected to database: {self.db_path}")
+            logging_service.log("INFO", f"Connected to database: {self.db_path} (journal_mode={journal_mode})")
             
         except sqlite3.OperationalError as e:
             if "database is locked" in str(e).lower():
                 error_msg = "Database connection timeout ERROR - Check database, maybe in use by other programs"
                 logging_service.log("ERROR", error_msg)
-                ui.notify(error_msg, type="negative", position="top-right")
+                self._notify_error(error_msg)
             else:
                 error_msg = f"Database connection error: {e}"
                 logging_service.log("ERROR", error_msg)
-                ui.notify(error_msg, type="negative", position="top-right")
+                self._notify_error(error_msg)
             raise
         except Exception as e:
             error_msg = f"Unexpected database connection error: {e}"
             logging_service.log("ERROR", error_msg)
-            ui.notify(error_msg, type="negative", position="top-right")
+            self._notify_error(error_msg)
             raise
     
     def _initialize_tables(self) -> None:
@@ -104,6 +203,27 @@ class DatabaseManager:
         try:
             # Create media table
             self._create_media_table()
+
+            # Create segment digests table (tree hash)
+            self._create_segments_table()
+
+            # Create directory tabel
+            self._create_directory_index()
+
+            # Create statistieken tabel
+            self._create_library_stats()
+
+            # Create raw metadata tabel
+            self._create_raw_store()
+
+            # Create spatial index (optioneel)
+            self._create_geo_index()
+
+            # Create full-text index (optioneel)
+            self._create_fts_index()
+
+            # Create tag tabellen
+            self._create_tag_index()
             
             logging_service.log("INFO", "All tables initialized successfully")
             
@@ -115,19 +235,14 @@ class DatabaseManager:
     def _create_media_table(self) -> None:
         """Create media table met dynamic fields vanuit config."""
         try:
-            # Get field mappings from config
-            field_mappings = self._get_field_mappings()
-            
             # Base fields
             fields = [
                 "id INTEGER PRIMARY KEY AUTOINCREMENT",
                 "YAPMO_FQPN TEXT UNIQUE NOT NULL"  # Fully Qualified Path Name
             ]
             
-            # Add fields from config
-            for exif_key, db_field in field_mappings.items():
-                if db_field not in ['YAPMO_FQPN']:  # Skip if already defined
-                    fields.append(f"{db_field} TEXT")
+            # Add fields from config (affinity uit database_field_types)
+            fields.extend(self.record_mapper.column_definitions())
             
             # Create table
             create_sql = f"""
@@ -137,6 +252,9 @@ class DatabaseManager:
             """
             
             self.cursor.execute(create_sql)
+
+            # Nieuwe gemapte velden toevoegen aan een bestaande tabel
+            self._evolve_schema()
             
             # Create indexes for performance
             self.cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_fqpn ON {self.db_table_media}(YAPMO_FQPN)")
@@ -144,6 +262,22 @@ class DatabaseManager:
             # Only create hash index if the hash field exists
             if 'YAPMO_hash' in [field.split()[0] for field in fields]:
                 self.cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_hash ON {self.db_table_media}(YAPMO_hash)")
+
+            # Perceptual hash index voor snelle exacte match op phash
+            if 'YAPMO_phash' in [field.split()[0] for field in fields]:
+                self.cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_phash ON {self.db_table_media}(YAPMO_phash)")
+
+            # Health status index voor "alle beschadigde bestanden" queries
+            if 'YAPMO_health' in [field.split()[0] for field in fields]:
+                self.cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_health ON {self.db_table_media}(YAPMO_health)")
+
+            # Indexes op getypeerde kolommen voor range queries (datum, grootte)
+            for statement in index_statements(
+                self.db_table_media,
+                self.db_index_fields,
+                [field.split()[0] for field in fields],
+            ):
+                self.cursor.execute(statement)
             
             self.connection.commit()
             logging_service.log("INFO", f"Media table '{self.db_table_media}' created/verified")
@@ -153,6 +287,233 @@ class DatabaseManager:
             logging_service.log("ERROR", error_msg)
             raise
     
+    def _create_segments_table(self) -> None:
+        """Create tabel met per-segment digests van tree-gehashte bestanden."""
+        try:
+            self.cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.db_table_segments} (
+                    YAPMO_FQPN TEXT NOT NULL,
+                    segment_index INTEGER NOT NULL,
+                    segment_size INTEGER NOT NULL,
+                    digest TEXT NOT NULL,
+                    PRIMARY KEY (YAPMO_FQPN, segment_index)
+                ) WITHOUT ROWID
+            """)
+            self.connection.commit()
+            logging_service.log("INFO", f"Segments table '{self.db_table_segments}' created/verified")
+
+        except sqlite3.Error as e:
+            error_msg = f"Error creating segments table: {e}"
+            logging_service.log("ERROR", error_msg)
+            raise
+
+    def _create_directory_index(self) -> None:
+        """Create de Directories tabel voor subtree queries."""
+        self.directory_index = DirectoryIndex(self.connection, self.db_table_media, self.db_table_dirs)
+        self.directory_index.create()
+        self.connection.commit()
+        logging_service.log("INFO", f"Directories table '{self.db_table_dirs}' created/verified")
+
+    def _create_library_stats(self) -> None:
+        """Create de Library_Stats tabel met de beschikbare bron kolommen."""
+        columns = set(self.record_mapper.columns)
+        self.library_stats = LibraryStats(
+            self.connection,
+            self.db_table_media,
+            self.db_table_stats,
+            date_fields=[
+                field for field in ("EXIF_DateTimeOriginal", "QuickTime_CreateDate")
+                if field in columns
+            ],
+            camera_field="EXIF_Model" if "EXIF_Model" in columns else None,
+        )
+        self.library_stats.create()
+        self.connection.commit()
+        logging_service.log("INFO", f"Library stats table '{self.db_table_stats}' created/verified")
+
+    def _evolve_schema(self) -> None:
+        """Vergelijk de mappings met de live tabel en voeg nieuwe kolommen toe."""
+        self.schema_evolution = SchemaEvolution(
+            self.connection,
+            self.db_table_media,
+            self.db_table_backfill,
+            self.record_mapper,
+            batch_size=self.backfill_batch_size,
+            exiftool_timeout=get_param("processing", "exiftool_timeout"),
+            lock=self.db_lock,
+        )
+        self.schema_evolution.create()
+        diff = self.schema_evolution.migrate()
+        if diff.added:
+            logging_service.log("INFO", f"Added columns to '{self.db_table_media}': {', '.join(diff.added)}")
+        if diff.removed:
+            logging_service.log("INFO", f"Columns no longer mapped (kept): {', '.join(diff.removed)}")
+        for column, live_type, wanted_type in diff.retyped:
+            logging_service.log(
+                "WARNING",
+                f"Column {column} is {live_type or 'untyped'}, config wants {wanted_type} - "
+                "enable database_clean to rebuild with the new type",
+            )
+
+    def _start_schema_backfill(self) -> None:
+        """Start de backfill job als er kolommen in de wachtrij staan."""
+        if self.schema_evolution is None or not self.schema_evolution.pending():
+            return
+        self._backfill_thread = Thread(target=self._run_schema_backfill, name="schema-backfill", daemon=True)
+        self._backfill_thread.start()
+
+    def _run_schema_backfill(self) -> None:
+        """Thread entry point: vul nieuwe kolommen en ververs de afgeleide indexes."""
+        columns = ", ".join(self.schema_evolution.pending())
+        logging_service.log("INFO", f"Schema backfill started for: {columns}")
+        try:
+            processed = self.schema_evolution.run_backfill(
+                raw_store=self.raw_store,
+                stop_event=self._backfill_stop,
+                progress_callback=lambda _processed: write_generation.bump(),
+            )
+        except FileNotFoundError:
+            logging_service.log("WARNING", "ExifTool not found - schema backfill postponed to next start")
+            return
+        except subprocess.SubprocessError as e:
+            # Mislukte batch is niet weggeschreven: de volgende start probeert hem opnieuw
+            logging_service.log("WARNING", f"Schema backfill batch failed ({e}) - retried on next start")
+            return
+        except (sqlite3.Error, OSError, ValueError) as e:
+            with self.db_lock:
+                self._rollback()
+            logging_service.log("ERROR", f"Schema backfill failed: {e}")
+            return
+        if self._backfill_stop.is_set():
+            logging_service.log("INFO", f"Schema backfill stopped after {processed} files, resumes on next start")
+            return
+        self.rebuild_indexes()
+        logging_service.log("INFO", f"Schema backfill completed ({processed} files read with ExifTool)")
+
+    def _create_raw_store(self) -> None:
+        """Create de tabel voor gecomprimeerde ExifTool JSON."""
+        codec = self.raw_codec
+        if codec == "zstd" and not zstd_available():
+            logging_service.log("WARNING", "zstandard package not installed - raw metadata uses zlib")
+            codec = "zlib"
+        self.raw_store = RawMetadataStore(self.connection, self.db_table_media, self.db_table_raw, codec)
+        self.raw_store.create()
+        self.connection.commit()
+        logging_service.log("INFO", f"Raw metadata table '{self.db_table_raw}' created/verified ({codec})")
+
+    def _create_geo_index(self) -> None:
+        """Create de R*Tree index over GPS posities indien ingeschakeld."""
+        if not self.geo_index_enabled:
+            return
+        if not rtree_available(self.connection):
+            logging_service.log("WARNING", "SQLite R*Tree module not available - geo index disabled")
+            return
+
+        self.geo_index = GeoIndex(self.connection, self.db_table_media, self.db_table_geo)
+        self.geo_index.create()
+        self.connection.commit()
+        logging_service.log("INFO", f"Geo index '{self.db_table_geo}' created/verified")
+
+    def _create_fts_index(self) -> None:
+        """Create de FTS5 index over de geconfigureerde tekst kolommen."""
+        columns = set(self.record_mapper.columns)
+        fields = [field for field in self.fts_fields if field in columns]
+        if not fields:
+            return
+        if not fts5_available(self.connection):
+            logging_service.log("WARNING", "SQLite FTS5 module not available - full-text index disabled")
+            return
+
+        self.fts_index = FullTextIndex(self.connection, self.db_table_media, self.db_table_fts, fields)
+        self.fts_index.create()
+        self.connection.commit()
+        logging_service.log("INFO", f"Full-text index '{self.db_table_fts}' created/verified ({len(fields)} fields)")
+
+    def _create_tag_index(self) -> None:
+        """Create Tags/MediaTags tabellen voor de geconfigureerde keyword kolommen."""
+        columns = set(self.record_mapper.columns)
+        keyword_fields = [field for field in self.tag_fields if field in columns]
+        hierarchical_fields = [field for field in self.hierarchical_tag_fields if field in columns]
+        if not keyword_fields and not hierarchical_fields:
+            return
+
+        self.tag_index = TagIndex(
+            self.connection, self.db_table_media, self.db_table_tags, self.db_table_media_tags,
+            keyword_fields, hierarchical_fields,
+        )
+        self.tag_index.create()
+        self.connection.commit()
+        logging_service.log("INFO", f"Tag tables '{self.db_table_tags}'/'{self.db_table_media_tags}' created/verified")
+
+    def _sync_indexes(self, fqpns: list[str]) -> None:
+        """Werk afgeleide indexes bij voor gewijzigde rijen (binnen de writer transactie)."""
+        if self.directory_index is not None:
+            self.directory_index.sync(fqpns)
+        if self.geo_index is not None:
+            self.geo_index.sync(fqpns)
+        if self.fts_index is not None:
+            self.fts_index.sync(fqpns)
+        if self.tag_index is not None:
+            self.tag_index.sync(fqpns)
+
+    def rebuild_indexes(self, chunk_size: int = 1000) -> None:
+        """Synchroniseer alle afgeleide indexes opnieuw vanuit de Media tabel.
+
+        Nodig na bulk wijzigingen buiten de writer om, zoals een backfill.
+
+        Args:
+            chunk_size: Aantal FQPNs per sync aanroep
+        """
+        with self.db_lock:
+            fqpns = [row[0] for row in self.cursor.execute(f"SELECT YAPMO_FQPN FROM {self.db_table_media}")]  # noqa: S608
+            for start in range(0, len(fqpns), chunk_size):
+                self._sync_indexes(fqpns[start:start + chunk_size])
+            if self.library_stats is not None:
+                self.library_stats.rebuild()
+            self.connection.commit()
+            write_generation.bump()
+        logging_service.log("INFO", f"Derived indexes rebuilt for {len(fqpns)} media records")
+
+    def migrate_legacy(
+        self, legacy_path: str | Path, legacy_table: str = "Media", replace: bool = False,
+    ) -> MigrationReport:
+        """Migreer een app3 catalogus naar de Media tabel en bouw de indexes opnieuw op.
+
+        Args:
+            legacy_path: Pad naar de app3 database
+            legacy_table: Naam van de app3 Media tabel
+            replace: Bestaande FQPNs overschrijven in plaats van overslaan
+
+        Returns:
+            MigrationReport met aantallen en niet gemapte kolommen
+
+        Raises:
+            ValueError: Als de legacy tabel geen FQPN kolom heeft
+            sqlite3.Error: Bij een database fout
+        """
+        migration = LegacyMigration(
+            self.connection, self.db_table_media, self.record_mapper,
+            chunk_size=self.migration_chunk_size, lock=self.db_lock,
+        )
+        try:
+            report = migration.migrate(legacy_path, legacy_table=legacy_table, replace=replace)
+        except sqlite3.Error as e:
+            logging_service.log("ERROR", f"Migration of {legacy_path} failed: {e}")
+            raise
+        logging_service.log(
+            "INFO",
+            f"Migrated {report.rows_written}/{report.rows_read} rows from {legacy_path} "
+            f"(skipped {report.rows_skipped}, unmapped columns: {', '.join(report.unmapped) or '-'})",
+        )
+        self.rebuild_indexes()
+        return report
+
+    def _rollback(self) -> None:
+        """Rollback de writer transactie en vergeet caches die ernaar verwezen."""
+        self.connection.rollback()
+        if self.tag_index is not None:
+            self.tag_index.clear_cache()
+
     def _get_field_mappings(self) -> Dict[str, str]:
         """Get combined field mappings vanuit config."""
         mappings = {}
@@ -188,43 +549,93 @@ class DatabaseManager:
         return mappings
     
     def add_media_record(self, metadata: Dict[str, Any]) -> bool:
-        """Add media record to database (thread-safe dummy routine voor testing).
+        """Add een enkel media record (zie add_media_records).
         
         Args:
             metadata: Dictionary met file metadata van process_single_file
             
         Returns:
-            True als record succesvol is verwerkt (dummy)
+            True als het record is weggeschreven
         """
-        with self.db_lock:
-            try:
-                # Log alle ontvangen JSON data voor debugging
-                logging_service.log("INFO", "=== RECEIVED MEDIA RECORD ===")
-                logging_service.log("INFO", f"Number of fields: {len(metadata)}")
-                
-                # Log alle individuele velden
-                for key, value in metadata.items():
-                    if isinstance(value, list):
-                        logging_service.log("INFO", f"Field: {key} = {value} (list with {len(value)} items)")
-                    else:
-                        logging_service.log("INFO", f"Field: {key} = {value}")
-                
-                # Log FQPN als die er is
-                fqpn = metadata.get('YAPMO:FQPN') or metadata.get('SourceFile', 'UNKNOWN')
-                logging_service.log("INFO", f"Processing file: {fqpn}")
-                
-                logging_service.log("INFO", "=== MEDIA RECORD PROCESSING COMPLETED ===")
-                
-                # Return True om succes te simuleren
-                return True
-                
-            except Exception as e:
-                error_msg = f"Error processing media record: {e}"
-                logging_service.log("ERROR", error_msg)
-                return False
+        return self.add_media_records([metadata]) == 1
+
+    def add_media_records(self, records: list[Dict[str, Any]]) -> int:
+        """Schrijf een batch worker resultaten weg in een transactie (upsert op FQPN).
+
+        Waarden worden via de typed ingest laag omgezet naar het gedeclareerde
+        kolom type; tree hash segment digests gaan mee in dezelfde transactie.
+        Bij "database is locked" wordt database_write_retry keer opnieuw
+        geprobeerd.
+
+        Args:
+            records: Worker resultaten (dicts met YAPMO:* keys en kolomnamen)
+
+        Returns:
+            Aantal weggeschreven records (0 bij een fout)
+        """
+        if not records:
+            return 0
+
+        rows = [self.record_mapper.to_row(record) for record in records]
+        upsert_sql = self.record_mapper.upsert_sql(self.db_table_media)
+
+        for attempt in range(1, self.db_write_retry + 1):
+            with self.db_lock:
+                try:
+                    fqpns = [record["YAPMO:FQPN"] for record in records]
+                    old_stats = self.library_stats.collect(fqpns) if self.library_stats else []
+                    self.cursor.executemany(upsert_sql, rows)
+                    self._sync_indexes(fqpns)
+                    raw_items = [
+                        (record["YAPMO:FQPN"], record["YAPMO:RawMetadata"])
+                        for record in records if record.get("YAPMO:RawMetadata")
+                    ]
+                    if raw_items and self.raw_store is not None:
+                        self.raw_store.store(raw_items)
+                    if self.library_stats is not None:
+                        self.library_stats.apply_change(old_stats, self.library_stats.collect(fqpns))
+                    for record in records:
+                        digests = record.get("YAPMO:SegmentDigests")
+                        if digests:
+                            self._write_segment_digests(
+                                record["YAPMO:FQPN"], record["YAPMO:SegmentSize"], digests,
+                            )
+                    self.connection.commit()
+                    # Gecachte query resultaten zijn vanaf nu verouderd
+                    write_generation.bump()
+                    return len(rows)
+
+                except sqlite3.OperationalError as e:
+                    self._rollback()
+                    if "database is locked" not in str(e).lower() or attempt == self.db_write_retry:
+                        logging_service.log("ERROR", f"Error writing media batch: {e}")
+                        return 0
+                    logging_service.log(
+                        "WARNING", f"Database locked, retrying batch write ({attempt}/{self.db_write_retry})",
+                    )
+
+                except sqlite3.Error as e:
+                    self._rollback()
+                    logging_service.log("ERROR", f"Error writing media batch: {e}")
+                    return 0
+        return 0
     
+    def _write_segment_digests(self, fqpn: str, segment_size: int, digests: list[str]) -> None:
+        """Vervang de segment digests van een bestand (zonder commit, lock vereist)."""
+        self.cursor.execute(
+            f"DELETE FROM {self.db_table_segments} WHERE YAPMO_FQPN = ?", (fqpn,),
+        )
+        self.cursor.executemany(
+            f"INSERT INTO {self.db_table_segments} "
+            "(YAPMO_FQPN, segment_index, segment_size, digest) VALUES (?, ?, ?, ?)",
+            [(fqpn, index, segment_size, digest) for index, digest in enumerate(digests)],
+        )
+
     def close(self) -> None:
         """Close database connection."""
+        if self._backfill_thread is not None and self._backfill_thread.is_alive():
+            self._backfill_stop.set()
+            self._backfill_thread.join()
         if self.connection:
             try:
                 self.connection.close()
@@ -0,0 +1,202 @@
+"""Genormaliseerde directory tabel met range keys voor subtree queries.
+
+"Alle media onder /Pictures/2018/Italy" was een LIKE 'prefix%' over het pad,
+zonder bruikbare index (LIKE is case-insensitive). Met binaire collatie ligt
+een subtree precies in het bereik [dir + "/", dir + "0"): "0" is het teken
+direct na "/". Plus de directory zelf is dat een indexeerbare range query,
+zowel op de Directories tabel als op de pad kolom in Media.
+
+De Directories tabel houdt per directory de directe aantallen en bytes bij;
+subtree tellingen zijn een som over een index range in plaats van een scan
+over alle media.
+"""
+
+import sqlite3
+from collections.abc import Iterable
+from pathlib import PurePosixPath
+
+# Teken direct na "/" in binaire collatie: bovengrens van een subtree range
+_RANGE_END = chr(ord("/") + 1)
+
+
+def normalize_directory(path: str) -> str:
+    """Normaliseer een directory pad (geen trailing slash, behalve root)."""
+    stripped = path.rstrip("/")
+    return stripped or "/"
+
+
+def subtree_range(path: str) -> tuple[str, str, str]:
+    """Range key voor een subtree.
+
+    Returns
+    -------
+        Tuple (directory, lo, hi): de directory zelf plus alles in [lo, hi)
+
+    """
+    directory = normalize_directory(path)
+    base = "" if directory == "/" else directory
+    return directory, f"{base}/", f"{base}{_RANGE_END}"
+
+
+def ancestors(path: str) -> list[str]:
+    """Alle directories van root tot en met path."""
+    directory = PurePosixPath(normalize_directory(path))
+    return [str(parent) for parent in reversed(directory.parents)] + [str(directory)]
+
+
+class DirectoryIndex:
+    """Directories tabel naast de Media tabel."""
+
+    def __init__(
+        self,
+        connection: sqlite3.Connection,
+        table_media: str,
+        table_dirs: str,
+        path_field: str = "YAPMO_FILE_Path",
+        size_field: str = "YAPMO_FILE_Size",
+    ) -> None:
+        """Initialize met connectie, tabelnamen en Media kolommen."""
+        self.connection = connection
+        self.table_media = table_media
+        self.table_dirs = table_dirs
+        self.path_field = path_field
+        self.size_field = size_field
+
+    def create(self) -> None:
+        """Create de tabel en indexes; vult vanuit bestaande Media rijen."""
+        exists = self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (self.table_dirs,),
+        ).fetchone()
+        self.connection.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table_dirs} (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL UNIQUE COLLATE BINARY,
+                parent_id INTEGER REFERENCES {self.table_dirs}(id),
+                depth INTEGER NOT NULL,
+                media_count INTEGER NOT NULL DEFAULT 0,
+                total_bytes INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.connection.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{self.table_dirs}_parent "
+            f"ON {self.table_dirs}(parent_id)",
+        )
+        # Covering index: subtree selectie en byte totalen zonder table lookups
+        self.connection.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{self.table_media}_path "
+            f"ON {self.table_media}({self.path_field}, {self.size_field})",
+        )
+        if not exists:
+            paths = [
+                row[0] for row in self.connection.execute(
+                    f"SELECT DISTINCT {self.path_field} FROM {self.table_media} "  # noqa: S608
+                    f"WHERE {self.path_field} IS NOT NULL",
+                )
+            ]
+            self.refresh(paths)
+
+    def _ensure_directory(self, path: str) -> int:
+        """Zoek of maak een directory (en zijn voorouders); geeft de id."""
+        parent_id: int | None = None
+        for depth, directory in enumerate(ancestors(path)):
+            row = self.connection.execute(
+                f"SELECT id FROM {self.table_dirs} WHERE path = ?",  # noqa: S608
+                (directory,),
+            ).fetchone()
+            if row:
+                parent_id = row[0]
+                continue
+            cursor = self.connection.execute(
+                f"INSERT INTO {self.table_dirs} (path, parent_id, depth) VALUES (?, ?, ?)",  # noqa: S608
+                (directory, parent_id, depth),
+            )
+            parent_id = cursor.lastrowid
+        return parent_id
+
+    def refresh(self, paths: Iterable[str]) -> None:
+        """Herbereken de directe tellingen van directories (geen commit)."""
+        for path in {normalize_directory(path) for path in paths if path}:
+            directory_id = self._ensure_directory(path)
+            self.connection.execute(
+                f"UPDATE {self.table_dirs} SET (media_count, total_bytes) = "  # noqa: S608
+                f"(SELECT count(*), IFNULL(sum({self.size_field}), 0) "
+                f"FROM {self.table_media} WHERE {self.path_field} = ?) WHERE id = ?",
+                (path, directory_id),
+            )
+
+    def sync(self, fqpns: Iterable[str]) -> None:
+        """Werk de directories van gewijzigde Media rijen bij (geen commit)."""
+        paths = set()
+        for fqpn in fqpns:
+            row = self.connection.execute(
+                f"SELECT {self.path_field} FROM {self.table_media} "  # noqa: S608
+                "WHERE YAPMO_FQPN = ?",
+                (fqpn,),
+            ).fetchone()
+            if row and row[0]:
+                paths.add(row[0])
+        self.refresh(paths)
+
+    def subtree_stats(self, path: str) -> tuple[int, int, int]:
+        """Aantal directories, media en bytes in een subtree (inclusief path zelf)."""
+        directory, low, high = subtree_range(path)
+        row = self.connection.execute(
+            "SELECT count(*), IFNULL(sum(media_count), 0), IFNULL(sum(total_bytes), 0) "  # noqa: S608
+            f"FROM {self.table_dirs} WHERE path = ? OR (path >= ? AND path < ?)",
+            (directory, low, high),
+        ).fetchone()
+        return row[0], row[1], row[2]
+
+    def children(self, path: str) -> list[tuple[str, int, int]]:
+        """Directe subdirectories met subtree aantallen en bytes.
+
+        Returns
+        -------
+            List van (pad, media in subtree, bytes in subtree), gesorteerd op pad
+
+        """
+        row = self.connection.execute(
+            f"SELECT id FROM {self.table_dirs} WHERE path = ?",  # noqa: S608
+            (normalize_directory(path),),
+        ).fetchone()
+        if row is None:
+            return []
+        child_paths = [
+            child[0] for child in self.connection.execute(
+                f"SELECT path FROM {self.table_dirs} WHERE parent_id = ? ORDER BY path",  # noqa: S608
+                (row[0],),
+            )
+        ]
+        return [(child, *self.subtree_stats(child)[1:]) for child in child_paths]
+
+    def media_in_subtree(
+        self, path: str, limit: int | None = None, offset: int = 0,
+    ) -> list[tuple[int, str]]:
+        """Media (id, FQPN) onder een directory, via de pad index op Media."""
+        directory, low, high = subtree_range(path)
+        sql = (
+            f"SELECT id, YAPMO_FQPN FROM {self.table_media} "  # noqa: S608
+            f"WHERE {self.path_field} = ? "
+            f"OR ({self.path_field} >= ? AND {self.path_field} < ?) "
+            f"ORDER BY {self.path_field}, YAPMO_FQPN"
+        )
+        parameters: list[object] = [directory, low, high]
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            parameters.extend([limit, offset])
+        return self.connection.execute(sql, parameters).fetchall()
+
+    def prune_empty(self) -> int:
+        """Verwijder directories zonder media in hun subtree; geeft het aantal terug."""
+        removed = 0
+        while True:
+            cursor = self.connection.execute(
+                f"DELETE FROM {self.table_dirs} WHERE media_count = 0 "  # noqa: S608
+                f"AND id NOT IN (SELECT parent_id FROM {self.table_dirs} "
+                "WHERE parent_id IS NOT NULL)",
+            )
+            if cursor.rowcount <= 0:
+                break
+            removed += cursor.rowcount
+        return removed
@@ -0,0 +1,334 @@
+"""Gefedereerde catalogi: een database per volume, samen doorzocht.
+
+De media staat op meerdere schijven die niet altijd gemount zijn. Met een
+enkele database wordt alles van een offline schijf verouderd en herindexeren
+van een schijf herschrijft de hele catalogus. Met federatie krijgt elke root
+een eigen catalogus bestand (zelfde schema, eigen DatabaseManager, eigen
+backup). Het register (catalogs.json in de catalogus directory) koppelt
+roots aan catalogus bestanden.
+
+Voor zoeken, duplicaten en statistieken worden de catalogi van gemounte
+volumes read-only ge-ATTACHed aan de connecties van de read pool. Een TEMP
+view (AllMedia) legt er een UNION ALL over met een extra kolom volume; de
+hoofd catalogus (database_name) doet mee als volume "main". Kolommen die een
+catalogus (nog) niet heeft worden NULL. Bij elke geleende connectie wordt de
+set gemounte volumes vergeleken met de ge-ATTACHte databases; alleen bij een
+verschil worden databases ontkoppeld/gekoppeld en de view opnieuw gemaakt.
+
+Gebruik:
+
+    federation = FederatedCatalog.from_config()
+    rows = federation.execute("SELECT volume, count(*) FROM AllMedia GROUP BY volume")
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+from urllib.parse import quote
+
+from library_stats import DIMENSION_LIBRARY, LibraryStats
+from query_cache import write_generation
+from read_pool import ReadPool, shared_pool, temp_writes
+
+REGISTRY_NAME = "catalogs.json"
+
+# Schema alias van een volume catalogus: vol_<naam>
+ALIAS_PREFIX = "vol_"
+
+MAIN_VOLUME = "main"
+
+# Mislukte hashes (media_processing) zijn geen inhoud: geen duplicaten
+HASH_ERROR_PREFIX = "hash_error"
+
+
+def catalog_name(root: str | Path) -> str:
+    """Bestandsnaam (zonder .db) voor de catalogus van een root.
+
+    Laatste pad deel (alleen letters, cijfers en _) plus een korte hash van het
+    volledige pad, zodat /Volumes/A/Photos en /Volumes/B/Photos verschillen.
+    """
+    resolved = str(Path(root).expanduser().resolve())
+    stem = re.sub(r"[^A-Za-z0-9_]+", "_", Path(resolved).name).strip("_") or "root"
+    return f"{stem}_{hashlib.sha1(resolved.encode('utf-8')).hexdigest()[:8]}"  # noqa: S324
+
+
+@dataclass(frozen=True)
+class VolumeCatalog:
+    """Een root met zijn eigen catalogus bestand."""
+
+    name: str
+    root: Path
+    db_path: Path
+
+    @property
+    def alias(self) -> str:
+        """Schema alias onder ATTACH."""
+        return f"{ALIAS_PREFIX}{self.name}"
+
+    @property
+    def mounted(self) -> bool:
+        """Root bereikbaar en catalogus aanwezig."""
+        return self.root.is_dir() and self.db_path.is_file()
+
+
+class CatalogRegistry:
+    """Register van volume catalogi in een catalogus directory."""
+
+    def __init__(self, catalog_dir: str | Path) -> None:
+        """Initialize met de directory voor het register en de catalogus bestanden."""
+        self.catalog_dir = Path(catalog_dir)
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> Path:
+        """Pad naar het register."""
+        return self.catalog_dir / REGISTRY_NAME
+
+    def _load(self) -> dict[str, str]:
+        """Naam -> root uit het register (leeg als het ontbreekt of onleesbaar is)."""
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return {str(name): str(root) for name, root in data.get("volumes", {}).items()}
+
+    def _save(self, volumes: dict[str, str]) -> None:
+        """Schrijf het register atomair (tijdelijk bestand, fsync, rename)."""
+        self.catalog_dir.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_name(f"{self.path.name}.tmp")
+        with temporary.open("w", encoding="utf-8") as handle:
+            json.dump({"volumes": volumes}, handle, indent=2)
+            handle.flush()
+            os.fsync(handle.fileno())
+        temporary.replace(self.path)
+
+    def _volume(self, name: str, root: str) -> VolumeCatalog:
+        return VolumeCatalog(name, Path(root), self.catalog_dir / f"{name}.db")
+
+    def volumes(self) -> list[VolumeCatalog]:
+        """Alle geregistreerde volumes (gesorteerd op naam)."""
+        return [self._volume(name, root) for name, root in sorted(self._load().items())]
+
+    def mounted(self) -> list[VolumeCatalog]:
+        """Volumes waarvan de root bereikbaar is en de catalogus bestaat."""
+        return [volume for volume in self.volumes() if volume.mounted]
+
+    def register(self, root: str | Path) -> VolumeCatalog:
+        """Registreer een root (idempotent); geeft zijn volume catalogus."""
+        resolved = str(Path(root).expanduser().resolve())
+        name = catalog_name(resolved)
+        with self._lock:
+            volumes = self._load()
+            if volumes.get(name) != resolved:
+                volumes[name] = resolved
+                self._save(volumes)
+        return self._volume(name, resolved)
+
+    def volume_for(self, path: str | Path) -> VolumeCatalog | None:
+        """Volume met de langste root waaronder path valt."""
+        resolved = Path(path).expanduser().resolve()
+        matches = [volume for volume in self.volumes() if resolved.is_relative_to(volume.root)]
+        return max(matches, key=lambda volume: len(volume.root.parts), default=None)
+
+
+class FederatedCatalog:
+    """Read pool met de gemounte volume catalogi ge-ATTACHed onder een UNION ALL view."""
+
+    def __init__(
+        self,
+        pool: ReadPool,
+        registry: CatalogRegistry,
+        table_media: str,
+        *,
+        table_stats: str = "Library_Stats",
+        view_name: str = "AllMedia",
+        recheck_interval: float = 5.0,
+    ) -> None:
+        """Initialize met de read pool van de hoofd catalogus en het register.
+
+        Args:
+        ----
+            pool: Read pool op de hoofd catalogus
+            registry: Register van de volume catalogi
+            table_media: Naam van de Media tabel (in elke catalogus gelijk)
+            table_stats: Naam van de Library_Stats tabel (in elke catalogus gelijk)
+            view_name: Naam van de TEMP view over alle volumes
+            recheck_interval: Seconden tussen twee controles welke volumes gemount zijn
+
+        """
+        self.pool = pool
+        self.registry = registry
+        self.table_media = table_media
+        self.table_stats = table_stats
+        self.view_name = view_name
+        self.recheck_interval = recheck_interval
+        self._lock = threading.Lock()
+        self._mounted: list[VolumeCatalog] = []
+        self._checked: float | None = None
+        # Set gemounte volumes waarvoor de write generatie het laatst opgehoogd is
+        self._bumped_aliases: frozenset[str] | None = None
+
+    @property
+    def cache_scope(self) -> str:
+        """Identiteit voor de query cache: hoofd catalogus plus de federatie view."""
+        return f"{self.pool.cache_scope}#{self.view_name}"
+
+    @classmethod
+    def from_config(cls) -> "FederatedCatalog":
+        """Maak een federatie met de gedeelde read pool en parameters uit config.json."""
+        from config import get_param
+
+        return cls(
+            shared_pool(),
+            CatalogRegistry(get_param("database", "database_catalog_path")),
+            get_param("database", "database_table_media"),
+            table_stats=get_param("database", "database_table_stats"),
+            view_name=get_param("database", "database_federated_view"),
+        )
+
+    def mounted(self) -> list[VolumeCatalog]:
+        """Gemounte volumes (hooguit elke recheck_interval seconden opnieuw bepaald)."""
+        with self._lock:
+            now = time.monotonic()
+            if self._checked is None or now - self._checked >= self.recheck_interval:
+                self._mounted = self.registry.mounted()
+                self._checked = now
+            return list(self._mounted)
+
+    def sync(self, connection: sqlite3.Connection) -> bool:
+        """Koppel de gemounte volumes aan connection; True als de view opnieuw gemaakt is."""
+        limit = connection.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        wanted = {volume.alias: volume for volume in self.mounted()[:limit]}
+        attached = {
+            row[1] for row in connection.execute("PRAGMA database_list") if row[1].startswith(ALIAS_PREFIX)
+        }
+        view_exists = connection.execute(
+            "SELECT 1 FROM sqlite_temp_master WHERE type = 'view' AND name = ?", (self.view_name,),
+        ).fetchone()
+        if attached == wanted.keys() and view_exists:
+            return False
+
+        if connection.in_transaction:
+            connection.rollback()
+        for alias in attached - wanted.keys():
+            connection.execute(f"DETACH DATABASE {alias}")
+        for alias in wanted.keys() - attached:
+            uri = f"file:{quote(str(wanted[alias].db_path.resolve()))}?mode=ro"
+            connection.execute(f"ATTACH DATABASE ? AS {alias}", (uri,))
+        self._create_view(connection, [wanted[alias] for alias in sorted(wanted)])
+        # Zichtbare data is veranderd zonder write: gecachte resultaten vervallen,
+        # een keer per wijziging van de set (niet per connectie in de pool)
+        aliases = frozenset(wanted)
+        with self._lock:
+            if aliases != self._bumped_aliases:
+                self._bumped_aliases = aliases
+                write_generation.bump()
+        return True
+
+    def _create_view(self, connection: sqlite3.Connection, volumes: list[VolumeCatalog]) -> None:
+        """Maak de TEMP view opnieuw over main en de gegeven volumes."""
+        sources = [(MAIN_VOLUME, "main")] + [(volume.name, volume.alias) for volume in volumes]
+        schema_columns: dict[str, list[str]] = {}
+        for _, schema in sources:
+            table_info = connection.execute(f'PRAGMA {schema}.table_info("{self.table_media}")').fetchall()
+            if table_info:
+                schema_columns[schema] = [row[1] for row in table_info]
+        columns = list(dict.fromkeys(column for names in schema_columns.values() for column in names))
+
+        selects = []
+        for name, schema in sources:
+            if schema not in schema_columns:
+                continue
+            present = set(schema_columns[schema])
+            expressions = [
+                f'"{column}"' if column in present else f'NULL AS "{column}"' for column in columns
+            ]
+            selects.append(
+                f"SELECT '{name}' AS volume, {', '.join(expressions)} "  # noqa: S608
+                f'FROM {schema}."{self.table_media}"',
+            )
+        if not selects:
+            selects.append("SELECT NULL AS volume WHERE 0")
+
+        # Read pool connecties staan op query_only; TEMP schema wijzigingen mogen wel
+        with temp_writes(connection):
+            connection.execute(f"DROP VIEW IF EXISTS temp.{self.view_name}")
+            connection.execute(f"CREATE TEMP VIEW {self.view_name} AS {' UNION ALL '.join(selects)}")
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Leen een read connectie met alle gemounte volumes gekoppeld."""
+        with self.pool.connection() as connection:
+            self.sync(connection)
+            yield connection
+
+    def execute(self, sql: str, parameters: Any = ()) -> list[tuple]:  # noqa: ANN401
+        """Voer een read query uit over de federatie en geef alle rijen terug."""
+        with self.connection() as connection:
+            return connection.execute(sql, parameters).fetchall()
+
+    def volume_totals(self) -> list[tuple[str, int, int]]:
+        """(volume, aantal bestanden, totale grootte) per gekoppeld volume.
+
+        Leest de library rij uit de Library_Stats tabel van elke catalogus; alleen
+        een catalogus zonder stats tabel wordt geteld.
+        """
+        totals = []
+        with self.connection() as connection:
+            for row in connection.execute("PRAGMA database_list").fetchall():
+                schema = row[1]
+                if schema == "main":
+                    volume = MAIN_VOLUME
+                elif schema.startswith(ALIAS_PREFIX):
+                    volume = schema.removeprefix(ALIAS_PREFIX)
+                else:
+                    continue
+                total = self._catalog_total(connection, schema)
+                if total is not None:
+                    totals.append((volume, *total))
+        return sorted(totals)
+
+    def _catalog_total(self, connection: sqlite3.Connection, schema: str) -> tuple[int, int] | None:
+        """Aantal bestanden en bytes van een catalogus (None zonder Media tabel)."""
+        tables = {
+            row[0] for row in connection.execute(
+                f"SELECT name FROM {schema}.sqlite_master WHERE type = 'table'",  # noqa: S608
+            )
+        }
+        if self.table_media not in tables:
+            return None
+        if self.table_stats in tables:
+            stats = LibraryStats(connection, f"{schema}.{self.table_media}", f"{schema}.{self.table_stats}")
+            return stats.get(DIMENSION_LIBRARY)
+        # Oudere catalogus zonder stats tabel
+        columns = {row[1] for row in connection.execute(f'PRAGMA {schema}.table_info("{self.table_media}")')}
+        size = "YAPMO_FILE_Size" if "YAPMO_FILE_Size" in columns else "0"
+        return connection.execute(
+            f'SELECT count(*), coalesce(sum({size}), 0) FROM {schema}."{self.table_media}"',  # noqa: S608
+        ).fetchone()
+
+    def duplicate_groups(self, limit: int = 100) -> list[tuple[str, list[tuple[str, str]]]]:
+        """Hashes die meer dan eens voorkomen, over alle volumes.
+
+        Returns
+        -------
+            Lijst van (hash, [(volume, FQPN), ...]), grootste groepen eerst
+
+        """
+        with self.connection() as connection:
+            rows = connection.execute(
+                "SELECT YAPMO_hash, json_group_array(json_array(volume, YAPMO_FQPN)) "  # noqa: S608
+                f"FROM {self.view_name} WHERE YAPMO_hash IS NOT NULL AND YAPMO_hash NOT LIKE ? "
+                "GROUP BY YAPMO_hash HAVING count(*) > 1 ORDER BY count(*) DESC, YAPMO_hash LIMIT ?",
+                (f"{HASH_ERROR_PREFIX}%", limit),
+            ).fetchall()
+        return [(digest, [tuple(item) for item in json.loads(items)]) for digest, items in rows]
@@ -0,0 +1,134 @@
+"""Full-text index (SQLite FTS5) over keywords, titels, beschrijvingen en bestandsnaam.
+
+Keywords en onderwerpen staan als (JSON of komma-gescheiden) tekst in de
+Media tabel; zoeken via LIKE '%x%' scant elke rij. Deze module houdt een FTS5
+tabel bij met rowid = Media.id, gesynchroniseerd door de writer in dezelfde
+transactie als de upsert. Zoeken ondersteunt prefix queries en ranking (bm25).
+
+De tokenizer (unicode61) splitst ook op "|" en leestekens, zodat
+hierarchische onderwerpen ("Vakantie|Wintersport") op elk niveau vindbaar zijn.
+"""
+
+import re
+import sqlite3
+from collections.abc import Iterable
+
+# Prefix indexes voor snelle "vak*" queries
+_FTS_PREFIX = "2 3 4"
+
+_WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def fts5_available(connection: sqlite3.Connection) -> bool:
+    """Check of de SQLite build FTS5 bevat."""
+    try:
+        connection.execute("CREATE VIRTUAL TABLE temp._fts5_probe USING fts5(a)")
+        connection.execute("DROP TABLE temp._fts5_probe")
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def build_match_query(text: str, *, prefix: bool = True) -> str | None:
+    """Maak een veilige FTS5 MATCH expressie uit vrije zoektekst.
+
+    Elk woord wordt gequote (geen FTS syntax injectie) en alle woorden moeten
+    voorkomen; met prefix=True matcht het laatste woord ook als prefix.
+
+    Returns
+    -------
+        MATCH expressie, of None als de tekst geen woorden bevat
+
+    """
+    words = _WORD_PATTERN.findall(text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    if prefix:
+        terms[-1] += "*"
+    return " AND ".join(terms)
+
+
+class FullTextIndex:
+    """FTS5 index naast de Media tabel."""
+
+    def __init__(
+        self,
+        connection: sqlite3.Connection,
+        table_media: str,
+        table_fts: str,
+        fields: list[str],
+    ) -> None:
+        """Initialize met een open connectie, tabelnamen en te indexeren kolommen."""
+        self.connection = connection
+        self.table_media = table_media
+        self.table_fts = table_fts
+        self.fields = fields
+
+    def create(self) -> None:
+        """Create de FTS tabel; herbouw als de geindexeerde kolommen gewijzigd zijn."""
+        existing = [
+            row[1] for row in self.connection.execute(f"PRAGMA table_info({self.table_fts})")
+        ]
+        if existing == self.fields:
+            return
+        if existing:
+            self.connection.execute(f"DROP TABLE {self.table_fts}")
+
+        self.connection.execute(
+            f"CREATE VIRTUAL TABLE {self.table_fts} USING fts5("
+            f"{', '.join(self.fields)}, "
+            f"tokenize = 'unicode61 remove_diacritics 2', prefix = '{_FTS_PREFIX}')",
+        )
+        self.connection.execute(
+            f"INSERT INTO {self.table_fts} (rowid, {', '.join(self.fields)}) "  # noqa: S608
+            f"SELECT id, {', '.join(self.fields)} FROM {self.table_media}",
+        )
+
+    def sync(self, fqpns: Iterable[str]) -> None:
+        """Werk de index bij voor gewijzigde Media rijen (geen commit)."""
+        parameters = [(fqpn,) for fqpn in fqpns]
+        self.connection.executemany(
+            f"DELETE FROM {self.table_fts} WHERE rowid = "  # noqa: S608
+            f"(SELECT id FROM {self.table_media} WHERE YAPMO_FQPN = ?)",
+            parameters,
+        )
+        self.connection.executemany(
+            f"INSERT INTO {self.table_fts} (rowid, {', '.join(self.fields)}) "  # noqa: S608
+            f"SELECT id, {', '.join(self.fields)} FROM {self.table_media} "
+            "WHERE YAPMO_FQPN = ?",
+            parameters,
+        )
+
+    def remove(self, media_ids: Iterable[int]) -> None:
+        """Verwijder media ids uit de index (geen commit)."""
+        self.connection.executemany(
+            f"DELETE FROM {self.table_fts} WHERE rowid = ?",  # noqa: S608
+            [(media_id,) for media_id in media_ids],
+        )
+
+    def search(
+        self, text: str, limit: int = 100, *, prefix: bool = True,
+    ) -> list[tuple[float, int, str]]:
+        """Zoek media op vrije tekst, beste match eerst.
+
+        Returns
+        -------
+            List van (bm25 rank, media id, FQPN); lagere rank is beter
+
+        """
+        match_query = build_match_query(text, prefix=prefix)
+        if match_query is None:
+            return []
+        return self.connection.execute(
+            f"SELECT f.rank, m.id, m.YAPMO_FQPN FROM {self.table_fts} f "  # noqa: S608
+            f"JOIN {self.table_media} m ON m.id = f.rowid "
+            f"WHERE {self.table_fts} MATCH ? ORDER BY f.rank LIMIT ?",
+            (match_query, limit),
+        ).fetchall()
+
+    def optimize(self) -> None:
+        """Voeg de FTS b-trees samen (na grote imports)."""
+        self.connection.execute(
+            f"INSERT INTO {self.table_fts} ({self.table_fts}) VALUES ('optimize')",  # noqa: S608
+        )
@@ -0,0 +1,235 @@
+"""Ruimtelijke index (SQLite R*Tree) over de GPS posities in de Media tabel.
+
+Zonder index vereist "foto's in dit gebied" een scan over elke rij. Deze
+module houdt een rtree virtual table bij met per media id de positie
+(lat/lon als gedegenereerde box) en ondersteunt:
+
+- Bounding-box queries (ook over de datumgrens heen)
+- Radius queries: bbox voorselectie in de rtree, exacte haversine afstand
+- Grid clustering in SQL voor een kaartweergave: een paar honderd cluster
+  punten per viewport in plaats van alle foto's
+"""
+
+import math
+import sqlite3
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+# Gemiddelde aardstraal in km (haversine)
+EARTH_RADIUS_KM = 6371.0088
+
+# Km per breedtegraad
+_KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def rtree_available(connection: sqlite3.Connection) -> bool:
+    """Check of de SQLite build de R*Tree module bevat."""
+    try:
+        connection.execute("CREATE VIRTUAL TABLE temp._rtree_probe USING rtree(id, a, b)")
+        connection.execute("DROP TABLE temp._rtree_probe")
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Afstand over de grootcirkel tussen twee punten in km."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    delta_phi = math.radians(lat2 - lat1)
+    delta_lambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(delta_phi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+@dataclass
+class MapCluster:
+    """Cluster punt voor de kaartweergave."""
+
+    latitude: float
+    longitude: float
+    count: int
+    media_id: int  # Voorbeeld media id (bijv. voor een thumbnail)
+
+
+class GeoIndex:
+    """R*Tree index naast de Media tabel."""
+
+    def __init__(
+        self,
+        connection: sqlite3.Connection,
+        table_media: str,
+        table_geo: str,
+        latitude_field: str = "GPS_Latitude",
+        longitude_field: str = "GPS_Longitude",
+    ) -> None:
+        """Initialize met een open connectie en tabel/kolom namen."""
+        self.connection = connection
+        self.table_media = table_media
+        self.table_geo = table_geo
+        self.latitude_field = latitude_field
+        self.longitude_field = longitude_field
+
+    def create(self) -> None:
+        """Create de rtree tabel indien nodig (vult vanuit bestaande rijen)."""
+        exists = self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = ?", (self.table_geo,),
+        ).fetchone()
+        if exists:
+            return
+        self.connection.execute(
+            f"CREATE VIRTUAL TABLE {self.table_geo} "
+            "USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+        )
+        self.connection.execute(
+            f"INSERT INTO {self.table_geo} "  # noqa: S608
+            f"SELECT id, {self.latitude_field}, {self.latitude_field}, "
+            f"{self.longitude_field}, {self.longitude_field} FROM {self.table_media} "
+            f"WHERE {self._valid_position_sql()}",
+        )
+
+    def _valid_position_sql(self) -> str:
+        """WHERE clausule voor rijen met een bruikbare positie."""
+        return (
+            f"{self.latitude_field} BETWEEN -90 AND 90 "
+            f"AND {self.longitude_field} BETWEEN -180 AND 180"
+        )
+
+    def sync(self, fqpns: Iterable[str]) -> None:
+        """Werk de index bij voor gewijzigde Media rijen (geen commit).
+
+        Wordt door de writer in dezelfde transactie als de upsert aangeroepen.
+        """
+        parameters = [(fqpn,) for fqpn in fqpns]
+        self.connection.executemany(
+            f"DELETE FROM {self.table_geo} WHERE id = "  # noqa: S608
+            f"(SELECT id FROM {self.table_media} WHERE YAPMO_FQPN = ?)",
+            parameters,
+        )
+        self.connection.executemany(
+            f"INSERT INTO {self.table_geo} "  # noqa: S608
+            f"SELECT id, {self.latitude_field}, {self.latitude_field}, "
+            f"{self.longitude_field}, {self.longitude_field} FROM {self.table_media} "
+            f"WHERE YAPMO_FQPN = ? AND {self._valid_position_sql()}",
+            parameters,
+        )
+
+    def remove(self, media_ids: Iterable[int]) -> None:
+        """Verwijder media ids uit de index (geen commit)."""
+        self.connection.executemany(
+            f"DELETE FROM {self.table_geo} WHERE id = ?",  # noqa: S608
+            [(media_id,) for media_id in media_ids],
+        )
+
+    @staticmethod
+    def _longitude_ranges(min_lon: float, max_lon: float) -> list[tuple[float, float]]:
+        """Split een longitude bereik dat de datumgrens kruist (min_lon > max_lon)."""
+        if min_lon <= max_lon:
+            return [(min_lon, max_lon)]
+        return [(min_lon, 180.0), (-180.0, max_lon)]
+
+    def query_bbox(
+        self,
+        min_lat: float,
+        min_lon: float,
+        max_lat: float,
+        max_lon: float,
+        limit: int | None = None,
+    ) -> list[tuple[int, str, float, float]]:
+        """Zoek media binnen een bounding box.
+
+        Returns
+        -------
+            List van (media id, FQPN, latitude, longitude)
+
+        """
+        results: list[tuple[int, str, float, float]] = []
+        for low_lon, high_lon in self._longitude_ranges(min_lon, max_lon):
+            sql = (
+                f"SELECT m.id, m.YAPMO_FQPN, m.{self.latitude_field}, "  # noqa: S608
+                f"m.{self.longitude_field} FROM {self.table_geo} g "
+                f"JOIN {self.table_media} m ON m.id = g.id "
+                "WHERE g.max_lat >= ? AND g.min_lat <= ? "
+                "AND g.max_lon >= ? AND g.min_lon <= ?"
+            )
+            parameters: list[float] = [min_lat, max_lat, low_lon, high_lon]
+            if limit is not None:
+                sql += " LIMIT ?"
+                parameters.append(limit - len(results))
+            results.extend(self.connection.execute(sql, parameters).fetchall())
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+    def query_radius(
+        self, latitude: float, longitude: float, radius_km: float,
+    ) -> list[tuple[float, int, str]]:
+        """Zoek media binnen radius_km van een punt.
+
+        Returns
+        -------
+            List van (afstand in km, media id, FQPN), gesorteerd op afstand
+
+        """
+        delta_lat = radius_km / _KM_PER_DEGREE
+        cos_lat = math.cos(math.radians(latitude))
+        if cos_lat < 1e-6 or latitude + delta_lat >= 90 or latitude - delta_lat <= -90:  # noqa: PLR2004
+            # Pool binnen bereik: alle longitudes
+            min_lon, max_lon = -180.0, 180.0
+        else:
+            delta_lon = min(180.0, delta_lat / cos_lat)
+            min_lon = _wrap_longitude(longitude - delta_lon)
+            max_lon = _wrap_longitude(longitude + delta_lon)
+            if delta_lon >= 180:  # noqa: PLR2004
+                min_lon, max_lon = -180.0, 180.0
+
+        matches = []
+        for media_id, fqpn, lat, lon in self.query_bbox(
+            max(-90.0, latitude - delta_lat), min_lon,
+            min(90.0, latitude + delta_lat), max_lon,
+        ):
+            distance = haversine_km(latitude, longitude, lat, lon)
+            if distance <= radius_km:
+                matches.append((distance, media_id, fqpn))
+        matches.sort()
+        return matches
+
+    def cluster_grid(
+        self,
+        min_lat: float,
+        min_lon: float,
+        max_lat: float,
+        max_lon: float,
+        grid_size: int = 16,
+    ) -> list[MapCluster]:
+        """Cluster alle posities in de viewport in een grid_size x grid_size raster.
+
+        De aggregatie gebeurt in SQL; per cel komt een punt terug op het
+        zwaartepunt van de foto's in die cel.
+        """
+        clusters: list[MapCluster] = []
+        lat_step = max((max_lat - min_lat) / grid_size, 1e-9)
+        for low_lon, high_lon in self._longitude_ranges(min_lon, max_lon):
+            lon_step = max((high_lon - low_lon) / grid_size, 1e-9)
+            rows = self.connection.execute(
+                "SELECT avg(min_lat), avg(min_lon), count(*), min(id) "  # noqa: S608
+                f"FROM {self.table_geo} "
+                "WHERE max_lat >= ? AND min_lat <= ? AND max_lon >= ? AND min_lon <= ? "
+                "GROUP BY CAST((min_lat - ?) / ? AS INTEGER), "
+                "CAST((min_lon - ?) / ? AS INTEGER)",
+                (
+                    min_lat, max_lat, low_lon, high_lon,
+                    min_lat, lat_step, low_lon, lon_step,
+                ),
+            ).fetchall()
+            clusters.extend(MapCluster(*row) for row in rows)
+        return clusters
+
+
+def _wrap_longitude(longitude: float) -> float:
+    """Normaliseer een longitude naar [-180, 180]."""
+    if -180.0 <= longitude <= 180.0:  # noqa: PLR2004
+        return longitude
+    return ((longitude + 180.0) % 360.0) - 180.0
@@ -0,0 +1,473 @@
+"""Integrity Scanner - achtergrond verificatie van opgeslagen hashes (bit-rot).
+
+Foto's worden decennia bewaard; stille corruptie wordt pas gezien als het te
+laat is. De IntegrityScanner hasht geindexeerde bestanden opnieuw en vergelijkt
+met de opgeslagen YAPMO_hash:
+
+- Draait in een eigen thread met lage CPU (nice) en IO prioriteit (ioprio_set)
+- Leessnelheid wordt begrensd op een configureerbaar aantal MB/s
+- Pauzeert zolang foreground processing actief is
+- Voortgang wordt gecheckpoint in de database en hervat na een herstart;
+  na een volledige pass begint de volgende start weer vooraan
+- Afwijkingen komen in een aparte mismatches tabel
+"""
+
+import ctypes
+import hashlib
+import os
+import platform
+import sqlite3
+import sys
+import threading
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime
+from pathlib import Path
+
+from tree_hash import is_tree_hash, verify_segments
+
+# ioprio_set syscall nummers per architectuur (Linux)
+_IOPRIO_SET_SYSCALL = {"x86_64": 251, "aarch64": 30, "i686": 289, "armv7l": 314}
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_CLASS_IDLE = 3
+_IOPRIO_CLASS_SHIFT = 13
+
+# Naam van de scan job in de progress tabel
+JOB_NAME = "hash_verification"
+
+# Leesblok bij het opnieuw hashen
+_READ_SIZE = 1024 * 1024
+
+# Lengte van een volledige SHA-256 hex digest (afbeeldingen)
+_SHA256_HEX_LENGTH = 64
+
+
+def lower_thread_priority(nice_value: int) -> None:
+    """Verlaag CPU en IO prioriteit van de aanroepende thread.
+
+    Op Linux zijn nice waarden en IO prioriteit per thread, zodat de UI en
+    foreground workers hun prioriteit houden. Op andere platformen wordt niets
+    aangepast (os.nice zou daar het hele process vertragen).
+    """
+    if not sys.platform.startswith("linux"):
+        return
+
+    thread_id = threading.get_native_id()
+    try:
+        os.setpriority(os.PRIO_PROCESS, thread_id, nice_value)
+    except (OSError, AttributeError):
+        pass
+
+    syscall_number = _IOPRIO_SET_SYSCALL.get(platform.machine())
+    if syscall_number is None:
+        return
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        ioprio = _IOPRIO_CLASS_IDLE << _IOPRIO_CLASS_SHIFT
+        libc.syscall(syscall_number, _IOPRIO_WHO_PROCESS, thread_id, ioprio)
+    except (OSError, AttributeError):
+        pass
+
+
+class ScanStoppedError(Exception):
+    """Scan gestopt midden in een bestand (geen mismatch, geen checkpoint)."""
+
+
+class RateLimiter:
+    """Begrens doorvoer tot een maximum aantal bytes per seconde."""
+
+    def __init__(self, max_bytes_per_second: float) -> None:
+        """Initialize met limiet; 0 of negatief betekent onbegrensd."""
+        self.max_bytes_per_second = max_bytes_per_second
+        self._start = time.monotonic()
+        self._bytes = 0
+
+    def consume(self, byte_count: int) -> None:
+        """Registreer gelezen bytes en slaap zolang we voor lopen op de limiet."""
+        if self.max_bytes_per_second <= 0:
+            return
+        self._bytes += byte_count
+        expected_elapsed = self._bytes / self.max_bytes_per_second
+        actual_elapsed = time.monotonic() - self._start
+        if expected_elapsed > actual_elapsed:
+            time.sleep(expected_elapsed - actual_elapsed)
+
+
+class IntegrityScanner:
+    """Achtergrond job die opgeslagen hashes opnieuw verifieert."""
+
+    def __init__(
+        self,
+        db_path: str,
+        table_media: str,
+        table_progress: str,
+        table_mismatches: str,
+        table_segments: str,
+        *,
+        rate_limit_mb: float = 20.0,
+        nice_value: int = 19,
+        checkpoint_interval: int = 100,
+        batch_size: int = 500,
+        video_header_size: int = 4096,
+        pause_callback: Callable[[], bool] | None = None,
+    ) -> None:
+        """Initialize de scanner.
+
+        Args:
+        ----
+            db_path: Pad naar de SQLite database
+            table_media: Naam van de Media tabel
+            table_progress: Naam van de checkpoint tabel
+            table_mismatches: Naam van de mismatches tabel
+            table_segments: Naam van de tree hash segments tabel
+            rate_limit_mb: Maximale leessnelheid in MB/s (0 = onbegrensd)
+            nice_value: Nice waarde voor de scanner thread
+            checkpoint_interval: Aantal bestanden tussen checkpoints
+            batch_size: Aantal Media rijen per database query
+            video_header_size: Header grootte van de hybrid video hash
+            pause_callback: Geeft True zolang de scanner moet pauzeren
+
+        """
+        self.db_path = db_path
+        self.table_media = table_media
+        self.table_progress = table_progress
+        self.table_mismatches = table_mismatches
+        self.table_segments = table_segments
+        self.rate_limit_mb = rate_limit_mb
+        self.nice_value = nice_value
+        self.checkpoint_interval = checkpoint_interval
+        self.batch_size = batch_size
+        self.video_header_size = video_header_size
+        self.pause_callback = pause_callback
+
+        self.thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._rate_limiter = RateLimiter(rate_limit_mb * 1024 * 1024)
+
+        # Voortgang (ook beschikbaar voor UI)
+        self.files_checked = 0
+        self.mismatches_found = 0
+        self.last_media_id = 0
+        self.finished = False
+
+    @classmethod
+    def from_config(
+        cls, pause_callback: Callable[[], bool] | None = None,
+    ) -> "IntegrityScanner":
+        """Maak een scanner met parameters uit config.json."""
+        from config import get_param
+
+        return cls(
+            db_path=get_param("database", "database_name"),
+            table_media=get_param("database", "database_table_media"),
+            table_progress=get_param("database", "database_table_integrity_progress"),
+            table_mismatches=get_param(
+                "database", "database_table_integrity_mismatches",
+            ),
+            table_segments=get_param("database", "database_table_segments"),
+            rate_limit_mb=get_param("integrity", "integrity_rate_limit_mb"),
+            nice_value=get_param("integrity", "integrity_nice"),
+            checkpoint_interval=get_param("integrity", "integrity_checkpoint_interval"),
+            batch_size=get_param("integrity", "integrity_batch_size"),
+            video_header_size=get_param("processing", "video_header_size"),
+            pause_callback=pause_callback,
+        )
+
+    @property
+    def is_running(self) -> bool:
+        """Check of de scanner thread actief is."""
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self) -> None:
+        """Start de scanner in een achtergrond thread (hervat vanaf checkpoint).
+
+        Is de vorige pass afgerond, dan begint een nieuwe pass vooraan.
+        """
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self.finished = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop de scanner; de voortgang blijft bewaard in de checkpoint."""
+        self._stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=timeout)
+
+    def reset(self, connection: sqlite3.Connection | None = None) -> None:
+        """Zet de checkpoint terug zodat de volgende run vooraan begint."""
+        own_connection = connection is None
+        connection = connection or self._connect()
+        try:
+            self._create_tables(connection)
+            connection.execute(
+                f"DELETE FROM {self.table_progress} WHERE job = ?", (JOB_NAME,),
+            )
+            connection.commit()
+        finally:
+            if own_connection:
+                connection.close()
+        with self._lock:
+            self.last_media_id = 0
+            self.files_checked = 0
+            self.mismatches_found = 0
+
+    def get_progress(self) -> dict[str, object]:
+        """Haal voortgang op voor UI updates."""
+        with self._lock:
+            return {
+                "is_running": self.is_running,
+                "finished": self.finished,
+                "files_checked": self.files_checked,
+                "mismatches_found": self.mismatches_found,
+                "last_media_id": self.last_media_id,
+            }
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open een eigen connectie (los van de foreground writer)."""
+        return sqlite3.connect(self.db_path, timeout=30.0)
+
+    def _run(self) -> None:
+        """Thread entry point."""
+        lower_thread_priority(self.nice_value)
+        connection = self._connect()
+        try:
+            self.run_once(connection)
+        finally:
+            connection.close()
+
+    def run_once(self, connection: sqlite3.Connection) -> None:
+        """Verifieer alle Media rijen vanaf de laatste checkpoint.
+
+        Kan direct (synchroon) aangeroepen worden; start() gebruikt dit in
+        een achtergrond thread.
+        """
+        self._create_tables(connection)
+        self._load_checkpoint(connection)
+        self._wrap_if_finished(connection)
+        since_checkpoint = 0
+
+        while not self._stop_event.is_set():
+            rows = connection.execute(
+                f"SELECT id, YAPMO_FQPN, YAPMO_hash FROM {self.table_media} "  # noqa: S608
+                "WHERE id > ? ORDER BY id LIMIT ?",
+                (self.last_media_id, self.batch_size),
+            ).fetchall()
+            if not rows:
+                with self._lock:
+                    self.finished = True
+                break
+
+            for media_id, fqpn, stored_hash in rows:
+                if self._wait_while_paused():
+                    break
+                try:
+                    reason, actual_hash = self.verify_file(connection, fqpn, stored_hash)
+                except ScanStoppedError:
+                    # Onafgemaakt bestand: volgende run begint opnieuw bij dit bestand
+                    break
+                if reason is not None:
+                    self._record_mismatch(connection, fqpn, stored_hash, actual_hash, reason)
+
+                with self._lock:
+                    self.last_media_id = media_id
+                    self.files_checked += 1
+                since_checkpoint += 1
+                if since_checkpoint >= self.checkpoint_interval:
+                    self._save_checkpoint(connection)
+                    since_checkpoint = 0
+
+        self._save_checkpoint(connection)
+
+    def _wrap_if_finished(self, connection: sqlite3.Connection) -> None:
+        """Begin een nieuwe pass als er na de checkpoint geen rijen meer zijn."""
+        if self.last_media_id == 0:
+            return
+        remaining = connection.execute(
+            f"SELECT 1 FROM {self.table_media} WHERE id > ? LIMIT 1",  # noqa: S608
+            (self.last_media_id,),
+        ).fetchone()
+        if remaining is None:
+            with self._lock:
+                self.last_media_id = self.files_checked = self.mismatches_found = 0
+
+    def _wait_while_paused(self) -> bool:
+        """Wacht zolang foreground processing actief is; True als gestopt."""
+        while self.pause_callback is not None and self.pause_callback():
+            if self._stop_event.wait(1.0):
+                return True
+        return self._stop_event.is_set()
+
+    def verify_file(
+        self, connection: sqlite3.Connection, fqpn: str, stored_hash: str | None,
+    ) -> tuple[str | None, str | None]:
+        """Verifieer een bestand tegen de opgeslagen hash.
+
+        Returns
+        -------
+            Tuple (reason, actual_hash); reason is None als het bestand klopt
+            of niet verifieerbaar is
+
+        """
+        if not stored_hash or str(stored_hash).startswith("hash_error_"):
+            return None, None
+
+        file_path = Path(fqpn)
+        if not file_path.exists():
+            return "missing", None
+
+        try:
+            if is_tree_hash(stored_hash):
+                return self._verify_tree_hash(connection, file_path, fqpn)
+            if len(stored_hash) == _SHA256_HEX_LENGTH:
+                actual_hash = self._hash_full_file(file_path)
+                if actual_hash != stored_hash:
+                    return "hash_mismatch", actual_hash
+                return None, actual_hash
+            return self._verify_video_hash(file_path, stored_hash)
+        except OSError as e:
+            return "read_error", str(e)
+
+    def _hash_full_file(self, file_path: Path) -> str:
+        """SHA-256 over het hele bestand met rate limiting."""
+        digest = hashlib.sha256()
+        with file_path.open("rb") as f:
+            while chunk := f.read(_READ_SIZE):
+                digest.update(chunk)
+                self._rate_limiter.consume(len(chunk))
+                if self._stop_event.is_set():
+                    raise ScanStoppedError
+        return digest.hexdigest()
+
+    def _verify_tree_hash(
+        self, connection: sqlite3.Connection, file_path: Path, fqpn: str,
+    ) -> tuple[str | None, str | None]:
+        """Verifieer een tree hash segment voor segment."""
+        rows = connection.execute(
+            f"SELECT segment_size, digest FROM {self.table_segments} "  # noqa: S608
+            "WHERE YAPMO_FQPN = ? ORDER BY segment_index",
+            (fqpn,),
+        ).fetchall()
+        if not rows:
+            # Geen segment digests opgeslagen: niet verifieerbaar
+            return None, None
+
+        segment_size = rows[0][0]
+        digests = [digest for _size, digest in rows]
+        bad_segments = []
+        for index, matches in verify_segments(file_path, segment_size, digests):
+            self._rate_limiter.consume(segment_size)
+            if not matches:
+                bad_segments.append(str(index))
+            if self._stop_event.is_set():
+                raise ScanStoppedError
+
+        if bad_segments:
+            return "segment_mismatch", f"segments {','.join(bad_segments)}"
+        return None, None
+
+    def _verify_video_hash(
+        self, file_path: Path, stored_hash: str,
+    ) -> tuple[str | None, str | None]:
+        """Verifieer de hybrid video hash: grootte en header hash.
+
+        Formaat: "{ext}_{size}_{date}_{header_hash16}"; de datum kan van
+        metadata of ctime komen en wordt daarom niet gecontroleerd.
+        """
+        parts = stored_hash.split("_", 2)
+        if len(parts) != 3 or not parts[1].isdigit() or "_" not in parts[2]:  # noqa: PLR2004
+            return None, None
+
+        size_text = parts[1]
+        header_hash = parts[2].rsplit("_", 1)[1]
+        actual_size = file_path.stat().st_size
+        with file_path.open("rb") as f:
+            header_bytes = f.read(self.video_header_size)
+        self._rate_limiter.consume(len(header_bytes))
+        actual_header_hash = hashlib.sha256(header_bytes).hexdigest()[:16]
+
+        if actual_size != int(size_text):
+            return "size_mismatch", str(actual_size)
+        if actual_header_hash != header_hash:
+            return "hash_mismatch", actual_header_hash
+        return None, None
+
+    def _create_tables(self, connection: sqlite3.Connection) -> None:
+        """Create checkpoint en mismatches tabellen indien nodig."""
+        connection.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table_progress} (
+                job TEXT PRIMARY KEY,
+                last_media_id INTEGER NOT NULL,
+                files_checked INTEGER NOT NULL,
+                mismatches_found INTEGER NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        connection.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table_mismatches} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                YAPMO_FQPN TEXT NOT NULL,
+                expected_hash TEXT,
+                actual_hash TEXT,
+                reason TEXT NOT NULL,
+                detected_at TEXT NOT NULL
+            )
+        """)
+        connection.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{self.table_mismatches}_fqpn "
+            f"ON {self.table_mismatches}(YAPMO_FQPN)",
+        )
+        connection.commit()
+
+    def _load_checkpoint(self, connection: sqlite3.Connection) -> None:
+        """Laad de laatste checkpoint (of begin vooraan)."""
+        row = connection.execute(
+            f"SELECT last_media_id, files_checked, mismatches_found "  # noqa: S608
+            f"FROM {self.table_progress} WHERE job = ?",
+            (JOB_NAME,),
+        ).fetchone()
+        with self._lock:
+            if row:
+                self.last_media_id, self.files_checked, self.mismatches_found = row
+            else:
+                self.last_media_id = self.files_checked = self.mismatches_found = 0
+
+    def _save_checkpoint(self, connection: sqlite3.Connection) -> None:
+        """Schrijf de huidige voortgang weg (kleine, korte transactie)."""
+        with self._lock:
+            values = (
+                JOB_NAME,
+                self.last_media_id,
+                self.files_checked,
+                self.mismatches_found,
+                datetime.now(UTC).isoformat(),
+            )
+        connection.execute(
+            f"INSERT OR REPLACE INTO {self.table_progress} "  # noqa: S608
+            "(job, last_media_id, files_checked, mismatches_found, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            values,
+        )
+        connection.commit()
+
+    def _record_mismatch(
+        self,
+        connection: sqlite3.Connection,
+        fqpn: str,
+        expected_hash: str | None,
+        actual_hash: str | None,
+        reason: str,
+    ) -> None:
+        """Registreer een afwijking in de mismatches tabel."""
+        connection.execute(
+            f"INSERT INTO {self.table_mismatches} "  # noqa: S608
+            "(YAPMO_FQPN, expected_hash, actual_hash, reason, detected_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (fqpn, expected_hash, actual_hash, reason, datetime.now(UTC).isoformat()),
+        )
+        connection.commit()
+        with self._lock:
+            self.mismatches_found += 1
@@ -0,0 +1,265 @@
+"""Migratie van app3 catalogi (images.db, images_auto_field.db) naar app2.
+
+Oude catalogi van app3's DBManager hebben alleen TEXT kolommen met 'nil' als
+lege waarde, een hash kolom en een Directories tabel. Opnieuw scannen en
+ExifTool draaien over terabytes aan media is niet nodig: de oude database
+wordt ge-ATTACHed en met INSERT ... SELECT in blokken van rowids omgezet.
+
+- Kolommen met dezelfde naam (images_auto_field.db) worden direct overgenomen,
+  de oude kolomnamen van images.db via LEGACY_COLUMNS
+- 'nil' en lege tekst worden NULL; getypeerde kolommen gaan door
+  yapmo_convert (EPOCH, INTEGER, REAL, ...) zoals bij de typed ingest
+- Rijen zonder FQPN worden overgeslagen; bestaande FQPNs blijven staan
+  tenzij replace=True
+- De Directories tabel wordt niet gekopieerd: de directory index wordt
+  na de migratie opnieuw opgebouwd uit de Media paden
+- Oude MD5 hashes blijven staan; de integrity scanner slaat hash formaten
+  die hij niet kent over
+
+Gebruik (vanuit app2):
+
+    python legacy_migration.py ../app3/images.db [--replace]
+"""
+
+import argparse
+import sqlite3
+from collections.abc import Callable
+from contextlib import AbstractContextManager, nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from metadata_blob import register_functions
+from typed_ingest import TypedRecordMapper
+
+# Schema alias van de ge-ATTACHte database
+LEGACY_SCHEMA = "legacy"
+
+# Kolomnamen van de oudste app3 catalogi (images.db) -> app2 kolommen
+LEGACY_COLUMNS = {
+    "fqpn": "YAPMO_FQPN",
+    "name": "YAPMO_FILE_Name",
+    "filepath_original": "YAPMO_FILE_Path",
+    "filepath_new": "YAPMO_FILE_Path_New",
+    "size": "YAPMO_FILE_Size",
+    "type": "YAPMO_FILE_Type",
+    "date": "YAPMO_FILE_Modify_Date",
+    "hash": "YAPMO_hash",
+    "cameraModel": "EXIF_Model",
+    "exifDateTime": "EXIF_DateTimeOriginal",
+    "latitude": "GPS_Latitude",
+    "longitude": "GPS_Longitude",
+    "keywords": "IPTC_Keywords",
+    "subject": "XMP_Subject",
+    "hierarchicalSubject": "XMP_HierarchicalSubject",
+}
+
+
+def _null_if_empty(legacy: str) -> str:
+    """SQL expressie voor een legacy kolom met 'nil' en lege tekst als NULL."""
+    return f"NULLIF(NULLIF(TRIM(l.\"{legacy}\"), 'nil'), '')"
+
+
+@dataclass
+class MigrationReport:
+    """Resultaat van een migratie."""
+
+    source: str
+    rows_read: int = 0
+    rows_written: int = 0
+    # app2 kolom -> legacy kolom
+    columns: dict[str, str] = field(default_factory=dict)
+    unmapped: list[str] = field(default_factory=list)
+
+    @property
+    def rows_skipped(self) -> int:
+        """Rijen zonder FQPN of met een FQPN die al bestond."""
+        return self.rows_read - self.rows_written
+
+
+def column_mapping(
+    legacy_columns: list[str], target_columns: list[str],
+) -> tuple[dict[str, str], list[str]]:
+    """Koppel legacy kolommen aan app2 kolommen.
+
+    Returns
+    -------
+        Tuple (app2 kolom -> legacy kolom, legacy kolommen zonder doel)
+
+    """
+    targets = set(target_columns) - {"id"}
+    mapping = {column: column for column in legacy_columns if column in targets}
+    for legacy, target in LEGACY_COLUMNS.items():
+        if legacy in legacy_columns and target in targets and target not in mapping:
+            mapping[target] = legacy
+    used = set(mapping.values()) | {"id"}
+    return mapping, [column for column in legacy_columns if column not in used]
+
+
+class LegacyMigration:
+    """Bulk migratie van een app3 Media tabel naar de app2 Media tabel."""
+
+    def __init__(
+        self,
+        connection: sqlite3.Connection,
+        table_media: str,
+        mapper: TypedRecordMapper,
+        *,
+        chunk_size: int = 5000,
+        lock: AbstractContextManager | None = None,
+    ) -> None:
+        """Initialize met de app2 connectie en de typed ingest mapper.
+
+        Args:
+        ----
+            connection: Schrijvende app2 connectie (Media tabel moet bestaan)
+            table_media: Naam van de app2 Media tabel
+            mapper: Typed ingest mapper voor de kolom types
+            chunk_size: Aantal legacy rijen per INSERT ... SELECT
+            lock: Lock rond de gedeelde connectie (per blok vastgehouden)
+
+        """
+        self.connection = connection
+        self.table_media = table_media
+        self.mapper = mapper
+        self.chunk_size = max(1, chunk_size)
+        self.lock = lock if lock is not None else nullcontext()
+        register_functions(connection)
+
+    def _select_expression(self, target: str, legacy: str) -> tuple[str, list[str]]:
+        """SELECT expressie die 'nil' naar NULL zet en het kolom type toepast."""
+        field_type = self.mapper.field_type(target)
+        value = _null_if_empty(legacy)
+        if field_type == "TEXT":
+            return value, []
+        return f"yapmo_convert({value}, ?)", [field_type]
+
+    def migrate(
+        self,
+        legacy_path: str | Path,
+        *,
+        legacy_table: str = "Media",
+        replace: bool = False,
+        progress_callback: Callable[[int, int], None] | None = None,
+    ) -> MigrationReport:
+        """Migreer alle rijen van legacy_table; commit per blok.
+
+        Args:
+        ----
+            legacy_path: Pad naar de app3 database
+            legacy_table: Naam van de app3 Media tabel
+            replace: Bestaande FQPNs overschrijven in plaats van overslaan
+            progress_callback: Optioneel, aangeroepen met (rijen gelezen, totaal)
+
+        Raises
+        ------
+            ValueError: Als de legacy tabel geen FQPN kolom heeft
+            sqlite3.Error: Bij een database fout (het lopende blok wordt teruggedraaid)
+
+        """
+        report = MigrationReport(str(legacy_path))
+        with self.lock:
+            # ATTACH kan niet binnen een open transactie
+            self.connection.commit()
+            self.connection.execute(f"ATTACH DATABASE ? AS {LEGACY_SCHEMA}", (str(legacy_path),))
+        try:
+            with self.lock:
+                legacy_columns = [
+                    row[1] for row in self.connection.execute(
+                        f'PRAGMA {LEGACY_SCHEMA}.table_info("{legacy_table}")',
+                    )
+                ]
+                target_columns = [
+                    row[1] for row in self.connection.execute(f"PRAGMA main.table_info({self.table_media})")
+                ]
+                total = self.connection.execute(
+                    f'SELECT count(*) FROM {LEGACY_SCHEMA}."{legacy_table}"',  # noqa: S608
+                ).fetchone()[0] if legacy_columns else 0
+            report.columns, report.unmapped = column_mapping(legacy_columns, target_columns)
+            if "YAPMO_FQPN" not in report.columns:
+                msg = f"No FQPN column in {legacy_path} ({legacy_table})"
+                raise ValueError(msg)
+
+            sql, parameters = self._insert_sql(report.columns, legacy_table, replace=replace)
+            last_id = 0
+            while True:
+                with self.lock:
+                    upper = self.connection.execute(
+                        f'SELECT max(key) FROM (SELECT rowid AS key FROM {LEGACY_SCHEMA}."{legacy_table}" '  # noqa: S608
+                        "WHERE rowid > ? ORDER BY rowid LIMIT ?)",
+                        (last_id, self.chunk_size),
+                    ).fetchone()[0]
+                    if upper is None:
+                        break
+                    try:
+                        report.rows_read += self.connection.execute(
+                            f'SELECT count(*) FROM {LEGACY_SCHEMA}."{legacy_table}" '  # noqa: S608
+                            "WHERE rowid > ? AND rowid <= ?",
+                            (last_id, upper),
+                        ).fetchone()[0]
+                        report.rows_written += self.connection.execute(
+                            sql, (*parameters, last_id, upper),
+                        ).rowcount
+                        self.connection.commit()
+                    except sqlite3.Error:
+                        self.connection.rollback()
+                        raise
+                last_id = upper
+                if progress_callback is not None:
+                    progress_callback(report.rows_read, total)
+        finally:
+            with self.lock:
+                self.connection.execute(f"DETACH DATABASE {LEGACY_SCHEMA}")
+        return report
+
+    def _insert_sql(
+        self, columns: dict[str, str], legacy_table: str, *, replace: bool,
+    ) -> tuple[str, list[str]]:
+        """INSERT ... SELECT voor een blok legacy rowids (laatste twee parameters)."""
+        targets = list(columns)
+        expressions, parameters = [], []
+        for target in targets:
+            expression, expression_parameters = self._select_expression(target, columns[target])
+            expressions.append(expression)
+            parameters.extend(expression_parameters)
+        fqpn = _null_if_empty(columns["YAPMO_FQPN"])
+        if replace:
+            updates = ", ".join(f"{column} = excluded.{column}" for column in targets if column != "YAPMO_FQPN")
+            conflict = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+        else:
+            conflict = "DO NOTHING"
+        sql = (
+            f"INSERT INTO main.{self.table_media} ({', '.join(targets)}) "  # noqa: S608
+            f"SELECT {', '.join(expressions)} FROM {LEGACY_SCHEMA}.\"{legacy_table}\" l "
+            f"WHERE l.rowid > ? AND l.rowid <= ? AND {fqpn} IS NOT NULL "
+            f"ORDER BY l.rowid ON CONFLICT(YAPMO_FQPN) {conflict}"
+        )
+        return sql, parameters
+
+
+def main() -> None:
+    """Command line: migreer een of meer app3 catalogi naar de app2 database."""
+    parser = argparse.ArgumentParser(description="Migrate app3 catalogs into the app2 database")
+    parser.add_argument("catalogs", nargs="+", type=Path, help="app3 database file(s)")
+    parser.add_argument("--table", default="Media", help="app3 media table (default: Media)")
+    parser.add_argument("--replace", action="store_true", help="overwrite existing FQPNs")
+    arguments = parser.parse_args()
+
+    from database_manager import DatabaseManager
+
+    # Migreren voegt toe aan de bestaande bibliotheek: nooit database_clean toepassen
+    try:
+        with DatabaseManager(clean=False, notify=False) as database_manager:
+            for catalog in arguments.catalogs:
+                report = database_manager.migrate_legacy(
+                    catalog, legacy_table=arguments.table, replace=arguments.replace,
+                )
+                print(  # noqa: T201
+                    f"{catalog}: {report.rows_written}/{report.rows_read} rows migrated, "
+                    f"{report.rows_skipped} skipped, unmapped columns: {', '.join(report.unmapped) or '-'}",
+                )
+    except (sqlite3.Error, OSError, ValueError) as e:
+        parser.exit(1, f"Migration failed: {e}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""Vergelijking van twee roots (backup verificatie) via een hash join.
+
+Bevat /backup/photos echt alles uit /photos? Beide roots worden eerst
+geindexeerd (FillDB, of per volume met federatie); de vergelijking gebruikt
+daarna alleen de opgeslagen YAPMO_hash waarden en leest geen bestanden.
+
+Per kant wordt een TEMP tabel (relatief pad, hash) gevuld met een range
+query over de FQPN index (subtree_range). Relatief pad is de primary key en
+de hash heeft een index, zodat elke categorie een enkele join over
+gesorteerde indexes is: geen paarsgewijze vergelijkingen, ook niet bij
+miljoenen bestanden.
+
+Categorieen:
+
+- missing: pad en inhoud ontbreken in de backup
+- moved: pad ontbreekt, dezelfde inhoud staat onder een ander pad
+- mismatch: zelfde relatief pad, andere hash
+- unverified: zelfde relatief pad, maar een kant heeft geen (geldige) hash
+- extra: alleen in de backup (ook de inhoud komt in de bron niet voor)
+
+Een root zonder rijen in zijn catalogus is (nog) niet geindexeerd; zo'n root
+staat als "unindexed" bovenaan het rapport en de vergelijking is dan nooit
+compleet.
+
+Gebruik:
+
+    with shared_pool().connection() as connection:
+        diff = LibraryDiff(connection, "Media", DiffSource("/photos"), DiffSource("/backup/photos"))
+        summary = diff.write(Path("photos_vs_backup.jsonl"))
+"""
+
+import sqlite3
+from collections.abc import Iterator
+from dataclasses import astuple, dataclass, field
+from pathlib import Path
+
+from directory_index import subtree_range
+from federated_catalog import CatalogRegistry
+from library_export import chunk_bytes, jsonl_lines
+from read_pool import temp_writes
+
+DIFF_MISSING = "missing"
+DIFF_MOVED = "moved"
+DIFF_MISMATCH = "mismatch"
+DIFF_UNVERIFIED = "unverified"
+DIFF_EXTRA = "extra"
+
+DIFF_KINDS = (DIFF_MISSING, DIFF_MOVED, DIFF_MISMATCH, DIFF_UNVERIFIED, DIFF_EXTRA)
+
+# Root zonder rijen in de catalogus (geen verschil, maar een waarschuwing)
+DIFF_UNINDEXED = "unindexed"
+
+# TEMP tabellen per kant
+_SIDES = ("diff_source", "diff_backup")
+
+# Mislukte hashes (media_processing) tellen als ontbrekend
+_HASH_ERROR_PREFIX = "hash_error"
+
+
+@dataclass(frozen=True)
+class DiffSource:
+    """Een root in een catalogus (schema "main" of een ge-ATTACHte volume catalogus)."""
+
+    root: str
+    schema: str = "main"
+
+
+@dataclass(frozen=True)
+class DiffEntry:
+    """Een verschil tussen bron en backup (of een root die niet geindexeerd is)."""
+
+    kind: str
+    path: str
+    source_hash: str | None
+    backup_hash: str | None
+    # Bij moved: het relatieve pad van dezelfde inhoud aan de andere kant
+    other_path: str | None = None
+
+
+@dataclass
+class DiffSummary:
+    """Aantallen per categorie."""
+
+    source_files: int = 0
+    backup_files: int = 0
+    matched: int = 0
+    counts: dict[str, int] = field(default_factory=lambda: dict.fromkeys(DIFF_KINDS, 0))
+    # Roots zonder rijen in hun catalogus
+    unindexed: list[str] = field(default_factory=list)
+
+    @property
+    def complete(self) -> bool:
+        """True als alles uit de bron met dezelfde inhoud in de backup staat."""
+        if self.unindexed:
+            return False
+        return not any(self.counts[kind] for kind in (DIFF_MISSING, DIFF_MISMATCH, DIFF_UNVERIFIED))
+
+    def add(self, entry: "DiffEntry") -> None:
+        """Tel een entry uit LibraryDiff.entries()."""
+        if entry.kind == DIFF_UNINDEXED:
+            self.unindexed.append(entry.path)
+        else:
+            self.counts[entry.kind] += 1
+
+
+def resolve_source(
+    connection: sqlite3.Connection, root: str, registry: CatalogRegistry | None = None,
+) -> DiffSource:
+    """DiffSource voor een root: de ge-ATTACHte volume catalogus of anders main."""
+    if registry is not None:
+        volume = registry.volume_for(root)
+        attached = {row[1] for row in connection.execute("PRAGMA database_list")}
+        if volume is not None and volume.alias in attached:
+            return DiffSource(root, volume.alias)
+    return DiffSource(root)
+
+
+class LibraryDiff:
+    """Hash join tussen de media onder twee roots."""
+
+    def __init__(
+        self,
+        connection: sqlite3.Connection,
+        table_media: str,
+        source: DiffSource,
+        backup: DiffSource,
+        *,
+        batch_size: int = 1000,
+    ) -> None:
+        """Initialize met een (read) connectie en de twee roots.
+
+        Args:
+        ----
+            connection: Connectie met beide catalogi (TEMP tabellen worden hierop gemaakt)
+            table_media: Naam van de Media tabel
+            source: Root die volledig in de backup moet staan
+            backup: Root van de backup
+            batch_size: Rijen per fetchmany
+
+        """
+        self.connection = connection
+        self.table_media = table_media
+        self.source = source
+        self.backup = backup
+        self.batch_size = max(1, batch_size)
+        self._prepared = False
+
+    def prepare(self) -> None:
+        """Vul de TEMP tabellen (relatief pad, hash) voor beide kanten."""
+        with temp_writes(self.connection):
+            for table, side in zip(_SIDES, (self.source, self.backup), strict=True):
+                _, low, high = subtree_range(side.root)
+                self.connection.execute(f"DROP TABLE IF EXISTS temp.{table}")
+                self.connection.execute(
+                    f"CREATE TEMP TABLE {table} (path TEXT PRIMARY KEY, hash TEXT) WITHOUT ROWID",
+                )
+                self.connection.execute(
+                    f"INSERT INTO temp.{table} (path, hash) "  # noqa: S608
+                    "SELECT substr(YAPMO_FQPN, ?), "
+                    "CASE WHEN YAPMO_hash = '' OR YAPMO_hash LIKE ? THEN NULL ELSE YAPMO_hash END "
+                    f'FROM {side.schema}."{self.table_media}" '
+                    "WHERE YAPMO_FQPN >= ? AND YAPMO_FQPN < ?",
+                    (len(low) + 1, f"{_HASH_ERROR_PREFIX}%", low, high),
+                )
+                self.connection.execute(f"CREATE INDEX temp.idx_{table}_hash ON {table}(hash)")
+            self.connection.commit()
+        self._prepared = True
+
+    def close(self) -> None:
+        """Verwijder de TEMP tabellen (de connectie kan terug naar de pool)."""
+        with temp_writes(self.connection):
+            for table in _SIDES:
+                self.connection.execute(f"DROP TABLE IF EXISTS temp.{table}")
+            self.connection.commit()
+        self._prepared = False
+
+    def _rows(self, sql: str) -> Iterator[tuple]:
+        """Rijen van een query in batches."""
+        cursor = self.connection.execute(sql)
+        while batch := cursor.fetchmany(self.batch_size):
+            yield from batch
+
+    def unindexed_roots(self) -> list[str]:
+        """Roots zonder een enkele rij onder zich in hun catalogus."""
+        if not self._prepared:
+            self.prepare()
+        return [
+            side.root
+            for table, side in zip(_SIDES, (self.source, self.backup), strict=True)
+            if self.connection.execute(f"SELECT 1 FROM temp.{table} LIMIT 1").fetchone() is None  # noqa: S608
+        ]
+
+    def entries(self) -> Iterator[DiffEntry]:
+        """Niet geindexeerde roots, dan alle verschillen per categorie gesorteerd op relatief pad."""
+        for root in self.unindexed_roots():
+            yield DiffEntry(DIFF_UNINDEXED, root, None, None)
+        # Pad ontbreekt in de backup: moved als de inhoud elders in de backup staat
+        for path, source_hash, other_path in self._rows(
+            "SELECT s.path, s.hash, (SELECT b.path FROM diff_backup b WHERE b.hash = s.hash LIMIT 1) "
+            "FROM diff_source s WHERE NOT EXISTS (SELECT 1 FROM diff_backup b WHERE b.path = s.path) "
+            "ORDER BY s.path",
+        ):
+            if other_path is None:
+                yield DiffEntry(DIFF_MISSING, path, source_hash, None)
+            else:
+                yield DiffEntry(DIFF_MOVED, path, source_hash, source_hash, other_path)
+        # Zelfde pad aan beide kanten
+        for path, source_hash, backup_hash in self._rows(
+            "SELECT s.path, s.hash, b.hash FROM diff_source s JOIN diff_backup b ON b.path = s.path "
+            "WHERE s.hash IS NULL OR b.hash IS NULL OR s.hash != b.hash ORDER BY s.path",
+        ):
+            kind = DIFF_MISMATCH if source_hash and backup_hash else DIFF_UNVERIFIED
+            yield DiffEntry(kind, path, source_hash, backup_hash)
+        # Alleen in de backup, ook qua inhoud
+        for path, backup_hash in self._rows(
+            "SELECT b.path, b.hash FROM diff_backup b "
+            "WHERE NOT EXISTS (SELECT 1 FROM diff_source s WHERE s.path = b.path) "
+            "AND (b.hash IS NULL OR NOT EXISTS (SELECT 1 FROM diff_source s WHERE s.hash = b.hash)) "
+            "ORDER BY b.path",
+        ):
+            yield DiffEntry(DIFF_EXTRA, path, None, backup_hash)
+
+    def _add_totals(self, summary: DiffSummary) -> None:
+        """Aantal bestanden per kant en gelijke paden met gelijke hash."""
+        summary.source_files, summary.backup_files, summary.matched = self.connection.execute(
+            "SELECT (SELECT count(*) FROM diff_source), (SELECT count(*) FROM diff_backup), "
+            "(SELECT count(*) FROM diff_source s JOIN diff_backup b ON b.path = s.path WHERE s.hash = b.hash)",
+        ).fetchone()
+
+    def summary(self) -> DiffSummary:
+        """Tel de verschillen per categorie."""
+        summary = DiffSummary()
+        for entry in self.entries():
+            summary.add(entry)
+        self._add_totals(summary)
+        return summary
+
+    def write(self, path: Path) -> DiffSummary:
+        """Schrijf alle verschillen als JSONL (via een tijdelijk bestand); geeft de aantallen."""
+        summary = DiffSummary()
+
+        def rows() -> Iterator[tuple]:
+            for entry in self.entries():
+                summary.add(entry)
+                yield astuple(entry)
+
+        columns = list(DiffEntry.__dataclass_fields__)
+        temporary = path.with_name(f"{path.name}.partial")
+        try:
+            with temporary.open("wb") as handle:
+                for block in chunk_bytes(jsonl_lines(columns, rows())):
+                    handle.write(block)
+            temporary.replace(path)
+        finally:
+            temporary.unlink(missing_ok=True)
+        self._add_totals(summary)
+        return summary
@@ -0,0 +1,204 @@
+"""Streaming export van de bibliotheek naar JSONL of CSV.
+
+De enige export was FillDBPage._export_json: een json.dump van de resultaten
+lijst in het geheugen. De database zelf kon niet geexporteerd worden. Deze
+module leest rijen met fetchmany van een read pool cursor en zet ze via
+generators om naar JSONL of CSV regels, gebundeld in blokken van vaste
+grootte en optioneel gzip gecomprimeerd. Het geheugengebruik hangt af van
+batch- en blokgrootte, niet van het aantal rijen.
+
+Dezelfde generator voedt een bestand (write) en de download endpoint van de
+SQL pagina (iter_bytes als streaming response body).
+
+Gebruik:
+
+    export = LibraryExport.from_search(shared_pool(), compiler, "type:video", "csv.gz")
+    export.write(Path("videos.csv.gz"))
+"""
+
+import base64
+import csv
+import io
+import json
+import zlib
+from collections.abc import Iterable, Iterator, Sequence
+from pathlib import Path
+from typing import Any
+
+from query_pager import is_read_query, normalize_query
+from read_pool import ReadPool
+from search_query import SearchCompiler
+
+# Formaat -> (regel formaat, gzip)
+EXPORT_FORMATS = {
+    "jsonl": ("jsonl", False),
+    "csv": ("csv", False),
+    "jsonl.gz": ("jsonl", True),
+    "csv.gz": ("csv", True),
+}
+
+_MEDIA_TYPES = {"jsonl": "application/x-ndjson", "csv": "text/csv"}
+
+# gzip header en trailer in plaats van een kale zlib stream
+_GZIP_WBITS = 31
+
+
+def export_value(value: Any) -> Any:  # noqa: ANN401
+    """Waarde geschikt voor JSON/CSV (BLOBs als base64)."""
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode("ascii")
+    return value
+
+
+def jsonl_lines(columns: Sequence[str], rows: Iterable[tuple]) -> Iterator[str]:
+    """Een JSON object per rij, met de kolomnamen als keys."""
+    for row in rows:
+        record = {column: export_value(value) for column, value in zip(columns, row, strict=True)}
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def csv_lines(columns: Sequence[str], rows: Iterable[tuple]) -> Iterator[str]:
+    """CSV header gevolgd door een regel per rij."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+
+    def take() -> str:
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    writer.writerow(columns)
+    yield take()
+    for row in rows:
+        writer.writerow([export_value(value) for value in row])
+        yield take()
+
+
+def chunk_bytes(
+    lines: Iterable[str], chunk_size: int = 1024 * 1024, *, compress: bool = False,
+) -> Iterator[bytes]:
+    """Bundel regels tot blokken van ongeveer chunk_size bytes (optioneel gzip)."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, _GZIP_WBITS) if compress else None
+    parts: list[bytes] = []
+    size = 0
+    for line in lines:
+        data = line.encode("utf-8")
+        parts.append(data)
+        size += len(data)
+        if size >= chunk_size:
+            block = b"".join(parts)
+            parts, size = [], 0
+            block = compressor.compress(block) if compressor is not None else block
+            if block:
+                yield block
+    block = b"".join(parts)
+    if compressor is not None:
+        block = compressor.compress(block) + compressor.flush()
+    if block:
+        yield block
+
+
+class LibraryExport:
+    """Een export van een leesquery naar een van de EXPORT_FORMATS."""
+
+    def __init__(
+        self,
+        pool: ReadPool,
+        sql: str,
+        parameters: Sequence[Any] = (),
+        fmt: str = "jsonl",
+        *,
+        batch_size: int = 1000,
+        chunk_size: int = 1024 * 1024,
+    ) -> None:
+        """Initialize met de read pool, de query en het formaat.
+
+        Args:
+        ----
+            pool: Read pool voor de cursor
+            sql: Leesquery (SELECT, WITH of VALUES)
+            parameters: Waarden voor de ? placeholders in sql
+            fmt: Een van EXPORT_FORMATS
+            batch_size: Rijen per fetchmany
+            chunk_size: Bytes per blok (voor compressie)
+
+        Raises
+        ------
+            ValueError: Bij een onbekend formaat of een query die geen leesquery is
+
+        """
+        if fmt not in EXPORT_FORMATS:
+            msg = f"Unknown export format: {fmt} (expected one of {', '.join(EXPORT_FORMATS)})"
+            raise ValueError(msg)
+        self.sql = normalize_query(sql)
+        if not is_read_query(self.sql):
+            msg = "Only SELECT/WITH/VALUES queries can be exported"
+            raise ValueError(msg)
+        self.pool = pool
+        self.parameters = tuple(parameters)
+        self.fmt = fmt
+        self.batch_size = max(1, batch_size)
+        self.chunk_size = chunk_size
+        self.rows = 0
+
+    @classmethod
+    def from_search(
+        cls,
+        pool: ReadPool,
+        compiler: SearchCompiler,
+        search: str,
+        fmt: str = "jsonl",
+        columns: Sequence[str] | None = None,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> "LibraryExport":
+        """Export van de media die aan een zoekopdracht voldoen (lege zoektekst = alles).
+
+        Zonder columns worden alle kolommen van de media tabel geexporteerd.
+
+        Raises
+        ------
+            SearchSyntaxError: Bij een ongeldige zoekopdracht of onbekende kolommen
+
+        """
+        with pool.connection() as connection:
+            compiled = compiler.compile(connection, search, columns or ["*"])
+        return cls(pool, compiled.sql, compiled.parameters, fmt, **kwargs)
+
+    @property
+    def media_type(self) -> str:
+        """Content type voor een download response."""
+        line_format, compressed = EXPORT_FORMATS[self.fmt]
+        return "application/gzip" if compressed else _MEDIA_TYPES[line_format]
+
+    def filename(self, stem: str = "yapmo_export") -> str:
+        """Bestandsnaam met de extensie van het formaat."""
+        return f"{stem}.{self.fmt}"
+
+    def _rows(self, cursor: Any) -> Iterator[tuple]:  # noqa: ANN401
+        """Rijen van de cursor in batches (telt self.rows)."""
+        while batch := cursor.fetchmany(self.batch_size):
+            self.rows += len(batch)
+            yield from batch
+
+    def iter_bytes(self) -> Iterator[bytes]:
+        """Stream de export als blokken bytes (de connectie blijft geleend tot het einde)."""
+        line_format, compressed = EXPORT_FORMATS[self.fmt]
+        self.rows = 0
+        with self.pool.connection() as connection:
+            cursor = connection.execute(self.sql, self.parameters)
+            columns = [description[0] for description in cursor.description or ()]
+            lines = (jsonl_lines if line_format == "jsonl" else csv_lines)(columns, self._rows(cursor))
+            yield from chunk_bytes(lines, self.chunk_size, compress=compressed)
+
+    def write(self, path: Path) -> int:
+        """Schrijf de export naar path (via een tijdelijk bestand); geeft het aantal rijen."""
+        temporary = path.with_name(f"{path.name}.partial")
+        try:
+            with temporary.open("wb") as handle:
+                for block in self.iter_bytes():
+                    handle.write(block)
+            temporary.replace(path)
+        finally:
+            temporary.unlink(missing_ok=True)
+        return self.rows
@@ -0,0 +1,200 @@
+"""Incrementeel bijgehouden bibliotheek statistieken.
+
+Statistieken (aantal en bytes per media type, jaar-maand, camera model en
+directory) werden telkens opnieuw berekend. Deze module houdt een
+samenvattingstabel bij die de writer in dezelfde transactie als de rij
+wijzigingen bijwerkt met delta's: de bijdrage van de oude rij eraf, de
+bijdrage van de nieuwe rij erbij. Directory tellingen worden doorgerold naar
+alle voorouders, zodat elke statistiek een O(1) lookup is.
+"""
+
+import sqlite3
+from collections import Counter
+from collections.abc import Iterable
+from datetime import UTC, datetime
+
+from directory_index import ancestors
+
+# Dimensies in de stats tabel
+DIMENSION_LIBRARY = "library"
+DIMENSION_TYPE = "type"
+DIMENSION_MONTH = "month"
+DIMENSION_CAMERA = "camera"
+DIMENSION_DIRECTORY = "directory"
+
+# Key voor rijen zonder waarde in een dimensie
+UNKNOWN_KEY = "unknown"
+
+# (dimension, key) -> [count, bytes]
+StatsDelta = dict[tuple[str, str], list[int]]
+
+
+def month_key(epoch: float | None) -> str:
+    """Jaar-maand ("2019-06") voor een epoch datum, of UNKNOWN_KEY."""
+    if epoch is None:
+        return UNKNOWN_KEY
+    try:
+        return datetime.fromtimestamp(epoch, UTC).strftime("%Y-%m")
+    except (OverflowError, OSError, ValueError, TypeError):
+        return UNKNOWN_KEY
+
+
+class LibraryStats:
+    """Library_Stats tabel naast de Media tabel."""
+
+    def __init__(
+        self,
+        connection: sqlite3.Connection,
+        table_media: str,
+        table_stats: str,
+        *,
+        type_field: str = "YAPMO_FILE_Type",
+        date_fields: list[str] | None = None,
+        camera_field: str | None = "EXIF_Model",
+        path_field: str = "YAPMO_FILE_Path",
+        size_field: str = "YAPMO_FILE_Size",
+    ) -> None:
+        """Initialize met connectie, tabelnamen en de bron kolommen.
+
+        Args:
+        ----
+            connection: Open database connectie
+            table_media: Naam van de Media tabel
+            table_stats: Naam van de stats tabel
+            type_field: Kolom met het media type (image/video)
+            date_fields: Epoch datum kolommen, eerste niet-NULL waarde telt
+            camera_field: Kolom met het camera model (None: geen camera dimensie)
+            path_field: Kolom met de directory
+            size_field: Kolom met de bestandsgrootte in bytes
+
+        """
+        self.connection = connection
+        self.table_media = table_media
+        self.table_stats = table_stats
+        self.type_field = type_field
+        self.date_fields = (
+            date_fields if date_fields is not None
+            else ["EXIF_DateTimeOriginal", "QuickTime_CreateDate"]
+        )
+        self.camera_field = camera_field
+        self.path_field = path_field
+        self.size_field = size_field
+
+    def create(self) -> None:
+        """Create de stats tabel; vult hem bij de eerste keer vanuit Media."""
+        exists = self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (self.table_stats,),
+        ).fetchone()
+        self.connection.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table_stats} (
+                dimension TEXT NOT NULL,
+                key TEXT NOT NULL,
+                media_count INTEGER NOT NULL,
+                total_bytes INTEGER NOT NULL,
+                PRIMARY KEY (dimension, key)
+            ) WITHOUT ROWID
+        """)
+        if not exists:
+            self.rebuild()
+
+    def _select_sql(self) -> str:
+        """SELECT over de bron kolommen in vaste volgorde."""
+        if len(self.date_fields) > 1:
+            date_sql = f"COALESCE({', '.join(self.date_fields)})"
+        else:
+            date_sql = self.date_fields[0] if self.date_fields else "NULL"
+        camera_sql = self.camera_field or "NULL"
+        return (
+            f"SELECT {self.type_field}, {date_sql}, {camera_sql}, "  # noqa: S608
+            f"{self.path_field}, {self.size_field} FROM {self.table_media}"
+        )
+
+    def _add_row(self, delta: StatsDelta, row: tuple, sign: int) -> None:
+        """Tel de bijdrage van een Media rij op bij delta (sign +1 of -1)."""
+        media_type, date_value, camera, path, size = row
+        size = int(size or 0)
+        keys = [
+            (DIMENSION_LIBRARY, ""),
+            (DIMENSION_TYPE, media_type or UNKNOWN_KEY),
+            (DIMENSION_MONTH, month_key(date_value)),
+        ]
+        if self.camera_field:
+            keys.append((DIMENSION_CAMERA, str(camera).strip() if camera else UNKNOWN_KEY))
+        if path:
+            keys.extend((DIMENSION_DIRECTORY, directory) for directory in ancestors(path))
+
+        for key in keys:
+            totals = delta.setdefault(key, [0, 0])
+            totals[0] += sign
+            totals[1] += sign * size
+
+    def collect(self, fqpns: Iterable[str]) -> list[tuple]:
+        """Lees de huidige bron waarden van Media rijen (voor of na een wijziging)."""
+        sql = self._select_sql() + " WHERE YAPMO_FQPN = ?"
+        rows = []
+        for fqpn in fqpns:
+            row = self.connection.execute(sql, (fqpn,)).fetchone()
+            if row is not None:
+                rows.append(row)
+        return rows
+
+    def apply_change(self, old_rows: Iterable[tuple], new_rows: Iterable[tuple]) -> None:
+        """Verwerk de delta tussen oude en nieuwe rijen (geen commit)."""
+        delta: StatsDelta = {}
+        for row in old_rows:
+            self._add_row(delta, row, -1)
+        for row in new_rows:
+            self._add_row(delta, row, 1)
+        self._apply_delta(delta)
+
+    def _apply_delta(self, delta: StatsDelta) -> None:
+        """Schrijf een delta weg als upsert; lege rijen worden verwijderd."""
+        changes = [
+            (dimension, key, count, size)
+            for (dimension, key), (count, size) in delta.items()
+            if count or size
+        ]
+        if not changes:
+            return
+        self.connection.executemany(
+            f"INSERT INTO {self.table_stats} (dimension, key, media_count, total_bytes) "  # noqa: S608
+            "VALUES (?, ?, ?, ?) ON CONFLICT(dimension, key) DO UPDATE SET "
+            "media_count = media_count + excluded.media_count, "
+            "total_bytes = total_bytes + excluded.total_bytes",
+            changes,
+        )
+        self.connection.executemany(
+            f"DELETE FROM {self.table_stats} "  # noqa: S608
+            "WHERE dimension = ? AND key = ? AND media_count <= 0",
+            [(dimension, key) for dimension, key, _count, _size in changes],
+        )
+
+    def rebuild(self) -> None:
+        """Herbereken alle statistieken vanuit de Media tabel (geen commit)."""
+        self.connection.execute(f"DELETE FROM {self.table_stats}")  # noqa: S608
+        delta: StatsDelta = {}
+        for row in self.connection.execute(self._select_sql()):
+            self._add_row(delta, row, 1)
+        self._apply_delta(delta)
+
+    def get(self, dimension: str, key: str = "") -> tuple[int, int]:
+        """Aantal media en bytes voor een enkele key (0, 0 als onbekend)."""
+        row = self.connection.execute(
+            f"SELECT media_count, total_bytes FROM {self.table_stats} "  # noqa: S608
+            "WHERE dimension = ? AND key = ?",
+            (dimension, key),
+        ).fetchone()
+        return (row[0], row[1]) if row else (0, 0)
+
+    def get_dimension(self, dimension: str) -> list[tuple[str, int, int]]:
+        """Alle keys van een dimensie: (key, aantal media, bytes), gesorteerd op key."""
+        return self.connection.execute(
+            f"SELECT key, media_count, total_bytes FROM {self.table_stats} "  # noqa: S608
+            "WHERE dimension = ? ORDER BY key",
+            (dimension,),
+        ).fetchall()
+
+    def counter(self, dimension: str) -> Counter[str]:
+        """Aantal media per key als Counter (bijv. voor een details popup)."""
+        return Counter({key: count for key, count, _bytes in self.get_dimension(dimension)})
@@ -0,0 +1,302 @@
+"""Onderhoud van de database als er niet geindexeerd wordt.
+
+Na grote index runs klopten de statistieken van de query planner niet meer
+(ANALYZE was nooit gedraaid) en groeide het WAL bestand tot gigabytes. De
+MaintenanceService draait periodiek in een achtergrond thread, maar alleen
+als de ingest stil ligt (geen foreground processing en geen writes in de
+laatste idle_seconds). Per ronde:
+
+- ANALYZE (met analysis_limit) op tabellen die nog geen statistiek hebben,
+  daarna PRAGMA optimize, dat tabellen met sterk gewijzigde aantallen rijen
+  zelf opnieuw analyseert
+- incremental_vacuum op databases met auto_vacuum=INCREMENTAL
+- wal_checkpoint(TRUNCATE) als het WAL bestand groter is dan de drempel
+  (in WAL mode krimpt het bestand pas bij de checkpoint na de vacuum)
+
+Elke stap heeft een tijdsbudget: ANALYZE wordt via een progress handler
+afgebroken, de checkpoint wacht maximaal het budget op readers en de vacuum
+geeft per blok pages de write lock weer vrij.
+"""
+
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+from integrity_scanner import lower_thread_priority
+from query_cache import WriteGeneration, write_generation
+
+# PRAGMA auto_vacuum waarde voor INCREMENTAL
+AUTO_VACUUM_INCREMENTAL = 2
+
+# VM instructies tussen twee controles van het tijdsbudget
+_PROGRESS_STEPS = 10000
+
+# Een onderhoudsronde per keer; vastgehouden terwijl een database bestand vervangen wordt
+_round_lock = threading.Lock()
+
+
+def enable_incremental_vacuum(connection: sqlite3.Connection) -> bool:
+    """Zet auto_vacuum=INCREMENTAL op een nieuwe (lege) database; True als actief.
+
+    Op een bestaande database heeft de PRAGMA pas effect na een volledige
+    VACUUM; die wordt hier bewust niet gedaan.
+    """
+    if connection.execute("PRAGMA page_count").fetchone()[0] == 0:
+        connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    return connection.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL
+
+
+@contextmanager
+def maintenance_paused() -> Iterator[None]:
+    """Wacht tot een lopende onderhoudsronde klaar is en start geen nieuwe.
+
+    De connectie van een ronde is gesloten zodra de lock vrij is, zodat het
+    database bestand veilig verwijderd kan worden (database_clean).
+    """
+    with _round_lock:
+        yield
+
+
+def stale_tables(connection: sqlite3.Connection) -> list[str]:
+    """Niet-lege tabellen zonder statistiek in sqlite_stat1.
+
+    Alleen sqlite_stat1 en een LIMIT 1 probe per tabel: geen count(*) over
+    miljoenen rijen. Gewijzigde aantallen rijen laat PRAGMA optimize over.
+    """
+    analyzed: set[str] = set()
+    has_stats = connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'",
+    ).fetchone()
+    if has_stats:
+        analyzed = {table for (table,) in connection.execute("SELECT DISTINCT tbl FROM sqlite_stat1")}
+
+    tables = [
+        table for (table,) in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' "
+            "AND sql NOT LIKE 'CREATE VIRTUAL%' ORDER BY name",
+        )
+        if table not in analyzed
+    ]
+    return [
+        table for table in tables
+        if connection.execute(f'SELECT 1 FROM "{table}" LIMIT 1').fetchone()  # noqa: S608
+    ]
+
+
+@dataclass
+class MaintenanceStep:
+    """Resultaat van een onderhoudsstap."""
+
+    name: str
+    duration: float
+    detail: str
+    completed: bool = True
+
+
+class MaintenanceService:
+    """Periodiek, tijdsbegrensd onderhoud als de ingest stil ligt."""
+
+    def __init__(
+        self,
+        db_path: str | Path,
+        *,
+        interval: float = 300.0,
+        idle_seconds: float = 60.0,
+        step_budget: float = 0.5,
+        wal_threshold_mb: float = 64.0,
+        vacuum_pages: int = 256,
+        analysis_limit: int = 1000,
+        nice_value: int = 19,
+        pause_callback: Callable[[], bool] | None = None,
+        generation: WriteGeneration | None = None,
+    ) -> None:
+        """Initialize de service.
+
+        Args:
+        ----
+            db_path: Pad naar de SQLite database
+            interval: Seconden tussen twee controles
+            idle_seconds: Zo lang moet er niet geschreven zijn voor een ronde
+            step_budget: Maximale duur van een stap in seconden
+            wal_threshold_mb: WAL grootte waarboven een TRUNCATE checkpoint draait
+            vacuum_pages: Pages per incremental_vacuum blok
+            analysis_limit: PRAGMA analysis_limit voor ANALYZE (0 = volledig)
+            nice_value: Nice waarde voor de onderhoud thread
+            pause_callback: Geeft True zolang foreground processing actief is
+            generation: Write generatie (default de gedeelde write_generation)
+
+        """
+        self.db_path = Path(db_path)
+        self.interval = interval
+        self.idle_seconds = idle_seconds
+        self.step_budget = step_budget
+        self.wal_threshold = int(wal_threshold_mb * 1024 * 1024)
+        self.vacuum_pages = max(1, vacuum_pages)
+        self.analysis_limit = analysis_limit
+        self.nice_value = nice_value
+        self.pause_callback = pause_callback
+        self.generation = generation if generation is not None else write_generation
+
+        self.thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._seen_generation = self.generation.value
+        self._last_write = time.monotonic()
+        # Generatie van de laatste ANALYZE ronde (None = nog nooit)
+        self._analyzed_generation: int | None = None
+
+        # Voortgang (ook beschikbaar voor UI)
+        self.last_run: float | None = None
+        self.last_steps: list[MaintenanceStep] = []
+
+    @classmethod
+    def from_config(
+        cls, pause_callback: Callable[[], bool] | None = None,
+    ) -> "MaintenanceService":
+        """Maak een service met parameters uit config.json."""
+        from config import get_param
+
+        return cls(
+            get_param("database", "database_name"),
+            interval=get_param("database", "database_maintenance_interval"),
+            idle_seconds=get_param("database", "database_maintenance_idle"),
+            step_budget=get_param("database", "database_maintenance_step_budget"),
+            wal_threshold_mb=get_param("database", "database_wal_threshold_mb"),
+            vacuum_pages=get_param("database", "database_vacuum_pages"),
+            nice_value=get_param("integrity", "integrity_nice"),
+            pause_callback=pause_callback,
+        )
+
+    @property
+    def is_running(self) -> bool:
+        """Check of de scheduler thread actief is."""
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self) -> None:
+        """Start de scheduler in een achtergrond thread."""
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop de scheduler (een lopende stap wordt afgemaakt)."""
+        self._stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=timeout)
+
+    def get_progress(self) -> dict[str, object]:
+        """Haal de laatste ronde op voor UI updates."""
+        with self._lock:
+            return {
+                "is_running": self.is_running,
+                "last_run": self.last_run,
+                "steps": [(step.name, step.detail, step.completed) for step in self.last_steps],
+            }
+
+    def is_idle(self) -> bool:
+        """Geen foreground processing en geen writes in de laatste idle_seconds."""
+        current = self.generation.value
+        if current != self._seen_generation:
+            self._seen_generation = current
+            self._last_write = time.monotonic()
+        if self.pause_callback is not None and self.pause_callback():
+            return False
+        return time.monotonic() - self._last_write >= self.idle_seconds
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open een eigen connectie (los van de foreground writer)."""
+        return sqlite3.connect(self.db_path, timeout=self.step_budget)
+
+    def _run(self) -> None:
+        """Thread entry point: elke interval een ronde als de ingest stil ligt."""
+        lower_thread_priority(self.nice_value)
+        while not self._stop_event.wait(self.interval):
+            with _round_lock:
+                if not self.db_path.exists() or not self.is_idle():
+                    continue
+                try:
+                    connection = self._connect()
+                except sqlite3.Error:
+                    continue
+                try:
+                    self.run_once(connection)
+                finally:
+                    connection.close()
+
+    def run_once(self, connection: sqlite3.Connection) -> list[MaintenanceStep]:
+        """Voer alle onderhoudsstappen een keer uit."""
+        steps = []
+        for step in (self._analyze, self._incremental_vacuum, self._checkpoint):
+            if self._stop_event.is_set():
+                break
+            started = time.perf_counter()
+            try:
+                result = step(connection)
+            except sqlite3.OperationalError as e:
+                # Lock van de writer of afgebroken op het tijdsbudget
+                result = MaintenanceStep(step.__name__.lstrip("_"), 0.0, str(e), completed=False)
+            if result is not None:
+                result.duration = time.perf_counter() - started
+                steps.append(result)
+        with self._lock:
+            self.last_run = time.time()
+            self.last_steps = steps
+        return steps
+
+    def _analyze(self, connection: sqlite3.Connection) -> MaintenanceStep | None:
+        """ANALYZE op tabellen zonder statistiek en PRAGMA optimize, binnen het tijdsbudget."""
+        generation = self.generation.value
+        if generation == self._analyzed_generation:
+            return None
+        # Buiten het tijdsbudget: de controle zelf mag ANALYZE niet opsouperen
+        stale = stale_tables(connection)
+        deadline = time.monotonic() + self.step_budget
+        connection.set_progress_handler(lambda: int(time.monotonic() > deadline), _PROGRESS_STEPS)
+        try:
+            connection.execute(f"PRAGMA analysis_limit = {int(self.analysis_limit)}")
+            analyzed = []
+            for table in stale:
+                connection.execute(f'ANALYZE "{table}"')
+                connection.commit()
+                analyzed.append(table)
+            connection.execute("PRAGMA optimize")
+        finally:
+            connection.set_progress_handler(None, 0)
+        self._analyzed_generation = generation
+        return MaintenanceStep("analyze", 0.0, f"analyzed {', '.join(analyzed) or 'no tables'}")
+
+    def _checkpoint(self, connection: sqlite3.Connection) -> MaintenanceStep | None:
+        """wal_checkpoint(TRUNCATE) als de WAL groter is dan de drempel."""
+        wal_path = self.db_path.with_name(f"{self.db_path.name}-wal")
+        try:
+            wal_size = wal_path.stat().st_size
+        except OSError:
+            return None
+        if wal_size <= self.wal_threshold:
+            return None
+        busy, log_pages, checkpointed = connection.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        detail = f"WAL {wal_size // (1024 * 1024)} MB, {checkpointed}/{log_pages} pages checkpointed"
+        return MaintenanceStep("checkpoint", 0.0, detail + (" (readers busy)" if busy else ""), not busy)
+
+    def _incremental_vacuum(self, connection: sqlite3.Connection) -> MaintenanceStep | None:
+        """Geef vrije pages terug aan het bestandssysteem, per blok tot het budget op is."""
+        if connection.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+            return None
+        free_before = connection.execute("PRAGMA freelist_count").fetchone()[0]
+        if not free_before:
+            return None
+        deadline = time.monotonic() + self.step_budget
+        free = free_before
+        while free and time.monotonic() < deadline and not self._stop_event.is_set():
+            # executescript stapt de PRAGMA volledig af (execute geeft maar een page vrij)
+            connection.executescript(f"PRAGMA incremental_vacuum({self.vacuum_pages});")
+            free = connection.execute("PRAGMA freelist_count").fetchone()[0]
+        return MaintenanceStep(
+            "incremental_vacuum", 0.0, f"{free_before - free} pages freed, {free} free", not free,
+        )
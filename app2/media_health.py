@@ -0,0 +1,151 @@
+"""Structurele health-check voor media bestanden zonder decoding.
+
+Half gekopieerde JPEGs en MP4s (afgebroken card imports) zijn herkenbaar aan
+hun structuur: een ontbrekende EOI marker, geen IEND chunk, of een MP4 atom
+die voorbij het einde van het bestand loopt. Deze module controleert dat met
+een paar positionele reads (os.pread) aan begin en eind van het bestand, dus
+nagenoeg op stat snelheid.
+"""
+
+import os
+from pathlib import Path
+
+# Status waarden voor YAPMO_health
+HEALTH_OK = "ok"
+HEALTH_TRUNCATED = "truncated"
+HEALTH_CORRUPT = "corrupt"
+HEALTH_EMPTY = "empty"
+HEALTH_UNREADABLE = "unreadable"
+HEALTH_UNSUPPORTED = "unsupported"
+
+_JPEG_EXTENSIONS = (".jpg", ".jpeg")
+_PNG_EXTENSIONS = (".png",)
+_ISO_BMFF_EXTENSIONS = (".mp4", ".mov", ".m4v", ".3gp", ".heic", ".heif", ".avif")
+
+_JPEG_SOI = b"\xff\xd8"
+_JPEG_EOI = b"\xff\xd9"
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_PNG_IEND = b"IEND\xaeB`\x82"
+
+# Aantal bytes aan het eind waarin IEND gezocht wordt, en waarbinnen padding
+# na de JPEG EOI marker toegestaan is
+_TAIL_SIZE = 64 * 1024
+
+# Opvulbytes die sommige camera's en tools na de EOI marker schrijven
+_JPEG_PADDING = b"\x00\xff"
+
+# Maximaal aantal top-level atoms (beschermt tegen onzin structuren)
+_MAX_ATOMS = 10_000
+
+
+def check_media_health(file_path: Path) -> str:
+    """Controleer de structuur van een media bestand.
+
+    Args:
+    ----
+        file_path: Pad naar het bestand
+
+    Returns:
+    -------
+        Een van HEALTH_OK, HEALTH_TRUNCATED, HEALTH_CORRUPT, HEALTH_EMPTY,
+        HEALTH_UNREADABLE of HEALTH_UNSUPPORTED (formaat zonder check)
+
+    """
+    file_ext = file_path.suffix.lower()
+    if file_ext in _JPEG_EXTENSIONS:
+        checker = _check_jpeg
+    elif file_ext in _PNG_EXTENSIONS:
+        checker = _check_png
+    elif file_ext in _ISO_BMFF_EXTENSIONS:
+        checker = _check_iso_bmff
+    else:
+        return HEALTH_UNSUPPORTED
+
+    try:
+        fd = os.open(file_path, os.O_RDONLY)
+    except OSError:
+        return HEALTH_UNREADABLE
+    try:
+        file_size = os.fstat(fd).st_size
+        if file_size == 0:
+            return HEALTH_EMPTY
+        return checker(fd, file_size)
+    except OSError:
+        return HEALTH_UNREADABLE
+    finally:
+        os.close(fd)
+
+
+def _read_tail(fd: int, file_size: int) -> bytes:
+    """Lees de laatste _TAIL_SIZE bytes van het bestand."""
+    offset = max(0, file_size - _TAIL_SIZE)
+    return os.pread(fd, file_size - offset, offset)
+
+
+def _check_jpeg(fd: int, file_size: int) -> str:
+    """JPEG: SOI aan het begin, EOI aan het eind (na eventuele padding).
+
+    FF D9 kan ook in entropy-coded data of een embedded thumbnail staan; alleen
+    een EOI op het echte einde betekent dat de scan volledig is. Extra beelden
+    (MPF) achter de hoofd JPEG eindigen zelf ook op een EOI.
+    """
+    if os.pread(fd, 2, 0) != _JPEG_SOI:
+        return HEALTH_CORRUPT
+    if not _read_tail(fd, file_size).rstrip(_JPEG_PADDING).endswith(_JPEG_EOI):
+        return HEALTH_TRUNCATED
+    return HEALTH_OK
+
+
+def _check_png(fd: int, file_size: int) -> str:
+    """PNG: signature aan het begin, IEND chunk aan het eind."""
+    if os.pread(fd, len(_PNG_SIGNATURE), 0) != _PNG_SIGNATURE:
+        return HEALTH_CORRUPT
+    if _PNG_IEND not in _read_tail(fd, file_size):
+        return HEALTH_TRUNCATED
+    return HEALTH_OK
+
+
+def _check_iso_bmff(fd: int, file_size: int) -> str:
+    """MP4/MOV/HEIF: de top-level atom keten moet precies op EOF eindigen.
+
+    Elke atom begint met size (4 bytes) en type (4 bytes ASCII); size 1 betekent
+    een 64-bit size erna, size 0 loopt tot het einde van het bestand.
+    """
+    offset = 0
+    atom_types = set()
+    for _ in range(_MAX_ATOMS):
+        if offset == file_size:
+            break
+        header = os.pread(fd, 16, offset)
+        if len(header) < 8:  # noqa: PLR2004
+            return HEALTH_TRUNCATED
+
+        size = int.from_bytes(header[:4], "big")
+        atom_type = header[4:8]
+        if not all(0x20 <= byte <= 0x7E for byte in atom_type):  # noqa: PLR2004
+            return HEALTH_CORRUPT
+        atom_types.add(atom_type)
+
+        if size == 1:
+            if len(header) < 16:  # noqa: PLR2004
+                return HEALTH_TRUNCATED
+            size = int.from_bytes(header[8:16], "big")
+            minimum_size = 16
+        elif size == 0:
+            size = file_size - offset
+            minimum_size = 8
+        else:
+            minimum_size = 8
+        if size < minimum_size:
+            return HEALTH_CORRUPT
+
+        offset += size
+        if offset > file_size:
+            return HEALTH_TRUNCATED
+    else:
+        return HEALTH_CORRUPT
+
+    # Zonder moov (video) of meta (HEIF) is het bestand niet afspeelbaar
+    if b"moov" not in atom_types and b"meta" not in atom_types:
+        return HEALTH_TRUNCATED
+    return HEALTH_OK
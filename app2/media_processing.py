@@ -5,8 +5,10 @@ Stap 1D: Hash functionaliteit toegevoegd.
 """
 
 import hashlib
+import io
 import json
 import logging
+import os
 import subprocess
 import time
 from concurrent.futures import ProcessPoolExecutor, as_completed
@@ -17,6 +19,11 @@ from typing import Any
 
 from config import get_param
 from globals import logging_service
+from media_health import check_media_health
+from perceptual_hash import compute_perceptual_hash, perceptual_hash_available
+from run_spool import ProcessingRun
+from single_read import header_bytes_for_exiftool, worker_read_buffer
+from tree_hash import tree_hash_file
 
 
 # Shared variable voor progress tracking
@@ -26,8 +33,19 @@ class MediaProcessing:
     # Shared variable voor progress tracking (multiprocessing-safe)
     _shared_counter = None
 
-    def __init__(self, log_files_count_update: int | None = None) -> None:
-        """Initialize MediaProcessing met configuratie."""
+    def __init__(
+        self,
+        log_files_count_update: int | None = None,
+        database_manager: Any = None,  # noqa: ANN401
+    ) -> None:
+        """Initialize MediaProcessing met configuratie.
+
+        Args:
+        ----
+            log_files_count_update: Optioneel log interval (anders uit config)
+            database_manager: Optionele DatabaseManager die de batches wegschrijft
+
+        """
         # DEV LOG: MediaProcessing initialization started
         logging_service.log("DEV", "=== MediaProcessing.__init__ STARTED ===")
 
@@ -53,11 +71,40 @@ class MediaProcessing:
         self.hash_chunk_size = get_param("processing", "hash_chunk_size")
         self.video_header_size = get_param("processing", "video_header_size")
 
+        # Tree hash configuratie (parallelle Merkle hash voor grote video's)
+        self.tree_hash_enabled = get_param("processing", "tree_hash_enabled")
+        self.tree_hash_threshold = get_param("processing", "tree_hash_threshold")
+        self.tree_hash_segment_size = get_param("processing", "tree_hash_segment_size")
+        self.tree_hash_threads = get_param("processing", "tree_hash_threads")
+
+        # Single-read configuratie (een leesactie per afbeelding)
+        self.single_read = get_param("processing", "single_read")
+        self.single_read_max_size = get_param("processing", "single_read_max_size")
+
+        # Perceptual hash configuratie (near-duplicate detectie)
+        self.perceptual_hash = get_param("processing", "perceptual_hash")
+        self.perceptual_hash_algorithm = get_param(
+            "processing", "perceptual_hash_algorithm",
+        )
+
+        # Volledige ExifTool JSON meesturen voor de raw metadata store
+        self.store_raw_metadata = get_param("processing", "store_raw_metadata")
+
+        # Structurele health-check (afgebroken kopieen detecteren)
+        self.health_check = get_param("processing", "health_check")
+
         # File type extensies
         self.image_extensions = get_param("extensions", "image_extensions")
         self.video_extensions = get_param("extensions", "video_extensions")
         self.sidecar_extensions = get_param("extensions", "sidecar_extensions")
 
+        # Batch writer (alleen in het hoofdprocess, niet in workers)
+        self.database_manager = database_manager
+
+        # Crash-safe spool van resultaten en hervatten van onvoltooide runs
+        self.run_spool = get_param("processing", "run_spool")
+        self.processing_run: ProcessingRun | None = None
+
         # Processing state
         self.is_running = False
         self.is_aborted = False
@@ -86,6 +133,9 @@ class MediaProcessing:
         # Check ExifTool availability
         self._check_exiftool_availability()
 
+        # Check perceptual hash libraries
+        self._check_perceptual_hash_availability()
+
         # DEV LOG: MediaProcessing initialization completed
         logging_service.log("DEV", "=== MediaProcessing.__init__ COMPLETED ===")
         logging_service.log(
@@ -97,6 +147,13 @@ class MediaProcessing:
             f"video_header_size={self.video_header_size} bytes",
         )
 
+    def __getstate__(self) -> dict[str, Any]:
+        """Pickle state voor worker processes zonder database connectie."""
+        state = self.__dict__.copy()
+        state["database_manager"] = None
+        state["processing_run"] = None
+        return state
+
     @property
     def files_processed(self) -> int:
         """Get the current number of processed files (multiprocessing-safe)."""
@@ -151,12 +208,29 @@ class MediaProcessing:
             )
             self.exiftool_disabled_logged = True
 
-    def _extract_exiftool_metadata(self, file_path: Path) -> dict[str, Any]:
+    def _check_perceptual_hash_availability(self) -> None:
+        """Check of perceptual hashing mogelijk is, anders uitschakelen met WARNING."""
+        if not self.perceptual_hash:
+            return
+
+        if not perceptual_hash_available(self.perceptual_hash_algorithm):
+            logging_service.log(
+                "WARNING",
+                f"Perceptual hash '{self.perceptual_hash_algorithm}' not available "
+                "(Pillow/NumPy missing or unknown algorithm) - stage disabled",
+            )
+            self.perceptual_hash = False
+
+    def _extract_exiftool_metadata(
+        self, file_path: Path, header_bytes: bytes | None = None,
+    ) -> dict[str, Any]:
         """Extract metadata using ExifTool.
         
         Args:
         ----
             file_path: Path to the file to process
+            header_bytes: Optional header bytes (single-read); worden via stdin
+                aan ExifTool gegeven zodat ExifTool het bestand niet opnieuw leest
             
         Returns:
         -------
@@ -177,21 +251,15 @@ class MediaProcessing:
 
         try:
             # Execute ExifTool command
-            cmd = ["exiftool", "-j", "-G", "-q", str(file_path)]
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=self.exiftool_timeout / 1000.0, check=False,  # Convert msec to seconds
-            )
+            returncode, stdout, stderr = self._run_exiftool(file_path, header_bytes)
 
-            if result.returncode == 0:
+            if returncode == 0:
                 # Success - parse JSON output
-                return self._process_exiftool_output(result.stdout, file_path)
+                return self._process_exiftool_output(stdout, file_path)
             else:
                 # ExifTool error
-                self._log_exiftool_error(result.stderr, file_path)
-                output = {"YAPMO_ExiftoolExitCode": result.returncode}
+                self._log_exiftool_error(stderr, file_path)
+                output = {"YAPMO_ExiftoolExitCode": returncode}
                 self._add_null_metadata_fields(output)
                 return output
 
@@ -209,6 +277,36 @@ class MediaProcessing:
             self._add_null_metadata_fields(output)
             return output
 
+    def _run_exiftool(
+        self, file_path: Path, header_bytes: bytes | None,
+    ) -> tuple[int, str, str]:
+        """Run ExifTool op een pad of op header bytes via stdin.
+
+        Returns:
+        -------
+            Tuple (returncode, stdout, stderr)
+
+        """
+        timeout = self.exiftool_timeout / 1000.0  # Convert msec to seconds
+
+        if header_bytes is None:
+            cmd = ["exiftool", "-j", "-G", "-q", str(file_path)]
+            result = subprocess.run(
+                cmd, capture_output=True, text=True, timeout=timeout, check=False,
+            )
+            return result.returncode, result.stdout, result.stderr
+
+        # Single-read: "-" laat ExifTool van stdin lezen
+        cmd = ["exiftool", "-j", "-G", "-q", "-"]
+        result = subprocess.run(
+            cmd, input=header_bytes, capture_output=True, timeout=timeout, check=False,
+        )
+        return (
+            result.returncode,
+            result.stdout.decode("utf-8", errors="replace"),
+            result.stderr.decode("utf-8", errors="replace"),
+        )
+
     def _process_exiftool_output(
         self, stdout: str, file_path: Path,
     ) -> dict[str, Any]:
@@ -256,6 +354,10 @@ class MediaProcessing:
                 else:
                     result[db_field] = None
 
+            # Complete output bewaren: nieuwe velden later vullen zonder ExifTool
+            if self.store_raw_metadata:
+                result["YAPMO:RawMetadata"] = file_data
+
             return result
 
         except json.JSONDecodeError:
@@ -355,6 +457,81 @@ class MediaProcessing:
             #DEBUG_einde
             return f"hash_error_{int(time.time())}"
 
+    def _use_single_read(self, file_type: str, file_size: int) -> bool:
+        """Bepaal of een bestand via het single-read pad verwerkt wordt.
+
+        Args:
+        ----
+            file_type: Type of file ("image" or "video")
+            file_size: File size in bytes
+
+        Returns:
+        -------
+            True voor afbeeldingen tot single_read_max_size als single-read aan staat.
+            Video's lezen al alleen de header voor de hybrid hash.
+
+        """
+        return (
+            bool(self.single_read)
+            and file_type == "image"
+            and file_size <= self.single_read_max_size
+        )
+
+    def _add_stat_metadata_fields(
+        self, metadata: dict[str, Any], file_path: Path, file_stat: os.stat_result,
+    ) -> None:
+        """Vervang File:* velden die ExifTool via stdin niet kan zien.
+
+        Via stdin kent ExifTool geen naam, map of datum en is FileSize de
+        lengte van de header. Deze velden komen uit het pad en os.stat, zowel
+        in de gemapte kolommen als in de bewaarde raw JSON.
+
+        Args:
+        ----
+            metadata: Gemapte ExifTool metadata (wordt aangepast)
+            file_path: Pad van het bestand
+            file_stat: Resultaat van stat() op het bestand
+
+        """
+        # ExifTool formaat: "2024:01:15 14:30:25+01:00"
+        modify_date = datetime.fromtimestamp(file_stat.st_mtime).astimezone()
+        modify_date = modify_date.replace(microsecond=0)
+        stat_values = {
+            "File:FileName": file_path.name,
+            "File:Directory": str(file_path.parent),
+            "File:FileSize": str(file_stat.st_size),
+            "File:FileModifyDate": (
+                modify_date.strftime("%Y:%m:%d %H:%M:%S") + modify_date.isoformat()[19:]
+            ),
+        }
+        file_fields = get_param("metadata_fields_file")
+        raw_metadata = metadata.get("YAPMO:RawMetadata")
+        for exif_field, value in stat_values.items():
+            db_field = file_fields.get(exif_field)
+            if db_field:
+                metadata[db_field] = value
+            if isinstance(raw_metadata, dict):
+                raw_metadata[exif_field] = value
+
+    def _use_tree_hash(self, file_type: str, file_size: int) -> bool:
+        """Bepaal of een bestand met de parallelle tree hash gehasht wordt.
+
+        Args:
+        ----
+            file_type: Type of file ("image" or "video")
+            file_size: File size in bytes
+
+        Returns:
+        -------
+            True voor video's vanaf tree_hash_threshold bytes als tree hashing aan staat
+
+        """
+        return (
+            bool(self.tree_hash_enabled)
+            and file_type == "video"
+            and file_size >= self.tree_hash_threshold
+        )
+
     def _calculate_image_hash(self, file_path: Path) -> str:
         """Calculate full SHA-256 hash for images.
         
@@ -734,6 +911,12 @@ class MediaProcessing:
         # Update shared progress variable
         results: list[dict[str, object | list[str]] | None] = []
 
+        # Hervat een onvoltooide run: spool replayen en klare bestanden overslaan
+        file_list = self._start_run(file_list)
+        if not file_list:
+            self._finish_run()
+            return results
+
         # Gebruik max_workers uit config
         max_workers = min(self.max_workers, len(file_list))
 
@@ -746,6 +929,64 @@ class MediaProcessing:
         logging_service.log("DEV", "=== PARALLEL PROCESSING STARTED ===")
         logging_service.log("DEV", f"Starting ProcessPoolExecutor with {max_workers} workers")
 
+        try:
+            results = self._run_executor(file_list, max_workers)
+        except BaseException:
+            self._finish_run(aborted=True)
+            raise
+        self._finish_run(aborted=self.is_aborted)
+        return results
+
+    def _start_run(self, file_list: list[str]) -> list[str]:
+        """Start of hervat de gespoolde run; geeft de nog te verwerken bestanden."""
+        self.processing_run = None
+        if not self.run_spool or self.database_manager is None:
+            return file_list
+        run = ProcessingRun.from_config()
+        incomplete = run.incomplete_run()
+        # Een net leeggemaakte database bevat de weggeschreven batches niet meer
+        database_cleaned = self.database_manager.cleaned
+        self.database_manager.cleaned = False
+        try:
+            remaining = run.start(
+                os.path.commonpath(file_list),
+                file_list,
+                self._write_batch,
+                database=str(Path(self.database_manager.db_path).resolve()),
+                database_cleaned=database_cleaned,
+            )
+        except (OSError, ValueError) as e:
+            logging_service.log("ERROR", f"Run spool unavailable, processing without spool: {e}")
+            return file_list
+        self.processing_run = run
+        if run.resumed:
+            logging_service.log(
+                "PROCESS",
+                f"Resuming incomplete run {run.manifest.run_id}: {run.replayed} spooled results "
+                f"replayed, {run.skipped} files skipped",
+            )
+        elif incomplete is not None:
+            logging_service.log(
+                "PROCESS",
+                f"Incomplete run {incomplete.run_id} ({incomplete.source}) not resumed: "
+                "different source or database, or the database was cleaned",
+            )
+        return remaining
+
+    def _finish_run(self, *, aborted: bool = False) -> None:
+        """Sluit de gespoolde run af (afgebroken runs blijven hervatbaar)."""
+        if self.processing_run is not None:
+            try:
+                self.processing_run.finish(aborted=aborted)
+            except OSError as e:
+                logging_service.log("ERROR", f"Could not close run spool: {e}")
+            self.processing_run = None
+
+    def _run_executor(
+        self, file_list: list[str], max_workers: int,
+    ) -> list[dict[str, object | list[str]] | None]:
+        """Verwerk de bestanden met de ProcessPoolExecutor en schrijf per batch weg."""
+        results: list[dict[str, object | list[str]] | None] = []
         with ProcessPoolExecutor(max_workers=max_workers) as executor:
             # DEV LOG: Submitting tasks to executor
             logging_service.log("DEV", f"Submitting {len(file_list)} tasks to executor")
@@ -782,6 +1023,8 @@ class MediaProcessing:
 
                         # Add to results and process in batch
                         results.append(result)
+                        if self.processing_run is not None:
+                            self.processing_run.record(result)
                         self.processed_count += 1
 
                         # DEV LOG: Processing result in batch collector
@@ -920,12 +1163,51 @@ class MediaProcessing:
                 "type": file_type,  # Voor processing log samenvatting
             }
 
-            # ExifTool metadata extraction
-            exiftool_metadata = self._extract_exiftool_metadata(file_path_obj)
+            # Structurele health-check: een paar preads, geen decoding
+            if self.health_check:
+                result["YAPMO:Health"] = check_media_health(file_path_obj)
+
+            # Single-read: bestand een keer lezen voor hash, header en ExifTool
+            image_data = None
+            if self._use_single_read(file_type, file_size):
+                image_data = worker_read_buffer.read(file_path_obj)
+                header_bytes = header_bytes_for_exiftool(image_data, file_ext)
+                exiftool_metadata = self._extract_exiftool_metadata(
+                    file_path_obj, header_bytes,
+                )
+                if header_bytes is not None:
+                    self._add_stat_metadata_fields(exiftool_metadata, file_path_obj, file_stat)
+            else:
+                # ExifTool metadata extraction
+                exiftool_metadata = self._extract_exiftool_metadata(file_path_obj)
             result.update(exiftool_metadata)
 
             # Calculate hash using existing metadata
-            result["YAPMO:Hash"] = self._calculate_file_hash(file_path_obj, file_type, exiftool_metadata)
+            if image_data is not None:
+                result["YAPMO:Hash"] = hashlib.sha256(image_data).hexdigest()
+            elif self._use_tree_hash(file_type, file_size):
+                # Grote video: parallelle Merkle hash met segment digests
+                tree_result = tree_hash_file(
+                    file_path_obj,
+                    self.tree_hash_segment_size,
+                    self.tree_hash_threads,
+                    self.hash_algorithm,
+                )
+                result["YAPMO:Hash"] = tree_result.hash_value
+                result["YAPMO:SegmentSize"] = tree_result.segment_size
+                result["YAPMO:SegmentDigests"] = tree_result.segment_digests
+            else:
+                result["YAPMO:Hash"] = self._calculate_file_hash(file_path_obj, file_type, exiftool_metadata)
+
+            # Optionele perceptual hash voor near-duplicate detectie
+            if self.perceptual_hash and file_type == "image":
+                # Bij single-read decodeert Pillow uit de buffer, niet van disk
+                phash_source = (
+                    io.BytesIO(image_data) if image_data is not None else file_path_obj
+                )
+                result["YAPMO:PHash"] = compute_perceptual_hash(
+                    phash_source, self.perceptual_hash_algorithm,
+                )
 
             # DEV LOG: File processing completed successfully
             # Note: logging_service not available in worker processes
@@ -944,6 +1226,8 @@ class MediaProcessing:
                 f.write(f"[{datetime.now(UTC)}] DEV: Hash: {result.get('YAPMO:Hash', 'NO_HASH')[:20]}...\n")
                 f.write(f"[{datetime.now(UTC)}] DEV: JSON result size: {len(result)} fields\n")
 
+            return result
+
         except (OSError, ValueError) as e:
             # DEV LOG: File processing error - creating FAIL JSON
             debug_path = Path("/workspaces/app/debug_processing.txt")
@@ -1027,10 +1311,32 @@ class MediaProcessing:
             if len(batch_results) < batch_size:
                 logging_service.log("DEV", f"LAST BATCH detected: {len(batch_results)} < {batch_size}")
 
+        # Markeer de batch in de spool zodra hij in de database staat
+        if self._write_batch(batch_results) and self.processing_run is not None:
+            self.processing_run.batch_written(batch_results)
+
         # DEV LOG: Batch processing completed
         logging_service.log("DEV", "=== BATCH PROCESSING COMPLETED ===")
         logging_service.log("DEV", f"Processed {len(batch_results)} results")
 
-        # TODO: In Fase 3, this will send the batch to DatabaseManager
-        # For now, just log that the batch is ready
-        logging_service.log("DEV", "Batch ready for database processing (placeholder)")
+    def _write_batch(self, batch_results: list[dict[str, object | list[str]]]) -> bool:
+        """Schrijf een batch weg; FAIL resultaten hebben geen metadata.
+
+        Returns
+        -------
+            True als alle records weggeschreven zijn
+
+        """
+        if self.database_manager is None:
+            return False
+        records = [
+            result for result in batch_results
+            if result.get("YAPMO:ProcessingStatus") != "FAIL"
+        ]
+        written = self.database_manager.add_media_records(records)
+        if written != len(records):
+            logging_service.log(
+                "ERROR", f"Database batch write failed: {written}/{len(records)} records written",
+            )
+            return False
+        return True
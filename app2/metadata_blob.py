@@ -0,0 +1,165 @@
+"""Opslag van de volledige ExifTool JSON per bestand als gecomprimeerde BLOB.
+
+Alleen gemapte velden worden als kolom opgeslagen; een nieuw veld in
+metadata_fields_image vereiste daarom een volledige her-extractie met
+ExifTool. Met deze store wordt de complete ExifTool output per bestand
+bewaard (zlib, of zstd als het zstandard package beschikbaar is) in een aparte
+tabel, zodat de Media rijen klein blijven.
+
+SQL functies op de connectie maken de BLOBs bruikbaar met JSON1:
+
+- yapmo_raw_json(blob): gedecomprimeerde JSON tekst
+- yapmo_convert(value, type): typed ingest omzetting (EPOCH, REAL, ...)
+
+Een nieuw gemapt veld wordt zo in een UPDATE vanuit de database gevuld:
+json_extract(yapmo_raw_json(data), '$."EXIF:Model"').
+"""
+
+import json
+import sqlite3
+import zlib
+from typing import Any
+
+from typed_ingest import convert_value
+
+try:
+    import zstandard
+except ImportError:  # zstd is optioneel
+    zstandard = None  # type: ignore[assignment]
+
+# Eerste byte van een BLOB geeft de codec aan
+_CODEC_ZLIB = 1
+_CODEC_ZSTD = 2
+
+_ZLIB_LEVEL = 6
+_ZSTD_LEVEL = 9
+
+
+def zstd_available() -> bool:
+    """Check of zstd compressie beschikbaar is."""
+    return zstandard is not None
+
+
+def compress_metadata(data: dict[str, Any], codec: str = "zlib") -> bytes:
+    """Comprimeer een ExifTool JSON dict tot een BLOB.
+
+    Args:
+    ----
+        data: ExifTool output voor een bestand
+        codec: "zlib" of "zstd" (valt terug op zlib zonder zstandard)
+
+    Returns:
+    -------
+        Codec byte gevolgd door de gecomprimeerde UTF-8 JSON
+
+    """
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if codec == "zstd" and zstandard is not None:
+        compressed = zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(payload)
+        return bytes([_CODEC_ZSTD]) + compressed
+    return bytes([_CODEC_ZLIB]) + zlib.compress(payload, _ZLIB_LEVEL)
+
+
+def decompress_json(blob: bytes | None) -> str | None:
+    """Decomprimeer een BLOB tot JSON tekst (None bij NULL of onbekende codec)."""
+    if not blob:
+        return None
+    codec, body = blob[0], blob[1:]
+    if codec == _CODEC_ZLIB:
+        return zlib.decompress(body).decode("utf-8")
+    if codec == _CODEC_ZSTD and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompress(body).decode("utf-8")
+    return None
+
+
+def decompress_metadata(blob: bytes | None) -> dict[str, Any] | None:
+    """Decomprimeer een BLOB tot de oorspronkelijke ExifTool dict."""
+    text = decompress_json(blob)
+    return json.loads(text) if text is not None else None
+
+
+def _sql_convert(value: Any, field_type: str) -> Any:  # noqa: ANN401
+    """SQL wrapper rond convert_value; onbekende types geven NULL."""
+    try:
+        return convert_value(value, field_type)
+    except ValueError:
+        return None
+
+
+def register_functions(connection: sqlite3.Connection) -> None:
+    """Registreer yapmo_raw_json en yapmo_convert op een connectie."""
+    connection.create_function("yapmo_raw_json", 1, decompress_json, deterministic=True)
+    connection.create_function("yapmo_convert", 2, _sql_convert, deterministic=True)
+
+
+def json_path(metadata_key: str) -> str:
+    """JSON1 pad voor een ExifTool key ("EXIF:Model" -> '$."EXIF:Model"')."""
+    escaped = metadata_key.replace("\\", "\\\\").replace('"', '\\"')
+    return f'$."{escaped}"'
+
+
+class RawMetadataStore:
+    """Media_Raw tabel: media id -> gecomprimeerde ExifTool JSON."""
+
+    def __init__(
+        self,
+        connection: sqlite3.Connection,
+        table_media: str,
+        table_raw: str,
+        codec: str = "zlib",
+    ) -> None:
+        """Initialize met connectie, tabelnamen en codec."""
+        self.connection = connection
+        self.table_media = table_media
+        self.table_raw = table_raw
+        self.codec = codec
+        register_functions(connection)
+
+    def create(self) -> None:
+        """Create de tabel indien nodig."""
+        self.connection.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table_raw} (
+                media_id INTEGER PRIMARY KEY,
+                data BLOB NOT NULL
+            )
+        """)
+
+    def store(self, items: list[tuple[str, dict[str, Any]]]) -> None:
+        """Sla (FQPN, ExifTool dict) paren op voor bestaande Media rijen (geen commit)."""
+        self.connection.executemany(
+            f"INSERT OR REPLACE INTO {self.table_raw} (media_id, data) "  # noqa: S608
+            f"SELECT id, ? FROM {self.table_media} WHERE YAPMO_FQPN = ?",
+            [(compress_metadata(data, self.codec), fqpn) for fqpn, data in items],
+        )
+
+    def load(self, fqpn: str) -> dict[str, Any] | None:
+        """Haal de volledige ExifTool dict van een bestand op."""
+        row = self.connection.execute(
+            f"SELECT r.data FROM {self.table_raw} r "  # noqa: S608
+            f"JOIN {self.table_media} m ON m.id = r.media_id WHERE m.YAPMO_FQPN = ?",
+            (fqpn,),
+        ).fetchone()
+        return decompress_metadata(row[0]) if row else None
+
+    def backfill_column(self, column: str, metadata_key: str, field_type: str = "TEXT") -> int:
+        """Vul een Media kolom vanuit de opgeslagen JSON (geen commit).
+
+        Args:
+        ----
+            column: Bestaande kolom in de Media tabel
+            metadata_key: ExifTool key in de JSON ("EXIF:Model")
+            field_type: Typed ingest type voor de omzetting
+
+        Returns:
+        -------
+            Aantal bijgewerkte rijen
+
+        """
+        cursor = self.connection.execute(
+            f"UPDATE {self.table_media} SET {column} = ("  # noqa: S608
+            "SELECT yapmo_convert(json_extract(yapmo_raw_json(r.data), ?), ?) "
+            f"FROM {self.table_raw} r WHERE r.media_id = {self.table_media}.id) "
+            f"WHERE id IN (SELECT media_id FROM {self.table_raw})",
+            (json_path(metadata_key), field_type),
+        )
+        return cursor.rowcount
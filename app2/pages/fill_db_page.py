@@ -9,13 +9,15 @@ from datetime import UTC, datetime
 from pathlib import Path
 from typing import Any
 
+from config import get_param, read_config
+from database_manager import DatabaseManager
+from federated_catalog import CatalogRegistry
 from globals import abort_button_manager, logging_service
 from local_directory_picker import pick_directory
 from media_processing import MediaProcessing
 from nicegui import ui
 from shutdown_manager import handle_exit_click
 from theme import YAPMOTheme
-from config import read_config, get_param
 
 
 class FillDBPage:
@@ -29,6 +31,9 @@ class FillDBPage:
         # Initialize MediaProcessing (will be created during processing)
         self.media_processor: Any = None
 
+        # DatabaseManager (created at the first processing run; per volume bij federatie)
+        self.database_manager: DatabaseManager | None = None
+
         # Initialize page state management
         self.page_state = {
             "scanning": False,
@@ -248,7 +253,7 @@ class FillDBPage:
 
     def _create_progress_log_panel(self) -> None:
         """Create the progress and log panel."""
-        Progress and Log Panel (Hele breedte - Wit met Donkere Blauwe Rand)
+        # Progress and Log Panel (Hele breedte - Wit met Donkere Blauwe Rand)
         progress_card_classes = (
             "w-full bg-white border-2 border-blue-800 rounded-lg shadow-lg"
         )
@@ -416,6 +421,28 @@ class FillDBPage:
             ui.notify("ERROR: search_path not found in config.json", type="negative")
             return get_param("paths", "search_path")
 
+    def _database_manager_for(self, directory_path: str) -> DatabaseManager:
+        """DatabaseManager voor de catalogus van directory_path.
+
+        Met federatie krijgt elke root een eigen catalogus, zodat herindexeren
+        van een volume de catalogi van de andere volumes niet herschrijft.
+        database_clean geldt dan niet: elke wissel van volume zou de catalogus
+        van dat volume anders leegmaken.
+        """
+        db_path = Path(get_param("database", "database_name"))
+        clean = None
+        if get_param("database", "database_federation"):
+            registry = CatalogRegistry(get_param("database", "database_catalog_path"))
+            volume = registry.volume_for(directory_path) or registry.register(directory_path)
+            db_path = volume.db_path
+            clean = False
+        if self.database_manager is not None and self.database_manager.db_path != db_path:
+            self.database_manager.close()
+            self.database_manager = None
+        if self.database_manager is None:
+            self.database_manager = DatabaseManager(db_path, clean=clean)
+        return self.database_manager
+
     def _load_config_parameters(self) -> dict[str, Any]:
         """Load configuration parameters for processing."""
         config = read_config()
@@ -1331,7 +1358,10 @@ class FillDBPage:
         # Create MediaProcessing instance with current config
         config = self._load_config_parameters()
         log_files_count_update = config.get("log_files_count_update")
-        self.media_processor = MediaProcessing(log_files_count_update=log_files_count_update)
+        self.media_processor = MediaProcessing(
+            log_files_count_update=log_files_count_update,
+            database_manager=self._database_manager_for(directory_path),
+        )
         
 
         
@@ -1,6 +1,20 @@
 """Metadata Page voor YAPMO applicatie."""
 
-from nicegui import ui
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+from catalog_backup import CatalogBackup
+from config import get_param
+from federated_catalog import FederatedCatalog
+from globals import abort_button_manager
+from integrity_scanner import IntegrityScanner
+from library_diff import DIFF_KINDS, DiffSummary, LibraryDiff, resolve_source
+from maintenance import MaintenanceService
+from nicegui import run, ui
+from perceptual_hash import PerceptualIndex
+from query_cache import write_generation
+from read_pool import shared_pool
 from shutdown_manager import handle_exit_click
 from theme import YAPMOTheme
 
@@ -10,6 +24,21 @@ class MetadataPage:
 
     def __init__(self) -> None:
         """Initialize the metadata page."""
+        # Scanner overleeft page reloads; pauzeert tijdens foreground processing
+        self.integrity_scanner = IntegrityScanner.from_config(
+            pause_callback=abort_button_manager.is_processing_active,
+        )
+        self.catalog_backup = CatalogBackup.from_config()
+        # Federatie: een catalogus (en backup) per volume
+        self.federation = FederatedCatalog.from_config() if get_param("database", "database_federation") else None
+        self.volume_backups: dict[str, CatalogBackup] = {}
+        # Near-duplicate index met de write generatie waarop hij gebouwd is
+        self._perceptual_index: tuple[int, PerceptualIndex] | None = None
+        # Onderhoud draait vanzelf zodra de ingest stil ligt
+        self.maintenance = MaintenanceService.from_config(
+            pause_callback=abort_button_manager.is_processing_active,
+        )
+        self.maintenance.start()
         self._create_page()
 
     def _create_page(self) -> None:
@@ -26,3 +55,263 @@ class MetadataPage:
         """Maak de content van de metadata pagina."""
         ui.label("Metadata Management Page").classes(
             "text-2xl font-bold text-center")
+        self._create_integrity_section()
+        self._create_backup_section()
+        if self.federation is not None:
+            self._create_volumes_section()
+        self._create_compare_section()
+        self._create_near_duplicates_section()
+        self._create_maintenance_section()
+
+    def _create_integrity_section(self) -> None:
+        """Maak de sectie voor de achtergrond integriteitscontrole."""
+        with ui.card().classes("w-full mt-4"), ui.card_section():
+            ui.label("Integrity Check").classes(
+                "text-xl font-semibold text-gray-800 mb-4")
+            with ui.row().classes("w-full items-center gap-4"):
+                YAPMOTheme.create_button(
+                    "START CHECK", self.integrity_scanner.start, "primary", "md",
+                )
+                YAPMOTheme.create_button(
+                    "STOP CHECK", self.integrity_scanner.stop, "secondary", "md",
+                )
+                YAPMOTheme.create_button(
+                    "RESTART FROM BEGINNING", self._reset_integrity_scan, "gray", "md",
+                )
+                self.integrity_status_label = ui.label("").classes(
+                    "text-gray-700 font-medium")
+        ui.timer(1.0, self._update_integrity_status)
+
+    def _create_backup_section(self) -> None:
+        """Maak de sectie voor de online backup van de database."""
+        with ui.card().classes("w-full mt-4"), ui.card_section():
+            ui.label("Database Backup").classes(
+                "text-xl font-semibold text-gray-800 mb-4")
+            with ui.row().classes("w-full items-center gap-4"):
+                YAPMOTheme.create_button(
+                    "BACKUP NOW", self.catalog_backup.start, "primary", "md",
+                )
+                YAPMOTheme.create_button(
+                    "STOP BACKUP", self.catalog_backup.stop, "secondary", "md",
+                )
+                self.backup_status_label = ui.label("").classes(
+                    "text-gray-700 font-medium")
+        ui.timer(1.0, self._update_backup_status)
+
+    def _update_backup_status(self) -> None:
+        """Update het status label met de voortgang van de backup."""
+        progress = self.catalog_backup.get_progress()
+        if progress["is_running"]:
+            total = progress["pages_total"] or 1
+            text = f"Running - {progress['pages_done'] * 100 // total}% of {progress['pages_total']} pages"
+        elif progress["last_error"]:
+            text = f"Failed - {progress['last_error']}"
+        elif progress["last_backup"]:
+            text = f"Last backup: {progress['last_backup']}"
+        else:
+            text = f"Idle - {len(self.catalog_backup.generations())} backups kept"
+        self.backup_status_label.text = text
+
+    def _create_volumes_section(self) -> None:
+        """Maak de sectie met de volume catalogi van de federatie."""
+        with ui.card().classes("w-full mt-4"), ui.card_section():
+            ui.label("Volumes").classes(
+                "text-xl font-semibold text-gray-800 mb-4")
+            with ui.row().classes("w-full items-center gap-4"):
+                YAPMOTheme.create_button(
+                    "BACKUP VOLUMES", self._backup_volumes, "primary", "md",
+                )
+                YAPMOTheme.create_button(
+                    "FIND DUPLICATES", self._find_duplicates, "secondary", "md",
+                )
+                self.duplicates_label = ui.label("").classes(
+                    "text-gray-700 font-medium")
+            self.volumes_label = ui.label("").classes(
+                "text-gray-700 font-medium whitespace-pre-line")
+        ui.timer(5.0, self._update_volumes_status)
+
+    def _backup_volumes(self) -> None:
+        """Start een backup van elke gemounte volume catalogus."""
+        for volume in self.federation.mounted():
+            backup = self.volume_backups.get(volume.name)
+            if backup is None:
+                backup = self.volume_backups[volume.name] = CatalogBackup.from_config(volume.db_path)
+            backup.start()
+
+    async def _find_duplicates(self) -> None:
+        """Tel de hashes die op meer dan een plek voorkomen, over alle volumes."""
+        self.duplicates_label.text = "Searching..."
+        try:
+            groups = await run.io_bound(self.federation.duplicate_groups)
+        except sqlite3.Error as e:
+            self.duplicates_label.text = f"Failed - {e}"
+            return
+        files = sum(len(members) for _, members in groups)
+        self.duplicates_label.text = f"{len(groups)} duplicate groups ({files} files)"
+
+    async def _update_volumes_status(self) -> None:
+        """Update de status per volume (gemount, bestanden, grootte, backup)."""
+        try:
+            volume_totals = await run.io_bound(self.federation.volume_totals)
+        except sqlite3.Error as e:
+            self.volumes_label.text = f"Failed - {e}"
+            return
+        totals = {volume: (files, size) for volume, files, size in volume_totals}
+        lines = []
+        for volume in self.federation.registry.volumes():
+            if volume.name in totals:
+                files, size = totals[volume.name]
+                line = f"{volume.root}: {files} files, {size / 1024**3:.1f} GB"
+            else:
+                line = f"{volume.root}: offline"
+            backup = self.volume_backups.get(volume.name)
+            if backup is not None and backup.is_running:
+                line += " - backup running"
+            lines.append(line)
+        self.volumes_label.text = "\n".join(lines) or "No volume catalogs registered"
+
+    def _create_compare_section(self) -> None:
+        """Maak de sectie voor de vergelijking van een root met zijn backup."""
+        with ui.card().classes("w-full mt-4"), ui.card_section():
+            ui.label("Backup Verification").classes(
+                "text-xl font-semibold text-gray-800 mb-4")
+            with ui.row().classes("w-full items-center gap-4"):
+                self.compare_source_input = ui.input("Source root", placeholder="/photos").classes("flex-grow")
+                self.compare_backup_input = ui.input("Backup root", placeholder="/backup/photos").classes("flex-grow")
+                YAPMOTheme.create_button("COMPARE", self._compare_roots, "primary", "md")
+            self.compare_status_label = ui.label("").classes(
+                "text-gray-700 font-medium")
+
+    async def _compare_roots(self) -> None:
+        """Vergelijk de twee (geindexeerde) roots en schrijf het rapport."""
+        source_root = (self.compare_source_input.value or "").strip()
+        backup_root = (self.compare_backup_input.value or "").strip()
+        if not source_root or not backup_root:
+            ui.notify("Enter a source and a backup root", type="warning")
+            return
+        self.compare_status_label.text = "Comparing..."
+        try:
+            report, summary = await run.io_bound(self._run_compare, source_root, backup_root)
+        except (OSError, sqlite3.Error) as e:
+            self.compare_status_label.text = f"Failed - {e}"
+            return
+        if summary.unindexed:
+            roots = ", ".join(summary.unindexed)
+            ui.notify(f"No indexed files under {roots} - index it first", type="warning")
+            self.compare_status_label.text = f"Not indexed: {roots} - report: {report}"
+            return
+        counts = ", ".join(f"{kind} {summary.counts[kind]}" for kind in DIFF_KINDS)
+        verdict = "complete" if summary.complete else "INCOMPLETE"
+        self.compare_status_label.text = (
+            f"Backup {verdict}: {summary.matched}/{summary.source_files} identical, {counts} - report: {report}"
+        )
+
+    def _run_compare(self, source_root: str, backup_root: str) -> tuple[Path, DiffSummary]:
+        """Hash join van de twee roots; geeft het rapport pad en de aantallen."""
+        report_dir = Path(get_param("database", "database_diff_report_path"))
+        report_dir.mkdir(parents=True, exist_ok=True)
+        report = report_dir / f"diff_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"  # noqa: DTZ005
+        pool = self.federation if self.federation is not None else shared_pool()
+        registry = self.federation.registry if self.federation is not None else None
+        with pool.connection() as connection:
+            diff = LibraryDiff(
+                connection,
+                get_param("database", "database_table_media"),
+                resolve_source(connection, source_root, registry),
+                resolve_source(connection, backup_root, registry),
+            )
+            try:
+                summary = diff.write(report)
+            finally:
+                diff.close()
+        return report, summary
+
+    def _create_near_duplicates_section(self) -> None:
+        """Maak de sectie voor near-duplicates van een afbeelding (perceptual hash)."""
+        with ui.card().classes("w-full mt-4"), ui.card_section():
+            ui.label("Near Duplicates").classes(
+                "text-xl font-semibold text-gray-800 mb-4")
+            with ui.row().classes("w-full items-center gap-4"):
+                self.near_duplicate_input = ui.input(
+                    "Image path", placeholder="/photos/2019/IMG_0001.JPG",
+                ).classes("flex-grow")
+                self.near_duplicate_distance = ui.number(
+                    "Max distance", value=6, min=0, max=64, step=1,
+                ).classes("w-32")
+                YAPMOTheme.create_button("FIND", self._find_near_duplicates, "primary", "md")
+            self.near_duplicate_label = ui.label("").classes(
+                "text-gray-700 font-medium whitespace-pre-line")
+
+    async def _find_near_duplicates(self) -> None:
+        """Toon de afbeeldingen binnen de Hamming-afstand van het gekozen bestand."""
+        fqpn = (self.near_duplicate_input.value or "").strip()
+        if not fqpn:
+            ui.notify("Enter the path of an indexed image", type="warning")
+            return
+        try:
+            matches = await run.io_bound(
+                self._near_duplicates, fqpn, int(self.near_duplicate_distance.value or 0),
+            )
+        except sqlite3.Error as e:
+            self.near_duplicate_label.text = f"Failed - {e}"
+            return
+        if matches is None:
+            self.near_duplicate_label.text = "No perceptual hash stored for this file"
+            return
+        lines = [f"{distance:2d}  {match}" for distance, match in matches if match != fqpn]
+        self.near_duplicate_label.text = "\n".join(lines) or "No near duplicates found"
+
+    def _near_duplicates(self, fqpn: str, max_distance: int) -> list[tuple[int, object]] | None:
+        """Near-duplicates van fqpn; de index wordt herbouwd na elke write."""
+        table_media = get_param("database", "database_table_media")
+        with shared_pool().connection() as connection:
+            row = connection.execute(
+                f"SELECT YAPMO_phash FROM {table_media} WHERE YAPMO_FQPN = ?", (fqpn,),  # noqa: S608
+            ).fetchone()
+            if row is None or not row[0]:
+                return None
+            generation = write_generation.value
+            if self._perceptual_index is None or self._perceptual_index[0] != generation:
+                self._perceptual_index = (generation, PerceptualIndex.from_database(connection, table_media))
+        return self._perceptual_index[1].find_near_duplicates(row[0], max_distance)
+
+    def _create_maintenance_section(self) -> None:
+        """Maak de sectie met de laatste onderhoudsronde."""
+        with ui.card().classes("w-full mt-4"), ui.card_section():
+            ui.label("Database Maintenance").classes(
+                "text-xl font-semibold text-gray-800 mb-4")
+            self.maintenance_status_label = ui.label("").classes(
+                "text-gray-700 font-medium")
+        ui.timer(5.0, self._update_maintenance_status)
+
+    def _update_maintenance_status(self) -> None:
+        """Update het status label met de stappen van de laatste ronde."""
+        progress = self.maintenance.get_progress()
+        if progress["last_run"] is None:
+            self.maintenance_status_label.text = "Waiting for idle ingest"
+            return
+        last_run = datetime.fromtimestamp(progress["last_run"]).strftime("%H:%M:%S")  # noqa: DTZ006
+        steps = "; ".join(
+            f"{name}: {detail}{'' if completed else ' (incomplete)'}"
+            for name, detail, completed in progress["steps"]
+        )
+        self.maintenance_status_label.text = f"Last run {last_run} - {steps or 'nothing to do'}"
+
+    def _reset_integrity_scan(self) -> None:
+        """Stop de controle en begin bij de volgende start vooraan."""
+        self.integrity_scanner.stop()
+        self.integrity_scanner.reset()
+
+    def _update_integrity_status(self) -> None:
+        """Update het status label met de voortgang van de scanner."""
+        progress = self.integrity_scanner.get_progress()
+        if progress["is_running"]:
+            state = "Running"
+        elif progress["finished"]:
+            state = "Finished (next start begins a new pass)"
+        else:
+            state = "Idle"
+        self.integrity_status_label.text = (
+            f"{state} - {progress['files_checked']} files checked, "
+            f"{progress['mismatches_found']} mismatches"
+        )
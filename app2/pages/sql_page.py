@@ -1,15 +1,50 @@
 """SQL Page voor YAPMO applicatie."""
 
-from nicegui import ui
+import json
+import sqlite3
+from datetime import datetime
+from urllib.parse import urlencode
+
+from config import get_param
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from federated_catalog import FederatedCatalog
+from library_export import EXPORT_FORMATS, LibraryExport
+from nicegui import app, run, ui
+from nicegui.events import GenericEventArguments
+from query_cache import shared_cache
+from query_pager import (
+    QueryInterruptedError,
+    QueryPager,
+    display_value,
+    normalize_query,
+)
+from read_pool import ReadPool, shared_pool
+from search_query import CompiledSearch, SearchCompiler
 from shutdown_manager import handle_exit_click
 from theme import YAPMOTheme
 
+# Custom event waarmee de AG Grid datasource een blok rijen opvraagt
+ROWS_EVENT = "yapmo_sql_rows"
+
+# Download endpoint voor streaming exports
+EXPORT_PATH = "/sql/export"
+
 
 class SQLPage:
     """SQL query pagina van de YAPMO applicatie."""
 
     def __init__(self) -> None:
         """Initialize the SQL page."""
+        self.page_size = get_param("database", "database_sql_page_size")
+        self.query_timeout = get_param("database", "database_query_timeout")
+        # Federatie: queries en zoekopdrachten over alle gemounte volume catalogi
+        self.federation = FederatedCatalog.from_config() if get_param("database", "database_federation") else None
+        self.pager: QueryPager | None = None
+        # Bron van het huidige resultaat voor EXPORT: {"search": ...} of {"sql": ...}
+        self.export_source: dict[str, str] = {}
+        # Verhoogd bij elke nieuwe query; oude blok verzoeken worden genegeerd
+        self.generation = 0
         self._create_page()
 
     def _create_page(self) -> None:
@@ -20,6 +55,257 @@ class SQLPage:
             with YAPMOTheme.page_frame("SQL Query", exit_handler=handle_exit_click):
                 self._create_content()
 
+        @app.get(EXPORT_PATH)
+        def export_download(
+            fmt: str = "jsonl", search: str | None = None, sql: str | None = None, columns: str = "",
+        ) -> StreamingResponse:
+            return self._export_response(fmt, search, sql, columns)
+
     def _create_content(self) -> None:
         """Maak de content van de SQL pagina."""
         ui.label("SQL Query Page").classes("text-2xl font-bold text-center")
+
+        with ui.card().classes("w-full mt-4"), ui.card_section():
+            # Zoektaal voor operators, bijv. camera:"ILCE-7M3" year:2019..2021 kw:ski
+            with ui.row().classes("w-full items-center gap-4"):
+                self.search_input = ui.input(
+                    placeholder='camera:"ILCE-7M3" year:2019..2021 kw:ski type:video size>100MB',
+                ).classes("flex-grow").on("keydown.enter", self._execute_search)
+                YAPMOTheme.create_button("SEARCH", self._execute_search, "primary", "md")
+
+        with ui.card().classes("w-full mt-4"), ui.card_section():
+            self.query_area = YAPMOTheme.create_textarea(
+                "SQL Query", "SELECT * FROM Media",
+            ).classes("w-full").style("font-family: monospace;")
+            with ui.row().classes("w-full items-center gap-4 mt-2"):
+                YAPMOTheme.create_button("EXECUTE", self._execute_query, "primary", "md")
+                YAPMOTheme.create_button("COUNT ROWS", self._count_rows, "secondary", "md")
+                YAPMOTheme.create_button("EXPLAIN", self._explain_query, "secondary", "md")
+                YAPMOTheme.create_button("CANCEL", self._cancel_query, "gray", "md")
+                self.export_format = ui.select(list(EXPORT_FORMATS), value="jsonl").classes("w-32")
+                YAPMOTheme.create_button("EXPORT", self._export_results, "secondary", "md")
+                self.status_label = ui.label("").classes("text-gray-700 font-medium")
+            # Timing van de laatste uitvoering en het query plan
+            self.stats_label = ui.label("").classes("text-sm text-gray-600 mt-2")
+            self.plan_code = ui.code("", language="text").classes("w-full mt-2")
+            self.plan_code.set_visibility(False)
+
+        # Infinite row model: de grid vraagt blokken rijen op tijdens het scrollen
+        self.grid = ui.aggrid({
+            "rowModelType": "infinite",
+            "cacheBlockSize": self.page_size,
+            "maxBlocksInCache": 20,
+            "columnDefs": [],
+            "defaultColDef": {"resizable": True, "sortable": False},
+        }).classes("w-full mt-4").style("height: 60vh")
+        ui.on(ROWS_EVENT, self._on_rows_request)
+
+    async def _execute_query(self) -> None:
+        """Start een nieuwe query: kolommen ophalen en de datasource koppelen."""
+        try:
+            pager = QueryPager(
+                self._pool(),
+                self.query_area.value or "",
+                self.query_timeout,
+                shared_cache(),
+                self._current_parameters(),
+            )
+        except ValueError as e:
+            ui.notify(f"Query error: {e}", type="negative")
+            return
+        if await self._open_pager(pager):
+            # Ongewijzigde gecompileerde zoekopdracht: export blijft de zoekopdracht
+            if not pager.parameters:
+                self.export_source = {"sql": pager.sql}
+            self.plan_code.set_visibility(False)
+
+    async def _execute_search(self) -> None:
+        """Compileer de zoektekst naar SQL en toon het resultaat in de grid."""
+        try:
+            compiled = await run.io_bound(self._compile_search, self.search_input.value or "")
+        except (ValueError, sqlite3.Error) as e:
+            ui.notify(f"Search error: {e}", type="negative")
+            return
+        pager = QueryPager(
+            self._pool(), compiled.sql, self.query_timeout, shared_cache(), compiled.parameters,
+        )
+        if await self._open_pager(pager):
+            self.export_source = {"search": self.search_input.value or ""}
+            self.query_area.value = compiled.sql
+            self.plan_code.content = "\n".join(
+                f"{description}  (~{estimate:,} rows)" for description, estimate in compiled.plan
+            )
+            self.plan_code.set_visibility(bool(compiled.plan))
+
+    def _current_parameters(self) -> tuple:
+        """Parameters van de gecompileerde zoekopdracht zolang de SQL niet gewijzigd is."""
+        if self.pager is not None and normalize_query(self.query_area.value or "") == self.pager.sql:
+            return self.pager.parameters
+        return ()
+
+    def _pool(self) -> ReadPool | FederatedCatalog:
+        """Read pool voor queries (met federatie: alle gemounte volumes gekoppeld)."""
+        return self.federation if self.federation is not None else shared_pool()
+
+    def _compiler(self) -> SearchCompiler:
+        """Zoek compiler; met federatie over de view (zonder per-catalogus indexes)."""
+        if self.federation is not None:
+            return SearchCompiler(self.federation.view_name)
+        return SearchCompiler.from_config()
+
+    def _compile_search(self, text: str) -> CompiledSearch:
+        """Compileer zoektekst met een read connectie voor de schattingen."""
+        with self._pool().connection() as connection:
+            return self._compiler().compile(connection, text)
+
+    async def _open_pager(self, pager: QueryPager) -> bool:
+        """Koppel een nieuwe pager aan de grid; False bij een query fout."""
+        if self.pager is not None:
+            self.pager.cancel()
+        try:
+            columns = await run.io_bound(pager.columns)
+        except sqlite3.Error as e:
+            ui.notify(f"Query error: {e}", type="negative")
+            return False
+
+        self.pager = pager
+        self.generation += 1
+        column_defs = [
+            {"headerName": name, "field": f"c{index}"} for index, name in enumerate(columns)
+        ]
+        self.status_label.text = f"{len(columns)} columns - row count not computed"
+        ui.run_javascript(f"""
+            const grid = getElement({self.grid.id});
+            window.yapmoSqlRequests = {{}};
+            let nextRequestId = 0;
+            grid.api.setGridOption("columnDefs", {json.dumps(column_defs)});
+            grid.api.setGridOption("datasource", {{
+                getRows: (params) => {{
+                    const requestId = String(nextRequestId++);
+                    window.yapmoSqlRequests[requestId] = params;
+                    emitEvent("{ROWS_EVENT}", {{
+                        request_id: requestId,
+                        generation: {self.generation},
+                        start: params.startRow,
+                        end: params.endRow,
+                    }});
+                }},
+            }});
+        """)
+        return True
+
+    async def _on_rows_request(self, event: GenericEventArguments) -> None:
+        """Lever een blok rijen aan de grid datasource."""
+        request_id = json.dumps(str(event.args["request_id"]))
+        pager = self.pager
+        if pager is None or event.args["generation"] != self.generation:
+            return
+        start, end = int(event.args["start"]), int(event.args["end"])
+        try:
+            rows = await run.io_bound(pager.fetch, start, end)
+        except sqlite3.Error as e:
+            ui.notify(f"Query error: {e}", type="negative")
+            ui.run_javascript(f"window.yapmoSqlRequests[{request_id}]?.failCallback();")
+            self._show_stats(pager)
+            return
+        self._show_stats(pager)
+
+        row_data = [
+            {f"c{index}": display_value(value) for index, value in enumerate(row)}
+            for row in rows
+        ]
+        last_row = pager.last_row(start, end, rows)
+        ui.run_javascript(f"""
+            const request = window.yapmoSqlRequests[{request_id}];
+            if (request) {{
+                delete window.yapmoSqlRequests[{request_id}];
+                request.successCallback({json.dumps(row_data, default=str)}, {last_row});
+            }}
+        """)
+
+    async def _count_rows(self) -> None:
+        """Tel het aantal rijen op de achtergrond (annuleerbaar)."""
+        pager = self.pager
+        if pager is None:
+            ui.notify("Execute a query first", type="warning")
+            return
+        self.status_label.text = "Counting rows..."
+        try:
+            total = await run.io_bound(pager.count)
+        except sqlite3.Error as e:
+            ui.notify(f"Count error: {e}", type="negative")
+            return
+        if pager is not self.pager:
+            return
+        self._show_stats(pager)
+        if total is None:
+            self.status_label.text = f"Count {pager.last_stats.interrupted}"
+        else:
+            self.status_label.text = f"{total} rows"
+            ui.run_javascript(f"getElement({self.grid.id}).api.setRowCount({total}, true);")
+
+    async def _explain_query(self) -> None:
+        """Toon het EXPLAIN QUERY PLAN van de huidige query."""
+        try:
+            pager = QueryPager(
+                self._pool(),
+                self.query_area.value or "",
+                self.query_timeout,
+                shared_cache(),
+                self._current_parameters(),
+            )
+            plan = await run.io_bound(pager.explain)
+        except QueryInterruptedError as e:
+            ui.notify(str(e), type="warning")
+            return
+        except (ValueError, sqlite3.Error) as e:
+            ui.notify(f"Query error: {e}", type="negative")
+            return
+        self.plan_code.content = plan
+        self.plan_code.set_visibility(True)
+
+    def _export_results(self) -> None:
+        """Download het huidige resultaat via de streaming export endpoint."""
+        if not self.export_source:
+            ui.notify("Execute a query or search first", type="warning")
+            return
+        query = urlencode({"fmt": self.export_format.value, **self.export_source})
+        ui.download(f"{EXPORT_PATH}?{query}")
+
+    def _export_response(
+        self,
+        fmt: str, search: str | None, sql: str | None, columns: str,
+    ) -> StreamingResponse:
+        """Streaming response voor een export van een zoekopdracht of SQL query.
+
+        Een zoekopdracht mag een projectie meegeven (kolommen gescheiden door komma's);
+        zonder search en sql wordt de hele media tabel geexporteerd.
+        """
+        batch_size = get_param("database", "database_export_batch_size")
+        try:
+            if sql is not None:
+                export = LibraryExport(self._pool(), sql, (), fmt, batch_size=batch_size)
+            else:
+                projection = [column.strip() for column in columns.split(",") if column.strip()]
+                export = LibraryExport.from_search(
+                    self._pool(), self._compiler(), search or "", fmt,
+                    projection or None, batch_size=batch_size,
+                )
+        except (ValueError, sqlite3.Error) as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+        filename = export.filename(f"yapmo_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}")  # noqa: DTZ005
+        return StreamingResponse(
+            export.iter_bytes(),
+            media_type=export.media_type,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+
+    def _cancel_query(self) -> None:
+        """Annuleer alle lopende uitvoeringen van de huidige query."""
+        if self.pager is not None:
+            self.pager.cancel()
+
+    def _show_stats(self, pager: QueryPager) -> None:
+        """Toon wall time, VM instructies en rijen van de laatste uitvoering."""
+        if pager.last_stats is not None:
+            self.stats_label.text = pager.last_stats.summary()
@@ -0,0 +1,329 @@
+"""Perceptual hashing en near-duplicate index voor YAPMO.
+
+Exacte hashes (YAPMO_hash) missen verkleinde, opnieuw gecomprimeerde of
+via WhatsApp gedeelde kopieen van dezelfde foto. Deze module berekent een
+64-bit perceptual hash (dHash of pHash) per afbeelding en indexeert die in een
+BK-tree zodat "zoek near-duplicates binnen afstand k" snel beantwoord wordt.
+
+- Bij voorkeur wordt de embedded EXIF thumbnail gebruikt (geen full decode)
+- Zonder thumbnail wordt JPEG via draft mode (DCT scaling) gedecodeerd
+- NumPy wordt gebruikt als die beschikbaar is, anders pure Python (alleen dHash)
+"""
+
+import io
+import sqlite3
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from typing import Any, BinaryIO
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optioneel
+    np = None  # type: ignore[assignment]
+
+try:
+    from PIL import ExifTags, Image
+except ImportError:  # Pillow is optioneel
+    Image = None  # type: ignore[assignment]
+    ExifTags = None  # type: ignore[assignment]
+
+# Hash grootte: 8x8 bits = 64-bit hash
+HASH_SIZE = 8
+
+# pHash werkt op een 32x32 grijswaarden afbeelding (DCT), waarvan 8x8 laagfrequent
+PHASH_IMAGE_SIZE = 32
+
+# EXIF tags in IFD1 die de embedded JPEG thumbnail beschrijven
+_THUMBNAIL_OFFSET_TAG = 0x0201
+_THUMBNAIL_LENGTH_TAG = 0x0202
+
+SUPPORTED_ALGORITHMS = ("dhash", "phash")
+
+
+def perceptual_hash_available(algorithm: str = "dhash") -> bool:
+    """Check of de benodigde libraries voor het algoritme aanwezig zijn."""
+    if Image is None:
+        return False
+    if algorithm == "phash":
+        return np is not None
+    return algorithm in SUPPORTED_ALGORITHMS
+
+
+def compute_perceptual_hash(
+    file_path: Path | BinaryIO, algorithm: str = "dhash",
+) -> str | None:
+    """Bereken de perceptual hash van een afbeelding.
+
+    Args:
+    ----
+        file_path: Pad naar de afbeelding, of een file object met de bytes
+            (single-read: voorkomt een extra leesactie van disk)
+        algorithm: "dhash" of "phash"
+
+    Returns:
+    -------
+        64-bit hash als 16 karakter hex string, of None als de afbeelding
+        niet gedecodeerd kan worden
+
+    """
+    if not perceptual_hash_available(algorithm):
+        return None
+
+    if algorithm == "phash":
+        width = height = PHASH_IMAGE_SIZE
+    else:
+        width, height = HASH_SIZE + 1, HASH_SIZE
+
+    try:
+        pixels = _load_grayscale_pixels(file_path, width, height)
+    except (OSError, ValueError, SyntaxError):
+        # Onbekend of beschadigd formaat (bijv. RAW zonder Pillow plugin)
+        return None
+
+    if algorithm == "phash":
+        value = phash_from_pixels(pixels, width, height)
+    else:
+        value = dhash_from_pixels(pixels, width, height)
+    return format_hash(value)
+
+
+def _load_grayscale_pixels(
+    file_path: Path | BinaryIO, width: int, height: int,
+) -> list[int]:
+    """Laad een afbeelding als verkleinde grijswaarden pixels (row-major)."""
+    with Image.open(file_path) as image:
+        source = _embedded_thumbnail(image)
+        if source is None:
+            # JPEG: decodeer direct op 1/2..1/8 schaal via DCT scaling
+            image.draft("L", (width * 4, height * 4))
+            source = image
+        small = source.convert("L").resize(
+            (width, height), Image.Resampling.LANCZOS,
+        )
+        return list(small.getdata())
+
+
+def _embedded_thumbnail(image: Any) -> Any:  # noqa: ANN401
+    """Haal de embedded EXIF thumbnail (IFD1) op, of None als die ontbreekt."""
+    raw_exif = image.info.get("exif")
+    if not raw_exif:
+        return None
+
+    try:
+        ifd1 = image.getexif().get_ifd(ExifTags.IFD.IFD1)
+        offset = ifd1.get(_THUMBNAIL_OFFSET_TAG)
+        length = ifd1.get(_THUMBNAIL_LENGTH_TAG)
+        if not offset or not length:
+            return None
+
+        # Offsets zijn relatief ten opzichte van de TIFF header
+        tiff_data = raw_exif[6:] if raw_exif.startswith(b"Exif\x00\x00") else raw_exif
+        thumbnail_data = tiff_data[offset:offset + length]
+        if len(thumbnail_data) != length:
+            return None
+
+        thumbnail = Image.open(io.BytesIO(thumbnail_data))
+        thumbnail.load()
+    except (OSError, ValueError, SyntaxError, AttributeError, KeyError):
+        return None
+    else:
+        return thumbnail
+
+
+def dhash_from_pixels(pixels: Sequence[int], width: int, height: int) -> int:
+    """Bereken dHash uit grijswaarden pixels van (HASH_SIZE+1) x HASH_SIZE.
+
+    Elk bit geeft aan of een pixel helderder is dan zijn linker buur.
+    """
+    if np is not None:
+        grid = np.asarray(pixels, dtype=np.int16).reshape(height, width)
+        bits = (grid[:, 1:] > grid[:, :-1]).flatten()
+        return _bits_to_int(bits)
+
+    value = 0
+    for row in range(height):
+        offset = row * width
+        for col in range(width - 1):
+            value <<= 1
+            if pixels[offset + col + 1] > pixels[offset + col]:
+                value |= 1
+    return value
+
+
+def phash_from_pixels(pixels: Sequence[int], width: int, height: int) -> int:
+    """Bereken pHash: DCT van 32x32 pixels, 8x8 laagfrequent blok vs mediaan.
+
+    Raises
+    ------
+        RuntimeError: Als NumPy niet beschikbaar is
+
+    """
+    if np is None:
+        msg = "pHash requires NumPy"
+        raise RuntimeError(msg)
+
+    grid = np.asarray(pixels, dtype=np.float64).reshape(height, width)
+    dct = _dct_matrix(height) @ grid @ _dct_matrix(width).T
+    low_freq = dct[:HASH_SIZE, :HASH_SIZE].flatten()
+    # DC component (0,0) niet meenemen in de mediaan
+    median = np.median(low_freq[1:])
+    return _bits_to_int(low_freq > median)
+
+
+def _dct_matrix(size: int) -> Any:  # noqa: ANN401
+    """Maak een DCT-II basis matrix (zonder normalisatie, alleen vergelijking)."""
+    index = np.arange(size)
+    return np.cos(np.pi * (2 * index[None, :] + 1) * index[:, None] / (2 * size))
+
+
+def _bits_to_int(bits: Any) -> int:  # noqa: ANN401
+    """Pak een boolean NumPy array in tot een integer (MSB eerst)."""
+    return int.from_bytes(np.packbits(bits.astype(np.uint8)).tobytes(), "big")
+
+
+def format_hash(value: int) -> str:
+    """Formatteer een 64-bit hash als 16 karakter hex string."""
+    return f"{value:016x}"
+
+
+def parse_hash(value: str) -> int:
+    """Parse een 16 karakter hex hash naar integer."""
+    return int(value, 16)
+
+
+def hamming_distance(first: int, second: int) -> int:
+    """Aantal verschillende bits tussen twee hashes."""
+    return (first ^ second).bit_count()
+
+
+class BKTree:
+    """BK-tree voor Hamming-afstand queries over 64-bit hashes.
+
+    Identieke hashes delen een node, zodat exacte kopieen de boom niet
+    dieper maken. Zoeken gebruikt de driehoeksongelijkheid om takken over
+    te slaan die niet binnen de gevraagde afstand kunnen liggen.
+    """
+
+    def __init__(self) -> None:
+        """Initialize een lege BK-tree."""
+        # Node: [hash, items, children{distance: node}]
+        self._root: list[Any] | None = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        """Aantal items in de boom."""
+        return self._size
+
+    def add(self, hash_value: int, item: object) -> None:
+        """Voeg een item met hash toe aan de boom."""
+        self._size += 1
+        if self._root is None:
+            self._root = [hash_value, [item], {}]
+            return
+
+        node = self._root
+        while True:
+            distance = hamming_distance(hash_value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [hash_value, [item], {}]
+                return
+            node = child
+
+    def search(self, hash_value: int, max_distance: int) -> list[tuple[int, object]]:
+        """Zoek alle items binnen max_distance van hash_value.
+
+        Returns
+        -------
+            List van (distance, item) tuples, gesorteerd op afstand
+
+        """
+        if self._root is None:
+            return []
+
+        matches: list[tuple[int, object]] = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(hash_value, node[0])
+            if distance <= max_distance:
+                matches.extend((distance, item) for item in node[1])
+            low, high = distance - max_distance, distance + max_distance
+            stack.extend(
+                child for child_distance, child in node[2].items()
+                if low <= child_distance <= high
+            )
+
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+
+class PerceptualIndex:
+    """Near-duplicate index over de perceptual hashes in de Media tabel."""
+
+    def __init__(self) -> None:
+        """Initialize een lege index."""
+        self.tree = BKTree()
+        self._hashes: dict[object, int] = {}
+
+    def add(self, item: object, hash_text: str) -> None:
+        """Voeg een item (bijv. FQPN) met hex hash toe."""
+        hash_value = parse_hash(hash_text)
+        self._hashes[item] = hash_value
+        self.tree.add(hash_value, item)
+
+    def add_many(self, rows: Iterable[tuple[object, str]]) -> None:
+        """Voeg (item, hex hash) rijen toe; lege of ongeldige hashes worden overgeslagen."""
+        for item, hash_text in rows:
+            if not hash_text:
+                continue
+            try:
+                self.add(item, hash_text)
+            except ValueError:
+                continue
+
+    def find_near_duplicates(
+        self, hash_text: str, max_distance: int,
+    ) -> list[tuple[int, object]]:
+        """Zoek items binnen max_distance van de gegeven hex hash."""
+        return self.tree.search(parse_hash(hash_text), max_distance)
+
+    def find_duplicate_groups(self, max_distance: int) -> list[list[object]]:
+        """Groepeer alle items in clusters van near-duplicates (union-find)."""
+        parent: dict[object, object] = {item: item for item in self._hashes}
+
+        def find(item: object) -> object:
+            while parent[item] != item:
+                parent[item] = parent[parent[item]]
+                item = parent[item]
+            return item
+
+        for item, hash_value in self._hashes.items():
+            for _distance, other in self.tree.search(hash_value, max_distance):
+                root_item, root_other = find(item), find(other)
+                if root_item != root_other:
+                    parent[root_other] = root_item
+
+        groups: dict[object, list[object]] = {}
+        for item in self._hashes:
+            groups.setdefault(find(item), []).append(item)
+        return [group for group in groups.values() if len(group) > 1]
+
+    @classmethod
+    def from_database(
+        cls,
+        connection: sqlite3.Connection,
+        table_name: str,
+        hash_column: str = "YAPMO_phash",
+    ) -> "PerceptualIndex":
+        """Bouw de index uit de Media tabel (FQPN -> perceptual hash)."""
+        index = cls()
+        cursor = connection.execute(
+            f"SELECT YAPMO_FQPN, {hash_column} FROM {table_name} "  # noqa: S608
+            f"WHERE {hash_column} IS NOT NULL",
+        )
+        index.add_many(cursor)
+        return index
@@ -0,0 +1,183 @@
+"""LRU cache voor query resultaten, geldig tot de volgende database write.
+
+Dashboard en opgeslagen queries werden bij elk openen van de pagina opnieuw
+uitgevoerd, ook als er sinds de vorige keer niets geindexeerd was. De cache
+bewaart resultaten per database (scope), genormaliseerde SQL tekst en
+parameters, samen met de write generatie waarin ze berekend zijn. Elke commit van de writer hoogt
+de generatie op; een resultaat uit een oudere generatie telt als miss.
+
+De cache heeft een budget in bytes (geschatte grootte van de rijen) en
+verwijdert de langst niet gebruikte resultaten als het budget op is.
+"""
+
+import re
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+# String literals, quoted identifiers en commentaar blijven ongewijzigd; alleen
+# witruimte daarbuiten wordt samengevoegd
+_SQL_TOKEN_PATTERN = re.compile(
+    r"""('(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\]|--[^\n]*\n?|/\*.*?\*/)|\s+""",
+    re.DOTALL,
+)
+
+_shared_cache: "QueryCache | None" = None
+_shared_lock = threading.Lock()
+
+
+class WriteGeneration:
+    """Teller die bij elke commit van een writer opgehoogd wordt."""
+
+    def __init__(self) -> None:
+        """Initialize op generatie 0."""
+        self._value = 0
+        self._lock = threading.Lock()
+
+    @property
+    def value(self) -> int:
+        """Huidige generatie."""
+        return self._value
+
+    def bump(self) -> int:
+        """Hoog de generatie op na een commit; geeft de nieuwe waarde."""
+        with self._lock:
+            self._value += 1
+            return self._value
+
+
+# Gedeelde generatie voor alle writers in dit proces
+write_generation = WriteGeneration()
+
+
+def normalize_sql(sql: str) -> str:
+    """SQL tekst als cache key: witruimte buiten literals samengevoegd, zonder afsluitende puntkomma."""
+    collapsed = _SQL_TOKEN_PATTERN.sub(lambda match: match.group(1) or " ", sql)
+    return collapsed.strip().rstrip(";").strip()
+
+
+def estimate_size(value: Any) -> int:  # noqa: ANN401
+    """Geschatte geheugengrootte van een resultaat (lijsten/tuples van waarden)."""
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+@dataclass
+class _CacheEntry:
+    """Resultaat met de generatie waarin het berekend is."""
+
+    value: Any
+    generation: int
+    size: int
+
+
+class QueryCache:
+    """Thread-safe LRU cache met een byte budget."""
+
+    def __init__(
+        self, max_bytes: int = 64 * 1024 * 1024, generation: WriteGeneration | None = None,
+    ) -> None:
+        """Initialize met budget en de write generatie om tegen te valideren.
+
+        Args:
+        ----
+            max_bytes: Maximale geschatte grootte van alle resultaten samen
+            generation: Write generatie (default de gedeelde write_generation)
+
+        """
+        self.max_bytes = max_bytes
+        self.generation = generation if generation is not None else write_generation
+        self._entries: OrderedDict[tuple[str, str, tuple], _CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_config(cls) -> "QueryCache":
+        """Maak een cache met het budget uit config.json."""
+        from config import get_param
+
+        return cls(max_bytes=get_param("database", "database_query_cache_mb") * 1024 * 1024)
+
+    @staticmethod
+    def _key(sql: str, parameters: Any, scope: str) -> tuple[str, str, tuple]:  # noqa: ANN401
+        """Cache key voor database (scope), SQL en parameters."""
+        return scope, normalize_sql(sql), tuple(parameters or ())
+
+    def _remove(self, key: tuple[str, str, tuple]) -> None:
+        """Verwijder een entry (lock moet vastgehouden worden)."""
+        entry = self._entries.pop(key)
+        self.size -= entry.size
+
+    def get(self, sql: str, parameters: Any = (), *, scope: str = "") -> tuple[bool, Any]:  # noqa: ANN401
+        """Zoek een resultaat; geeft (gevonden, waarde).
+
+        scope identificeert de database waarop sql draait (zie ReadPool.cache_scope),
+        zodat dezelfde query op een andere catalogus of view een eigen entry heeft.
+        """
+        key = self._key(sql, parameters, scope)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.generation != self.generation.value:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry.value
+
+    def put(
+        self, sql: str, parameters: Any, value: Any, generation: int | None = None, *, scope: str = "",  # noqa: ANN401
+    ) -> None:
+        """Bewaar een resultaat berekend in generation (default de huidige).
+
+        Resultaten groter dan het hele budget worden niet bewaard.
+        """
+        key = self._key(sql, parameters, scope)
+        size = estimate_size(value)
+        generation = self.generation.value if generation is None else generation
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes or generation != self.generation.value:
+                return
+            self._entries[key] = _CacheEntry(value, generation, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_compute(
+        self, sql: str, parameters: Any, compute: Callable[[], Any], *, scope: str = "",  # noqa: ANN401
+    ) -> Any:  # noqa: ANN401
+        """Geef het gecachte resultaat of bereken en bewaar het."""
+        found, value = self.get(sql, parameters, scope=scope)
+        if found:
+            return value
+        # Generatie voor de berekening: een commit tijdens compute maakt het resultaat ongeldig
+        generation = self.generation.value
+        value = compute()
+        self.put(sql, parameters, value, generation, scope=scope)
+        return value
+
+    def clear(self) -> None:
+        """Leeg de cache."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+def shared_cache() -> QueryCache:
+    """Gedeelde cache voor alle pagina's (lazy aangemaakt vanuit config)."""
+    global _shared_cache  # noqa: PLW0603
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = QueryCache.from_config()
+        return _shared_cache
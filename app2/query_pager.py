@@ -0,0 +1,260 @@
+"""Server-side paginering voor vrije SQL queries.
+
+De oude SQL pagina deed fetchall() op elke SELECT om total_rows te weten en
+sneed daarna het gevraagde stuk eruit: een SELECT * op Media haalde de hele
+database in het geheugen. De pager haalt alleen de gevraagde rijen op met
+LIMIT/OFFSET rond de query; het totaal komt uit een aparte COUNT(*) die pas
+op verzoek draait.
+
+Alle queries lopen via de read pool (read-only, wacht niet op de writer) en
+onder een progress handler: elke N VM instructies wordt gecontroleerd of de
+query geannuleerd is of over zijn timeout gaat. Per query worden wall time,
+VM instructies en rijen bijgehouden; EXPLAIN QUERY PLAN laat zien of een
+index gebruikt wordt.
+"""
+
+import re
+import sqlite3
+import threading
+import time
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from query_cache import QueryCache
+from read_pool import ReadPool
+
+# Eerste keyword van een leesquery (na commentaar)
+_READ_KEYWORDS = ("SELECT", "WITH", "VALUES")
+_COMMENT_PATTERN = re.compile(r"(--[^\n]*\n?)|(/\*.*?\*/)", re.DOTALL)
+
+# Aantal SQLite VM instructies tussen twee progress handler aanroepen
+PROGRESS_STEPS = 10000
+
+
+class QueryInterruptedError(sqlite3.OperationalError):
+    """Query gestopt door annuleren of timeout."""
+
+    def __init__(self, reason: str) -> None:
+        """Initialize met de reden ("cancelled" of "timeout")."""
+        self.reason = reason
+        super().__init__(f"Query {'timed out' if reason == 'timeout' else 'cancelled'}")
+
+
+@dataclass
+class QueryStats:
+    """Meting van een enkele query uitvoering."""
+
+    label: str
+    wall_time: float = 0.0
+    vm_steps: int = 0
+    rows: int = 0
+    interrupted: str | None = None
+
+    def summary(self) -> str:
+        """Korte regel voor de UI."""
+        text = (
+            f"{self.label}: {self.wall_time * 1000:.1f} ms, "
+            f"~{self.vm_steps:,} VM steps, {self.rows:,} rows"
+        )
+        return f"{text} ({self.interrupted})" if self.interrupted else text
+
+
+def normalize_query(sql: str) -> str:
+    """Verwijder witruimte en afsluitende puntkomma's."""
+    return sql.strip().rstrip(";").strip()
+
+
+def is_read_query(sql: str) -> bool:
+    """Check of een query een leesquery is (SELECT, WITH of VALUES)."""
+    stripped = _COMMENT_PATTERN.sub(" ", sql).lstrip().upper()
+    return stripped.startswith(_READ_KEYWORDS)
+
+
+def display_value(value: Any) -> Any:  # noqa: ANN401
+    """Waarde geschikt voor JSON/weergave (BLOBs als korte omschrijving)."""
+    if isinstance(value, bytes):
+        return f"<BLOB {len(value)} bytes>"
+    return value
+
+
+def format_plan(plan: list[tuple[int, int, str]]) -> str:
+    """EXPLAIN QUERY PLAN rijen (id, parent, detail) als ingesprongen boom."""
+    depth: dict[int, int] = {0: -1}
+    lines = []
+    for node_id, parent_id, detail in plan:
+        depth[node_id] = depth.get(parent_id, -1) + 1
+        lines.append(f"{'   ' * depth[node_id]}{detail}")
+    return "\n".join(lines)
+
+
+class QueryPager:
+    """Pagina's, een telling en een query plan voor een enkele leesquery."""
+
+    def __init__(
+        self,
+        pool: ReadPool,
+        sql: str,
+        timeout: float = 0,
+        cache: QueryCache | None = None,
+        parameters: Sequence[Any] = (),
+    ) -> None:
+        """Initialize met de read pool en de query.
+
+        Args:
+        ----
+            pool: Read pool voor de connecties
+            sql: Leesquery (SELECT, WITH of VALUES)
+            timeout: Maximale duur per uitvoering in seconden (0 = geen limiet)
+            cache: Optionele resultaat cache (geldig tot de volgende write)
+            parameters: Waarden voor de ? placeholders in sql
+
+        Raises
+        ------
+            ValueError: Als de query geen leesquery is
+
+        """
+        self.pool = pool
+        self.sql = normalize_query(sql)
+        if not is_read_query(self.sql):
+            msg = "Only SELECT/WITH/VALUES queries can be paginated"
+            raise ValueError(msg)
+        self.timeout = timeout
+        self.cache = cache
+        self.parameters = tuple(parameters)
+        self.last_stats: QueryStats | None = None
+        self._columns: list[str] | None = None
+        self._count: int | None = None
+        # Ophogen annuleert alle uitvoeringen die eerder gestart zijn
+        self._cancel_generation = 0
+        self._active: set[sqlite3.Connection] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def total(self) -> int | None:
+        """Totaal aantal rijen als de telling klaar is, anders None."""
+        return self._count
+
+    def _execute(
+        self, label: str, sql: str, parameters: Any = (),  # noqa: ANN401
+    ) -> tuple[list[str], list[tuple]]:
+        """Voer sql uit of haal het resultaat uit de cache; geeft (kolommen, rijen)."""
+        if self.cache is None:
+            return self._run(label, sql, parameters)
+        started = time.perf_counter()
+        found, result = self.cache.get(sql, parameters, scope=self.pool.cache_scope)
+        if found:
+            self.last_stats = QueryStats(
+                f"{label} (cached)", time.perf_counter() - started, 0, len(result[1]),
+            )
+            return result
+        generation = self.cache.generation.value
+        result = self._run(label, sql, parameters)
+        self.cache.put(sql, parameters, result, generation, scope=self.pool.cache_scope)
+        return result
+
+    def _run(
+        self, label: str, sql: str, parameters: Any = (),  # noqa: ANN401
+    ) -> tuple[list[str], list[tuple]]:
+        """Voer sql uit onder timeout en annulering; geeft (kolommen, rijen).
+
+        Raises
+        ------
+            QueryInterruptedError: Bij annuleren of overschrijden van de timeout
+
+        """
+        stats = QueryStats(label)
+        generation = self._cancel_generation
+        deadline = time.monotonic() + self.timeout if self.timeout > 0 else None
+        started = time.perf_counter()
+
+        def progress() -> int:
+            stats.vm_steps += PROGRESS_STEPS
+            if self._cancel_generation != generation:
+                stats.interrupted = "cancelled"
+                return 1
+            if deadline is not None and time.monotonic() > deadline:
+                stats.interrupted = "timeout"
+                return 1
+            return 0
+
+        with self.pool.connection() as connection:
+            with self._lock:
+                self._active.add(connection)
+            connection.set_progress_handler(progress, PROGRESS_STEPS)
+            try:
+                cursor = connection.execute(sql, parameters)
+                columns = [description[0] for description in cursor.description or ()]
+                rows = cursor.fetchall()
+            except sqlite3.OperationalError as e:
+                if stats.interrupted is None and "interrupted" in str(e).lower():
+                    stats.interrupted = "cancelled"
+                if stats.interrupted is not None:
+                    raise QueryInterruptedError(stats.interrupted) from e
+                raise
+            finally:
+                connection.set_progress_handler(None, 0)
+                with self._lock:
+                    self._active.discard(connection)
+                stats.wall_time = time.perf_counter() - started
+                self.last_stats = stats
+        stats.rows = len(rows)
+        return columns, rows
+
+    def columns(self) -> list[str]:
+        """Kolomnamen van het resultaat (zonder rijen op te halen)."""
+        if self._columns is None:
+            self._columns, _rows = self._execute(
+                "Columns", f"SELECT * FROM ({self.sql}) LIMIT 0", self.parameters,  # noqa: S608
+            )
+        return self._columns
+
+    def fetch(self, start: int, end: int) -> list[tuple]:
+        """Rijen [start, end) van het resultaat (0-based)."""
+        limit = max(0, end - start)
+        if limit == 0:
+            return []
+        _columns, rows = self._execute(
+            f"Rows {start}-{start + limit}",
+            f"SELECT * FROM ({self.sql}) LIMIT ? OFFSET ?",  # noqa: S608
+            (*self.parameters, limit, max(0, start)),
+        )
+        return rows
+
+    def last_row(self, start: int, end: int, rows: list[tuple]) -> int:
+        """Laatste rij index voor een infinite grid (-1 als nog onbekend)."""
+        if len(rows) < end - start:
+            return start + len(rows)
+        return self._count if self._count is not None else -1
+
+    def iter_rows(self, batch_size: int = 1000) -> Iterator[tuple]:
+        """Stream alle rijen met fetchmany (constant geheugen, geen timeout)."""
+        with self.pool.connection() as connection:
+            cursor = connection.execute(self.sql, self.parameters)
+            while batch := cursor.fetchmany(batch_size):
+                yield from batch
+
+    def count(self) -> int | None:
+        """Tel het aantal rijen; None als de telling geannuleerd of te traag is."""
+        if self._count is not None:
+            return self._count
+        try:
+            _columns, rows = self._execute(
+                "Count", f"SELECT count(*) FROM ({self.sql})", self.parameters,  # noqa: S608
+            )
+        except QueryInterruptedError:
+            return None
+        self._count = rows[0][0]
+        return self._count
+
+    def explain(self) -> str:
+        """EXPLAIN QUERY PLAN van de query als leesbare boom."""
+        _columns, rows = self._execute("Explain", f"EXPLAIN QUERY PLAN {self.sql}", self.parameters)
+        return format_plan([(row[0], row[1], row[-1]) for row in rows])
+
+    def cancel(self) -> None:
+        """Annuleer alle lopende uitvoeringen (veilig vanuit een andere thread)."""
+        with self._lock:
+            self._cancel_generation += 1
+            for connection in self._active:
+                connection.interrupt()
@@ -0,0 +1,236 @@
+"""Gedeelde pool van read-only database connecties.
+
+Elke query opende een eigen sqlite3.connect en wachtte daarna op dezelfde
+lock als de ingest writer. De pool houdt een paar mode=ro URI connecties open
+met een statement cache, PRAGMA query_only en mmap_size. Met de database in
+WAL mode lezen ze een consistente snapshot terwijl de writer doorschrijft:
+bladeren en SQL queries blijven responsief tijdens een grote index run.
+
+Gebruik:
+
+    with shared_pool().connection() as connection:
+        rows = connection.execute("SELECT ...").fetchall()
+"""
+
+import sqlite3
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+from urllib.parse import quote
+
+from metadata_blob import register_functions
+
+_shared_pool: "ReadPool | None" = None
+_shared_lock = threading.Lock()
+
+
+def enable_wal(connection: sqlite3.Connection) -> str:
+    """Zet een (schrijvende) connectie in WAL mode; geeft de actieve journal mode."""
+    mode = connection.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+    # NORMAL is veilig in WAL mode en scheelt een fsync per commit
+    connection.execute("PRAGMA synchronous = NORMAL")
+    return str(mode).lower()
+
+
+@contextmanager
+def temp_writes(connection: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """Zet PRAGMA query_only tijdelijk uit voor TEMP tabellen en views.
+
+    Een mode=ro connectie blijft read-only voor de database bestanden zelf.
+    """
+    query_only = connection.execute("PRAGMA query_only").fetchone()[0]
+    connection.execute("PRAGMA query_only = OFF")
+    try:
+        yield connection
+    finally:
+        if query_only:
+            connection.execute("PRAGMA query_only = ON")
+
+
+class ReadPool:
+    """Thread-safe pool van read-only connecties op een database bestand."""
+
+    def __init__(
+        self,
+        db_path: str | Path,
+        size: int = 4,
+        *,
+        mmap_size: int = 268435456,
+        cached_statements: int = 256,
+        busy_timeout: float = 5.0,
+        on_connect: Callable[[sqlite3.Connection], None] | None = None,
+    ) -> None:
+        """Initialize de pool (connecties worden lazy geopend).
+
+        Args:
+        ----
+            db_path: Pad naar het database bestand (moet bestaan)
+            size: Maximum aantal gelijktijdige read connecties
+            mmap_size: PRAGMA mmap_size in bytes (0 = uit)
+            cached_statements: Grootte van de prepared statement cache per connectie
+            busy_timeout: Seconden wachten op een lock (alleen bij checkpoints)
+            on_connect: Optionele callback voor nieuwe connecties (bijv. SQL functies)
+
+        """
+        self.db_path = Path(db_path)
+        self.size = max(1, size)
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+        self.busy_timeout = busy_timeout
+        self.on_connect = on_connect
+        # Vrije connecties (laatst teruggegeven eerst)
+        self._idle: list[sqlite3.Connection] = []
+        self._opened = 0
+        # Reset generatie per connectie: oudere connecties sluiten bij teruggave
+        self._epoch = 0
+        self._epochs: dict[sqlite3.Connection, int] = {}
+        # Wachtende threads worden gewekt bij teruggave, sluiten en reset
+        self._available = threading.Condition()
+        self._closed = False
+
+    @property
+    def closed(self) -> bool:
+        """Check of de pool gesloten is."""
+        return self._closed
+
+    @property
+    def cache_scope(self) -> str:
+        """Identiteit van de database voor de query cache."""
+        return str(self.db_path.resolve())
+
+    @classmethod
+    def from_config(cls, db_path: str | Path | None = None) -> "ReadPool":
+        """Maak een pool met parameters uit config.json (default op database_name)."""
+        from config import get_param
+
+        return cls(
+            db_path=db_path or get_param("database", "database_name"),
+            size=get_param("database", "database_read_pool_size"),
+            mmap_size=get_param("database", "database_mmap_size"),
+            cached_statements=get_param("database", "database_statement_cache"),
+            on_connect=register_functions,
+        )
+
+    def _open(self) -> sqlite3.Connection:
+        """Open een nieuwe read-only connectie."""
+        uri = f"file:{quote(str(self.db_path.resolve()))}?mode=ro"
+        connection = sqlite3.connect(
+            uri,
+            uri=True,
+            timeout=self.busy_timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        connection.execute("PRAGMA query_only = ON")
+        connection.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        if self.on_connect is not None:
+            self.on_connect(connection)
+        return connection
+
+    def _acquire(self) -> sqlite3.Connection:
+        """Pak een vrije connectie, open een nieuwe of wacht op een vrije.
+
+        Raises
+        ------
+            sqlite3.ProgrammingError: Als de pool gesloten is (ook tijdens het wachten)
+
+        """
+        with self._available:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("Read pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._opened < self.size:
+                    self._opened += 1
+                    try:
+                        connection = self._open()
+                    except sqlite3.Error:
+                        self._opened -= 1
+                        raise
+                    self._epochs[connection] = self._epoch
+                    return connection
+                self._available.wait()
+
+    def _release(self, connection: sqlite3.Connection) -> None:
+        """Geef een connectie terug (open read transacties worden afgesloten)."""
+        if connection.in_transaction:
+            connection.rollback()
+        with self._available:
+            if self._closed or self._epochs.get(connection) != self._epoch:
+                # Plek vrij: een wachtende thread opent een nieuwe connectie
+                self._discard(connection)
+            else:
+                self._idle.append(connection)
+            self._available.notify()
+
+    def _discard(self, connection: sqlite3.Connection) -> None:
+        """Sluit een connectie van de pool (aanroepen met self._available)."""
+        connection.close()
+        self._epochs.pop(connection, None)
+        self._opened -= 1
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Context manager die een read connectie uit de pool leent."""
+        connection = self._acquire()
+        try:
+            yield connection
+        finally:
+            self._release(connection)
+
+    def execute(self, sql: str, parameters: Any = ()) -> list[tuple]:  # noqa: ANN401
+        """Voer een read query uit en geef alle rijen terug."""
+        with self.connection() as connection:
+            return connection.execute(sql, parameters).fetchall()
+
+    def close(self) -> None:
+        """Sluit alle vrije connecties; geleende connecties sluiten bij teruggave."""
+        with self._available:
+            self._closed = True
+            self._close_idle()
+            self._available.notify_all()
+
+    def reset(self) -> None:
+        """Sluit alle connecties maar houd de pool bruikbaar.
+
+        Voor het vervangen van het database bestand (database_clean): vrije
+        connecties sluiten direct, geleende bij teruggave, en daarna worden
+        nieuwe connecties op het nieuwe bestand geopend.
+        """
+        with self._available:
+            self._epoch += 1
+            self._close_idle()
+            self._available.notify_all()
+
+    def _close_idle(self) -> None:
+        """Sluit alle vrije connecties (aanroepen met self._available)."""
+        while self._idle:
+            self._discard(self._idle.pop())
+
+
+def shared_pool() -> ReadPool:
+    """Gedeelde pool voor alle pagina's (lazy aangemaakt vanuit config)."""
+    global _shared_pool  # noqa: PLW0603
+    with _shared_lock:
+        if _shared_pool is None or _shared_pool.closed:
+            _shared_pool = ReadPool.from_config()
+        return _shared_pool
+
+
+def reset_shared_pool() -> None:
+    """Sluit de connecties van de gedeelde pool (het database bestand wordt vervangen)."""
+    with _shared_lock:
+        if _shared_pool is not None:
+            _shared_pool.reset()
+
+
+def close_shared_pool() -> None:
+    """Sluit de gedeelde pool (bij afsluiten van de applicatie)."""
+    global _shared_pool  # noqa: PLW0603
+    with _shared_lock:
+        if _shared_pool is not None:
+            _shared_pool.close()
+            _shared_pool = None
@@ -0,0 +1,354 @@
+"""Crash-safe spool en run manifest voor processing runs.
+
+Resultaten van de workers stonden alleen in het geheugen tot hun batch naar
+de database geschreven was, en niets hield bij welke batches klaar waren:
+een crash op 80% van een run van 12 uur begon weer vooraan. De spool is een
+append-only JSONL bestand met een regel per resultaat en een regel per
+weggeschreven batch. Het bestand wordt in groepen ge-fsynct (elke N regels
+of na een interval, en altijd na een batch regel). Het manifest beschrijft
+de lopende run en wordt atomair vervangen.
+
+Een nieuwe run ziet een manifest met status running of aborted en, als bron
+directory en doel database gelijk zijn aan die in het manifest:
+
+1. leest de spool tot de laatste volledige regel (een half geschreven regel
+   van de crash wordt afgekapt),
+2. schrijft resultaten die nog niet in een batch zaten opnieuw weg
+   (add_media_records is een upsert, dus replay is idempotent),
+3. slaat bestanden over die al in een weggeschreven batch zaten.
+
+Is de database net leeggemaakt (database_clean), dan staan de weggeschreven
+batches er niet meer in en begint de run opnieuw.
+
+Regels:
+
+    {"type": "result", "data": {...}}
+    {"type": "batch", "batch": 3, "files": ["/P/a.jpg", ...]}
+"""
+
+import base64
+import json
+import os
+import time
+import uuid
+from collections.abc import Callable, Iterable
+from dataclasses import asdict, dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+MANIFEST_NAME = "run_manifest.json"
+
+STATUS_RUNNING = "running"
+STATUS_ABORTED = "aborted"
+STATUS_COMPLETE = "complete"
+
+# Runs met deze status worden bij de volgende start hervat
+RESUMABLE = (STATUS_RUNNING, STATUS_ABORTED)
+
+_FQPN_KEY = "YAPMO:FQPN"
+_STATUS_KEY = "YAPMO:ProcessingStatus"
+_BYTES_KEY = "$bytes"
+
+
+def _encode(value: Any) -> Any:  # noqa: ANN401
+    """JSON default: bytes als base64 object."""
+    if isinstance(value, bytes):
+        return {_BYTES_KEY: base64.b64encode(value).decode("ascii")}
+    msg = f"Object of type {type(value).__name__} is not JSON serializable"
+    raise TypeError(msg)
+
+
+def _decode(value: dict[str, Any]) -> Any:  # noqa: ANN401
+    """JSON object_hook: base64 objecten terug naar bytes."""
+    if len(value) == 1 and _BYTES_KEY in value:
+        return base64.b64decode(value[_BYTES_KEY])
+    return value
+
+
+def _spooled(result: dict[str, Any]) -> bool:
+    """FAIL resultaten worden niet gespooled: die bestanden komen bij hervatten terug."""
+    return result.get(_STATUS_KEY) != "FAIL"
+
+
+def _now() -> str:
+    """Huidige tijd als ISO string (UTC)."""
+    return datetime.now(UTC).isoformat(timespec="seconds")
+
+
+@dataclass
+class RunManifest:
+    """Beschrijving van een processing run."""
+
+    run_id: str
+    source: str
+    spool_file: str
+    total_files: int
+    status: str = STATUS_RUNNING
+    started: str = field(default_factory=_now)
+    updated: str = field(default_factory=_now)
+    batches: int = 0
+    resumed: int = 0
+    # Doel database van de run (leeg bij manifests van voor dit veld)
+    database: str = ""
+
+    @classmethod
+    def load(cls, path: Path) -> "RunManifest | None":
+        """Lees een manifest; None als het ontbreekt of onleesbaar is."""
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            return cls(**data)
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def save(self, path: Path) -> None:
+        """Schrijf het manifest atomair (tijdelijk bestand, fsync, rename)."""
+        self.updated = _now()
+        temporary = path.with_name(f"{path.name}.tmp")
+        with temporary.open("w", encoding="utf-8") as handle:
+            json.dump(asdict(self), handle, indent=2)
+            handle.flush()
+            os.fsync(handle.fileno())
+        temporary.replace(path)
+
+
+@dataclass
+class SpoolState:
+    """Inhoud van een spool na het lezen."""
+
+    # Resultaten die nog niet in een weggeschreven batch zaten, per FQPN
+    pending: dict[str, dict[str, Any]] = field(default_factory=dict)
+    # Bestanden uit weggeschreven batches
+    committed: set[str] = field(default_factory=set)
+    batches: int = 0
+    # Byte offset na de laatste volledige regel
+    valid_size: int = 0
+
+
+class ResultSpool:
+    """Append-only JSONL spool met gegroepeerde fsync."""
+
+    def __init__(self, path: Path, *, fsync_every: int = 100, fsync_interval: float = 1.0) -> None:
+        """Open de spool om toe te voegen.
+
+        Args:
+        ----
+            path: Pad naar het spool bestand
+            fsync_every: Aantal regels tussen twee fsyncs
+            fsync_interval: Maximaal aantal seconden tussen twee fsyncs
+
+        """
+        self.path = path
+        self.fsync_every = max(1, fsync_every)
+        self.fsync_interval = fsync_interval
+        self._handle = path.open("ab")
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    @staticmethod
+    def read(path: Path) -> SpoolState:
+        """Lees een spool tot de laatste volledige regel."""
+        state = SpoolState()
+        if not path.exists():
+            return state
+        with path.open("rb") as handle:
+            for line in handle:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line, object_hook=_decode)
+                except ValueError:
+                    break
+                if record.get("type") == "result":
+                    data = record["data"]
+                    state.pending[str(data.get(_FQPN_KEY))] = data
+                elif record.get("type") == "batch":
+                    for fqpn in record["files"]:
+                        state.pending.pop(fqpn, None)
+                        state.committed.add(fqpn)
+                    state.batches = max(state.batches, int(record["batch"]))
+                state.valid_size += len(line)
+        return state
+
+    @staticmethod
+    def truncate(path: Path, size: int) -> None:
+        """Kap een half geschreven laatste regel af."""
+        if path.exists() and path.stat().st_size > size:
+            with path.open("r+b") as handle:
+                handle.truncate(size)
+
+    def _append(self, record: dict[str, Any], *, sync: bool = False) -> None:
+        """Voeg een regel toe en fsync per groep."""
+        line = json.dumps(record, ensure_ascii=False, default=_encode) + "\n"
+        self._handle.write(line.encode("utf-8"))
+        self._unsynced += 1
+        if (
+            sync
+            or self._unsynced >= self.fsync_every
+            or time.monotonic() - self._last_sync >= self.fsync_interval
+        ):
+            self.flush()
+
+    def append_result(self, result: dict[str, Any]) -> None:
+        """Spool een voltooid resultaat."""
+        self._append({"type": "result", "data": result})
+
+    def append_batch(self, batch_id: int, files: Iterable[str]) -> None:
+        """Markeer de bestanden van een weggeschreven batch (direct ge-fsynct)."""
+        self._append({"type": "batch", "batch": batch_id, "files": list(files)}, sync=True)
+
+    def flush(self) -> None:
+        """Schrijf de buffer weg en fsync."""
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        """Fsync en sluit de spool."""
+        if not self._handle.closed:
+            self.flush()
+            self._handle.close()
+
+
+class ProcessingRun:
+    """Manifest en spool van een processing run, met hervatten na een crash."""
+
+    def __init__(self, spool_dir: Path, *, fsync_every: int = 100, fsync_interval: float = 1.0) -> None:
+        """Initialize met de directory voor manifest en spool bestanden.
+
+        Args:
+        ----
+            spool_dir: Directory voor het manifest en de spool
+            fsync_every: Aantal spool regels tussen twee fsyncs
+            fsync_interval: Maximaal aantal seconden tussen twee fsyncs
+
+        """
+        self.spool_dir = Path(spool_dir)
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.manifest: RunManifest | None = None
+        self.spool: ResultSpool | None = None
+        self.skipped = 0
+        self.replayed = 0
+        self.resumed = False
+
+    @classmethod
+    def from_config(cls) -> "ProcessingRun":
+        """Maak een run met instellingen uit config.json."""
+        from config import get_param
+
+        return cls(
+            Path(get_param("processing", "run_spool_path")),
+            fsync_every=get_param("processing", "run_spool_fsync_every"),
+            fsync_interval=get_param("processing", "run_spool_fsync_interval"),
+        )
+
+    @property
+    def manifest_path(self) -> Path:
+        """Pad naar het run manifest."""
+        return self.spool_dir / MANIFEST_NAME
+
+    def incomplete_run(self) -> RunManifest | None:
+        """Manifest van een vorige run die niet afgemaakt is."""
+        manifest = RunManifest.load(self.manifest_path)
+        if manifest is None or manifest.status not in RESUMABLE:
+            return None
+        return manifest
+
+    def start(
+        self,
+        source: str,
+        file_list: list[str],
+        write_batch: Callable[[list[dict[str, Any]]], Any],
+        *,
+        database: str = "",
+        database_cleaned: bool = False,
+    ) -> list[str]:
+        """Start een run of hervat de onvoltooide; geeft de nog te verwerken bestanden.
+
+        Alleen een onvoltooide run met dezelfde source en database wordt hervat,
+        en niet als de database net leeggemaakt is. Resultaten uit de spool die
+        nog niet weggeschreven waren gaan eerst via write_batch naar de
+        database. Bestanden waarvan het resultaat al in de spool staat worden
+        overgeslagen.
+
+        Args:
+        ----
+            source: Bron directory van de run
+            file_list: Alle bestanden van de run
+            write_batch: Schrijft een batch resultaten naar de database
+            database: Doel database van de run
+            database_cleaned: True als de database sinds de vorige run leeggemaakt is
+
+        """
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        manifest = self.incomplete_run()
+        if manifest is not None and (
+            database_cleaned or (manifest.source, manifest.database) != (source, database)
+        ):
+            # Andere run of lege database: opnieuw beginnen (de oude spool blijft staan)
+            manifest = None
+        self.resumed = manifest is not None
+        state = SpoolState()
+        if manifest is not None:
+            spool_path = self.spool_dir / manifest.spool_file
+            state = ResultSpool.read(spool_path)
+            ResultSpool.truncate(spool_path, state.valid_size)
+            manifest.total_files = len(file_list)
+            manifest.status = STATUS_RUNNING
+            manifest.resumed += 1
+            manifest.batches = state.batches
+        else:
+            run_id = datetime.now(UTC).strftime("%Y%m%d_%H%M%S_") + uuid.uuid4().hex[:8]
+            manifest = RunManifest(
+                run_id, source, f"{run_id}.spool.jsonl", len(file_list), database=database,
+            )
+        self.manifest = manifest
+        self.spool = ResultSpool(
+            self.spool_dir / manifest.spool_file,
+            fsync_every=self.fsync_every,
+            fsync_interval=self.fsync_interval,
+        )
+        manifest.save(self.manifest_path)
+
+        self.replayed = len(state.pending)
+        if state.pending:
+            replay = list(state.pending.values())
+            write_batch(replay)
+            self.batch_written(replay)
+
+        done = state.committed | state.pending.keys()
+        remaining = [path for path in file_list if path not in done]
+        self.skipped = len(file_list) - len(remaining)
+        return remaining
+
+    def record(self, result: dict[str, Any]) -> None:
+        """Spool een voltooid resultaat (voordat zijn batch weggeschreven wordt)."""
+        if self.spool is not None and _spooled(result):
+            self.spool.append_result(result)
+
+    def batch_written(self, results: Iterable[dict[str, Any]]) -> int:
+        """Markeer een weggeschreven batch; geeft het batch nummer."""
+        if self.spool is None or self.manifest is None:
+            return 0
+        self.manifest.batches += 1
+        self.spool.append_batch(
+            self.manifest.batches,
+            (str(result.get(_FQPN_KEY)) for result in results if _spooled(result)),
+        )
+        self.manifest.save(self.manifest_path)
+        return self.manifest.batches
+
+    def finish(self, *, aborted: bool = False) -> None:
+        """Sluit de run af; een voltooide run ruimt zijn spool op."""
+        if self.spool is None or self.manifest is None:
+            return
+        self.spool.close()
+        if aborted:
+            self.manifest.status = STATUS_ABORTED
+        else:
+            self.manifest.status = STATUS_COMPLETE
+            self.spool.path.unlink(missing_ok=True)
+        self.manifest.save(self.manifest_path)
+        self.spool = None
@@ -0,0 +1,280 @@
+"""Schema evolutie wanneer de metadata_fields_* mappings wijzigen.
+
+Een nieuw veld in metadata_fields_image betekende de database wissen
+(database_clean) en alles opnieuw verwerken. Deze module vergelijkt bij het
+opstarten de geconfigureerde kolommen met de live tabel, voegt nieuwe kolommen
+toe met ALTER TABLE ADD COLUMN en zet ze in een backfill wachtrij.
+
+De backfill job vult alleen de nieuwe kolommen voor bestaande rijen:
+
+- uit de raw metadata store als daar een BLOB voor de rij staat;
+- anders met gebatchte ExifTool aanroepen die alleen de nieuwe tags lezen,
+  zonder hashing of stat.
+
+De voortgang staat per kolom in een tabel, zodat een onderbroken backfill bij
+de volgende start verder gaat.
+"""
+
+import json
+import sqlite3
+import subprocess
+import threading
+from collections.abc import Callable
+from contextlib import AbstractContextManager, nullcontext
+from dataclasses import dataclass, field
+from typing import Any
+
+from typed_ingest import TypedRecordMapper, convert_value, sql_affinity
+
+# Metadata keys die YAPMO zelf berekent (hash, stat, health): niet via ExifTool
+_COMPUTED_PREFIX = "YAPMO:"
+
+
+@dataclass
+class SchemaDiff:
+    """Verschil tussen de geconfigureerde mappings en de live tabel."""
+
+    added: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    retyped: list[tuple[str, str, str]] = field(default_factory=list)
+
+    def is_empty(self) -> bool:
+        """Check of er niets gewijzigd is."""
+        return not (self.added or self.removed or self.retyped)
+
+
+def live_columns(connection: sqlite3.Connection, table: str) -> dict[str, str]:
+    """Kolommen van een bestaande tabel: naam -> gedeclareerd type."""
+    return {
+        row[1]: (row[2] or "").upper()
+        for row in connection.execute(f"PRAGMA table_info({table})")
+    }
+
+
+def diff_schema(
+    connection: sqlite3.Connection, table: str, mapper: TypedRecordMapper,
+) -> SchemaDiff:
+    """Vergelijk de mapper kolommen met de live tabel.
+
+    Args:
+    ----
+        connection: Open database connectie
+        table: Naam van de Media tabel
+        mapper: Mapper met de geconfigureerde kolommen en types
+
+    Returns:
+    -------
+        SchemaDiff met toegevoegde, niet meer gemapte en van type gewijzigde kolommen
+
+    """
+    live = live_columns(connection, table)
+    diff = SchemaDiff()
+    for column in mapper.columns:
+        wanted = sql_affinity(mapper.field_type(column))
+        if column not in live:
+            diff.added.append(column)
+        elif column != "YAPMO_FQPN" and live[column] != wanted:
+            diff.retyped.append((column, live[column], wanted))
+    configured = set(mapper.columns)
+    diff.removed = [column for column in live if column != "id" and column not in configured]
+    return diff
+
+
+def exiftool_tags(metadata_keys: list[str]) -> list[str]:
+    """ExifTool tag argumenten ("-EXIF:Model") voor extraheerbare keys."""
+    return [f"-{key}" for key in metadata_keys if not key.startswith(_COMPUTED_PREFIX)]
+
+
+class SchemaEvolution:
+    """ALTER TABLE voor nieuwe kolommen plus een hervatbare backfill wachtrij."""
+
+    def __init__(
+        self,
+        connection: sqlite3.Connection,
+        table_media: str,
+        table_backfill: str,
+        mapper: TypedRecordMapper,
+        *,
+        batch_size: int = 200,
+        exiftool_timeout: int = 30000,
+        lock: AbstractContextManager | None = None,
+    ) -> None:
+        """Initialize met connectie, tabelnamen en mapper.
+
+        Args:
+        ----
+            connection: Open database connectie
+            table_media: Naam van de Media tabel
+            table_backfill: Naam van de backfill wachtrij tabel
+            mapper: Mapper met de geconfigureerde kolommen en types
+            batch_size: Aantal bestanden per ExifTool aanroep
+            exiftool_timeout: ExifTool timeout per bestand in milliseconden
+            lock: Lock rond de gedeelde connectie (ExifTool draait erbuiten)
+
+        """
+        self.connection = connection
+        self.table_media = table_media
+        self.table_backfill = table_backfill
+        self.mapper = mapper
+        self.batch_size = batch_size
+        self.exiftool_timeout = exiftool_timeout
+        self.lock = lock if lock is not None else nullcontext()
+
+    def create(self) -> None:
+        """Create de wachtrij tabel indien nodig."""
+        self.connection.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table_backfill} (
+                column_name TEXT PRIMARY KEY,
+                last_id INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+
+    def migrate(self) -> SchemaDiff:
+        """Voeg nieuwe kolommen toe en zet ze in de backfill wachtrij (geen commit).
+
+        Een nieuwe (lege) tabel krijgt geen backfill. Niet meer gemapte kolommen
+        blijven staan; een type wijziging vereist nog steeds een rebuild.
+        """
+        diff = diff_schema(self.connection, self.table_media, self.mapper)
+        has_rows = self.connection.execute(
+            f"SELECT 1 FROM {self.table_media} LIMIT 1",  # noqa: S608
+        ).fetchone()
+        for column in diff.added:
+            self.connection.execute(
+                f"ALTER TABLE {self.table_media} ADD COLUMN "
+                f"{column} {sql_affinity(self.mapper.field_type(column))}",
+            )
+            if has_rows:
+                self.connection.execute(
+                    f"INSERT OR IGNORE INTO {self.table_backfill} (column_name) VALUES (?)",  # noqa: S608
+                    (column,),
+                )
+        return diff
+
+    def pending(self) -> dict[str, int]:
+        """Kolommen in de wachtrij met hun laatst verwerkte media id."""
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT column_name, last_id FROM {self.table_backfill}",  # noqa: S608
+            ).fetchall()
+        return {column: last_id for column, last_id in rows if column in self.mapper.sources}
+
+    def run_backfill(
+        self,
+        raw_store: Any = None,  # noqa: ANN401
+        stop_event: threading.Event | None = None,
+        progress_callback: Callable[[int], None] | None = None,
+    ) -> int:
+        """Vul de kolommen in de wachtrij; hervat vanaf de opgeslagen voortgang.
+
+        Args:
+        ----
+            raw_store: Optionele RawMetadataStore; rijen met een BLOB gaan niet via ExifTool
+            stop_event: Stopt de job na de lopende batch
+            progress_callback: Krijgt het aantal verwerkte bestanden na elke batch
+
+        Returns:
+        -------
+            Aantal via ExifTool verwerkte bestanden
+
+        Raises
+        ------
+            FileNotFoundError: Als ExifTool niet geinstalleerd is
+            subprocess.SubprocessError: Als ExifTool een batch niet afmaakt (timeout);
+                de voortgang van die batch is niet opgeslagen, de volgende run
+                probeert hem opnieuw
+
+        """
+        pending = self.pending()
+        if not pending:
+            return 0
+
+        if raw_store is not None:
+            self._backfill_from_raw(raw_store, [c for c, last_id in pending.items() if last_id == 0])
+
+        tags = exiftool_tags([key for column in pending for key in self.mapper.sources[column]])
+        processed = 0
+        while tags and not (stop_event and stop_event.is_set()):
+            batch = self._next_batch(min(pending.values()), raw_store)
+            if not batch:
+                break
+            metadata = self._extract([fqpn for _id, fqpn in batch], tags)
+            self._apply_batch(batch, metadata, pending)
+            processed += len(batch)
+            if progress_callback:
+                progress_callback(processed)
+
+        if not (stop_event and stop_event.is_set()):
+            with self.lock:
+                self.connection.executemany(
+                    f"DELETE FROM {self.table_backfill} WHERE column_name = ?",  # noqa: S608
+                    [(column,) for column in pending],
+                )
+                self.connection.commit()
+        return processed
+
+    def _backfill_from_raw(self, raw_store: Any, columns: list[str]) -> None:  # noqa: ANN401
+        """Vul kolommen vanuit de opgeslagen ExifTool JSON (een UPDATE per kolom)."""
+        with self.lock:
+            for column in columns:
+                keys = self.mapper.sources[column]
+                if keys:
+                    raw_store.backfill_column(column, keys[0], self.mapper.field_type(column))
+            self.connection.commit()
+
+    def _next_batch(self, last_id: int, raw_store: Any) -> list[tuple[int, str]]:  # noqa: ANN401
+        """Volgende (id, FQPN) batch na last_id, zonder rijen met een raw BLOB."""
+        sql = f"SELECT id, YAPMO_FQPN FROM {self.table_media} WHERE id > ?"  # noqa: S608
+        if raw_store is not None:
+            sql += f" AND id NOT IN (SELECT media_id FROM {raw_store.table_raw})"
+        sql += " ORDER BY id LIMIT ?"
+        with self.lock:
+            return self.connection.execute(sql, (last_id, self.batch_size)).fetchall()
+
+    def _extract(self, fqpns: list[str], tags: list[str]) -> dict[str, dict[str, Any]]:
+        """Lees alleen de gevraagde tags van een batch bestanden met een ExifTool aanroep.
+
+        Paden gaan via een argfile op stdin (geen limiet op de command line).
+        Ontbrekende bestanden leveren geen output en blijven NULL.
+        """
+        cmd = ["exiftool", "-j", "-G", "-q", "-q", *tags, "-@", "-"]
+        result = subprocess.run(
+            cmd,
+            input="\n".join(fqpns),
+            capture_output=True,
+            text=True,
+            timeout=self.exiftool_timeout / 1000.0 * len(fqpns),
+            check=False,
+        )
+        try:
+            entries = json.loads(result.stdout) if result.stdout.strip() else []
+        except json.JSONDecodeError:
+            return {}
+        return {entry.get("SourceFile"): entry for entry in entries}
+
+    def _apply_batch(
+        self,
+        batch: list[tuple[int, str]],
+        metadata: dict[str, dict[str, Any]],
+        pending: dict[str, int],
+    ) -> None:
+        """Schrijf een batch weg en bewaar de voortgang (een transactie)."""
+        with self.lock:
+            for media_id, fqpn in batch:
+                data = metadata.get(fqpn, {})
+                for column, last_id in pending.items():
+                    if media_id <= last_id:
+                        continue
+                    value = convert_value(self.mapper.raw_value(data, column), self.mapper.field_type(column))
+                    self.connection.execute(
+                        f"UPDATE {self.table_media} SET {column} = ? WHERE id = ?",  # noqa: S608
+                        (value, media_id),
+                    )
+            batch_last_id = batch[-1][0]
+            for column in pending:
+                pending[column] = max(pending[column], batch_last_id)
+            self.connection.executemany(
+                f"UPDATE {self.table_backfill} SET last_id = ? WHERE column_name = ?",  # noqa: S608
+                [(last_id, column) for column, last_id in pending.items()],
+            )
+            self.connection.commit()
@@ -0,0 +1,493 @@
+"""Compacte zoektaal die naar geindexeerde, geparametriseerde SQL compileert.
+
+Operators schrijven geen SQL. Een zoekopdracht als
+
+    camera:"ILCE-7M3" year:2019..2021 kw:ski type:video size>100MB under:/Pictures/2020
+
+wordt geparsed en omgezet naar een SELECT op de Media tabel die de getypeerde
+kolommen, de FTS index, de tag tabellen en de pad range keys gebruikt.
+
+Termen:
+
+- camera:X          camera model (exact)
+- type:image|video  media type
+- year:2019, year:2019..2021, date:2019-06, date:2019-06-01..2019-08
+- size>100MB, size<=2GB, size:1MB..10MB (KB/MB/GB/TB, 1024-based)
+- kw:ski, kw:"Vakantie|Ski"   tag (inclusief onderliggende tags)
+- under:/Pictures/2020   directory subtree
+- health:corrupt     resultaat van de health check
+- text:"..." of losse woorden   full-text zoeken
+- een - voor een term negeert hem (-type:video)
+
+De planner schat per term het aantal rijen uit de aggregaat tabellen
+(Library_Stats, MediaTags) en zet de meest selectieve term vooraan. Alleen die
+term mag een index op Media gebruiken; bij de overige termen schakelt de unaire
++ de index uit. Zonder ANALYZE statistieken kiest SQLite anders vaak de
+verkeerde index.
+"""
+
+import re
+import sqlite3
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from typing import Any
+
+from directory_index import normalize_directory, subtree_range
+from fts_index import build_match_query
+from library_stats import (
+    DIMENSION_CAMERA,
+    DIMENSION_DIRECTORY,
+    DIMENSION_MONTH,
+    DIMENSION_TYPE,
+    month_key,
+)
+from tag_index import split_hierarchy
+
+_TOKEN_PATTERN = re.compile(
+    r'(?P<neg>-)?(?:(?P<field>[A-Za-z_]+)(?P<op>>=|<=|:|>|<)(?P<value>"[^"]*"?|\S*)|(?P<word>"[^"]*"?|\S+))',
+)
+_SIZE_PATTERN = re.compile(r"^(\d+(?:\.\d+)?)\s*([KMGT]?)B?$", re.IGNORECASE)
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+# Aandeel van de bibliotheek als er geen statistiek voor een term is
+_DEFAULT_SELECTIVITY = {"size": 1 / 3, "text": 1 / 20, "health": 1 / 100}
+
+
+class SearchSyntaxError(ValueError):
+    """Ongeldige of niet ondersteunde zoekterm."""
+
+
+@dataclass
+class SearchTerm:
+    """Een geparste term: veld, operator en waarde."""
+
+    field: str
+    op: str
+    value: str
+    negated: bool = False
+
+
+@dataclass
+class Predicate:
+    """Gecompileerde term met de geschatte selectiviteit.
+
+    index_sql mag een index op Media gebruiken, filter_sql niet (unaire +).
+    """
+
+    description: str
+    index_sql: str
+    filter_sql: str
+    parameters: list[Any]
+    estimate: int
+
+
+@dataclass
+class CompiledSearch:
+    """Resultaat van de compiler: SQL, parameters en het gekozen plan."""
+
+    sql: str
+    parameters: list[Any]
+    plan: list[tuple[str, int]] = field(default_factory=list)
+
+
+def tokenize(text: str) -> list[SearchTerm]:
+    """Splits zoektekst in termen; losse woorden worden text termen.
+
+    Raises
+    ------
+        SearchSyntaxError: Bij een term zonder waarde
+
+    """
+    terms = []
+    for match in _TOKEN_PATTERN.finditer(text):
+        if match.group("word") is not None:
+            value = match.group("word").strip('"')
+            if value:
+                terms.append(SearchTerm("text", ":", value, bool(match.group("neg"))))
+            continue
+        value = match.group("value").strip('"')
+        if not value:
+            msg = f"Missing value for '{match.group('field')}{match.group('op')}'"
+            raise SearchSyntaxError(msg)
+        terms.append(SearchTerm(
+            match.group("field").lower(), match.group("op"), value, bool(match.group("neg")),
+        ))
+    return terms
+
+
+def parse_size(text: str) -> int:
+    """Bestandsgrootte met optionele eenheid ("100MB", "1.5G", "500") in bytes."""
+    match = _SIZE_PATTERN.match(text.strip())
+    if not match:
+        msg = f"Invalid size: {text}"
+        raise SearchSyntaxError(msg)
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).upper()])
+
+
+def period_bounds(text: str) -> tuple[int, int]:
+    """Epoch grenzen [start, end) van een jaar, maand of dag ("2019", "2019-06", "2019-06-01")."""
+    parts = text.split("-")
+    try:
+        numbers = [int(part) for part in parts]
+        if len(numbers) == 1:
+            start = datetime(numbers[0], 1, 1, tzinfo=UTC)
+            end = datetime(numbers[0] + 1, 1, 1, tzinfo=UTC)
+        elif len(numbers) == 2:  # noqa: PLR2004
+            start = datetime(numbers[0], numbers[1], 1, tzinfo=UTC)
+            end = datetime(numbers[0] + numbers[1] // 12, numbers[1] % 12 + 1, 1, tzinfo=UTC)
+        elif len(numbers) == 3:  # noqa: PLR2004
+            start = datetime(numbers[0], numbers[1], numbers[2], tzinfo=UTC)
+            end = datetime.fromtimestamp(start.timestamp() + 86400, UTC)
+        else:
+            raise ValueError(text)
+    except ValueError as e:
+        msg = f"Invalid date: {text}"
+        raise SearchSyntaxError(msg) from e
+    return int(start.timestamp()), int(end.timestamp())
+
+
+def _split_range(value: str) -> tuple[str, str]:
+    """Splits "a..b" (beide kanten optioneel); een enkele waarde geeft (a, a)."""
+    if ".." in value:
+        low, high = value.split("..", 1)
+        return low, high
+    return value, value
+
+
+class SearchCompiler:
+    """Compileert zoektekst naar SQL op de Media tabel."""
+
+    def __init__(
+        self,
+        table_media: str,
+        *,
+        table_stats: str | None = None,
+        table_tags: str | None = None,
+        table_media_tags: str | None = None,
+        table_fts: str | None = None,
+        type_field: str = "YAPMO_FILE_Type",
+        date_fields: list[str] | None = None,
+        camera_field: str = "EXIF_Model",
+        path_field: str = "YAPMO_FILE_Path",
+        size_field: str = "YAPMO_FILE_Size",
+        health_field: str = "YAPMO_health",
+    ) -> None:
+        """Initialize met tabelnamen en Media kolommen.
+
+        Args:
+        ----
+            table_media: Naam van de Media tabel
+            table_stats: Library_Stats tabel voor schattingen (optioneel)
+            table_tags: Tags tabel voor kw: (optioneel)
+            table_media_tags: MediaTags tabel voor kw: (optioneel)
+            table_fts: FTS5 tabel voor vrije tekst (optioneel)
+            type_field: Kolom met het media type
+            date_fields: Epoch datum kolommen, eerste niet-NULL waarde telt
+            camera_field: Kolom met het camera model
+            path_field: Kolom met de directory
+            size_field: Kolom met de bestandsgrootte
+            health_field: Kolom met de health status
+
+        """
+        self.table_media = table_media
+        self.table_stats = table_stats
+        self.table_tags = table_tags
+        self.table_media_tags = table_media_tags
+        self.table_fts = table_fts
+        self.type_field = type_field
+        self.date_fields = (
+            date_fields if date_fields is not None
+            else ["EXIF_DateTimeOriginal", "QuickTime_CreateDate"]
+        )
+        self.camera_field = camera_field
+        self.path_field = path_field
+        self.size_field = size_field
+        self.health_field = health_field
+
+    @classmethod
+    def from_config(cls) -> "SearchCompiler":
+        """Maak een compiler met tabelnamen uit config.json."""
+        from config import get_param
+
+        return cls(
+            get_param("database", "database_table_media"),
+            table_stats=get_param("database", "database_table_stats"),
+            table_tags=get_param("database", "database_table_tags"),
+            table_media_tags=get_param("database", "database_table_media_tags"),
+            table_fts=get_param("database", "database_table_fts"),
+        )
+
+    def compile(
+        self, connection: sqlite3.Connection, text: str, columns: Sequence[str] | None = None,
+    ) -> CompiledSearch:
+        """Compileer zoektekst naar SQL (connectie alleen voor schattingen en tags).
+
+        Args:
+        ----
+            connection: Connectie voor schema, schattingen en tag lookups
+            text: Zoektekst
+            columns: Optionele projectie, "*" voor alle kolommen (default id, pad en de zoekvelden)
+
+        Raises
+        ------
+            SearchSyntaxError: Bij ongeldige of niet beschikbare termen of kolommen
+
+        """
+        self._columns = {row[1] for row in connection.execute(f"PRAGMA table_info({self.table_media})")}
+        self._tables = {
+            row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        }
+        total = self._total(connection)
+
+        predicates = [self._compile_term(connection, term, total) for term in tokenize(text)]
+        predicates.sort(key=lambda predicate: predicate.estimate)
+
+        where, parameters = [], []
+        for position, predicate in enumerate(predicates):
+            where.append(predicate.index_sql if position == 0 else predicate.filter_sql)
+            parameters.extend(predicate.parameters)
+
+        if columns:
+            unknown = [column for column in columns if column != "*" and column not in self._columns]
+            if unknown:
+                msg = f"Unknown column(s): {', '.join(unknown)}"
+                raise SearchSyntaxError(msg)
+            select_columns = list(columns)
+        else:
+            select_columns = ["id", "YAPMO_FQPN"] + [
+                column for column in (
+                    self.type_field, *self.date_fields, self.size_field, self.camera_field, self.path_field,
+                ) if column in self._columns
+            ]
+        sql = f"SELECT {', '.join(select_columns)} FROM {self.table_media}"  # noqa: S608
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id"
+        plan = [(predicate.description, predicate.estimate) for predicate in predicates]
+        return CompiledSearch(sql, parameters, plan)
+
+    def _require_column(self, column: str, term: SearchTerm) -> None:
+        """Controleer dat de kolom voor een term bestaat."""
+        if column not in self._columns:
+            msg = f"Field '{term.field}' not available (missing column {column})"
+            raise SearchSyntaxError(msg)
+
+    def _require_table(self, table: str | None, term: SearchTerm) -> str:
+        """Controleer dat de tabel voor een term bestaat; geeft de naam."""
+        if not table or table not in self._tables:
+            msg = f"Field '{term.field}' not available (index not enabled)"
+            raise SearchSyntaxError(msg)
+        return table
+
+    def _total(self, connection: sqlite3.Connection) -> int:
+        """Aantal media in de bibliotheek (O(1) via de stats tabel)."""
+        if self.table_stats in self._tables:
+            row = connection.execute(
+                f"SELECT media_count FROM {self.table_stats} "  # noqa: S608
+                "WHERE dimension = 'library' AND key = ''",
+            ).fetchone()
+            return row[0] if row else 0
+        return connection.execute(f"SELECT count(*) FROM {self.table_media}").fetchone()[0]  # noqa: S608
+
+    def _stats_count(self, connection: sqlite3.Connection, dimension: str, key: str) -> int | None:
+        """Aantal media voor een key in de stats tabel (None zonder stats)."""
+        if self.table_stats not in self._tables:
+            return None
+        row = connection.execute(
+            f"SELECT media_count FROM {self.table_stats} WHERE dimension = ? AND key = ?",  # noqa: S608
+            (dimension, key),
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _compile_term(self, connection: sqlite3.Connection, term: SearchTerm, total: int) -> Predicate:
+        """Compileer een term; negatie keert filter en schatting om."""
+        builders = {
+            "camera": self._camera,
+            "type": self._type,
+            "year": self._date,
+            "date": self._date,
+            "size": self._size,
+            "kw": self._keyword,
+            "under": self._under,
+            "health": self._health,
+            "text": self._text,
+        }
+        builder = builders.get(term.field)
+        if builder is None:
+            msg = f"Unknown field '{term.field}' (use {', '.join(sorted(builders))})"
+            raise SearchSyntaxError(msg)
+        if term.field not in ("size",) and term.op != ":":
+            msg = f"Operator '{term.op}' not supported for '{term.field}'"
+            raise SearchSyntaxError(msg)
+
+        predicate = builder(connection, term, total)
+        if term.negated:
+            return Predicate(
+                f"NOT {predicate.description}",
+                f"NOT ({predicate.filter_sql})",
+                f"NOT ({predicate.filter_sql})",
+                predicate.parameters,
+                max(0, total - predicate.estimate),
+            )
+        return predicate
+
+    @staticmethod
+    def _column_predicate(
+        description: str, column: str, condition: str, parameters: list[Any], estimate: int,
+    ) -> Predicate:
+        """Predicate op een Media kolom; condition gebruikt {col} voor de kolom."""
+        return Predicate(
+            description,
+            condition.format(col=column),
+            condition.format(col=f"+{column}"),
+            parameters,
+            estimate,
+        )
+
+    def _camera(self, connection: sqlite3.Connection, term: SearchTerm, total: int) -> Predicate:
+        self._require_column(self.camera_field, term)
+        estimate = self._stats_count(connection, DIMENSION_CAMERA, term.value)
+        return self._column_predicate(
+            f"camera = {term.value}", self.camera_field, "{col} = ?", [term.value],
+            total if estimate is None else estimate,
+        )
+
+    def _type(self, connection: sqlite3.Connection, term: SearchTerm, total: int) -> Predicate:
+        self._require_column(self.type_field, term)
+        value = term.value.lower()
+        estimate = self._stats_count(connection, DIMENSION_TYPE, value)
+        return self._column_predicate(
+            f"type = {value}", self.type_field, "{col} = ?", [value],
+            total // 2 if estimate is None else estimate,
+        )
+
+    def _date(self, connection: sqlite3.Connection, term: SearchTerm, total: int) -> Predicate:
+        date_fields = [column for column in self.date_fields if column in self._columns]
+        if not date_fields:
+            self._require_column(self.date_fields[0] if self.date_fields else "date", term)
+        low_text, high_text = _split_range(term.value)
+        if term.field == "year" and not all(part.isdigit() for part in (low_text, high_text) if part):
+            msg = f"Invalid year: {term.value}"
+            raise SearchSyntaxError(msg)
+        start = period_bounds(low_text)[0] if low_text else None
+        end = period_bounds(high_text)[1] if high_text else None
+
+        # Eerste niet-NULL datum kolom telt (zoals de statistieken); per kolom een OR tak
+        branches, parameters = [], []
+        for position, column in enumerate(date_fields):
+            parts = [f"{{{earlier}}} IS NULL" for earlier in date_fields[:position]]
+            if start is not None:
+                parts.append(f"{{{column}}} >= ?")
+                parameters.append(start)
+            if end is not None:
+                parts.append(f"{{{column}}} < ?")
+                parameters.append(end)
+            if start is None and end is None:
+                parts.append(f"{{{column}}} IS NOT NULL")
+            branches.append(f"({' AND '.join(parts)})")
+        condition = f"({' OR '.join(branches)})"
+        index_sql = condition.format(**{column: column for column in date_fields})
+        filter_sql = condition.format(**{column: f"+{column}" for column in date_fields})
+
+        estimate = None
+        if self.table_stats in self._tables:
+            low_key = month_key(start) if start is not None else "0000-00"
+            high_key = month_key(end - 1) if end is not None else "9999-99"
+            estimate = connection.execute(
+                f"SELECT IFNULL(sum(media_count), 0) FROM {self.table_stats} "  # noqa: S608
+                "WHERE dimension = ? AND key BETWEEN ? AND ? AND key != 'unknown'",
+                (DIMENSION_MONTH, low_key, high_key),
+            ).fetchone()[0]
+        return Predicate(
+            f"{term.field} {term.value}", index_sql, filter_sql, parameters,
+            total // 3 if estimate is None else estimate,
+        )
+
+    def _size(self, _connection: sqlite3.Connection, term: SearchTerm, total: int) -> Predicate:
+        self._require_column(self.size_field, term)
+        estimate = int(total * _DEFAULT_SELECTIVITY["size"])
+        if term.op == ":":
+            low_text, high_text = _split_range(term.value)
+            parts, parameters = [], []
+            if low_text:
+                parts.append("{col} >= ?")
+                parameters.append(parse_size(low_text))
+            if high_text:
+                parts.append("{col} <= ?")
+                parameters.append(parse_size(high_text))
+            if not parts:
+                msg = f"Invalid size range: {term.value}"
+                raise SearchSyntaxError(msg)
+            condition = " AND ".join(parts)
+        else:
+            condition, parameters = f"{{col}} {term.op} ?", [parse_size(term.value)]
+        return self._column_predicate(
+            f"size{term.op}{term.value}", self.size_field, f"({condition})", parameters, estimate,
+        )
+
+    def _keyword(self, connection: sqlite3.Connection, term: SearchTerm, _total: int) -> Predicate:
+        table_tags = self._require_table(self.table_tags, term)
+        table_media_tags = self._require_table(self.table_media_tags, term)
+        tag_ids = self._resolve_tags(connection, table_tags, term.value)
+        sql = (
+            f"id IN (SELECT media_id FROM {table_media_tags} "  # noqa: S608
+            "WHERE tag_id IN (SELECT value FROM json_each(?)))"
+        )
+        parameters = [f"[{', '.join(str(tag_id) for tag_id in tag_ids)}]"]
+        estimate = connection.execute(
+            f"SELECT count(*) FROM {table_media_tags} "  # noqa: S608
+            "WHERE tag_id IN (SELECT value FROM json_each(?))",
+            parameters,
+        ).fetchone()[0]
+        return Predicate(f"kw = {term.value}", sql, sql, parameters, estimate)
+
+    @staticmethod
+    def _resolve_tags(connection: sqlite3.Connection, table_tags: str, value: str) -> list[int]:
+        """Tag ids voor een naam (alle niveaus) of een hierarchisch pad ("A|B")."""
+        names = split_hierarchy(value)
+        if len(names) > 1:
+            parent_ids: list[int | None] = [None]
+            for name in names:
+                parent_ids = [
+                    row[0] for parent_id in parent_ids for row in connection.execute(
+                        f"SELECT id FROM {table_tags} "  # noqa: S608
+                        "WHERE IFNULL(parent_id, 0) = ? AND name = ? COLLATE NOCASE",
+                        (parent_id or 0, name),
+                    )
+                ]
+            return [tag_id for tag_id in parent_ids if tag_id is not None]
+        return [
+            row[0] for row in connection.execute(
+                f"SELECT id FROM {table_tags} WHERE name = ? COLLATE NOCASE",  # noqa: S608
+                (value,),
+            )
+        ]
+
+    def _under(self, connection: sqlite3.Connection, term: SearchTerm, total: int) -> Predicate:
+        self._require_column(self.path_field, term)
+        directory, low, high = subtree_range(term.value)
+        estimate = self._stats_count(connection, DIMENSION_DIRECTORY, normalize_directory(term.value))
+        return self._column_predicate(
+            f"under {directory}", self.path_field, "({col} = ? OR ({col} >= ? AND {col} < ?))",
+            [directory, low, high], total if estimate is None else estimate,
+        )
+
+    def _health(self, _connection: sqlite3.Connection, term: SearchTerm, total: int) -> Predicate:
+        self._require_column(self.health_field, term)
+        value = term.value.lower()
+        selectivity = 1 - _DEFAULT_SELECTIVITY["health"] if value == "ok" else _DEFAULT_SELECTIVITY["health"]
+        return self._column_predicate(
+            f"health = {value}", self.health_field, "{col} = ?", [value], int(total * selectivity),
+        )
+
+    def _text(self, _connection: sqlite3.Connection, term: SearchTerm, total: int) -> Predicate:
+        table_fts = self._require_table(self.table_fts, term)
+        match = build_match_query(term.value)
+        if match is None:
+            msg = f"No searchable words in: {term.value}"
+            raise SearchSyntaxError(msg)
+        sql = f"id IN (SELECT rowid FROM {table_fts} WHERE {table_fts} MATCH ?)"  # noqa: S608
+        return Predicate(
+            f"text {term.value}", sql, sql, [match], int(total * _DEFAULT_SELECTIVITY["text"]),
+        )
@@ -5,6 +5,7 @@ Handles application exit logic and confirmation dialogs.
 
 
 from nicegui import app, ui
+from read_pool import close_shared_pool
 from theme import YAPMOTheme
 
 
@@ -14,6 +15,7 @@ def create_exit_dialog() -> None:
     def _exit_action(dialog: ui.dialog) -> None:
         dialog.close()
         ui.notify("Application shutting down...", type="info")  # type: ignore[arg-type]
+        close_shared_pool()
         app.shutdown()
 
     # Dialog styling consistent met hoofdpagina design
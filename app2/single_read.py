@@ -0,0 +1,119 @@
+"""Single-read helpers: een bestand een keer lezen voor hash, header en ExifTool.
+
+Zonder deze module wordt elk bestand minstens twee keer gelezen: door ExifTool
+en door de hash berekening (en een derde keer door Pillow voor de perceptual
+hash). Met single-read leest de worker het bestand een keer in een herbruikbare
+buffer, voedt de bytes aan de hash engine en een lichte header parser, en geeft
+alleen de header bytes via stdin aan ExifTool.
+
+De header parser kent alleen JPEG, waar alle metadata (APPn segmenten) voor
+de beelddata staat. Voor andere formaten (PNG met tEXt chunks na IDAT,
+TIFF/RAW, video met de moov atom achteraan) wordt None teruggegeven en leest
+ExifTool zelf het bestand.
+"""
+
+import os
+from pathlib import Path
+
+# JPEG markers
+_JPEG_SOI = b"\xff\xd8"
+_JPEG_SOS = 0xDA
+_JPEG_EOI = 0xD9
+# Markers zonder length veld (RSTn, TEM)
+_JPEG_STANDALONE = {0x01, *range(0xD0, 0xD8)}
+
+
+class ReusableReadBuffer:
+    """Herbruikbare leesbuffer per worker process (groeit alleen, nooit kleiner)."""
+
+    def __init__(self) -> None:
+        """Initialize een lege buffer."""
+        self._buffer = bytearray()
+
+    def read(self, file_path: Path) -> memoryview:
+        """Lees het volledige bestand in de buffer.
+
+        Returns
+        -------
+            Read-only memoryview op precies de gelezen bytes (geldig tot de
+            volgende read() call)
+
+        """
+        with file_path.open("rb", buffering=0) as f:
+            size = os.fstat(f.fileno()).st_size
+            if len(self._buffer) < size:
+                # Nieuwe buffer i.p.v. resize: oude views blijven geldig
+                self._buffer = bytearray(size)
+            view = memoryview(self._buffer)
+            total = 0
+            while total < size:
+                count = f.readinto(view[total:size])
+                if not count:
+                    break
+                total += count
+            return view[:total].toreadonly()
+
+
+def find_header_length(data: bytes | memoryview, file_ext: str) -> int | None:
+    """Bepaal hoeveel bytes aan het begin van een bestand alle metadata bevatten.
+
+    Args:
+    ----
+        data: Bestandsinhoud (of tenminste het begin ervan)
+        file_ext: Extensie in lowercase inclusief punt (".jpg")
+
+    Returns:
+    -------
+        Aantal header bytes, of None als het formaat niet ondersteund wordt
+        of de structuur niet herkend wordt
+
+    """
+    if file_ext in (".jpg", ".jpeg"):
+        return _jpeg_header_length(data)
+    return None
+
+
+def _jpeg_header_length(data: bytes | memoryview) -> int | None:
+    """Loop de JPEG markers af tot Start Of Scan (daar begint de beelddata)."""
+    if bytes(data[:2]) != _JPEG_SOI:
+        return None
+
+    position = 2
+    size = len(data)
+    while position + 4 <= size:
+        if data[position] != 0xFF:
+            return None
+        marker = data[position + 1]
+        if marker == 0xFF:
+            # Fill byte
+            position += 1
+            continue
+        if marker in _JPEG_STANDALONE:
+            position += 2
+            continue
+        if marker in (_JPEG_SOS, _JPEG_EOI):
+            # Alles tot hier + EOI zodat ExifTool een geldige JPEG ziet
+            return position
+        length = (data[position + 2] << 8) | data[position + 3]
+        position += 2 + length
+    return None
+
+
+def header_bytes_for_exiftool(data: bytes | memoryview, file_ext: str) -> bytes | None:
+    """Maak de bytes die via stdin naar ExifTool gaan, of None voor fallback.
+
+    Voor JPEG wordt een EOI marker toegevoegd zodat de afgekapte stream een
+    structureel geldige JPEG is.
+    """
+    header_length = find_header_length(data, file_ext)
+    if header_length is None:
+        return None
+    header = bytes(data[:header_length])
+    if file_ext in (".jpg", ".jpeg"):
+        header += b"\xff\xd9"
+    return header
+
+
+# Een buffer per worker process; MediaProcessing wordt per taak gepickled,
+# dus een buffer op de instance zou niet hergebruikt worden.
+worker_read_buffer = ReusableReadBuffer()
@@ -0,0 +1,261 @@
+"""Genormaliseerde keyword/tag tabellen met hierarchische onderwerpen.
+
+Full-text search vindt foto's, maar geeft geen exacte facet tellingen
+("hoeveel foto's hebben Vakantie|Wintersport"). Deze module splitst de keyword
+kolommen bij ingest naar:
+
+- Tags(id, name, parent_id): een boom; XMP:HierarchicalSubject paden
+  ("Vakantie|Wintersport") worden uitgeklapt tot een tag per niveau
+- MediaTags(media_id, tag_id): koppeling, ook naar alle voorouders van een
+  hierarchische tag, zodat een facet telling een geindexeerde GROUP BY is
+
+Platte keywords (IPTC:Keywords, XMP:Subject) worden root tags; een platte tag
+en de root van een hierarchie met dezelfde naam zijn dezelfde tag.
+"""
+
+import json
+import sqlite3
+from collections.abc import Iterable
+from typing import Any
+
+# Scheidingsteken in XMP:HierarchicalSubject
+HIERARCHY_SEPARATOR = "|"
+
+
+def split_keywords(value: Any) -> list[str]:  # noqa: ANN401
+    """Split een keyword waarde (JSON lijst, lijst of een enkel keyword).
+
+    ExifTool -j geeft meerdere keywords als lijst en een enkel keyword als
+    tekst; die tekst wordt niet op komma's gesplitst ("Smith, John").
+
+    Returns
+    -------
+        Ontdubbelde, getrimde keywords in oorspronkelijke volgorde
+
+    """
+    if value is None:
+        return []
+    if isinstance(value, str):
+        text = value.strip()
+        try:
+            parsed = json.loads(text) if text.startswith("[") else None
+        except json.JSONDecodeError:
+            parsed = None
+        value = parsed if isinstance(parsed, list) else [text]
+    elif not isinstance(value, list):
+        value = [value]
+
+    keywords: list[str] = []
+    for item in value:
+        keyword = str(item).strip()
+        if keyword and keyword not in keywords:
+            keywords.append(keyword)
+    return keywords
+
+
+def split_hierarchy(path: str) -> list[str]:
+    """Split een hierarchisch pad in niveaus (lege niveaus worden overgeslagen)."""
+    return [part.strip() for part in path.split(HIERARCHY_SEPARATOR) if part.strip()]
+
+
+class TagIndex:
+    """Tags en MediaTags tabellen naast de Media tabel."""
+
+    def __init__(
+        self,
+        connection: sqlite3.Connection,
+        table_media: str,
+        table_tags: str,
+        table_media_tags: str,
+        keyword_fields: list[str],
+        hierarchical_fields: list[str],
+    ) -> None:
+        """Initialize met connectie, tabelnamen en de bron kolommen."""
+        self.connection = connection
+        self.table_media = table_media
+        self.table_tags = table_tags
+        self.table_media_tags = table_media_tags
+        self.keyword_fields = keyword_fields
+        self.hierarchical_fields = hierarchical_fields
+        # (parent_id, name) -> tag id
+        self._tag_cache: dict[tuple[int | None, str], int] = {}
+
+    def create(self) -> None:
+        """Create de tabellen en indexes; vult vanuit bestaande Media rijen."""
+        exists = self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (self.table_media_tags,),
+        ).fetchone()
+        self.connection.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table_tags} (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                parent_id INTEGER REFERENCES {self.table_tags}(id)
+            )
+        """)
+        # Root tags hebben parent_id NULL; IFNULL maakt ze uniek per naam
+        self.connection.execute(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{self.table_tags}_parent_name "
+            f"ON {self.table_tags}(IFNULL(parent_id, 0), name)",
+        )
+        self.connection.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table_media_tags} (
+                media_id INTEGER NOT NULL,
+                tag_id INTEGER NOT NULL,
+                PRIMARY KEY (media_id, tag_id)
+            ) WITHOUT ROWID
+        """)
+        self.connection.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{self.table_media_tags}_tag "
+            f"ON {self.table_media_tags}(tag_id, media_id)",
+        )
+        if not exists:
+            self.sync([
+                row[0] for row in self.connection.execute(
+                    f"SELECT YAPMO_FQPN FROM {self.table_media}",  # noqa: S608
+                )
+            ])
+
+    def _get_tag_id(self, name: str, parent_id: int | None) -> int:
+        """Zoek of maak een tag onder parent_id."""
+        key = (parent_id, name)
+        tag_id = self._tag_cache.get(key)
+        if tag_id is not None:
+            return tag_id
+
+        row = self.connection.execute(
+            f"SELECT id FROM {self.table_tags} "  # noqa: S608
+            "WHERE IFNULL(parent_id, 0) = IFNULL(?, 0) AND name = ?",
+            (parent_id, name),
+        ).fetchone()
+        if row:
+            tag_id = row[0]
+        else:
+            cursor = self.connection.execute(
+                f"INSERT INTO {self.table_tags} (name, parent_id) VALUES (?, ?)",  # noqa: S608
+                (name, parent_id),
+            )
+            tag_id = cursor.lastrowid
+        self._tag_cache[key] = tag_id
+        return tag_id
+
+    def clear_cache(self) -> None:
+        """Vergeet gecachte tag ids (na een rollback kunnen die ongeldig zijn)."""
+        self._tag_cache.clear()
+
+    def tag_ids_for_path(self, levels: list[str]) -> list[int]:
+        """Tag ids voor alle niveaus van een pad (maakt ontbrekende tags aan)."""
+        tag_ids: list[int] = []
+        parent_id: int | None = None
+        for name in levels:
+            parent_id = self._get_tag_id(name, parent_id)
+            tag_ids.append(parent_id)
+        return tag_ids
+
+    def _tag_ids_for_row(self, row: sqlite3.Row | tuple[Any, ...]) -> set[int]:
+        """Alle tag ids voor de keyword kolommen van een Media rij."""
+        tag_ids: set[int] = set()
+        for value in row[:len(self.keyword_fields)]:
+            for keyword in split_keywords(value):
+                tag_ids.update(self.tag_ids_for_path([keyword]))
+        for value in row[len(self.keyword_fields):]:
+            for path in split_keywords(value):
+                tag_ids.update(self.tag_ids_for_path(split_hierarchy(path)))
+        return tag_ids
+
+    def sync(self, fqpns: Iterable[str]) -> None:
+        """Werk de tag koppelingen bij voor gewijzigde Media rijen (geen commit)."""
+        fields = self.keyword_fields + self.hierarchical_fields
+        select_sql = (
+            f"SELECT id, {', '.join(fields)} FROM {self.table_media} "  # noqa: S608
+            "WHERE YAPMO_FQPN = ?"
+        )
+        for fqpn in fqpns:
+            row = self.connection.execute(select_sql, (fqpn,)).fetchone()
+            if row is None:
+                continue
+            media_id = row[0]
+            self.connection.execute(
+                f"DELETE FROM {self.table_media_tags} WHERE media_id = ?",  # noqa: S608
+                (media_id,),
+            )
+            self.connection.executemany(
+                f"INSERT INTO {self.table_media_tags} (media_id, tag_id) VALUES (?, ?)",  # noqa: S608
+                [(media_id, tag_id) for tag_id in self._tag_ids_for_row(row[1:])],
+            )
+
+    def remove(self, media_ids: Iterable[int]) -> None:
+        """Verwijder koppelingen van media ids (geen commit)."""
+        self.connection.executemany(
+            f"DELETE FROM {self.table_media_tags} WHERE media_id = ?",  # noqa: S608
+            [(media_id,) for media_id in media_ids],
+        )
+
+    def find_tag(self, path: str) -> int | None:
+        """Zoek de tag id van een (hierarchisch) pad zonder tags aan te maken."""
+        parent_id: int | None = None
+        for name in split_hierarchy(path):
+            row = self.connection.execute(
+                f"SELECT id FROM {self.table_tags} "  # noqa: S608
+                "WHERE IFNULL(parent_id, 0) = IFNULL(?, 0) AND name = ?",
+                (parent_id, name),
+            ).fetchone()
+            if row is None:
+                return None
+            parent_id = row[0]
+        return parent_id
+
+    def facet_counts(
+        self, parent_path: str | None = None, limit: int = 100,
+    ) -> list[tuple[str, int]]:
+        """Aantal media per tag onder parent_path (None: root tags).
+
+        Returns
+        -------
+            List van (tag naam, aantal media), hoogste aantal eerst
+
+        """
+        parent_id = None
+        if parent_path:
+            parent_id = self.find_tag(parent_path)
+            if parent_id is None:
+                return []
+        return self.connection.execute(
+            f"SELECT t.name, count(*) AS media_count FROM {self.table_tags} t "  # noqa: S608
+            f"JOIN {self.table_media_tags} mt ON mt.tag_id = t.id "
+            "WHERE IFNULL(t.parent_id, 0) = IFNULL(?, 0) "
+            "GROUP BY t.id ORDER BY media_count DESC, t.name LIMIT ?",
+            (parent_id, limit),
+        ).fetchall()
+
+    def media_for_tag(self, path: str, limit: int | None = None) -> list[tuple[int, str]]:
+        """Media (id, FQPN) met een tag of een van zijn onderliggende tags."""
+        tag_id = self.find_tag(path)
+        if tag_id is None:
+            return []
+        sql = (
+            f"SELECT m.id, m.YAPMO_FQPN FROM {self.table_media_tags} mt "  # noqa: S608
+            f"JOIN {self.table_media} m ON m.id = mt.media_id "
+            "WHERE mt.tag_id = ? ORDER BY m.id"
+        )
+        parameters: list[int] = [tag_id]
+        if limit is not None:
+            sql += " LIMIT ?"
+            parameters.append(limit)
+        return self.connection.execute(sql, parameters).fetchall()
+
+    def prune_unused(self) -> int:
+        """Verwijder tags zonder media en zonder kinderen; geeft het aantal terug."""
+        removed = 0
+        while True:
+            cursor = self.connection.execute(
+                f"DELETE FROM {self.table_tags} WHERE "  # noqa: S608
+                f"id NOT IN (SELECT tag_id FROM {self.table_media_tags}) "
+                f"AND id NOT IN (SELECT parent_id FROM {self.table_tags} "
+                "WHERE parent_id IS NOT NULL)",
+            )
+            if cursor.rowcount <= 0:
+                break
+            removed += cursor.rowcount
+        self.clear_cache()
+        return removed
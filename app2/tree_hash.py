@@ -0,0 +1,174 @@
+"""Merkle tree hashing voor zeer grote (video) bestanden.
+
+Een enkele SHA pass over een bestand van 10-50 GB is gebonden aan een enkele
+lees-stream en moet na een fout opnieuw beginnen. Deze module splitst een
+bestand in segmenten van vaste grootte, hasht de segmenten parallel met
+positionele reads (os.pread) in threads en combineert de segment digests tot
+een root hash. De segment digests worden apart opgeslagen zodat een
+integriteitscheck per segment kan verifieren of hervatten.
+
+hashlib en os.pread geven de GIL vrij, dus threads schalen hier wel.
+"""
+
+import hashlib
+import os
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+# Prefix voor YAPMO_hash waarden die met tree hashing berekend zijn
+TREE_HASH_PREFIX = "tree_"
+
+# Domain separation tussen leaf en interne nodes (voorkomt second-preimage)
+_LEAF_PREFIX = b"\x00"
+_NODE_PREFIX = b"\x01"
+
+# Leesblok binnen een segment
+_READ_SIZE = 1024 * 1024
+
+
+@dataclass
+class TreeHashResult:
+    """Resultaat van een tree hash berekening."""
+
+    root_hash: str
+    segment_size: int
+    segment_digests: list[str]
+    file_size: int
+
+    @property
+    def hash_value(self) -> str:
+        """Waarde voor YAPMO_hash (herkenbaar aan TREE_HASH_PREFIX)."""
+        return f"{TREE_HASH_PREFIX}{self.root_hash}"
+
+
+def is_tree_hash(hash_value: str | None) -> bool:
+    """Check of een opgeslagen hash een tree hash is."""
+    return bool(hash_value) and str(hash_value).startswith(TREE_HASH_PREFIX)
+
+
+def segment_count(file_size: int, segment_size: int) -> int:
+    """Aantal segmenten voor een bestand (minimaal 1, ook voor lege bestanden)."""
+    return max(1, -(-file_size // segment_size))
+
+
+def hash_segment(
+    fd: int, index: int, segment_size: int, file_size: int, algorithm: str = "sha256",
+) -> str:
+    """Hash een enkel segment via positionele reads op een open file descriptor.
+
+    Args:
+    ----
+        fd: Open file descriptor (os.open)
+        index: Segment nummer (0-based)
+        segment_size: Segment grootte in bytes
+        file_size: Totale bestandsgrootte in bytes
+        algorithm: hashlib algoritme
+
+    Returns:
+    -------
+        Hex digest van het segment
+
+    """
+    digest = hashlib.new(algorithm, _LEAF_PREFIX)
+    offset = index * segment_size
+    end = min(offset + segment_size, file_size)
+    while offset < end:
+        chunk = os.pread(fd, min(_READ_SIZE, end - offset), offset)
+        if not chunk:
+            # Bestand is ingekort tijdens het lezen
+            msg = f"Unexpected end of file at offset {offset}"
+            raise OSError(msg)
+        digest.update(chunk)
+        offset += len(chunk)
+    return digest.hexdigest()
+
+
+def combine_segment_digests(digests: list[str], algorithm: str = "sha256") -> str:
+    """Combineer segment digests paarsgewijs tot een Merkle root hash."""
+    level = [bytes.fromhex(digest) for digest in digests]
+    if not level:
+        return hashlib.new(algorithm, _LEAF_PREFIX).hexdigest()
+
+    while len(level) > 1:
+        next_level = []
+        for position in range(0, len(level), 2):
+            pair = level[position:position + 2]
+            if len(pair) == 1:
+                # Oneven aantal: node schuift ongewijzigd door
+                next_level.append(pair[0])
+            else:
+                next_level.append(
+                    hashlib.new(algorithm, _NODE_PREFIX + pair[0] + pair[1]).digest(),
+                )
+        level = next_level
+    return level[0].hex()
+
+
+def tree_hash_file(
+    file_path: Path,
+    segment_size: int,
+    max_threads: int = 4,
+    algorithm: str = "sha256",
+) -> TreeHashResult:
+    """Bereken de Merkle tree hash van een bestand met parallelle segment reads.
+
+    Args:
+    ----
+        file_path: Pad naar het bestand
+        segment_size: Segment grootte in bytes
+        max_threads: Maximaal aantal threads voor segment hashing
+        algorithm: hashlib algoritme
+
+    Returns:
+    -------
+        TreeHashResult met root hash en alle segment digests
+
+    """
+    fd = os.open(file_path, os.O_RDONLY)
+    try:
+        file_size = os.fstat(fd).st_size
+        count = segment_count(file_size, segment_size)
+        threads = max(1, min(max_threads, count))
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            digests = list(executor.map(
+                lambda index: hash_segment(fd, index, segment_size, file_size, algorithm),
+                range(count),
+            ))
+    finally:
+        os.close(fd)
+
+    return TreeHashResult(
+        root_hash=combine_segment_digests(digests, algorithm),
+        segment_size=segment_size,
+        segment_digests=digests,
+        file_size=file_size,
+    )
+
+
+def verify_segments(
+    file_path: Path,
+    segment_size: int,
+    expected_digests: list[str],
+    start_index: int = 0,
+    algorithm: str = "sha256",
+) -> Iterator[tuple[int, bool]]:
+    """Verifieer segmenten een voor een, hervatbaar vanaf start_index.
+
+    Yields
+    ------
+        (segment index, True als de digest overeenkomt)
+
+    """
+    fd = os.open(file_path, os.O_RDONLY)
+    try:
+        file_size = os.fstat(fd).st_size
+        for index in range(start_index, len(expected_digests)):
+            try:
+                digest = hash_segment(fd, index, segment_size, file_size, algorithm)
+            except OSError:
+                digest = ""
+            yield index, digest == expected_digests[index]
+    finally:
+        os.close(fd)
@@ -0,0 +1,270 @@
+"""Typed ingest laag: ExifTool waarden naar getypeerde SQLite kolommen.
+
+ExifTool levert (zonder -n) alles als leesbare tekst: "2019:06:01 14:30:00",
+"52 deg 22' 12.00\\" N", "2.3 MB", "0:01:23". Als alles als TEXT wordt
+opgeslagen, worden range queries ("foto's uit 2019", "bestanden > 100 MB")
+full-table string scans. Deze module zet waarden om naar het type dat per
+kolom in config (database_field_types) gedeclareerd is:
+
+- EPOCH: datum/tijd als epoch seconden (INTEGER); tijden zonder tijdzone
+  worden als UTC wall-clock tijd geinterpreteerd
+- ISODATE: datum/tijd als ISO 8601 tekst (sorteerbaar)
+- INTEGER / REAL: eerste getal uit de waarde; GPS graden-minuten-seconden
+  worden naar decimale graden omgezet (Z/W negatief); bij INTEGER worden
+  bestandsgroottes ("2.3 MB", "512 kB") naar bytes omgezet
+- DURATION: "H:MM:SS" of "12.3 s" naar seconden (REAL)
+- TEXT: ongewijzigd; lijsten als JSON
+
+Ontbrekende of lege waarden (ook app3's "nil") worden NULL.
+"""
+
+import json
+import re
+from collections.abc import Iterable
+from datetime import UTC, datetime, timedelta, timezone
+from typing import Any
+
+# SQLite affinity per veld type
+FIELD_AFFINITY = {
+    "TEXT": "TEXT",
+    "INTEGER": "INTEGER",
+    "REAL": "REAL",
+    "EPOCH": "INTEGER",
+    "ISODATE": "TEXT",
+    "DURATION": "REAL",
+}
+
+# Waarden die als "geen waarde" gelden
+_NULL_VALUES = {"", "nil", "none", "null", "-", "unknown"}
+
+_DATETIME_PATTERN = re.compile(
+    r"^(\d{4})[:-](\d{2})[:-](\d{2})"
+    r"(?:[ T](\d{2}):(\d{2})(?::(\d{2}))?(?:\.\d+)?)?"
+    r"\s*(Z|[+-]\d{2}:?\d{2})?",
+)
+_NUMBER_PATTERN = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_DMS_PATTERN = re.compile(
+    r"^\s*([-+]?\d+(?:\.\d+)?)\s*deg"
+    r"(?:\s*(\d+(?:\.\d+)?)\s*')?"
+    r"(?:\s*(\d+(?:\.\d+)?)\s*\")?"
+    r"\s*([NSEW])?",
+)
+# ExifTool PrintConv van FileSize: "123 bytes", "512 kB", "2.3 MB" (factor 1024)
+_SIZE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(bytes|[kKMGT]i?B)\s*$")
+_SIZE_FACTORS = {"b": 1, "k": 1024, "m": 1024**2, "g": 1024**3, "t": 1024**4}
+
+
+def is_null(value: Any) -> bool:  # noqa: ANN401
+    """Check of een waarde als NULL opgeslagen moet worden."""
+    if value is None:
+        return True
+    return isinstance(value, str) and value.strip().lower() in _NULL_VALUES
+
+
+def parse_exif_datetime(value: Any) -> datetime | None:  # noqa: ANN401
+    """Parse een ExifTool datum ("YYYY:MM:DD HH:MM:SS[.fff][+HH:MM]").
+
+    Returns
+    -------
+        datetime (aware als de waarde een tijdzone had, anders naive), of None
+        voor onbekende of nul datums ("0000:00:00 00:00:00")
+
+    """
+    if is_null(value):
+        return None
+    match = _DATETIME_PATTERN.match(str(value).strip())
+    if not match:
+        return None
+
+    year, month, day, hour, minute, second, zone = match.groups()
+    try:
+        parsed = datetime(  # noqa: DTZ001
+            int(year), int(month), int(day),
+            int(hour or 0), int(minute or 0), int(second or 0),
+        )
+    except ValueError:
+        return None
+
+    if zone:
+        if zone == "Z":
+            return parsed.replace(tzinfo=UTC)
+        sign = -1 if zone[0] == "-" else 1
+        digits = zone[1:].replace(":", "")
+        offset = timedelta(hours=int(digits[:2]), minutes=int(digits[2:]))
+        return parsed.replace(tzinfo=timezone(sign * offset))
+    return parsed
+
+
+def to_epoch(value: Any) -> int | None:  # noqa: ANN401
+    """Datum naar epoch seconden (naive datums als UTC wall-clock)."""
+    parsed = parse_exif_datetime(value)
+    if parsed is None:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=UTC)
+    return int(parsed.timestamp())
+
+
+def to_iso(value: Any) -> str | None:  # noqa: ANN401
+    """Datum naar ISO 8601 tekst."""
+    parsed = parse_exif_datetime(value)
+    return parsed.isoformat() if parsed is not None else None
+
+
+def to_real(value: Any) -> float | None:  # noqa: ANN401
+    """Eerste getal uit de waarde als float; GPS DMS naar decimale graden."""
+    if is_null(value) or isinstance(value, bool):
+        return None
+    if isinstance(value, int | float):
+        return float(value)
+
+    text = str(value)
+    dms = _DMS_PATTERN.match(text)
+    if dms:
+        degrees, minutes, seconds, hemisphere = dms.groups()
+        result = abs(float(degrees)) + float(minutes or 0) / 60 + float(seconds or 0) / 3600
+        negative = degrees.startswith("-") or hemisphere in ("S", "W")
+        return -result if negative else result
+
+    match = _NUMBER_PATTERN.search(text)
+    return float(match.group()) if match else None
+
+
+def to_integer(value: Any) -> int | None:  # noqa: ANN401
+    """Eerste getal uit de waarde als integer (afgerond); groottes in bytes."""
+    if isinstance(value, str):
+        size = _SIZE_PATTERN.match(value)
+        if size:
+            return round(float(size.group(1)) * _SIZE_FACTORS[size.group(2)[0].lower()])
+    number = to_real(value)
+    return round(number) if number is not None else None
+
+
+def to_duration(value: Any) -> float | None:  # noqa: ANN401
+    """Duur ("0:01:23", "1:23", "12.34 s") naar seconden."""
+    if is_null(value):
+        return None
+    text = str(value).strip()
+    if ":" in text:
+        try:
+            parts = [float(part) for part in text.split()[0].split(":")]
+        except ValueError:
+            return None
+        seconds = 0.0
+        for part in parts:
+            seconds = seconds * 60 + part
+        return seconds
+    return to_real(text)
+
+
+def to_text(value: Any) -> str | None:  # noqa: ANN401
+    """Waarde als tekst; lijsten en dicts als JSON."""
+    if is_null(value):
+        return None
+    if isinstance(value, list | dict):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+_CONVERTERS = {
+    "TEXT": to_text,
+    "INTEGER": to_integer,
+    "REAL": to_real,
+    "EPOCH": to_epoch,
+    "ISODATE": to_iso,
+    "DURATION": to_duration,
+}
+
+
+def convert_value(value: Any, field_type: str) -> Any:  # noqa: ANN401
+    """Zet een ExifTool waarde om naar het gedeclareerde veld type.
+
+    Raises
+    ------
+        ValueError: Bij een onbekend veld type
+
+    """
+    converter = _CONVERTERS.get(field_type.upper())
+    if converter is None:
+        msg = f"Unknown field type: {field_type}"
+        raise ValueError(msg)
+    return converter(value)
+
+
+def sql_affinity(field_type: str) -> str:
+    """SQLite kolom type voor een veld type (onbekend: TEXT)."""
+    return FIELD_AFFINITY.get(field_type.upper(), "TEXT")
+
+
+class TypedRecordMapper:
+    """Zet worker resultaten om naar getypeerde database rijen.
+
+    Een worker resultaat bevat zowel "YAPMO:*" keys (hash, FQPN) als reeds
+    gemapte kolomnamen uit de ExifTool output. Per kolom wordt eerst de
+    metadata key gebruikt en anders de kolomnaam.
+    """
+
+    def __init__(
+        self, field_mappings: dict[str, str], field_types: dict[str, str],
+    ) -> None:
+        """Initialize met metadata key -> kolom mappings en kolom -> type."""
+        self.field_types = {column: kind.upper() for column, kind in field_types.items()}
+        # Kolom -> metadata keys (meerdere keys kunnen dezelfde kolom vullen)
+        self.sources: dict[str, list[str]] = {"YAPMO_FQPN": []}
+        for key, column in field_mappings.items():
+            if isinstance(column, str):
+                self.sources.setdefault(column, []).append(key)
+        self.columns = list(self.sources)
+
+    def field_type(self, column: str) -> str:
+        """Gedeclareerd type van een kolom (default TEXT)."""
+        return self.field_types.get(column, "TEXT")
+
+    def column_definitions(self) -> list[str]:
+        """Kolom definities voor CREATE TABLE (zonder YAPMO_FQPN)."""
+        return [
+            f"{column} {sql_affinity(self.field_type(column))}"
+            for column in self.columns
+            if column != "YAPMO_FQPN"
+        ]
+
+    def raw_value(self, record: dict[str, Any], column: str) -> Any:  # noqa: ANN401
+        """Ruwe waarde voor een kolom uit een worker resultaat."""
+        for key in self.sources.get(column, ()):
+            if record.get(key) is not None:
+                return record[key]
+        return record.get(column)
+
+    def to_row(self, record: dict[str, Any]) -> tuple[Any, ...]:
+        """Getypeerde rij in de volgorde van self.columns."""
+        return tuple(
+            convert_value(self.raw_value(record, column), self.field_type(column))
+            for column in self.columns
+        )
+
+    def upsert_sql(self, table_name: str) -> str:
+        """INSERT ... ON CONFLICT(YAPMO_FQPN) DO UPDATE voor alle kolommen."""
+        placeholders = ", ".join("?" for _ in self.columns)
+        updates = ", ".join(
+            f"{column} = excluded.{column}"
+            for column in self.columns
+            if column != "YAPMO_FQPN"
+        )
+        return (
+            f"INSERT INTO {table_name} ({', '.join(self.columns)}) "  # noqa: S608
+            f"VALUES ({placeholders}) "
+            f"ON CONFLICT(YAPMO_FQPN) DO UPDATE SET {updates}"
+        )
+
+
+def index_statements(
+    table_name: str, columns: Iterable[str], existing_columns: Iterable[str],
+) -> list[str]:
+    """CREATE INDEX statements voor de opgegeven kolommen die bestaan."""
+    existing = set(existing_columns)
+    return [
+        f"CREATE INDEX IF NOT EXISTS idx_{table_name}_{column} "
+        f"ON {table_name}({column})"
+        for column in columns
+        if column in existing
+    ]
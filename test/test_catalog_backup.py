@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Test script voor catalog_backup.py (app2)."""
+
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+# Add app2 directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app2"))
+
+from catalog_backup import CatalogBackup  # noqa: E402
+
+
+@pytest.fixture
+def writer(tmp_path):
+    """Schrijvende WAL connectie op een database met 2000 rijen."""
+    connection = sqlite3.connect(str(tmp_path / "catalog.db"))
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("CREATE TABLE Media (id INTEGER PRIMARY KEY, data BLOB)")
+    connection.executemany("INSERT INTO Media (data) VALUES (?)", [(b"x" * 1000,) for _ in range(2000)])
+    connection.commit()
+    yield connection
+    connection.close()
+
+
+def test_backup_during_writes(writer, tmp_path):
+    """Test een snapshot backup terwijl de writer blijft committen."""
+    print("=== Testing Online Backup ===")
+    backup = CatalogBackup(tmp_path / "catalog.db", tmp_path / "backup", pages=50, sleep=0)
+    steps = []
+
+    def write_during_backup(done, total):
+        steps.append((done, total))
+        # Writer wordt niet geblokkeerd door de backup
+        writer.execute("INSERT INTO Media (data) VALUES (?)", (b"y",))
+        writer.commit()
+
+    target = backup.run_once(write_during_backup)
+    assert target is not None
+    assert target.parent == tmp_path / "backup"
+    assert target.name.startswith("catalog_")
+    assert len(steps) > 10
+    assert steps[-1][0] == steps[-1][1]
+
+    copy = sqlite3.connect(target)
+    # Snapshot van het begin van de backup, zonder de writes daarna
+    assert copy.execute("SELECT count(*) FROM Media").fetchone()[0] == 2000
+    assert copy.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    copy.close()
+    assert writer.execute("SELECT count(*) FROM Media").fetchone()[0] == 2000 + len(steps)
+    assert not list((tmp_path / "backup").glob("*.partial"))
+    print("✅ Backup consistent without blocking the writer")
+
+
+def test_rotation_and_cancel(writer, tmp_path):
+    """Test het bewaren van N generaties en het stoppen van een backup."""
+    print("\n=== Testing Rotation ===")
+    backup = CatalogBackup(tmp_path / "catalog.db", tmp_path / "backup", keep=2, pages=100, sleep=0)
+    (tmp_path / "backup").mkdir()
+    for day in (1, 2, 3):
+        backup.backup_path(datetime(2024, 1, day, 12, 0, 0)).touch()  # noqa: DTZ001
+    assert backup.backup_path(datetime(2024, 1, 3, 12, 0, 0)).name == "catalog_20240103_120000_1.db"  # noqa: DTZ001
+    (tmp_path / "backup" / "notes.db").touch()
+
+    newest = backup.run_once()
+    names = [path.name for path in backup.generations()]
+    assert names == [newest.name, "catalog_20240103_120000.db"]
+    assert (tmp_path / "backup" / "notes.db").exists()
+
+    def cancel(_done, _total):
+        backup._stop_event.set()
+
+    assert backup.run_once(cancel) is None
+    assert [path.name for path in backup.generations()] == names
+    assert not list((tmp_path / "backup").glob("*.partial"))
+    print("✅ Rotation and cancel work")
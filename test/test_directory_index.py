@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Test script voor directory_index.py (app2)."""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+# Add app2 directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app2"))
+
+from directory_index import DirectoryIndex, ancestors, subtree_range  # noqa: E402
+
+
+def _create_index() -> DirectoryIndex:
+    connection = sqlite3.connect(":memory:")
+    connection.execute(
+        "CREATE TABLE Media (id INTEGER PRIMARY KEY, YAPMO_FQPN TEXT UNIQUE, "
+        "YAPMO_FILE_Path TEXT, YAPMO_FILE_Size INTEGER)",
+    )
+    connection.executemany(
+        "INSERT INTO Media (YAPMO_FQPN, YAPMO_FILE_Path, YAPMO_FILE_Size) VALUES (?, ?, ?)",
+        [
+            ("/P/2018/Italy/a.jpg", "/P/2018/Italy", 100),
+            ("/P/2018/Italy/Rome/b.jpg", "/P/2018/Italy/Rome", 200),
+            ("/P/2018/Italy-old/c.jpg", "/P/2018/Italy-old", 400),
+            ("/P/2018/italy/d.jpg", "/P/2018/italy", 800),
+        ],
+    )
+    index = DirectoryIndex(connection, "Media", "Directories")
+    index.create()
+    return index
+
+
+def test_range_keys():
+    """Test range keys en voorouders."""
+    print("=== Testing Range Keys ===")
+    assert subtree_range("/P/2018/") == ("/P/2018", "/P/2018/", "/P/20180")
+    assert subtree_range("/") == ("/", "/", "0")
+    assert ancestors("/P/2018") == ["/", "/P", "/P/2018"]
+    print("✅ Range keys correct")
+
+
+def test_subtree_queries():
+    """Test subtree selectie en tellingen (case-sensitive, geen prefix fouten)."""
+    print("\n=== Testing Subtree Queries ===")
+    index = _create_index()
+    assert index.subtree_stats("/P/2018/Italy") == (2, 2, 300)
+    assert index.subtree_stats("/P") == (6, 4, 1500)
+    assert [fqpn for _id, fqpn in index.media_in_subtree("/P/2018/Italy")] == [
+        "/P/2018/Italy/a.jpg", "/P/2018/Italy/Rome/b.jpg",
+    ]
+    assert [child[0] for child in index.children("/P/2018")] == [
+        "/P/2018/Italy", "/P/2018/Italy-old", "/P/2018/italy",
+    ]
+
+    index.connection.execute("DELETE FROM Media WHERE YAPMO_FQPN = '/P/2018/Italy-old/c.jpg'")
+    index.refresh(["/P/2018/Italy-old"])
+    assert index.prune_empty() == 1
+    index.connection.execute(
+        "INSERT INTO Media (YAPMO_FQPN, YAPMO_FILE_Path, YAPMO_FILE_Size) "
+        "VALUES ('/Q/e.jpg', '/Q', 5)",
+    )
+    index.sync(["/Q/e.jpg"])
+    assert index.subtree_stats("/") == (7, 4, 1105)
+    print("✅ Subtree queries work")
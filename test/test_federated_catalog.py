@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Test script voor federated_catalog.py (app2)."""
+
+import shutil
+import sqlite3
+import sys
+from pathlib import Path
+
+# Add app2 directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app2"))
+
+from federated_catalog import CatalogRegistry, FederatedCatalog, catalog_name  # noqa: E402
+from query_cache import write_generation  # noqa: E402
+from read_pool import ReadPool  # noqa: E402
+
+
+def _create_catalog(path: Path, rows: list[tuple], *, with_size: bool = True) -> None:
+    connection = sqlite3.connect(path)
+    size = ", YAPMO_FILE_Size INTEGER" if with_size else ""
+    connection.execute(f"CREATE TABLE Media (id INTEGER PRIMARY KEY, YAPMO_FQPN TEXT UNIQUE, YAPMO_hash TEXT{size})")
+    columns = "YAPMO_FQPN, YAPMO_hash, YAPMO_FILE_Size" if with_size else "YAPMO_FQPN, YAPMO_hash"
+    placeholders = ", ".join("?" * len(rows[0]))
+    connection.executemany(f"INSERT INTO Media ({columns}) VALUES ({placeholders})", rows)
+    connection.commit()
+    connection.close()
+
+
+def _create_stats(path: Path, files: int, size: int) -> None:
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE Library_Stats (dimension TEXT, key TEXT, media_count INTEGER, total_bytes INTEGER)",
+    )
+    connection.execute("INSERT INTO Library_Stats VALUES ('library', '', ?, ?)", (files, size))
+    connection.commit()
+    connection.close()
+
+
+def test_catalog_registry(tmp_path):
+    """Test registratie van roots en het vinden van het volume voor een pad."""
+    print("=== Testing Catalog Registry ===")
+    (tmp_path / "A" / "Photos" / "2019").mkdir(parents=True)
+    (tmp_path / "B" / "Photos").mkdir(parents=True)
+    assert catalog_name(tmp_path / "A" / "Photos") != catalog_name(tmp_path / "B" / "Photos")
+    assert catalog_name(tmp_path / "A" / "Photos").startswith("Photos_")
+
+    registry = CatalogRegistry(tmp_path / "catalogs")
+    photos = registry.register(tmp_path / "A" / "Photos")
+    assert registry.register(tmp_path / "A" / "Photos") == photos
+    registry.register(tmp_path / "A")
+    assert len(registry.volumes()) == 2
+    assert photos.db_path == tmp_path / "catalogs" / f"{photos.name}.db"
+    assert registry.volume_for(tmp_path / "A" / "Photos" / "2019" / "x.jpg") == photos
+    assert registry.volume_for(tmp_path / "B" / "Photos") is None
+
+    # Zonder catalogus bestand telt een volume niet als gemount
+    assert registry.mounted() == []
+    _create_catalog(photos.db_path, [("/A/Photos/x.jpg", "h1", 10)])
+    assert registry.mounted() == [photos]
+    print("✅ Registry maps roots to catalog files")
+
+
+def test_federated_queries(tmp_path):
+    """Test de UNION ALL view, duplicaten, statistieken en ontkoppelen bij unmount."""
+    print("\n=== Testing Federated Queries ===")
+    main_path = tmp_path / "main.db"
+    _create_catalog(main_path, [
+        ("/M/a.jpg", "h1", 100), ("/M/b.jpg", "h2", 200), ("/M/c.jpg", "hash_error_1700000000", 1),
+    ])
+    registry = CatalogRegistry(tmp_path / "catalogs")
+    for disk in ("disk1", "disk2"):
+        (tmp_path / disk).mkdir()
+    disk1 = registry.register(tmp_path / "disk1")
+    disk2 = registry.register(tmp_path / "disk2")
+    _create_catalog(disk1.db_path, [
+        ("/D1/a.jpg", "h1", 100), ("/D1/c.jpg", "h3", 300), ("/D1/d.jpg", "hash_error_1700000000", 1),
+    ])
+    # Totalen komen uit Library_Stats, niet uit een scan van Media
+    _create_stats(disk1.db_path, 30, 4010)
+    # Oudere catalogus zonder YAPMO_FILE_Size kolom
+    _create_catalog(disk2.db_path, [("/D2/a.jpg", "h1"), ("/D2/b.jpg", "h2")], with_size=False)
+
+    pool = ReadPool(main_path, size=2)
+    federation = FederatedCatalog(pool, registry, "Media", recheck_interval=0)
+    assert {volume: (files, size) for volume, files, size in federation.volume_totals()} == {
+        "main": (3, 301), disk1.name: (30, 4010), disk2.name: (2, 0),
+    }
+    # Tweede pool connectie krijgt de view ook, maar de set volumes is niet veranderd
+    generation = write_generation.value
+    with pool.connection() as first, pool.connection() as second:
+        assert federation.sync(first) is False
+        assert federation.sync(second) is True
+    assert write_generation.value == generation
+    groups = dict(federation.duplicate_groups())
+    assert list(groups) == ["h1", "h2"]
+    assert sorted(groups["h1"]) == sorted([("main", "/M/a.jpg"), (disk1.name, "/D1/a.jpg"), (disk2.name, "/D2/a.jpg")])
+
+    # Ongewijzigde set volumes: de view blijft staan
+    with pool.connection() as connection:
+        assert federation.sync(connection) is False
+
+    # Disk 2 offline: ontkoppeld en uit de view
+    shutil.rmtree(tmp_path / "disk2")
+    with federation.connection() as connection:
+        schemas = [row[1] for row in connection.execute("PRAGMA database_list")]
+        assert disk2.alias not in schemas
+        assert disk1.alias in schemas
+        assert connection.execute("SELECT count(*) FROM AllMedia").fetchone()[0] == 6
+        # Read pool connecties blijven read-only
+        try:
+            connection.execute("DELETE FROM Media")
+            raise AssertionError("Expected read-only connection")
+        except sqlite3.OperationalError:
+            pass
+    assert [digest for digest, _ in federation.duplicate_groups()] == ["h1"]
+    assert write_generation.value == generation + 1
+    pool.close()
+    print("✅ Federated view spans mounted volumes")
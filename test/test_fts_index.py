@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Test script voor fts_index.py (app2)."""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add app2 directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app2"))
+
+from fts_index import FullTextIndex, build_match_query, fts5_available  # noqa: E402
+
+
+def _create_index() -> FullTextIndex:
+    connection = sqlite3.connect(":memory:")
+    if not fts5_available(connection):
+        pytest.skip("SQLite built without FTS5")
+    connection.execute(
+        "CREATE TABLE Media (id INTEGER PRIMARY KEY, YAPMO_FQPN TEXT UNIQUE, "
+        "YAPMO_FILE_Name TEXT, IPTC_Keywords TEXT, XMP_HierarchicalSubject TEXT)",
+    )
+    connection.executemany(
+        "INSERT INTO Media (YAPMO_FQPN, YAPMO_FILE_Name, IPTC_Keywords, XMP_HierarchicalSubject) "
+        "VALUES (?, ?, ?, ?)",
+        [
+            ("/a.jpg", "a.jpg", '["strand", "zee"]', '["Vakantie|Zomer"]'),
+            ("/b.jpg", "b.jpg", "wintersport, sneeuw", '["Vakantie|Wintersport"]'),
+            ("/c.jpg", "café.jpg", None, None),
+        ],
+    )
+    index = FullTextIndex(
+        connection, "Media", "Media_FTS",
+        ["YAPMO_FILE_Name", "IPTC_Keywords", "XMP_HierarchicalSubject"],
+    )
+    index.create()
+    return index
+
+
+def test_match_query():
+    """Test opbouw van veilige MATCH expressies."""
+    print("=== Testing Match Query ===")
+    assert build_match_query('vak "OR') == '"vak" AND "OR"*'
+    assert build_match_query("zee", prefix=False) == '"zee"'
+    assert build_match_query("  ***  ") is None
+    print("✅ Match queries built")
+
+
+def test_search_and_sync():
+    """Test prefix search, hierarchie, diacritics en sync."""
+    print("\n=== Testing Full-Text Search ===")
+    index = _create_index()
+    assert {row[2] for row in index.search("vakan")} == {"/a.jpg", "/b.jpg"}
+    assert [row[2] for row in index.search("wintersport")] == ["/b.jpg"]
+    assert [row[2] for row in index.search("cafe")] == ["/c.jpg"]
+    assert index.search("strand sneeuw") == []
+
+    index.connection.execute("UPDATE Media SET IPTC_Keywords = 'bergen' WHERE YAPMO_FQPN = '/c.jpg'")
+    index.sync(["/c.jpg"])
+    assert [row[2] for row in index.search("berg")] == ["/c.jpg"]
+    assert index.search("café", prefix=False)[0][2] == "/c.jpg"
+    print("✅ Full-text search works")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Test script voor geo_index.py (app2)."""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add app2 directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app2"))
+
+from geo_index import GeoIndex, haversine_km, rtree_available  # noqa: E402
+
+
+def _create_index() -> GeoIndex:
+    connection = sqlite3.connect(":memory:")
+    if not rtree_available(connection):
+        pytest.skip("SQLite built without R*Tree")
+    connection.execute(
+        "CREATE TABLE Media (id INTEGER PRIMARY KEY, YAPMO_FQPN TEXT UNIQUE, "
+        "GPS_Latitude REAL, GPS_Longitude REAL)",
+    )
+    rows = [
+        ("/amsterdam.jpg", 52.3676, 4.9041),
+        ("/utrecht.jpg", 52.0907, 5.1214),
+        ("/fiji.jpg", -17.7134, 178.0650),
+        ("/samoa.jpg", -13.7590, -172.1046),
+        ("/no_gps.jpg", None, None),
+    ]
+    connection.executemany("INSERT INTO Media (YAPMO_FQPN, GPS_Latitude, GPS_Longitude) VALUES (?, ?, ?)", rows)
+    index = GeoIndex(connection, "Media", "Media_Geo")
+    index.create()
+    return index
+
+
+def test_bbox_and_radius():
+    """Test bounding box (ook over de datumgrens) en radius queries."""
+    print("=== Testing Geo Queries ===")
+    index = _create_index()
+    netherlands = index.query_bbox(50.7, 3.3, 53.6, 7.2)
+    assert sorted(row[1] for row in netherlands) == ["/amsterdam.jpg", "/utrecht.jpg"]
+
+    pacific = index.query_bbox(-20, 170, -10, -170)
+    assert sorted(row[1] for row in pacific) == ["/fiji.jpg", "/samoa.jpg"]
+
+    distance = haversine_km(52.3676, 4.9041, 52.0907, 5.1214)
+    assert 33 < distance < 36
+    near = index.query_radius(52.37, 4.90, 40)
+    assert [fqpn for _d, _id, fqpn in near] == ["/amsterdam.jpg", "/utrecht.jpg"]
+    assert len(index.query_radius(52.37, 4.90, 10)) == 1
+    print("✅ Bounding box and radius queries work")
+
+
+def test_sync_and_clusters():
+    """Test sync na een update en grid clustering."""
+    print("\n=== Testing Geo Sync and Clustering ===")
+    index = _create_index()
+    index.connection.execute(
+        "UPDATE Media SET GPS_Latitude = 52.1, GPS_Longitude = 5.1 WHERE YAPMO_FQPN = '/no_gps.jpg'",
+    )
+    index.connection.execute(
+        "UPDATE Media SET GPS_Latitude = NULL WHERE YAPMO_FQPN = '/fiji.jpg'",
+    )
+    index.sync(["/no_gps.jpg", "/fiji.jpg"])
+    assert len(index.query_bbox(-90, -180, 90, 180)) == 4
+
+    clusters = index.cluster_grid(50, 3, 54, 7, grid_size=2)
+    counts = sorted(cluster.count for cluster in clusters)
+    assert counts == [1, 2]
+    print("✅ Sync and clustering work")
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Test script voor integrity_scanner.py (app2)."""
+
+import hashlib
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+# Add app2 directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app2"))
+
+from integrity_scanner import IntegrityScanner  # noqa: E402
+from query_cache import write_generation  # noqa: E402
+from tree_hash import tree_hash_file  # noqa: E402
+
+
+def _new_scanner(db_path: Path) -> IntegrityScanner:
+    return IntegrityScanner(
+        str(db_path),
+        "Media",
+        "Integrity_Progress",
+        "Integrity_Mismatches",
+        "Media_Segments",
+        rate_limit_mb=0,
+        checkpoint_interval=1,
+        batch_size=2,
+    )
+
+
+def _create_scanner(temp_dir: Path) -> tuple[IntegrityScanner, sqlite3.Connection]:
+    db_path = temp_dir / "test.db"
+    connection = sqlite3.connect(db_path)
+    connection.execute(
+        "CREATE TABLE Media (id INTEGER PRIMARY KEY, YAPMO_FQPN TEXT, YAPMO_hash TEXT)",
+    )
+    connection.execute(
+        "CREATE TABLE Media_Segments (YAPMO_FQPN TEXT, segment_index INTEGER, "
+        "segment_size INTEGER, digest TEXT)",
+    )
+    return _new_scanner(db_path), connection
+
+
+def test_detects_corrupted_files():
+    """Test dat gewijzigde en ontbrekende bestanden gemeld worden."""
+    print("=== Testing Mismatch Detection ===")
+    with tempfile.TemporaryDirectory() as temp:
+        temp_dir = Path(temp)
+        scanner, connection = _create_scanner(temp_dir)
+
+        good = temp_dir / "good.jpg"
+        good.write_bytes(b"good image")
+        bad = temp_dir / "bad.jpg"
+        bad.write_bytes(b"rotten image")
+        video = temp_dir / "clip.mp4"
+        video.write_bytes(b"v" * 5000)
+        video_header = hashlib.sha256(b"v" * 4096).hexdigest()[:16]
+        big = temp_dir / "big.mp4"
+        big.write_bytes(b"x" * 3000)
+        tree = tree_hash_file(big, segment_size=1000)
+        big.write_bytes(b"x" * 1500 + b"y" + b"x" * 1499)
+
+        rows = [
+            (str(good), hashlib.sha256(b"good image").hexdigest()),
+            (str(bad), hashlib.sha256(b"original image").hexdigest()),
+            (str(temp_dir / "missing.jpg"), hashlib.sha256(b"x").hexdigest()),
+            (str(video), f"mp4_5000_unknown_date_{video_header}"),
+            (str(big), tree.hash_value),
+        ]
+        connection.executemany(
+            "INSERT INTO Media (YAPMO_FQPN, YAPMO_hash) VALUES (?, ?)", rows,
+        )
+        connection.executemany(
+            "INSERT INTO Media_Segments VALUES (?, ?, ?, ?)",
+            [(str(big), i, 1000, d) for i, d in enumerate(tree.segment_digests)],
+        )
+        connection.commit()
+
+        generation = write_generation.value
+        scanner.run_once(connection)
+        # Checkpoints en mismatches raken geen gecachte Media data
+        assert write_generation.value == generation
+
+        mismatches = dict(connection.execute(
+            "SELECT YAPMO_FQPN, reason FROM Integrity_Mismatches",
+        ).fetchall())
+        assert mismatches == {
+            str(bad): "hash_mismatch",
+            str(temp_dir / "missing.jpg"): "missing",
+            str(big): "segment_mismatch",
+        }
+        progress = scanner.get_progress()
+        assert progress["files_checked"] == 5
+        assert progress["finished"]
+        connection.close()
+        print("✅ Corrupted, missing and tree hash mismatches detected")
+
+
+def test_resumes_from_checkpoint():
+    """Test dat een nieuwe scanner verder gaat vanaf de checkpoint."""
+    print("\n=== Testing Checkpoint Resume ===")
+    with tempfile.TemporaryDirectory() as temp:
+        temp_dir = Path(temp)
+        scanner, connection = _create_scanner(temp_dir)
+        connection.executemany(
+            "INSERT INTO Media (YAPMO_FQPN, YAPMO_hash) VALUES (?, ?)",
+            [(str(temp_dir / f"{i}.jpg"), None) for i in range(3)],
+        )
+        connection.commit()
+        scanner.run_once(connection)
+
+        connection.execute("INSERT INTO Media (YAPMO_FQPN) VALUES ('new.jpg')")
+        connection.commit()
+        resumed = _new_scanner(temp_dir / "test.db")
+        resumed.run_once(connection)
+        assert resumed.get_progress()["files_checked"] == 4
+        assert resumed.get_progress()["last_media_id"] == 4
+
+        resumed.reset(connection)
+        assert resumed.get_progress()["files_checked"] == 0
+        connection.close()
+        print("✅ Scan resumes from checkpoint")
+
+
+def test_stop_mid_file_and_new_pass():
+    """Test dat stoppen midden in een bestand geen mismatch of checkpoint geeft."""
+    print("\n=== Testing Stop And New Pass ===")
+    with tempfile.TemporaryDirectory() as temp:
+        temp_dir = Path(temp)
+        scanner, connection = _create_scanner(temp_dir)
+        image = temp_dir / "a.jpg"
+        image.write_bytes(b"image")
+        connection.execute(
+            "INSERT INTO Media (YAPMO_FQPN, YAPMO_hash) VALUES (?, ?)",
+            (str(image), hashlib.sha256(b"image").hexdigest()),
+        )
+        connection.commit()
+
+        # Stop request tijdens het lezen van het eerste bestand
+        scanner._rate_limiter.consume = lambda _count: scanner._stop_event.set()
+        scanner.run_once(connection)
+        assert connection.execute("SELECT count(*) FROM Integrity_Mismatches").fetchone()[0] == 0
+        assert scanner.get_progress()["last_media_id"] == 0
+        assert not scanner.get_progress()["finished"]
+
+        resumed = _new_scanner(temp_dir / "test.db")
+        resumed.run_once(connection)
+        assert resumed.get_progress()["files_checked"] == 1
+        assert resumed.get_progress()["finished"]
+
+        # Afgeronde pass: de volgende run begint vooraan
+        again = _new_scanner(temp_dir / "test.db")
+        again.run_once(connection)
+        assert again.get_progress()["files_checked"] == 1
+        assert again.get_progress()["last_media_id"] == 1
+        connection.close()
+        print("✅ Stop keeps checkpoint, finished scan wraps around")
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Test script voor legacy_migration.py (app2)."""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+# Add app2 directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app2"))
+
+from legacy_migration import LegacyMigration, column_mapping  # noqa: E402
+from typed_ingest import TypedRecordMapper  # noqa: E402
+
+FIELD_MAPPINGS = {
+    "FileName": "YAPMO_FILE_Name",
+    "FileSize": "YAPMO_FILE_Size",
+    "YAPMO:Hash": "YAPMO_hash",
+    "Model": "EXIF_Model",
+    "DateTimeOriginal": "EXIF_DateTimeOriginal",
+    "GPSLatitude": "GPS_Latitude",
+    "Keywords": "IPTC_Keywords",
+}
+FIELD_TYPES = {
+    "YAPMO_FILE_Size": "INTEGER",
+    "EXIF_DateTimeOriginal": "EPOCH",
+    "GPS_Latitude": "REAL",
+}
+
+
+def _create_target(path: Path, mapper: TypedRecordMapper) -> sqlite3.Connection:
+    connection = sqlite3.connect(path)
+    columns = ", ".join(mapper.column_definitions())
+    connection.execute(
+        f"CREATE TABLE Media (id INTEGER PRIMARY KEY, YAPMO_FQPN TEXT UNIQUE NOT NULL, {columns})",
+    )
+    connection.commit()
+    return connection
+
+
+def test_migrate_old_schema(tmp_path):
+    """Test images.db kolomnamen, 'nil' als NULL, getypeerde kolommen en blokken."""
+    print("=== Testing Old Schema Migration ===")
+    legacy = sqlite3.connect(tmp_path / "images.db")
+    legacy.execute(
+        "CREATE TABLE Media (id INTEGER PRIMARY KEY, name TEXT, fqpn TEXT UNIQUE, size TEXT, "
+        "hash TEXT, cameraModel TEXT, exifDateTime TEXT, latitude TEXT, keywords TEXT, hasAAE TEXT)",
+    )
+    legacy.executemany(
+        "INSERT INTO Media (name, fqpn, size, hash, cameraModel, exifDateTime, latitude, keywords, hasAAE) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (f"{index}.JPG", f"/P/{index}.JPG", str(1000 + index), f"{index:032x}",
+             "SONY DCR-TRV10" if index % 2 else "nil", "2002:04:11 19:24:18", "nil", "", "0")
+            for index in range(7)
+        ] + [("lost.JPG", "nil", "10", "nil", "nil", "nil", "nil", "nil", "0")],
+    )
+    legacy.commit()
+    legacy.close()
+
+    mapper = TypedRecordMapper(FIELD_MAPPINGS, FIELD_TYPES)
+    connection = _create_target(tmp_path / "catalog.db", mapper)
+    connection.execute("INSERT INTO Media (YAPMO_FQPN, YAPMO_FILE_Name) VALUES ('/P/0.JPG', 'kept')")
+    connection.commit()
+
+    progress = []
+    migration = LegacyMigration(connection, "Media", mapper, chunk_size=3)
+    report = migration.migrate(tmp_path / "images.db", progress_callback=lambda done, total: progress.append(done))
+    assert progress == [3, 6, 8]
+    assert report.rows_read == 8
+    assert report.rows_written == 6
+    assert report.rows_skipped == 2
+    assert report.columns["YAPMO_FILE_Size"] == "size"
+    assert report.columns["EXIF_DateTimeOriginal"] == "exifDateTime"
+    assert report.unmapped == ["hasAAE"]
+
+    assert connection.execute("SELECT YAPMO_FILE_Name FROM Media WHERE YAPMO_FQPN = '/P/0.JPG'").fetchone() == ("kept",)
+    row = connection.execute(
+        "SELECT YAPMO_FILE_Size, typeof(YAPMO_FILE_Size), EXIF_Model, EXIF_DateTimeOriginal, "
+        "GPS_Latitude, IPTC_Keywords, YAPMO_hash FROM Media WHERE YAPMO_FQPN = '/P/2.JPG'",
+    ).fetchone()
+    assert row[:3] == (1002, "integer", None)
+    assert isinstance(row[3], int)
+    assert row[4:] == (None, None, f"{2:032x}")
+    assert connection.execute("SELECT count(*) FROM Media WHERE EXIF_Model = 'SONY DCR-TRV10'").fetchone()[0] == 3
+    # De legacy database is weer losgekoppeld
+    assert [row[1] for row in connection.execute("PRAGMA database_list")] == ["main"]
+
+    report = migration.migrate(tmp_path / "images.db", replace=True)
+    assert report.rows_written == 7
+    assert connection.execute("SELECT YAPMO_FILE_Name FROM Media WHERE YAPMO_FQPN = '/P/0.JPG'").fetchone() == ("0.JPG",)
+    print("✅ Old schema migrated with typed columns")
+
+
+def test_migrate_auto_field_schema(tmp_path):
+    """Test images_auto_field.db met app2 kolomnamen en een tabel zonder FQPN."""
+    print("\n=== Testing Auto Field Schema Migration ===")
+    assert column_mapping(["id", "YAPMO_FQPN", "fqpn", "Other"], ["id", "YAPMO_FQPN"]) == (
+        {"YAPMO_FQPN": "YAPMO_FQPN"}, ["fqpn", "Other"],
+    )
+
+    legacy = sqlite3.connect(tmp_path / "images_auto_field.db")
+    legacy.execute(
+        "CREATE TABLE Media (id INTEGER PRIMARY KEY, YAPMO_FQPN TEXT UNIQUE, "
+        "YAPMO_FILE_Size TEXT DEFAULT 'nil', GPS_Latitude TEXT DEFAULT 'nil')",
+    )
+    legacy.execute("CREATE TABLE Directories (id INTEGER PRIMARY KEY, dirpath TEXT UNIQUE)")
+    legacy.execute("INSERT INTO Media (YAPMO_FQPN, YAPMO_FILE_Size, GPS_Latitude) VALUES ('/P/a.MOV', '2048', '52.1')")
+    legacy.execute("INSERT INTO Media (YAPMO_FQPN) VALUES ('/P/b.MOV')")
+    legacy.commit()
+    legacy.close()
+
+    mapper = TypedRecordMapper(FIELD_MAPPINGS, FIELD_TYPES)
+    connection = _create_target(tmp_path / "catalog.db", mapper)
+    report = LegacyMigration(connection, "Media", mapper).migrate(tmp_path / "images_auto_field.db")
+    assert report.rows_written == 2
+    assert connection.execute(
+        "SELECT YAPMO_FQPN, YAPMO_FILE_Size, GPS_Latitude FROM Media ORDER BY YAPMO_FQPN",
+    ).fetchall() == [("/P/a.MOV", 2048, 52.1), ("/P/b.MOV", None, None)]
+
+    try:
+        LegacyMigration(connection, "Media", mapper).migrate(tmp_path / "images_auto_field.db", legacy_table="Directories")
+        raise AssertionError("Expected ValueError")
+    except ValueError:
+        pass
+    assert [row[1] for row in connection.execute("PRAGMA database_list")] == ["main"]
+    print("✅ Auto field schema migrated")
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Test script voor library_diff.py (app2)."""
+
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+# Add app2 directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app2"))
+
+from federated_catalog import CatalogRegistry, FederatedCatalog  # noqa: E402
+from library_diff import DiffSource, LibraryDiff, resolve_source  # noqa: E402
+from read_pool import ReadPool  # noqa: E402
+
+
+def _create_catalog(path: Path, rows: list[tuple[str, str | None]]) -> None:
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE Media (id INTEGER PRIMARY KEY, YAPMO_FQPN TEXT UNIQUE NOT NULL, YAPMO_hash TEXT)")
+    connection.executemany("INSERT INTO Media (YAPMO_FQPN, YAPMO_hash) VALUES (?, ?)", rows)
+    connection.commit()
+    connection.close()
+
+
+def test_library_diff_categories(tmp_path):
+    """Test missing, moved, mismatch, unverified en extra binnen een catalogus."""
+    print("=== Testing Library Diff Categories ===")
+    _create_catalog(tmp_path / "catalog.db", [
+        ("/photos/a.jpg", "h_a"),
+        ("/photos/2019/b.jpg", "h_b"),
+        ("/photos/2019/c.jpg", "h_c"),
+        ("/photos/d.jpg", "h_d"),
+        ("/photos/e.jpg", "hash_error_1700000000"),
+        ("/photos/f.jpg", "h_f"),
+        ("/photos0/other.jpg", "h_x"),
+        ("/backup/photos/a.jpg", "h_a"),
+        ("/backup/photos/2019/b.jpg", "h_b_corrupt"),
+        ("/backup/photos/renamed/c.jpg", "h_c"),
+        ("/backup/photos/e.jpg", "h_e"),
+        ("/backup/photos/f.jpg", "h_f"),
+        ("/backup/photos/old.jpg", "h_old"),
+    ])
+
+    pool = ReadPool(tmp_path / "catalog.db", size=1)
+    with pool.connection() as connection:
+        diff = LibraryDiff(connection, "Media", DiffSource("/photos/"), DiffSource("/backup/photos"), batch_size=2)
+        entries = {(entry.kind, entry.path): entry for entry in diff.entries()}
+        assert set(entries) == {
+            ("missing", "d.jpg"),
+            ("moved", "2019/c.jpg"),
+            ("mismatch", "2019/b.jpg"),
+            ("unverified", "e.jpg"),
+            ("extra", "old.jpg"),
+        }
+        assert entries["moved", "2019/c.jpg"].other_path == "renamed/c.jpg"
+        assert entries["mismatch", "2019/b.jpg"].backup_hash == "h_b_corrupt"
+
+        summary = diff.write(tmp_path / "report.jsonl")
+        assert (summary.source_files, summary.backup_files, summary.matched) == (6, 6, 2)
+        assert summary.counts == {"missing": 1, "moved": 1, "mismatch": 1, "unverified": 1, "extra": 1}
+        assert not summary.complete
+        lines = [json.loads(line) for line in (tmp_path / "report.jsonl").read_text().splitlines()]
+        assert lines[1] == {
+            "kind": "missing", "path": "d.jpg", "source_hash": "h_d", "backup_hash": None, "other_path": None,
+        }
+        assert [line["kind"] for line in lines] == ["moved", "missing", "mismatch", "unverified", "extra"]
+
+        diff.close()
+        assert connection.execute("SELECT count(*) FROM sqlite_temp_master").fetchone()[0] == 0
+        # Connectie blijft read-only voor de catalogus
+        try:
+            connection.execute("DELETE FROM Media")
+            raise AssertionError("Expected read-only connection")
+        except sqlite3.OperationalError:
+            pass
+    pool.close()
+    print("✅ Diff categories reported")
+
+
+def test_library_diff_across_volumes(tmp_path):
+    """Test een backup in een eigen volume catalogus (federatie)."""
+    print("\n=== Testing Library Diff Across Volumes ===")
+    files = [f"{index:05d}.jpg" for index in range(3000)]
+    _create_catalog(tmp_path / "main.db", [(f"/photos/{name}", f"h{name}") for name in files])
+    (tmp_path / "backup").mkdir()
+    registry = CatalogRegistry(tmp_path / "catalogs")
+    volume = registry.register(tmp_path / "backup")
+    backup_root = str(tmp_path / "backup")
+    _create_catalog(volume.db_path, [(f"{backup_root}/{name}", f"h{name}") for name in files[:-1]])
+
+    pool = ReadPool(tmp_path / "main.db", size=1)
+    federation = FederatedCatalog(pool, registry, "Media")
+    with federation.connection() as connection:
+        source = resolve_source(connection, "/photos", registry)
+        backup = resolve_source(connection, backup_root, registry)
+        assert (source.schema, backup.schema) == ("main", volume.alias)
+        diff = LibraryDiff(connection, "Media", source, backup)
+        summary = diff.summary()
+        diff.close()
+    assert summary.matched == 2999
+    assert summary.counts["missing"] == 1
+    assert sum(summary.counts.values()) == 1
+    pool.close()
+    print("✅ Diff across volume catalogs")
+
+
+def test_library_diff_unindexed_root(tmp_path):
+    """Test dat een root zonder rijen gemeld wordt in plaats van als compleet te gelden."""
+    print("\n=== Testing Library Diff Unindexed Root ===")
+    _create_catalog(tmp_path / "catalog.db", [("/backup/photos/a.jpg", "h_a")])
+
+    pool = ReadPool(tmp_path / "catalog.db", size=1)
+    with pool.connection() as connection:
+        diff = LibraryDiff(connection, "Media", DiffSource("/photos"), DiffSource("/backup/photos"))
+        summary = diff.write(tmp_path / "report.jsonl")
+        diff.close()
+    assert summary.unindexed == ["/photos"]
+    assert summary.source_files == 0
+    assert not summary.complete
+    lines = [json.loads(line) for line in (tmp_path / "report.jsonl").read_text().splitlines()]
+    assert lines[0] == {
+        "kind": "unindexed", "path": "/photos", "source_hash": None, "backup_hash": None, "other_path": None,
+    }
+    assert [line["kind"] for line in lines] == ["unindexed", "extra"]
+    pool.close()
+    print("✅ Unindexed root reported")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Test script voor library_export.py (app2)."""
+
+import csv
+import gzip
+import io
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add app2 directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app2"))
+
+from library_export import LibraryExport, chunk_bytes, csv_lines, jsonl_lines  # noqa: E402
+from read_pool import ReadPool  # noqa: E402
+from search_query import SearchCompiler, SearchSyntaxError  # noqa: E402
+
+
+@pytest.fixture
+def pool(tmp_path):
+    """Read pool op een database met 3000 media rijen."""
+    connection = sqlite3.connect(str(tmp_path / "media.db"))
+    connection.execute(
+        "CREATE TABLE Media (id INTEGER PRIMARY KEY, YAPMO_FQPN TEXT, YAPMO_FILE_Type TEXT, "
+        "EXIF_Model TEXT, thumb BLOB)",
+    )
+    connection.executemany(
+        "INSERT INTO Media (YAPMO_FQPN, YAPMO_FILE_Type, EXIF_Model, thumb) VALUES (?, ?, ?, ?)",
+        [
+            (f"/P/{index:04d}.jpg", "video" if index % 3 == 0 else "image", 'Model "A", 1', b"\xff")
+            for index in range(3000)
+        ],
+    )
+    connection.commit()
+    connection.close()
+    read_pool = ReadPool(tmp_path / "media.db", size=1)
+    yield read_pool
+    read_pool.close()
+
+
+def test_lines_and_chunks():
+    """Test JSONL/CSV regels en het bundelen in (gzip) blokken."""
+    print("=== Testing Export Lines ===")
+    rows = [(1, 'a "b", c', b"\x00"), (2, None, None)]
+    assert list(jsonl_lines(["id", "name", "blob"], rows)) == [
+        '{"id": 1, "name": "a \\"b\\", c", "blob": "AA=="}\n',
+        '{"id": 2, "name": null, "blob": null}\n',
+    ]
+    text = "".join(csv_lines(["id", "name", "blob"], rows))
+    assert list(csv.reader(io.StringIO(text))) == [["id", "name", "blob"], ["1", 'a "b", c', "AA=="], ["2", "", ""]]
+
+    lines = [f"{index:09d}\n" for index in range(1000)]
+    blocks = list(chunk_bytes(lines, 1000))
+    assert len(blocks) == 10
+    assert all(len(block) == 1000 for block in blocks)
+    assert gzip.decompress(b"".join(chunk_bytes(lines, 1000, compress=True))) == "".join(lines).encode()
+    print("✅ Export lines correct")
+
+
+def test_export_search_and_sql(pool, tmp_path):
+    """Test export van een zoekopdracht met projectie en van vrije SQL."""
+    print("\n=== Testing Library Export ===")
+    compiler = SearchCompiler("Media")
+    export = LibraryExport.from_search(
+        pool, compiler, "type:video", "csv.gz", ["YAPMO_FQPN", "EXIF_Model"], batch_size=100, chunk_size=4096,
+    )
+    assert export.media_type == "application/gzip"
+    assert export.filename() == "yapmo_export.csv.gz"
+    target = tmp_path / "videos.csv.gz"
+    assert export.write(target) == 1000
+    with gzip.open(target, "rt", encoding="utf-8", newline="") as handle:
+        records = list(csv.reader(handle))
+    assert records[0] == ["YAPMO_FQPN", "EXIF_Model"]
+    assert records[1] == ["/P/0000.jpg", 'Model "A", 1']
+    assert len(records) == 1001
+    assert not (tmp_path / "videos.csv.gz.partial").exists()
+
+    # Zonder projectie alle kolommen, in blokken gestreamd
+    export = LibraryExport.from_search(pool, compiler, "", "jsonl", chunk_size=4096)
+    blocks = list(export.iter_bytes())
+    assert len(blocks) > 10
+    records = [json.loads(line) for line in b"".join(blocks).decode().splitlines()]
+    assert len(records) == export.rows == 3000
+    assert set(records[0]) == {"id", "YAPMO_FQPN", "YAPMO_FILE_Type", "EXIF_Model", "thumb"}
+
+    export = LibraryExport(pool, "SELECT count(*) AS n FROM Media;", fmt="jsonl")
+    assert b"".join(export.iter_bytes()) == b'{"n": 3000}\n'
+
+    with pytest.raises(ValueError, match="Unknown export format"):
+        LibraryExport(pool, "SELECT 1", fmt="xml")
+    with pytest.raises(ValueError, match="can be exported"):
+        LibraryExport(pool, "DELETE FROM Media")
+    with pytest.raises(SearchSyntaxError, match="Unknown column"):
+        LibraryExport.from_search(pool, compiler, "", "csv", ["nope"])
+    print("✅ Library export works")
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Test script voor library_stats.py (app2)."""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+# Add app2 directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app2"))
+
+from library_stats import LibraryStats, month_key  # noqa: E402
+
+UPSERT_SQL = (
+    "INSERT INTO Media (YAPMO_FQPN, YAPMO_FILE_Type, EXIF_DateTimeOriginal, EXIF_Model, "
+    "YAPMO_FILE_Path, YAPMO_FILE_Size) VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(YAPMO_FQPN) DO UPDATE SET EXIF_Model = excluded.EXIF_Model, "
+    "YAPMO_FILE_Size = excluded.YAPMO_FILE_Size"
+)
+
+
+def _write(stats: LibraryStats, rows: list[tuple]) -> None:
+    """Upsert rijen zoals de writer: oude bijdrage eraf, nieuwe erbij."""
+    fqpns = [row[0] for row in rows]
+    old_rows = stats.collect(fqpns)
+    stats.connection.executemany(UPSERT_SQL, rows)
+    stats.apply_change(old_rows, stats.collect(fqpns))
+
+
+def test_month_key():
+    """Test jaar-maand keys."""
+    print("=== Testing Month Key ===")
+    assert month_key(0) == "1970-01"
+    assert month_key(None) == "unknown"
+    assert month_key("2019-06-01") == "unknown"
+    print("✅ Month keys correct")
+
+
+def test_incremental_updates_match_rebuild():
+    """Test dat delta updates gelijk zijn aan een volledige herberekening."""
+    print("\n=== Testing Incremental Stats ===")
+    connection = sqlite3.connect(":memory:")
+    connection.execute(
+        "CREATE TABLE Media (id INTEGER PRIMARY KEY, YAPMO_FQPN TEXT UNIQUE, YAPMO_FILE_Type TEXT, "
+        "EXIF_DateTimeOriginal INTEGER, EXIF_Model TEXT, YAPMO_FILE_Path TEXT, YAPMO_FILE_Size INTEGER)",
+    )
+    stats = LibraryStats(connection, "Media", "Library_Stats", date_fields=["EXIF_DateTimeOriginal"])
+    stats.create()
+
+    june_2019 = 1559390400
+    _write(stats, [
+        ("/P/a.jpg", "image", june_2019, "X100", "/P", 100),
+        ("/P/2019/b.jpg", "image", june_2019, "X100", "/P/2019", 200),
+        ("/P/2019/c.mp4", "video", None, None, "/P/2019", 1000),
+    ])
+    _write(stats, [("/P/a.jpg", "image", june_2019, "Pixel", "/P", 150)])
+
+    assert stats.get("library") == (3, 1350)
+    assert stats.get("directory", "/P") == (3, 1350)
+    assert stats.get("directory", "/P/2019") == (2, 1200)
+    assert stats.counter("camera") == {"X100": 1, "Pixel": 1, "unknown": 1}
+    assert stats.get_dimension("month") == [("2019-06", 2, 350), ("unknown", 1, 1000)]
+    assert dict(stats.counter("type")) == {"image": 2, "video": 1}
+
+    incremental = connection.execute("SELECT * FROM Library_Stats ORDER BY 1, 2").fetchall()
+    stats.rebuild()
+    assert connection.execute("SELECT * FROM Library_Stats ORDER BY 1, 2").fetchall() == incremental
+    print("✅ Incremental stats match rebuild")
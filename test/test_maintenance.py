@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Test script voor maintenance.py (app2)."""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+# Add app2 directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app2"))
+
+from maintenance import MaintenanceService, enable_incremental_vacuum, stale_tables  # noqa: E402
+from query_cache import WriteGeneration  # noqa: E402
+
+
+def _create_database(path: Path, rows: int) -> sqlite3.Connection:
+    connection = sqlite3.connect(path)
+    assert enable_incremental_vacuum(connection)
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA wal_autocheckpoint = 0")
+    connection.execute("CREATE TABLE Media (id INTEGER PRIMARY KEY, camera TEXT, data BLOB)")
+    connection.execute("CREATE INDEX idx_camera ON Media(camera)")
+    connection.execute("CREATE TABLE Empty (id INTEGER PRIMARY KEY)")
+    connection.executemany(
+        "INSERT INTO Media (camera, data) VALUES (?, ?)",
+        [(f"cam{index % 7}", b"x" * 500) for index in range(rows)],
+    )
+    connection.commit()
+    return connection
+
+
+def test_maintenance_round(tmp_path):
+    """Test ANALYZE, checkpoint en incremental vacuum in een ronde."""
+    print("=== Testing Maintenance Round ===")
+    writer = _create_database(tmp_path / "catalog.db", 3000)
+    assert stale_tables(writer) == ["Media"]
+    writer.execute("DELETE FROM Media WHERE id > 1000")
+    writer.commit()
+
+    service = MaintenanceService(tmp_path / "catalog.db", step_budget=5, wal_threshold_mb=0.01, vacuum_pages=50)
+    connection = sqlite3.connect(tmp_path / "catalog.db")
+    steps = {step.name: step for step in service.run_once(connection)}
+    assert steps["analyze"].detail == "analyzed Media"
+    assert steps["checkpoint"].completed
+    assert (tmp_path / "catalog.db-wal").stat().st_size == 0
+    assert steps["incremental_vacuum"].completed
+    assert connection.execute("PRAGMA freelist_count").fetchone()[0] == 0
+    assert stale_tables(connection) == []
+
+    # Niets gewijzigd: geen stappen meer nodig
+    assert service.run_once(connection) == []
+    connection.close()
+    writer.close()
+    print("✅ Maintenance round complete")
+
+
+def test_idle_and_time_budget(tmp_path):
+    """Test idle detectie en het afbreken van ANALYZE op het tijdsbudget."""
+    print("\n=== Testing Idle And Budget ===")
+    writer = _create_database(tmp_path / "catalog.db", 30000)
+    generation = WriteGeneration()
+    processing = [False]
+    service = MaintenanceService(
+        tmp_path / "catalog.db",
+        idle_seconds=0,
+        step_budget=0,
+        wal_threshold_mb=1024,
+        pause_callback=lambda: processing[0],
+        generation=generation,
+    )
+    assert service.is_idle()
+    processing[0] = True
+    assert not service.is_idle()
+    processing[0] = False
+    service.idle_seconds = 3600
+    generation.bump()
+    assert not service.is_idle()
+
+    steps = service.run_once(writer)
+    assert [(step.name, step.completed) for step in steps] == [("analyze", False)]
+    assert "interrupted" in steps[0].detail
+    # Afgebroken ronde wordt de volgende keer opnieuw geprobeerd
+    service.step_budget = 5
+    assert service.run_once(writer)[0].completed
+    writer.close()
+    print("✅ Idle detection and time budget work")
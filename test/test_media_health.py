@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Test script voor media_health.py (app2)."""
+
+import struct
+import sys
+import tempfile
+from pathlib import Path
+
+# Add app2 directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app2"))
+
+from media_health import (  # noqa: E402
+    HEALTH_CORRUPT,
+    HEALTH_EMPTY,
+    HEALTH_OK,
+    HEALTH_TRUNCATED,
+    HEALTH_UNSUPPORTED,
+    check_media_health,
+)
+
+
+def _check(data: bytes, suffix: str) -> str:
+    with tempfile.TemporaryDirectory() as temp:
+        path = Path(temp) / f"file{suffix}"
+        path.write_bytes(data)
+        return check_media_health(path)
+
+
+def _atom(atom_type: bytes, payload: bytes = b"") -> bytes:
+    return struct.pack(">I", 8 + len(payload)) + atom_type + payload
+
+
+def test_jpeg_and_png():
+    """Test SOI/EOI en IEND detectie."""
+    print("=== Testing JPEG/PNG Health ===")
+    jpeg = b"\xff\xd8\xff\xe0" + b"\x00" * 100 + b"\xff\xd9"
+    assert _check(jpeg, ".jpg") == HEALTH_OK
+    assert _check(jpeg + b"\x00" * 10, ".jpg") == HEALTH_OK
+    assert _check(jpeg + b"\xff" * 3, ".jpg") == HEALTH_OK
+    # EOI van een embedded thumbnail, daarna afgebroken scan data
+    assert _check(jpeg + b"\x12\x34" * 50, ".jpg") == HEALTH_TRUNCATED
+    assert _check(jpeg[:60], ".jpg") == HEALTH_TRUNCATED
+    assert _check(b"GIF89a" + jpeg, ".jpg") == HEALTH_CORRUPT
+    assert _check(b"", ".jpg") == HEALTH_EMPTY
+
+    png = b"\x89PNG\r\n\x1a\n" + b"\x00" * 50 + b"\x00\x00\x00\x00IEND\xaeB`\x82"
+    assert _check(png, ".png") == HEALTH_OK
+    assert _check(png[:40], ".png") == HEALTH_TRUNCATED
+    assert _check(b"data", ".arw") == HEALTH_UNSUPPORTED
+    print("✅ JPEG/PNG markers checked")
+
+
+def test_mp4_atom_chain():
+    """Test MP4 top-level atom keten."""
+    print("\n=== Testing MP4 Health ===")
+    mp4 = _atom(b"ftyp", b"isom") + _atom(b"mdat", b"x" * 200) + _atom(b"moov", b"m" * 20)
+    assert _check(mp4, ".mp4") == HEALTH_OK
+    assert _check(mp4[:-5], ".mp4") == HEALTH_TRUNCATED
+
+    # Afgebroken kopie met moov achteraan: moov ontbreekt
+    no_moov = _atom(b"ftyp", b"isom") + _atom(b"mdat", b"x" * 200)
+    assert _check(no_moov, ".mp4") == HEALTH_TRUNCATED
+
+    # 64-bit size en size 0 (tot EOF)
+    large = struct.pack(">I", 1) + b"mdat" + struct.pack(">Q", 16 + 10) + b"x" * 10
+    assert _check(_atom(b"moov") + large, ".mov") == HEALTH_OK
+    assert _check(_atom(b"moov") + struct.pack(">I", 0) + b"mdat" + b"x", ".mp4") == HEALTH_OK
+
+    assert _check(_atom(b"ftyp") + b"\x00\x00\x00\x10\x00\x01\x02\x03", ".mp4") == HEALTH_CORRUPT
+    print("✅ MP4 atom chain checked")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Test script voor metadata_blob.py (app2)."""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+# Add app2 directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app2"))
+
+from metadata_blob import (  # noqa: E402
+    RawMetadataStore,
+    compress_metadata,
+    decompress_metadata,
+    json_path,
+    register_functions,
+)
+
+SAMPLE = {
+    "SourceFile": "/P/a.jpg",
+    "EXIF:Model": "X100V",
+    "EXIF:DateTimeOriginal": "2019:06:01 12:00:00",
+    "XMP:Subject": ["Italië", "Rome"],
+}
+
+
+def test_roundtrip_and_json1():
+    """Test compressie roundtrip en JSON1 projecties op de BLOB."""
+    print("=== Testing Compression Roundtrip ===")
+    blob = compress_metadata(SAMPLE)
+    assert blob[0] == 1
+    assert decompress_metadata(blob) == SAMPLE
+    assert decompress_metadata(None) is None
+    assert json_path("EXIF:Model") == '$."EXIF:Model"'
+
+    connection = sqlite3.connect(":memory:")
+    register_functions(connection)
+    row = connection.execute(
+        "SELECT json_extract(yapmo_raw_json(?), ?), json_extract(yapmo_raw_json(?), ?)",
+        (blob, json_path("EXIF:Model"), blob, '$."XMP:Subject"[0]'),
+    ).fetchone()
+    assert row == ("X100V", "Italië")
+    print("✅ Roundtrip and JSON1 work")
+
+
+def test_backfill_column():
+    """Test het vullen van een nieuwe getypeerde kolom vanuit de opgeslagen JSON."""
+    print("\n=== Testing Backfill ===")
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE Media (id INTEGER PRIMARY KEY, YAPMO_FQPN TEXT UNIQUE)")
+    connection.executemany(
+        "INSERT INTO Media (YAPMO_FQPN) VALUES (?)", [("/P/a.jpg",), ("/P/b.jpg",), ("/P/c.jpg",)],
+    )
+    store = RawMetadataStore(connection, "Media", "Media_Raw")
+    store.create()
+    store.store([("/P/a.jpg", SAMPLE), ("/P/b.jpg", {"EXIF:Model": "Pixel"}), ("/P/missing.jpg", SAMPLE)])
+    assert connection.execute("SELECT count(*) FROM Media_Raw").fetchone()[0] == 2
+    assert store.load("/P/a.jpg") == SAMPLE
+    assert store.load("/P/c.jpg") is None
+
+    connection.execute("ALTER TABLE Media ADD COLUMN EXIF_Model TEXT")
+    connection.execute("ALTER TABLE Media ADD COLUMN EXIF_DateTimeOriginal INTEGER")
+    assert store.backfill_column("EXIF_Model", "EXIF:Model") == 2
+    assert store.backfill_column("EXIF_DateTimeOriginal", "EXIF:DateTimeOriginal", "EPOCH") == 2
+    rows = connection.execute(
+        "SELECT YAPMO_FQPN, EXIF_Model, EXIF_DateTimeOriginal FROM Media ORDER BY id",
+    ).fetchall()
+    assert rows == [
+        ("/P/a.jpg", "X100V", 1559390400),
+        ("/P/b.jpg", "Pixel", None),
+        ("/P/c.jpg", None, None),
+    ]
+    print("✅ Backfill from raw metadata works")
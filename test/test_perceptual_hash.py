@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Test script voor perceptual_hash.py (app2)."""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+# Add app2 directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app2"))
+
+from perceptual_hash import (  # noqa: E402
+    BKTree,
+    PerceptualIndex,
+    dhash_from_pixels,
+    format_hash,
+    hamming_distance,
+    parse_hash,
+)
+
+
+def test_dhash_from_pixels():
+    """Test dHash bits: helderder dan linker buur = 1."""
+    print("=== Testing dHash From Pixels ===")
+
+    # 9x8 gradient: elke pixel helderder dan zijn linker buur -> alle bits 1
+    gradient = [col * 10 for _row in range(8) for col in range(9)]
+    assert dhash_from_pixels(gradient, 9, 8) == (1 << 64) - 1
+
+    # Omgekeerde gradient -> alle bits 0
+    reverse = [(8 - col) * 10 for _row in range(8) for col in range(9)]
+    assert dhash_from_pixels(reverse, 9, 8) == 0
+    print("✅ dHash bits correct")
+
+
+def test_hash_format_roundtrip():
+    """Test hex formattering van 64-bit hashes."""
+    print("\n=== Testing Hash Format ===")
+    value = 0x00FF00FF00FF00FF
+    text = format_hash(value)
+    assert len(text) == 16
+    assert parse_hash(text) == value
+    assert hamming_distance(value, value ^ 0b1011) == 3
+    print("✅ Hash format roundtrip correct")
+
+
+def test_bktree_search():
+    """Test BK-tree zoeken binnen Hamming-afstand."""
+    print("\n=== Testing BK-tree Search ===")
+    tree = BKTree()
+    base = 0x0123456789ABCDEF
+    tree.add(base, "original.jpg")
+    tree.add(base, "exact_copy.jpg")
+    tree.add(base ^ 0b11, "resized.jpg")
+    tree.add(base ^ 0xFFFF, "other.jpg")
+
+    matches = tree.search(base, 2)
+    found = {item for _distance, item in matches}
+    assert found == {"original.jpg", "exact_copy.jpg", "resized.jpg"}
+    assert matches[-1] == (2, "resized.jpg")
+    assert len(tree) == 4
+    assert BKTree().search(base, 5) == []
+    print("✅ BK-tree search correct")
+
+
+def test_perceptual_index_from_database():
+    """Test index opbouw uit Media tabel en duplicate groepen."""
+    print("\n=== Testing PerceptualIndex From Database ===")
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE Media (YAPMO_FQPN TEXT, YAPMO_phash TEXT)")
+    connection.executemany(
+        "INSERT INTO Media VALUES (?, ?)",
+        [
+            ("/a.jpg", format_hash(0xF0F0F0F0F0F0F0F0)),
+            ("/a_whatsapp.jpg", format_hash(0xF0F0F0F0F0F0F0F1)),
+            ("/b.jpg", format_hash(0x0F0F0F0F0F0F0F0F)),
+            ("/video.mp4", None),
+        ],
+    )
+
+    index = PerceptualIndex.from_database(connection, "Media")
+    assert len(index.tree) == 3
+
+    near = index.find_near_duplicates(format_hash(0xF0F0F0F0F0F0F0F0), 4)
+    assert [item for _distance, item in near] == ["/a.jpg", "/a_whatsapp.jpg"]
+
+    groups = index.find_duplicate_groups(4)
+    assert [sorted(group) for group in groups] == [["/a.jpg", "/a_whatsapp.jpg"]]
+    print("✅ PerceptualIndex correct")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Test script voor query_cache.py (app2)."""
+
+import sys
+from pathlib import Path
+
+# Add app2 directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app2"))
+
+from query_cache import QueryCache, WriteGeneration, estimate_size, normalize_sql  # noqa: E402
+
+
+def test_generation_invalidates():
+    """Test hits binnen een generatie en misses na een commit."""
+    print("=== Testing Write Generation ===")
+    generation = WriteGeneration()
+    cache = QueryCache(generation=generation)
+    calls = []
+
+    def compute() -> list[tuple]:
+        calls.append(1)
+        return [(len(calls),)]
+
+    assert normalize_sql("SELECT *\n  FROM Media ;") == "SELECT * FROM Media"
+    # Witruimte in literals en na regelcommentaar is betekenisvol
+    assert normalize_sql("SELECT  'a  b' ,\"x  y\"") == "SELECT 'a  b' ,\"x  y\""
+    assert normalize_sql("SELECT 'it''s  ok'") == "SELECT 'it''s  ok'"
+    assert normalize_sql("SELECT 1 -- c\nFROM t") != normalize_sql("SELECT 1 -- c FROM t")
+    assert cache.get_or_compute("SELECT * FROM Media", (), compute) == [(1,)]
+    assert cache.get_or_compute("SELECT  *  FROM Media;", [], compute) == [(1,)]
+    assert cache.get_or_compute("SELECT * FROM Media", (5,), compute) == [(2,)]
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    generation.bump()
+    assert cache.get("SELECT * FROM Media") == (False, None)
+    assert cache.get_or_compute("SELECT * FROM Media", (), compute) == [(3,)]
+
+    # Zelfde query op een andere database (federatie view): eigen entry
+    assert cache.get_or_compute("SELECT * FROM Media", (), compute, scope="main.db#AllMedia") == [(4,)]
+    assert cache.get("SELECT * FROM Media", scope="main.db#AllMedia") == (True, [(4,)])
+
+    # Commit tijdens de berekening: resultaat wordt niet bewaard
+    stale = cache.generation.value
+    generation.bump()
+    cache.put("SELECT 1", (), [(1,)], stale)
+    assert cache.get("SELECT 1") == (False, None)
+    print("✅ Generation invalidates cached results")
+
+
+def test_byte_budget_eviction():
+    """Test LRU eviction binnen het byte budget."""
+    print("\n=== Testing Byte Budget ===")
+    rows = [(index, f"/P/{index}.jpg") for index in range(10)]
+    size = estimate_size(rows)
+    cache = QueryCache(max_bytes=size * 2 + 1, generation=WriteGeneration())
+    cache.put("q1", (), rows)
+    cache.put("q2", (), rows)
+    assert cache.get("q1")[0]  # q1 is nu recent gebruikt
+    cache.put("q3", (), rows)
+    assert cache.get("q2") == (False, None)
+    assert cache.get("q1")[0]
+    assert cache.get("q3")[0]
+    assert cache.evictions == 1
+    assert cache.size <= cache.max_bytes
+
+    cache.put("huge", (), rows * 10)
+    assert cache.get("huge") == (False, None)
+    assert cache.get("q3")[0]
+    print("✅ Budget respected with LRU eviction")
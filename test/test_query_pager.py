@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Test script voor query_pager.py (app2)."""
+
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Add app2 directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app2"))
+
+from query_pager import QueryInterruptedError, QueryPager, is_read_query  # noqa: E402
+from read_pool import ReadPool  # noqa: E402
+
+
+@pytest.fixture
+def pool(tmp_path):
+    """Read pool op een database met 250 media rijen."""
+    connection = sqlite3.connect(str(tmp_path / "media.db"))
+    connection.execute("CREATE TABLE Media (id INTEGER PRIMARY KEY, YAPMO_FQPN TEXT, data BLOB)")
+    connection.executemany(
+        "INSERT INTO Media (YAPMO_FQPN, data) VALUES (?, ?)",
+        [(f"/P/{index:03d}.jpg", b"\x00\x01") for index in range(250)],
+    )
+    connection.commit()
+    connection.close()
+    read_pool = ReadPool(tmp_path / "media.db", size=2)
+    yield read_pool
+    read_pool.close()
+
+
+def test_pages_and_lazy_count(pool):
+    """Test blokken rijen, de laatste rij index en de telling."""
+    print("=== Testing Query Pages ===")
+    assert is_read_query("-- browse\n  with x AS (SELECT 1) SELECT * FROM x")
+    assert not is_read_query("DELETE FROM Media")
+    with pytest.raises(ValueError, match="Only SELECT"):
+        QueryPager(pool, "UPDATE Media SET data = NULL")
+
+    pager = QueryPager(pool, "SELECT id, YAPMO_FQPN FROM Media ORDER BY id DESC;")
+    assert pager.columns() == ["id", "YAPMO_FQPN"]
+    rows = pager.fetch(100, 200)
+    assert rows[0] == (150, "/P/149.jpg")
+    assert pager.last_row(100, 200, rows) == -1
+    rows = pager.fetch(200, 300)
+    assert len(rows) == 50
+    assert pager.last_row(200, 300, rows) == 250
+    assert pager.total is None
+    assert pager.count() == 250
+    assert sum(1 for _row in pager.iter_rows(batch_size=64)) == 250
+    print("✅ Pages and count work")
+
+
+def test_cancel_count(pool):
+    """Test het annuleren van een telling die nooit eindigt."""
+    print("\n=== Testing Cancel Count ===")
+    pager = QueryPager(
+        pool, "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n) SELECT x FROM n",
+    )
+    assert pager.fetch(0, 3) == [(1,), (2,), (3,)]
+    result: list[int | None] = []
+    counter = threading.Thread(target=lambda: result.append(pager.count()))
+    counter.start()
+    time.sleep(0.2)
+    pager.cancel()
+    counter.join(5.0)
+    assert not counter.is_alive()
+    assert result == [None]
+    assert pool.execute("SELECT count(*) FROM Media") == [(250,)]
+    print("✅ Count cancelled")
+
+
+def test_timeout_and_plan(pool):
+    """Test de timeout, timing statistieken en EXPLAIN QUERY PLAN."""
+    print("\n=== Testing Timeout And Plan ===")
+    pager = QueryPager(
+        pool, "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n) SELECT x FROM n",
+        timeout=0.1,
+    )
+    with pytest.raises(QueryInterruptedError, match="timed out"):
+        pager.fetch(0, 10**12)
+    assert pager.last_stats.interrupted == "timeout"
+    assert pager.last_stats.vm_steps > 0
+
+    pager = QueryPager(pool, "SELECT * FROM Media WHERE YAPMO_FQPN = '/P/001.jpg'")
+    assert pager.fetch(0, 10)[0][1] == "/P/001.jpg"
+    assert "1 rows" in pager.last_stats.summary()
+    assert "SCAN Media" in pager.explain()
+    print("✅ Timeout and plan work")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Test script voor read_pool.py (app2)."""
+
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add app2 directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app2"))
+
+from read_pool import ReadPool, enable_wal  # noqa: E402
+
+
+def _create_database(db_path: Path) -> sqlite3.Connection:
+    writer = sqlite3.connect(str(db_path), check_same_thread=False)
+    assert enable_wal(writer) == "wal"
+    writer.execute("CREATE TABLE Media (id INTEGER PRIMARY KEY, YAPMO_FQPN TEXT)")
+    writer.execute("INSERT INTO Media (YAPMO_FQPN) VALUES ('/P/a.jpg')")
+    writer.commit()
+    return writer
+
+
+def test_read_only_connections(tmp_path):
+    """Test query_only, hergebruik en de maximale pool grootte."""
+    print("=== Testing Read Only Pool ===")
+    writer = _create_database(tmp_path / "media.db")
+    pool = ReadPool(tmp_path / "media.db", size=2, mmap_size=1 << 20)
+
+    with pool.connection() as first:
+        assert first.execute("PRAGMA query_only").fetchone()[0] == 1
+        assert first.execute("PRAGMA mmap_size").fetchone()[0] == 1 << 20
+        with pytest.raises(sqlite3.OperationalError):
+            first.execute("DELETE FROM Media")
+    with pool.connection() as again:
+        assert again is first
+
+    with pool.connection() as a, pool.connection() as b:
+        assert a is not b
+        waiter = threading.Thread(target=lambda: pool.execute("SELECT 1"))
+        waiter.start()
+        waiter.join(0.2)
+        assert waiter.is_alive()  # pool vol: wacht op een vrije connectie
+    waiter.join(1.0)
+    assert not waiter.is_alive()
+
+    pool.close()
+    writer.close()
+    print("✅ Read only pool works")
+
+
+def test_reads_during_write_transaction(tmp_path):
+    """Test dat readers een snapshot zien terwijl de writer een open transactie heeft."""
+    print("\n=== Testing Reads During Write ===")
+    writer = _create_database(tmp_path / "media.db")
+    pool = ReadPool(tmp_path / "media.db")
+
+    writer.execute("INSERT INTO Media (YAPMO_FQPN) VALUES ('/P/b.jpg')")
+    assert writer.in_transaction
+    assert pool.execute("SELECT count(*) FROM Media") == [(1,)]
+    writer.commit()
+    assert pool.execute("SELECT count(*) FROM Media") == [(2,)]
+
+    pool.close()
+    writer.close()
+    print("✅ Readers are not blocked by the writer")
+
+
+def test_reset_for_replaced_database(tmp_path):
+    """Test dat reset alle connecties sluit en de pool het nieuwe bestand leest."""
+    print("\n=== Testing Pool Reset ===")
+    db_path = tmp_path / "media.db"
+    writer = _create_database(db_path)
+    pool = ReadPool(db_path, size=2)
+    with pool.connection() as borrowed:
+        with pool.connection() as idle:
+            pass
+        pool.reset()
+        # Vrije connectie is direct gesloten
+        with pytest.raises(sqlite3.ProgrammingError):
+            idle.execute("SELECT 1")
+    # Geleende connectie sluit bij teruggave
+    with pytest.raises(sqlite3.ProgrammingError):
+        borrowed.execute("SELECT 1")
+
+    writer.close()
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+    writer = _create_database(db_path)
+    writer.execute("INSERT INTO Media (YAPMO_FQPN) VALUES ('/P/new.jpg')")
+    writer.commit()
+    assert pool.execute("SELECT count(*) FROM Media") == [(2,)]
+    assert not pool.closed
+
+    pool.close()
+    writer.close()
+    print("✅ Reset pool reads the new database")
+
+
+def test_waiters_wake_on_reset_and_close(tmp_path):
+    """Test dat wachtende threads niet blijven hangen na reset of close."""
+    print("\n=== Testing Pool Waiters ===")
+    writer = _create_database(tmp_path / "media.db")
+    pool = ReadPool(tmp_path / "media.db", size=1)
+    results: list[object] = []
+
+    def wait_for_connection() -> None:
+        try:
+            results.append(pool.execute("SELECT count(*) FROM Media"))
+        except sqlite3.ProgrammingError as e:
+            results.append(e)
+
+    # Reset terwijl de enige connectie geleend is: de waiter opent een nieuwe
+    with pool.connection():
+        waiter = threading.Thread(target=wait_for_connection)
+        waiter.start()
+        waiter.join(0.2)
+        assert waiter.is_alive()
+        pool.reset()
+    waiter.join(1.0)
+    assert not waiter.is_alive()
+    assert results == [[(1,)]]
+
+    # Close terwijl een thread wacht: de waiter krijgt een fout
+    with pool.connection():
+        waiter = threading.Thread(target=wait_for_connection)
+        waiter.start()
+        waiter.join(0.2)
+        pool.close()
+        waiter.join(1.0)
+        assert not waiter.is_alive()
+    assert isinstance(results[-1], sqlite3.ProgrammingError)
+
+    writer.close()
+    print("✅ Waiters wake after reset and close")
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Test script voor run_spool.py (app2)."""
+
+import json
+import sys
+from pathlib import Path
+
+# Add app2 directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app2"))
+
+from run_spool import (  # noqa: E402
+    STATUS_ABORTED,
+    STATUS_COMPLETE,
+    ProcessingRun,
+    ResultSpool,
+    RunManifest,
+)
+
+
+def _result(name: str, status: str = "OK") -> dict:
+    return {"YAPMO:FQPN": f"/P/{name}", "YAPMO:ProcessingStatus": status, "YAPMO:Thumb": b"\x00\xff"}
+
+
+def test_spool_torn_line(tmp_path):
+    """Test lezen van een spool met een half geschreven laatste regel."""
+    print("=== Testing Result Spool ===")
+    path = tmp_path / "run.spool.jsonl"
+    spool = ResultSpool(path, fsync_every=2, fsync_interval=60)
+    spool.append_result(_result("a.jpg"))
+    spool.append_result(_result("b.jpg"))
+    spool.append_batch(1, ["/P/a.jpg", "/P/b.jpg"])
+    spool.append_result(_result("c.jpg"))
+    spool.close()
+    valid_size = path.stat().st_size
+    with path.open("ab") as handle:
+        handle.write(b'{"type": "result", "data": {"YAPMO:FQ')
+
+    state = ResultSpool.read(path)
+    assert state.committed == {"/P/a.jpg", "/P/b.jpg"}
+    assert list(state.pending) == ["/P/c.jpg"]
+    assert state.pending["/P/c.jpg"]["YAPMO:Thumb"] == b"\x00\xff"
+    assert state.batches == 1
+    assert state.valid_size == valid_size
+
+    ResultSpool.truncate(path, state.valid_size)
+    assert path.stat().st_size == valid_size
+    print("✅ Spool survives a torn write")
+
+
+def test_resume_incomplete_run(tmp_path):
+    """Test hervatten: replay van de spool en overslaan van klare bestanden."""
+    print("\n=== Testing Resume ===")
+    files = [f"/P/{index}.jpg" for index in range(8)]
+    written: list[list[str]] = []
+
+    def write_batch(results):
+        written.append([result["YAPMO:FQPN"] for result in results])
+
+    run = ProcessingRun(tmp_path, fsync_every=1)
+    assert run.start("/P", files, write_batch) == files
+    batch = [_result("0.jpg"), _result("1.jpg"), _result("2.jpg", "FAIL")]
+    for result in batch:
+        run.record(result)
+    assert run.batch_written(batch) == 1
+    run.record(_result("3.jpg"))
+    run.record(_result("4.jpg"))
+    run.spool.flush()
+    # Crash: geen finish(), manifest blijft op running staan
+
+    run = ProcessingRun(tmp_path)
+    assert run.incomplete_run() is not None
+    remaining = run.start("/P", files, write_batch)
+    assert written == [["/P/3.jpg", "/P/4.jpg"]]
+    assert remaining == ["/P/2.jpg", "/P/5.jpg", "/P/6.jpg", "/P/7.jpg"]
+    assert (run.replayed, run.skipped) == (2, 4)
+    assert run.manifest.resumed == 1
+    assert run.manifest.batches == 2
+
+    run.finish(aborted=True)
+    manifest = RunManifest.load(tmp_path / "run_manifest.json")
+    assert manifest.status == STATUS_ABORTED
+
+    run = ProcessingRun(tmp_path)
+    assert run.start("/P", files, write_batch) == remaining
+    spool_file = tmp_path / run.manifest.spool_file
+    run.finish()
+    assert json.loads((tmp_path / "run_manifest.json").read_text())["status"] == STATUS_COMPLETE
+    assert not spool_file.exists()
+    assert run.incomplete_run() is None
+    assert ProcessingRun(tmp_path).start("/P", files, write_batch) == files
+    print("✅ Incomplete run resumed")
+
+
+def test_resume_only_same_run(tmp_path):
+    """Test dat een andere bron, andere database of leeggemaakte database niet hervat."""
+    print("\n=== Testing Resume Guard ===")
+    files = ["/P/a.jpg", "/P/b.jpg"]
+    written: list[list[str]] = []
+
+    def write_batch(results):
+        written.append([result["YAPMO:FQPN"] for result in results])
+
+    def crashed_run() -> None:
+        run = ProcessingRun(tmp_path, fsync_every=1)
+        run.start("/P", files, write_batch, database="/db/main.db")
+        run.record(_result("a.jpg"))
+        run.batch_written([_result("a.jpg")])
+        run.record(_result("b.jpg"))
+        run.spool.flush()
+
+    crashed_run()
+    other = ProcessingRun(tmp_path)
+    assert other.start("/Q", ["/Q/c.jpg"], write_batch, database="/db/main.db") == ["/Q/c.jpg"]
+    assert not other.resumed
+    assert other.manifest.source == "/Q"
+    assert written == []
+
+    crashed_run()
+    other = ProcessingRun(tmp_path)
+    assert other.start("/P", files, write_batch, database="/db/volume.db") == files
+    assert not other.resumed
+
+    crashed_run()
+    cleaned = ProcessingRun(tmp_path)
+    assert cleaned.start("/P", files, write_batch, database="/db/main.db", database_cleaned=True) == files
+    assert (cleaned.resumed, cleaned.skipped, written) == (False, 0, [])
+
+    crashed_run()
+    same = ProcessingRun(tmp_path)
+    assert same.start("/P", files, write_batch, database="/db/main.db") == []
+    assert same.resumed
+    assert written == [["/P/b.jpg"]]
+    print("✅ Only the same source and database are resumed")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Test script voor schema_evolution.py (app2)."""
+
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add app2 directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app2"))
+
+from metadata_blob import RawMetadataStore  # noqa: E402
+from schema_evolution import SchemaEvolution, diff_schema, exiftool_tags  # noqa: E402
+from typed_ingest import TypedRecordMapper  # noqa: E402
+
+OLD_MAPPINGS = {"YAPMO:Hash": "YAPMO_hash", "EXIF:Make": "EXIF_Make"}
+NEW_MAPPINGS = {**OLD_MAPPINGS, "EXIF:Model": "EXIF_Model", "EXIF:DateTimeOriginal": "EXIF_DateTimeOriginal"}
+FIELD_TYPES = {"EXIF_DateTimeOriginal": "EPOCH"}
+
+
+def _create_media(connection: sqlite3.Connection) -> None:
+    mapper = TypedRecordMapper(OLD_MAPPINGS, FIELD_TYPES)
+    connection.execute(
+        "CREATE TABLE Media (id INTEGER PRIMARY KEY AUTOINCREMENT, YAPMO_FQPN TEXT UNIQUE NOT NULL, "
+        f"{', '.join(mapper.column_definitions())})",
+    )
+
+
+def test_diff_schema():
+    """Test het verschil tussen mappings en de live tabel."""
+    print("=== Testing Schema Diff ===")
+    connection = sqlite3.connect(":memory:")
+    _create_media(connection)
+    connection.execute("ALTER TABLE Media ADD COLUMN Legacy_Field TEXT")
+    diff = diff_schema(connection, "Media", TypedRecordMapper(NEW_MAPPINGS, {**FIELD_TYPES, "EXIF_Make": "INTEGER"}))
+    assert diff.added == ["EXIF_Model", "EXIF_DateTimeOriginal"]
+    assert diff.removed == ["Legacy_Field"]
+    assert diff.retyped == [("EXIF_Make", "TEXT", "INTEGER")]
+    assert exiftool_tags(["YAPMO:Hash", "EXIF:Model"]) == ["-EXIF:Model"]
+    print("✅ Schema diff correct")
+
+
+def test_migrate_and_backfill_from_raw():
+    """Test ALTER TABLE, de wachtrij en een backfill zonder ExifTool aanroepen."""
+    print("\n=== Testing Migrate And Backfill ===")
+    connection = sqlite3.connect(":memory:")
+    _create_media(connection)
+    connection.executemany(
+        "INSERT INTO Media (YAPMO_FQPN, EXIF_Make) VALUES (?, ?)",
+        [("/P/a.jpg", "Fujifilm"), ("/P/b.jpg", "Google")],
+    )
+    raw_store = RawMetadataStore(connection, "Media", "Media_Raw")
+    raw_store.create()
+    raw_store.store([
+        ("/P/a.jpg", {"EXIF:Make": "Fujifilm", "EXIF:Model": "X100V", "EXIF:DateTimeOriginal": "1970:01:01 00:01:00"}),
+        ("/P/b.jpg", {"EXIF:Make": "Google", "EXIF:Model": "Pixel"}),
+    ])
+
+    evolution = SchemaEvolution(connection, "Media", "Schema_Backfill", TypedRecordMapper(NEW_MAPPINGS, FIELD_TYPES))
+    evolution.create()
+    assert evolution.migrate().added == ["EXIF_Model", "EXIF_DateTimeOriginal"]
+    assert evolution.pending() == {"EXIF_Model": 0, "EXIF_DateTimeOriginal": 0}
+    assert evolution.migrate().is_empty()
+
+    assert evolution.run_backfill(raw_store=raw_store) == 0
+    assert evolution.pending() == {}
+    assert connection.execute(
+        "SELECT YAPMO_FQPN, EXIF_Model, EXIF_DateTimeOriginal FROM Media ORDER BY id",
+    ).fetchall() == [("/P/a.jpg", "X100V", 60), ("/P/b.jpg", "Pixel", None)]
+    print("✅ Columns added and backfilled")
+
+
+def test_backfill_batch_timeout(monkeypatch):
+    """Test dat een ExifTool timeout de batch niet als verwerkt markeert."""
+    print("\n=== Testing Backfill Timeout ===")
+    connection = sqlite3.connect(":memory:")
+    _create_media(connection)
+    connection.execute("INSERT INTO Media (YAPMO_FQPN, EXIF_Make) VALUES ('/P/a.jpg', 'Fujifilm')")
+    evolution = SchemaEvolution(connection, "Media", "Schema_Backfill", TypedRecordMapper(NEW_MAPPINGS, FIELD_TYPES))
+    evolution.create()
+    evolution.migrate()
+
+    def timeout(cmd: list[str], **kwargs: object) -> None:
+        raise subprocess.TimeoutExpired(cmd, kwargs.get("timeout"))
+
+    monkeypatch.setattr(subprocess, "run", timeout)
+    with pytest.raises(subprocess.SubprocessError):
+        evolution.run_backfill()
+    # Voortgang staat nog voor de batch: de volgende run probeert hem opnieuw
+    assert evolution.pending() == {"EXIF_Model": 0, "EXIF_DateTimeOriginal": 0}
+    print("✅ Timed out batch is retried")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Test script voor search_query.py (app2)."""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add app2 directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app2"))
+
+from library_stats import LibraryStats  # noqa: E402
+from search_query import (  # noqa: E402
+    SearchCompiler,
+    SearchSyntaxError,
+    parse_size,
+    period_bounds,
+    tokenize,
+)
+from tag_index import TagIndex  # noqa: E402
+
+JUNE_2019 = 1559390400
+MARCH_2021 = 1614556800
+
+
+def _create_library() -> sqlite3.Connection:
+    connection = sqlite3.connect(":memory:")
+    connection.execute(
+        "CREATE TABLE Media (id INTEGER PRIMARY KEY, YAPMO_FQPN TEXT UNIQUE, YAPMO_FILE_Type TEXT, "
+        "EXIF_DateTimeOriginal INTEGER, QuickTime_CreateDate INTEGER, EXIF_Model TEXT, "
+        "YAPMO_FILE_Path TEXT, YAPMO_FILE_Size INTEGER, IPTC_Keywords TEXT)",
+    )
+    connection.execute("CREATE INDEX idx_model ON Media(EXIF_Model)")
+    connection.execute("CREATE INDEX idx_type ON Media(YAPMO_FILE_Type)")
+    connection.executemany(
+        "INSERT INTO Media (YAPMO_FQPN, YAPMO_FILE_Type, EXIF_DateTimeOriginal, QuickTime_CreateDate, "
+        "EXIF_Model, YAPMO_FILE_Path, YAPMO_FILE_Size, IPTC_Keywords) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            ("/Pictures/2020/ski.mp4", "video", None, MARCH_2021, "ILCE-7M3", "/Pictures/2020", 300 << 20, "ski"),
+            ("/Pictures/2020/a.jpg", "image", JUNE_2019, None, "ILCE-7M3", "/Pictures/2020", 5 << 20, "ski"),
+            ("/Pictures/2020/b.mp4", "video", JUNE_2019, None, "Pixel", "/Pictures/2020", 200 << 20, "beach"),
+            ("/Pictures/2018/c.mp4", "video", JUNE_2019, None, "ILCE-7M3", "/Pictures/2018", 200 << 20, "ski"),
+            ("/Pictures/20200/d.mp4", "video", JUNE_2019, None, "ILCE-7M3", "/Pictures/20200", 200 << 20, "ski"),
+        ],
+    )
+    LibraryStats(connection, "Media", "Library_Stats").create()
+    tags = TagIndex(connection, "Media", "Tags", "MediaTags", ["IPTC_Keywords"], [])
+    tags.create()
+    tags.sync([row[0] for row in connection.execute("SELECT YAPMO_FQPN FROM Media")])
+    return connection
+
+
+def test_tokenize_and_values():
+    """Test het parsen van termen, groottes en datums."""
+    print("=== Testing Tokenizer ===")
+    terms = tokenize('camera:"ILCE-7M3" year:2019..2021 -type:video size>100MB sunset')
+    assert [(t.field, t.op, t.value, t.negated) for t in terms] == [
+        ("camera", ":", "ILCE-7M3", False),
+        ("year", ":", "2019..2021", False),
+        ("type", ":", "video", True),
+        ("size", ">", "100MB", False),
+        ("text", ":", "sunset", False),
+    ]
+    assert parse_size("1.5GB") == 1536 << 20
+    assert period_bounds("2019-12") == (1575158400, 1577836800)
+    with pytest.raises(SearchSyntaxError):
+        tokenize("camera:")
+    with pytest.raises(SearchSyntaxError):
+        parse_size("big")
+    print("✅ Tokenizer correct")
+
+
+def test_compile_and_plan():
+    """Test de gecompileerde SQL, de resultaten en de volgorde van de planner."""
+    print("\n=== Testing Compiler ===")
+    connection = _create_library()
+    compiler = SearchCompiler("Media", table_stats="Library_Stats", table_tags="Tags", table_media_tags="MediaTags")
+
+    compiled = compiler.compile(
+        connection, 'camera:"ILCE-7M3" year:2019..2021 kw:ski type:video size>100MB under:/Pictures/2020',
+    )
+    rows = connection.execute(compiled.sql, compiled.parameters).fetchall()
+    assert [row[1] for row in rows] == ["/Pictures/2020/ski.mp4"]
+
+    # Termen op geschatte selectiviteit; alleen de eerste mag een index gebruiken
+    estimates = [estimate for _description, estimate in compiled.plan]
+    assert estimates == sorted(estimates)
+    assert compiled.plan[1] == ("under /Pictures/2020", 3)
+    assert "WHERE (YAPMO_FILE_Size > ?)" in compiled.sql
+    assert "+EXIF_Model = ?" in compiled.sql
+    assert "+YAPMO_FILE_Type = ?" in compiled.sql
+
+    compiled = compiler.compile(connection, "under:/Pictures/2020 camera:Pixel")
+    assert compiled.plan[0] == ("camera = Pixel", 1)
+    assert "WHERE EXIF_Model = ?" in compiled.sql
+    assert [row[1] for row in connection.execute(compiled.sql, compiled.parameters)] == ["/Pictures/2020/b.mp4"]
+
+    compiled = compiler.compile(connection, "-camera:Pixel year:2019")
+    rows = connection.execute(compiled.sql, compiled.parameters).fetchall()
+    assert [row[1] for row in rows] == ["/Pictures/2020/a.jpg", "/Pictures/2018/c.mp4", "/Pictures/20200/d.mp4"]
+
+    compiled = compiler.compile(connection, "kw:nothing")
+    assert connection.execute(compiled.sql, compiled.parameters).fetchall() == []
+    with pytest.raises(SearchSyntaxError, match="not available"):
+        compiler.compile(connection, "sunset")
+    with pytest.raises(SearchSyntaxError, match="Unknown field"):
+        compiler.compile(connection, "lens:50mm")
+    print("✅ Compiler and planner work")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Test script voor single_read.py (app2)."""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add app2 directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app2"))
+
+from single_read import (  # noqa: E402
+    ReusableReadBuffer,
+    find_header_length,
+    header_bytes_for_exiftool,
+)
+
+
+def _segment(marker: int, payload: bytes) -> bytes:
+    return bytes([0xFF, marker]) + (len(payload) + 2).to_bytes(2, "big") + payload
+
+
+# SOI + APP1 (Exif) + DQT + SOS + scan data + EOI
+JPEG_HEADER = b"\xff\xd8" + _segment(0xE1, b"Exif\x00\x00" + b"x" * 20) + _segment(0xDB, b"q" * 10)
+JPEG_DATA = JPEG_HEADER + _segment(0xDA, b"s" * 8) + b"\x12\x34" * 100 + b"\xff\xd9"
+
+
+def test_jpeg_header_length():
+    """Test dat de JPEG header eindigt bij Start Of Scan."""
+    print("=== Testing JPEG Header Length ===")
+    assert find_header_length(JPEG_DATA, ".jpg") == len(JPEG_HEADER)
+    assert find_header_length(b"not a jpeg", ".jpg") is None
+    assert find_header_length(JPEG_DATA, ".mp4") is None
+    print("✅ JPEG header length correct")
+
+
+def test_header_bytes_for_exiftool():
+    """Test dat de header bytes een structureel geldige JPEG vormen."""
+    print("\n=== Testing Header Bytes For ExifTool ===")
+    header = header_bytes_for_exiftool(memoryview(JPEG_DATA), ".jpeg")
+    assert header == JPEG_HEADER + b"\xff\xd9"
+    assert header_bytes_for_exiftool(b"\x89PNG\r\n\x1a\n", ".png") is None
+    print("✅ Header bytes correct")
+
+
+def test_reusable_read_buffer():
+    """Test dat de buffer hergebruikt wordt en exact de bestandsinhoud geeft."""
+    print("\n=== Testing Reusable Read Buffer ===")
+    buffer = ReusableReadBuffer()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        large = Path(temp_dir) / "large.jpg"
+        small = Path(temp_dir) / "small.jpg"
+        large.write_bytes(JPEG_DATA * 4)
+        small.write_bytes(JPEG_DATA)
+
+        assert bytes(buffer.read(large)) == JPEG_DATA * 4
+        view = buffer.read(small)
+        assert bytes(view) == JPEG_DATA
+        assert view.readonly
+    print("✅ Reusable read buffer correct")
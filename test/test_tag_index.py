@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Test script voor tag_index.py (app2)."""
+
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+# Add app2 directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app2"))
+
+from media_processing import MediaProcessing  # noqa: E402
+from tag_index import TagIndex, split_keywords  # noqa: E402
+from typed_ingest import to_text  # noqa: E402
+
+
+def _create_index() -> TagIndex:
+    connection = sqlite3.connect(":memory:")
+    connection.execute(
+        "CREATE TABLE Media (id INTEGER PRIMARY KEY, YAPMO_FQPN TEXT UNIQUE, "
+        "IPTC_Keywords TEXT, XMP_HierarchicalSubject TEXT)",
+    )
+    connection.executemany(
+        "INSERT INTO Media (YAPMO_FQPN, IPTC_Keywords, XMP_HierarchicalSubject) VALUES (?, ?, ?)",
+        [
+            ("/a.jpg", '["strand", "Vakantie"]', '["Vakantie|Zomer|Italie"]'),
+            ("/b.jpg", '["sneeuw", "bergen"]', '["Vakantie|Wintersport"]'),
+            ("/c.jpg", "sneeuw", None),
+        ],
+    )
+    index = TagIndex(
+        connection, "Media", "Tags", "MediaTags", ["IPTC_Keywords"], ["XMP_HierarchicalSubject"],
+    )
+    # Nieuwe tabellen worden gevuld vanuit de bestaande Media rijen
+    index.create()
+    return index
+
+
+def test_split_keywords():
+    """Test parsing van JSON lijsten en enkele keywords."""
+    print("=== Testing Keyword Splitting ===")
+    assert split_keywords('["a", "b", "a"]') == ["a", "b"]
+    # Een enkel ExifTool keyword mag komma's bevatten
+    assert split_keywords(" Smith, John ") == ["Smith, John"]
+    assert split_keywords("[draft") == ["[draft"]
+    assert split_keywords(["x"]) == ["x"]
+    assert split_keywords(None) == []
+    print("✅ Keywords split")
+
+
+def test_facets_and_hierarchy():
+    """Test facet tellingen over de hierarchie en resync."""
+    print("\n=== Testing Tag Facets ===")
+    index = _create_index()
+    roots = dict(index.facet_counts())
+    # Platte keyword "Vakantie" en hierarchie root zijn dezelfde tag
+    assert roots == {"Vakantie": 2, "sneeuw": 2, "strand": 1, "bergen": 1}
+    assert dict(index.facet_counts("Vakantie")) == {"Zomer": 1, "Wintersport": 1}
+    assert [fqpn for _id, fqpn in index.media_for_tag("Vakantie|Wintersport")] == ["/b.jpg"]
+    assert index.media_for_tag("Onbekend") == []
+
+    index.connection.execute(
+        "UPDATE Media SET XMP_HierarchicalSubject = NULL WHERE YAPMO_FQPN = '/b.jpg'",
+    )
+    index.sync(["/b.jpg"])
+    assert dict(index.facet_counts("Vakantie")) == {"Zomer": 1}
+    assert index.prune_unused() == 1
+    assert index.find_tag("Vakantie|Wintersport") is None
+    print("✅ Tag facets work")
+
+
+def test_exiftool_keywords_to_tags(monkeypatch):
+    """Test echte exiftool -j -G output via _process_exiftool_output naar tags."""
+    print("\n=== Testing ExifTool Keywords ===")
+    monkeypatch.setattr(MediaProcessing, "_check_exiftool_availability", lambda _self: None)
+    processing = MediaProcessing()
+    # exiftool -j -G: meerdere waarden als lijst, een enkele waarde als tekst
+    stdout = json.dumps([{
+        "SourceFile": "/a.jpg",
+        "File:FileSize": "2.3 MB",
+        "IPTC:Keywords": "Smith, John",
+        "XMP:Subject": ["Smith, John", "Strand"],
+        "XMP:HierarchicalSubject": "Familie|Smith, John",
+        "XMP:Title": "Zomer",
+    }])
+    result = processing._process_exiftool_output(stdout, Path("/a.jpg"))
+    assert result["XMP_Subject"] == ["Smith, John", "Strand"]
+    assert result["XMP_HierarchicalSubject"] == "Familie|Smith, John"
+    assert result["XMP_Title"] == "Zomer"
+
+    columns = ["IPTC_Keywords", "XMP_Subject", "XMP_HierarchicalSubject"]
+    connection = sqlite3.connect(":memory:")
+    connection.execute(
+        f"CREATE TABLE Media (id INTEGER PRIMARY KEY, YAPMO_FQPN TEXT UNIQUE, {', '.join(columns)})",
+    )
+    connection.execute(
+        f"INSERT INTO Media (YAPMO_FQPN, {', '.join(columns)}) VALUES ('/a.jpg', ?, ?, ?)",
+        [to_text(result[column]) for column in columns],
+    )
+    index = TagIndex(
+        connection, "Media", "Tags", "MediaTags", columns[:2], ["XMP_HierarchicalSubject"],
+    )
+    index.create()
+    index.sync(["/a.jpg"])
+    assert dict(index.facet_counts()) == {"Smith, John": 1, "Strand": 1, "Familie": 1}
+    assert dict(index.facet_counts("Familie")) == {"Smith, John": 1}
+    print("✅ ExifTool keywords reach the tag index")
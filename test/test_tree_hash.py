@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Test script voor tree_hash.py (app2)."""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add app2 directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app2"))
+
+from tree_hash import (  # noqa: E402
+    combine_segment_digests,
+    is_tree_hash,
+    segment_count,
+    tree_hash_file,
+    verify_segments,
+)
+
+
+def _write_temp_file(data: bytes) -> Path:
+    with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as temp_file:
+        temp_file.write(data)
+    return Path(temp_file.name)
+
+
+def test_segment_count():
+    """Test segment telling inclusief randgevallen."""
+    print("=== Testing Segment Count ===")
+    assert segment_count(0, 10) == 1
+    assert segment_count(10, 10) == 1
+    assert segment_count(11, 10) == 2
+    print("✅ Segment count correct")
+
+
+def test_tree_hash_independent_of_threads():
+    """Test dat root hash niet afhangt van het aantal threads."""
+    print("\n=== Testing Tree Hash Determinism ===")
+    temp_path = _write_temp_file(bytes(range(256)) * 1000)
+    try:
+        single = tree_hash_file(temp_path, segment_size=10_000, max_threads=1)
+        parallel = tree_hash_file(temp_path, segment_size=10_000, max_threads=8)
+        assert single.root_hash == parallel.root_hash
+        assert len(single.segment_digests) == 26
+        assert single.root_hash == combine_segment_digests(single.segment_digests)
+        assert is_tree_hash(single.hash_value)
+        assert not is_tree_hash("mp4_123_2024-01-01_abcdef")
+        print("✅ Tree hash deterministic")
+    finally:
+        temp_path.unlink()
+
+
+def test_verify_segments_detects_corruption():
+    """Test dat een gewijzigd segment als mismatch gevonden wordt."""
+    print("\n=== Testing Segment Verification ===")
+    data = bytearray(b"a" * 50_000)
+    temp_path = _write_temp_file(bytes(data))
+    try:
+        result = tree_hash_file(temp_path, segment_size=10_000)
+
+        data[25_000] = ord("b")
+        temp_path.write_bytes(bytes(data))
+
+        outcome = dict(verify_segments(temp_path, 10_000, result.segment_digests))
+        assert outcome == {0: True, 1: True, 2: False, 3: True, 4: True}
+
+        # Hervatten vanaf segment 3
+        resumed = list(verify_segments(temp_path, 10_000, result.segment_digests, 3))
+        assert resumed == [(3, True), (4, True)]
+        print("✅ Segment verification correct")
+    finally:
+        temp_path.unlink()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Test script voor typed_ingest.py (app2)."""
+
+import json
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+# Add app2 directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app2"))
+
+from config import get_param  # noqa: E402
+from media_processing import MediaProcessing  # noqa: E402
+from typed_ingest import (  # noqa: E402
+    TypedRecordMapper,
+    convert_value,
+    index_statements,
+    to_duration,
+    to_epoch,
+    to_iso,
+    to_real,
+)
+
+
+def test_value_conversion():
+    """Test omzetting van ExifTool waarden naar getypeerde waarden."""
+    print("=== Testing Value Conversion ===")
+    assert to_epoch("1970:01:02 00:00:00") == 86400
+    assert to_epoch("1970:01:01 02:00:00+02:00") == 0
+    assert to_epoch("0000:00:00 00:00:00") is None
+    assert to_epoch("nil") is None
+    assert to_iso("2019:06:01 14:30:05") == "2019-06-01T14:30:05"
+    assert to_iso("2019:06:01") == "2019-06-01T00:00:00"
+
+    assert to_real("52 deg 22' 12.00\" N") == 52.37
+    assert round(to_real("4 deg 30' 0.00\" W"), 4) == -4.5
+    assert to_real("12.5 MP") == 12.5
+    assert to_real("") is None
+    assert convert_value("2.3 MB", "INTEGER") == 2411725
+    assert convert_value("512 kB", "INTEGER") == 524288
+    assert convert_value("123 bytes", "INTEGER") == 123
+    assert convert_value("5", "integer") == 5
+
+    assert to_duration("0:01:23") == 83.0
+    assert to_duration("12.5 s") == 12.5
+    assert convert_value(["a", "b"], "TEXT") == '["a", "b"]'
+    print("✅ Values converted")
+
+
+def test_record_mapper_upsert():
+    """Test typed schema, upsert en range query op getypeerde kolommen."""
+    print("\n=== Testing Record Mapper ===")
+    mapper = TypedRecordMapper(
+        {
+            "YAPMO:FQPN": "YAPMO_FQPN",
+            "YAPMO:Hash": "YAPMO_hash",
+            "YAPMO:FileSize": "YAPMO_FILE_Size",
+            "EXIF:DateTimeOriginal": "EXIF_DateTimeOriginal",
+        },
+        {"YAPMO_FILE_Size": "INTEGER", "EXIF_DateTimeOriginal": "EPOCH"},
+    )
+    assert "YAPMO_FILE_Size INTEGER" in mapper.column_definitions()
+
+    connection = sqlite3.connect(":memory:")
+    connection.execute(
+        "CREATE TABLE Media (id INTEGER PRIMARY KEY, YAPMO_FQPN TEXT UNIQUE NOT NULL, "
+        f"{', '.join(mapper.column_definitions())})",
+    )
+    for statement in index_statements("Media", ["EXIF_DateTimeOriginal", "Missing"], mapper.columns):
+        connection.execute(statement)
+
+    records = [
+        # Worker zet hash onder de YAPMO key; de kolomnaam uit ExifTool is None
+        {"YAPMO:FQPN": "/a.jpg", "YAPMO:Hash": "h1", "YAPMO_hash": None,
+         "YAPMO:FileSize": "2000", "EXIF_DateTimeOriginal": "2019:06:01 12:00:00"},
+        {"YAPMO:FQPN": "/b.jpg", "YAPMO:Hash": "h2", "YAPMO:FileSize": "10",
+         "EXIF_DateTimeOriginal": "nil"},
+    ]
+    sql = mapper.upsert_sql("Media")
+    connection.executemany(sql, [mapper.to_row(record) for record in records])
+    records[0]["YAPMO:Hash"] = "h1-new"
+    connection.execute(sql, mapper.to_row(records[0]))
+
+    rows = connection.execute(
+        "SELECT YAPMO_FQPN, YAPMO_hash, YAPMO_FILE_Size, typeof(EXIF_DateTimeOriginal) "
+        "FROM Media WHERE YAPMO_FILE_Size > 100",
+    ).fetchall()
+    assert rows == [("/a.jpg", "h1-new", 2000, "integer")]
+    assert connection.execute("SELECT count(*) FROM Media").fetchone()[0] == 2
+    assert connection.execute(
+        "SELECT EXIF_DateTimeOriginal FROM Media WHERE YAPMO_FQPN = '/b.jpg'",
+    ).fetchone()[0] is None
+    print("✅ Typed upsert works")
+
+
+def test_single_read_file_fields(monkeypatch, tmp_path):
+    """Test dat een single-read resultaat naam, map en grootte van het bestand krijgt."""
+    print("\n=== Testing Single-Read File Fields ===")
+    monkeypatch.setattr(MediaProcessing, "_check_exiftool_availability", lambda _self: None)
+    processing = MediaProcessing()
+    processing.store_raw_metadata = True
+    photo = tmp_path / "photo.jpg"
+    photo.write_bytes(b"x" * 5000)
+    os.utime(photo, (86400, 86400))
+
+    # exiftool -j -G - : geen naam of map, FileSize is de lengte van de header
+    stdout = json.dumps([{
+        "SourceFile": "-",
+        "File:FileSize": "120 bytes",
+        "File:FileType": "JPEG",
+        "EXIF:Make": "Canon",
+    }])
+    metadata = processing._process_exiftool_output(stdout, photo)
+    processing._add_stat_metadata_fields(metadata, photo, photo.stat())
+    record = {"YAPMO:FQPN": str(photo), "YAPMO:Hash": "h1", **metadata}
+
+    mappings = {
+        **get_param("metadata_fields_file"),
+        **get_param("metadata_fields_image"),
+        **get_param("metadata_fields_video"),
+    }
+    mapper = TypedRecordMapper(mappings, get_param("database_field_types"))
+    row = dict(zip(mapper.columns, mapper.to_row(record), strict=True))
+    assert row["FILE_Name"] == "photo.jpg"
+    assert row["FILE_Path"] == str(tmp_path)
+    assert row["FILE_Size"] == 5000
+    assert row["FILE_Modify_Date"] == 86400
+
+    raw = metadata["YAPMO:RawMetadata"]
+    assert raw["File:FileSize"] == "5000"
+    assert raw["File:FileName"] == "photo.jpg"
+    assert raw["File:Directory"] == str(tmp_path)
+    assert raw["EXIF:Make"] == "Canon"
+    print("✅ Single-read file fields come from the file")